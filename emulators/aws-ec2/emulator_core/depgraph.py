@@ -0,0 +1,170 @@
+"""
+Typed parent → child edges between resources.
+
+Every resource dataclass tracks its dependents in ChildIds fields (declared
+with child_ids("Subnet") and so on). A ChildIds is one typed edge set: the
+IDs of one kind of child, kept as an insertion-ordered set, so registering
+and deregistering a child is O(1) however many siblings it has. The helpers
+here read those edges generically: the dependency check a Delete action runs
+before removing a resource, and the walk over a resource's subtree used for
+cascading deletes.
+"""
+
+from dataclasses import fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models import lazy_field
+from .utils import create_error_response
+
+# Resource kinds (as used in ChildIds.kind) whose EC2State store name is not
+# simply the snake_case plural of the kind
+_KIND_STORES = {
+    "NetworkACL": "network_acls",
+    "ResourceDiscovery": "resource_discoveries",
+    "TransitGatewayMulticast": "transit_gateway_multicast",
+    "TransitGatewayConnect": "transit_gateway_connect",
+    "TrafficMirroring": "traffic_mirroring",
+    "Ec2Topology": "ec2_topology",
+    "VpcPeering": "vpc_peering",
+    "VmExport": "vm_export",
+}
+
+
+class ChildIds:
+    """
+    IDs of one kind of child resource, as an insertion-ordered set.
+
+    Supports the list operations the backends use on child ID lists
+    (append, remove, membership, iteration, len, truthiness), each O(1).
+    Appending an ID that is already present keeps a single copy.
+
+    Example:
+        vpc.subnet_ids.append("subnet-1")
+        "subnet-1" in vpc.subnet_ids  # Returns: True
+        vpc.subnet_ids.kind  # Returns: "Subnet"
+    """
+
+    __slots__ = ("kind", "_ids")
+
+    def __init__(self, kind: str = "", ids: Iterable[str] = ()) -> None:
+        self.kind = kind
+        self._ids: Dict[str, None] = dict.fromkeys(ids)
+
+    def append(self, resource_id: str) -> None:
+        self._ids[resource_id] = None
+
+    def extend(self, resource_ids: Iterable[str]) -> None:
+        for resource_id in resource_ids:
+            self._ids[resource_id] = None
+
+    def remove(self, resource_id: str) -> None:
+        try:
+            del self._ids[resource_id]
+        except KeyError:
+            raise ValueError(f"{resource_id!r} is not a tracked {self.kind} child") from None
+
+    def discard(self, resource_id: str) -> None:
+        self._ids.pop(resource_id, None)
+
+    def __contains__(self, resource_id: object) -> bool:
+        return resource_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index: Any) -> Any:
+        return list(self._ids)[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ChildIds):
+            return self.kind == other.kind and list(self._ids) == list(other._ids)
+        if isinstance(other, (list, tuple)):
+            return list(self._ids) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ChildIds({self.kind!r}, {list(self._ids)!r})"
+
+    def __reduce__(self) -> Any:
+        return ChildIds, (self.kind, tuple(self._ids))
+
+
+def child_ids(kind: str) -> Any:
+    """Dataclass field holding the IDs of ``kind`` children (allocated on first use)."""
+    return lazy_field(lambda: ChildIds(kind))
+
+
+_EDGE_FIELDS: Dict[type, Tuple[str, ...]] = {}
+
+
+def edges(resource: Any) -> List[ChildIds]:
+    """The resource's child edge sets, in field declaration order."""
+    names = _EDGE_FIELDS.get(type(resource))
+    if names is None:
+        try:
+            candidates = [item.name for item in fields(resource)]
+        except TypeError:
+            candidates = []
+        names = tuple(name for name in candidates if isinstance(getattr(resource, name, None), ChildIds))
+        _EDGE_FIELDS[type(resource)] = names
+    return [getattr(resource, name) for name in names]
+
+
+def dependents(resource: Any) -> Dict[str, List[str]]:
+    """{kind: child IDs} for every non-empty edge set of ``resource``."""
+    found: Dict[str, List[str]] = {}
+    for children in edges(resource):
+        if children:
+            found.setdefault(children.kind, []).extend(children)
+    return found
+
+
+def dependency_violation(resource: Any, resource_type: str) -> Optional[Dict[str, Any]]:
+    """
+    The DependencyViolation error for deleting ``resource`` while it still has
+    dependents, or None when it has none.
+    """
+    for children in edges(resource):
+        if children:
+            return create_error_response(
+                "DependencyViolation",
+                f"{resource_type} has dependent {children.kind}(s) and cannot be deleted.",
+            )
+    return None
+
+
+def kind_store(state: Any, kind: str) -> Optional[Dict[str, Any]]:
+    """The EC2State store holding resources of ``kind``, if any."""
+    name = _KIND_STORES.get(kind)
+    if name is None:
+        snake = "".join(f"_{char.lower()}" if char.isupper() else char for char in kind).lstrip("_")
+        name = snake + "s"
+    store = getattr(state, name, None)
+    return store if isinstance(store, dict) else None
+
+
+def subtree(state: Any, resource: Any) -> Dict[str, List[str]]:
+    """
+    {kind: IDs} of every resource reachable from ``resource`` through child
+    edges, each ID listed once. Children whose kind has no store (or that are
+    already gone from it) are listed but not descended into.
+    """
+    found: Dict[str, List[str]] = {}
+    seen = set()
+    pending = [resource]
+    while pending:
+        node = pending.pop()
+        for children in edges(node):
+            store = kind_store(state, children.kind)
+            for child_id in children:
+                if child_id in seen:
+                    continue
+                seen.add(child_id)
+                found.setdefault(children.kind, []).append(child_id)
+                child = store.get(child_id) if store is not None else None
+                if child is not None:
+                    pending.append(child)
+    return found
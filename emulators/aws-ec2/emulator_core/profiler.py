@@ -0,0 +1,281 @@
+"""
+On-demand profiling of live traffic, driven by the /_admin/profile endpoints.
+
+Three independent tools, each started and stopped at runtime:
+
+- cprofile: deterministic cProfile of the requests to one action (or all).
+  Since Python 3.12 a cProfile.Profile records every thread of the
+  interpreter, not just the one that enabled it, so profiled requests run
+  alone: each waits for the requests in flight to finish, and the requests
+  arriving meanwhile wait for it. The profile then holds only the profiled
+  requests (and the sampler's thread, if it runs too), at the cost of
+  serializing the server while targeted requests come in. Results
+  download as a pstats file (pstats.Stats / snakeviz) or as text.
+- sampler: a thread that samples the stacks of every other thread at a
+  fixed interval. It can only run when it gets the GIL, which busy threads
+  mostly hand over where they release it (I/O, os.urandom), so samples
+  would pile up there; the interpreter's switch interval is lowered to a
+  tenth of the sampling interval while it runs. Results download as
+  collapsed stacks, one "frame;frame count" line per stack
+  (flamegraph.pl, speedscope).
+- tracemalloc: traces allocations until stopped. Snapshots download as
+  text (top lines by size) or as a tracemalloc.Snapshot dump.
+
+Results stay available after stopping, until the tool is started again.
+Misuse (starting twice, downloading nothing) raises ValueError.
+
+Example:
+    profiler = Profiler()
+    profiler.start_cprofile("DescribeSecurityGroups")
+    profiling = profiler.begin(action)   # in the gateway, per request
+    try:
+        ...
+    finally:
+        if profiling:
+            profiler.end()
+    profiler.stop_cprofile()
+    profiler.pstats_data()  # bytes for pstats.Stats(path)
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import tracemalloc
+from typing import Any, Dict, Optional
+
+# Default seconds between two samples of the sampler
+DEFAULT_INTERVAL = 0.005
+# Default frames kept per allocation traceback by tracemalloc
+DEFAULT_FRAMES = 16
+
+
+class Profiler:
+    """The profiling tools of one emulator; see the module docstring."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # cProfile: the action profiled ("" for all), None when stopped
+        self._target: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._profiled = 0
+        # While cProfile runs, every request passes this gate: the one being
+        # profiled runs alone, the others run together (counted in _others)
+        self._gate = threading.Condition()
+        self._exclusive = False
+        self._waiting = 0
+        self._others = 0
+        self._local = threading.local()
+        # Sampler
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+        self._stacks: Dict[str, int] = {}
+        self._samples = 0
+        self._interval = DEFAULT_INTERVAL
+        self._labels: Dict[Any, str] = {}
+        self._switch_interval = sys.getswitchinterval()
+        # tracemalloc
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+
+    # cProfile
+
+    def start_cprofile(self, target: str = "") -> None:
+        """Profile the requests to ``target`` ("" for every request), dropping earlier results."""
+        with self._lock:
+            if self._target is not None:
+                raise ValueError(f"cProfile is already profiling '{self._target or '*'}'")
+            self._profile = cProfile.Profile()
+            self._profiled = 0
+            self._target = target
+
+    def stop_cprofile(self) -> None:
+        """Stop profiling requests; the results stay available."""
+        with self._lock:
+            if self._target is None:
+                raise ValueError("cProfile is not running")
+            self._target = None
+            with self._gate:
+                # Wake the requests waiting to be profiled, and wait for the one profiled
+                self._gate.notify_all()
+                while self._exclusive:
+                    self._gate.wait()
+
+    def begin(self, name: str) -> bool:
+        """
+        Pass the current request to ``name`` through the gate while cProfile
+        runs, profiling it if it is targeted. Returns whether it went
+        through; if so, end() must follow.
+        """
+        target = self._target
+        if target is None:
+            return False
+        with self._gate:
+            if target and target != name:
+                # Not profiled: keep out of the profile of another request
+                while self._exclusive or self._waiting:
+                    self._gate.wait()
+                self._others += 1
+                self._local.profiled = False
+                return True
+            self._waiting += 1
+            try:
+                while (self._exclusive or self._others) and self._target is not None:
+                    self._gate.wait()
+            finally:
+                self._waiting -= 1
+            if self._target is None:
+                self._gate.notify_all()
+                return False
+            self._exclusive = True
+            self._profiled += 1
+        self._local.profiled = True
+        self._profile.enable()
+        return True
+
+    def end(self) -> None:
+        """Let the current request out of the gate (after begin() returned True)."""
+        if self._local.profiled:
+            self._profile.disable()
+        with self._gate:
+            if self._local.profiled:
+                self._exclusive = False
+            else:
+                self._others -= 1
+            self._gate.notify_all()
+
+    def _stats(self) -> pstats.Stats:
+        with self._gate:
+            while self._exclusive:
+                self._gate.wait()
+            if self._profile is None or not self._profiled:
+                raise ValueError("No profiled requests")
+            return pstats.Stats(self._profile)
+
+    def pstats_data(self) -> bytes:
+        """The results as a pstats file (what pstats.Stats.dump_stats() writes)."""
+        return marshal.dumps(self._stats().stats)
+
+    def pstats_text(self, limit: int = 50, sort: str = "cumulative") -> str:
+        """The top ``limit`` functions by ``sort`` (a pstats sort key), as text."""
+        stream = io.StringIO()
+        stats = self._stats()
+        stats.stream = stream
+        try:
+            stats.sort_stats(sort)
+        except KeyError:
+            raise ValueError(f"Unknown sort key: {sort}") from None
+        stats.print_stats(limit)
+        return stream.getvalue()
+
+    # Sampler
+
+    def start_sampler(self, interval: float = DEFAULT_INTERVAL) -> None:
+        """Sample every thread's stack each ``interval`` seconds, dropping earlier samples."""
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        with self._lock:
+            if self._sampler is not None:
+                raise ValueError("The sampler is already running")
+            self._stacks = {}
+            self._samples = 0
+            self._interval = interval
+            self._sampler_stop.clear()
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch_interval, interval / 10))
+            self._sampler = threading.Thread(target=self._sample, name="vera-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop_sampler(self) -> None:
+        """Stop sampling; the samples stay available."""
+        with self._lock:
+            if self._sampler is None:
+                raise ValueError("The sampler is not running")
+            self._sampler_stop.set()
+            self._sampler.join()
+            self._sampler = None
+            sys.setswitchinterval(self._switch_interval)
+
+    def _label(self, code: Any) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)})"
+        return label
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        stacks = self._stacks
+        while not self._sampler_stop.wait(self._interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                names = []
+                while frame is not None:
+                    names.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                names.reverse()
+                stack = ";".join(names)
+                stacks[stack] = stacks.get(stack, 0) + 1
+            self._samples += 1
+
+    def collapsed(self) -> str:
+        """The samples as collapsed stacks, one "outer;...;inner count" line per stack."""
+        stacks = dict(self._stacks)
+        if not stacks:
+            raise ValueError("No samples")
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+    # tracemalloc
+
+    def start_tracemalloc(self, frames: int = DEFAULT_FRAMES) -> None:
+        """Trace allocations with ``frames`` frames per traceback, dropping the last snapshot."""
+        with self._lock:
+            if tracemalloc.is_tracing():
+                raise ValueError("tracemalloc is already tracing")
+            self._snapshot = None
+            tracemalloc.start(frames)
+
+    def stop_tracemalloc(self) -> None:
+        """Take a last snapshot and stop tracing (which frees the traces)."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise ValueError("tracemalloc is not tracing")
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        if tracemalloc.is_tracing():
+            return tracemalloc.take_snapshot()
+        if self._snapshot is None:
+            raise ValueError("tracemalloc is not tracing")
+        return self._snapshot
+
+    def tracemalloc_text(self, limit: int = 50, key: str = "lineno") -> str:
+        """The top ``limit`` allocation sites of a snapshot (now, or the last one), as text."""
+        snapshot = self._take_snapshot()
+        stats = snapshot.statistics(key)
+        lines = [f"{sum(stat.size for stat in stats) / 2**20:.1f} MiB in {sum(stat.count for stat in stats)} blocks"]
+        lines.extend(str(stat) for stat in stats[:limit])
+        return "\n".join(lines) + "\n"
+
+    def tracemalloc_data(self) -> bytes:
+        """A snapshot (now, or the last one) as a file for tracemalloc.Snapshot.load()."""
+        snapshot = self._take_snapshot()
+        with tempfile.NamedTemporaryFile(suffix=".tracemalloc") as handle:
+            snapshot.dump(handle.name)
+            return handle.read()
+
+    def status(self) -> Dict[str, Any]:
+        """Whether each tool is running, and what it has collected."""
+        return {
+            "cprofile": {"running": self._target is not None, "target": self._target,
+                         "requests": self._profiled},
+            "sampler": {"running": self._sampler is not None, "interval": self._interval,
+                        "samples": self._samples, "stacks": len(self._stacks)},
+            "tracemalloc": {"running": tracemalloc.is_tracing(),
+                            "tracedBytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0,
+                            "snapshot": self._snapshot is not None},
+        }
@@ -0,0 +1,949 @@
+"""
+Path engine behind Reachability Analyzer.
+
+NetworkTopology compiles the VPC resources held in EC2State (route tables,
+network interfaces and instances, security groups, network ACLs and
+gateways) into lookup tables. The tables are split into sections, each
+derived from a few stores, and a section is only rebuilt once one of its
+stores has been written to (see EC2State.store_versions).
+
+PathFinder runs a breadth-first search from the source to the destination.
+Each hop applies a longest-prefix route lookup, security group rules and
+network ACL entries to a packet described by protocol, addresses and
+destination port, so the first arrival is the shortest feasible path. The
+return path replays the stateless checks (network ACLs and routes) for the
+reply packet; security groups and NAT are stateful and are not re-checked.
+"""
+
+import ipaddress
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .rulematch import (PORTED_PROTOCOLS, Address, Network, NetworkAclRules, network_acl_rules,
+                        prefix_list_resolver, protocol_number, security_group_rules)
+
+_PROTOCOL_NAMES = {"6": "tcp", "17": "udp", "1": "icmp", "58": "icmpv6", "-1": "-1"}
+
+# Source port assumed for replies when the path does not pin one
+_EPHEMERAL_PORT = 49152
+
+# Route keys in the order CreateRoute accepts targets, mapped to target kinds
+_ROUTE_TARGETS = (
+    ("natGatewayId", "nat-gateway"),
+    ("transitGatewayId", "transit-gateway"),
+    ("vpcPeeringConnectionId", "peering"),
+    ("networkInterfaceId", "network-interface"),
+    ("instanceId", "instance"),
+    ("egressOnlyInternetGatewayId", "internet-gateway"),
+    ("carrierGatewayId", "carrier-gateway"),
+    ("localGatewayId", "local-gateway"),
+    ("vpcEndpointId", "vpc-endpoint"),
+)
+
+_RESOURCE_TYPES = {
+    "acl": "network-acl",
+    "eni": "network-interface",
+    "i": "instance",
+    "igw": "internet-gateway",
+    "eigw": "egress-only-internet-gateway",
+    "nat": "natgateway",
+    "pcx": "vpc-peering-connection",
+    "rtb": "route-table",
+    "sg": "security-group",
+    "subnet": "subnet",
+    "tgw": "transit-gateway",
+    "vgw": "vpn-gateway",
+    "vpc": "vpc",
+}
+
+# Resource ID prefixes PathFinder accepts as a source or destination
+ENDPOINT_PREFIXES = ("i", "eni", "nat", "igw")
+
+
+def resource_arn(resource_id: str) -> str:
+    resource_type = _RESOURCE_TYPES.get(resource_id.split("-")[0], "resource")
+    return f"arn:aws:ec2:::{resource_type}/{resource_id}"
+
+
+def _get(item: Any, *keys: str) -> Any:
+    if not isinstance(item, dict):
+        return None
+    for key in keys:
+        value = item.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _network(value: Any) -> Optional[Network]:
+    if not value:
+        return None
+    try:
+        return ipaddress.ip_network(str(value), strict=False)
+    except ValueError:
+        return None
+
+
+def _address(value: Any) -> Optional[Address]:
+    if not value:
+        return None
+    try:
+        return ipaddress.ip_address(str(value))
+    except ValueError:
+        return None
+
+
+def _port(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _covers(network: Optional[Network], address: Optional[Address]) -> bool:
+    """True if ``address`` falls in ``network``; an unknown address only matches /0."""
+    if network is None:
+        return False
+    if address is None:
+        return network.prefixlen == 0
+    return address.version == network.version and address in network
+
+
+@dataclass(frozen=True)
+class Packet:
+    """The traffic a path describes, as seen at one hop."""
+
+    protocol: str
+    source: Optional[Address]
+    destination: Optional[Address]
+    source_port: Optional[int] = None
+    destination_port: Optional[int] = None
+
+    def reply(self) -> "Packet":
+        return Packet(
+            self.protocol,
+            self.destination,
+            self.source,
+            self.destination_port,
+            self.source_port if self.source_port is not None else _EPHEMERAL_PORT,
+        )
+
+    def header(self) -> Dict[str, Any]:
+        header: Dict[str, Any] = {
+            "protocol": _PROTOCOL_NAMES.get(self.protocol, self.protocol),
+            "sourceAddressSet": [str(self.source)] if self.source else [],
+            "destinationAddressSet": [str(self.destination)] if self.destination else [],
+        }
+        if self.protocol in PORTED_PROTOCOLS and self.destination_port is not None:
+            header["destinationPortRangeSet"] = [{"from": self.destination_port, "to": self.destination_port}]
+        return header
+
+
+@dataclass(frozen=True)
+class _Route:
+    network: Network
+    kind: str
+    target: str
+    blackhole: bool
+    raw: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    """Something that owns addresses in a subnet: an instance, ENI or NAT gateway."""
+
+    id: str
+    kind: str
+    vpc_id: str
+    subnet_id: str
+    addresses: Tuple[Address, ...]
+    public_addresses: Tuple[Address, ...] = ()
+    groups: frozenset = frozenset()
+    instance_id: str = ""
+
+
+class NetworkTopology:
+    """
+    Compiled, incrementally refreshed view of the VPC network in an EC2State.
+
+    Example:
+        topology = NetworkTopology(EC2State.get())
+        topology.route_table("subnet-1")  # Returns: ("rtb-1", [_Route, ...])
+    """
+
+    # section -> stores it is derived from
+    SECTIONS: Dict[str, Tuple[str, ...]] = {
+        "routing": ("vpcs", "subnets", "route_tables"),
+        "endpoints": ("elastic_network_interfaces", "instances", "elastic_ip_addresses", "nat_gateways"),
+        "filters": ("network_acls",),
+        "gateways": ("internet_gateways", "transit_gateways", "transit_gateway_vpc_attachments", "vpc_peering"),
+    }
+
+    def __init__(self, state: Any) -> None:
+        self.state = state
+        self._sections: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any]]] = {}
+        self.rebuilds: Dict[str, int] = {}
+
+    def _section(self, name: str) -> Dict[str, Any]:
+        versions = getattr(self.state, "store_versions", {})
+        key = tuple(
+            (versions.get(store, 0), len(getattr(self.state, store, None) or ()))
+            for store in self.SECTIONS[name]
+        )
+        cached = self._sections.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, getattr(self, f"_build_{name}")())
+            self._sections[name] = cached
+            self.rebuilds[name] = self.rebuilds.get(name, 0) + 1
+        return cached[1]
+
+    # ---------------------------------------------------------------- builders
+
+    def _build_routing(self) -> Dict[str, Any]:
+        vpc_networks: Dict[str, Tuple[Network, ...]] = {}
+        for vpc_id, vpc in self.state.vpcs.items():
+            cidrs = [getattr(vpc, "cidr_block", "")]
+            cidrs += [_get(item, "cidrBlock") for item in getattr(vpc, "cidr_block_association_set", []) or []]
+            cidrs += [_get(item, "ipv6CidrBlock") for item in getattr(vpc, "ipv6_cidr_block_association_set", []) or []]
+            networks = {_network(cidr) for cidr in cidrs} - {None}
+            vpc_networks[vpc_id] = tuple(sorted(networks, key=lambda net: (net.version, net.prefixlen)))
+
+        subnet_vpc = {subnet_id: getattr(subnet, "vpc_id", "") for subnet_id, subnet in self.state.subnets.items()}
+
+        tables: Dict[str, List[_Route]] = {}
+        subnet_table: Dict[str, str] = {}
+        main_table: Dict[str, str] = {}
+        gateway_table: Dict[str, str] = {}
+        for table_id, table in self.state.route_tables.items():
+            tables[table_id] = _compile_routes(getattr(table, "route_set", []) or [])
+            if getattr(table, "is_main", False):
+                main_table.setdefault(getattr(table, "vpc_id", ""), table_id)
+            for association in getattr(table, "association_set", []) or []:
+                if _get(association, "main") is True:
+                    main_table[getattr(table, "vpc_id", "")] = table_id
+                elif _get(association, "subnetId"):
+                    subnet_table[association["subnetId"]] = table_id
+                elif _get(association, "gatewayId"):
+                    gateway_table[association["gatewayId"]] = table_id
+
+        # VPCs without a main route table still route locally
+        implicit = {
+            vpc_id: [_Route(network, "local", "local", False, {"destinationCidrBlock": str(network), "gatewayId": "local"})
+                     for network in sorted(networks, key=lambda net: -net.prefixlen)]
+            for vpc_id, networks in vpc_networks.items()
+        }
+        return {
+            "vpc_networks": vpc_networks,
+            "subnet_vpc": subnet_vpc,
+            "tables": tables,
+            "subnet_table": subnet_table,
+            "main_table": main_table,
+            "gateway_table": gateway_table,
+            "implicit": implicit,
+        }
+
+    def _build_endpoints(self) -> Dict[str, Any]:
+        pending: Dict[str, Dict[str, Any]] = {}
+
+        for eni_id, eni in self.state.elastic_network_interfaces.items():
+            addresses = [getattr(eni, "private_ip_address", "")]
+            addresses += [_get(item, "privateIpAddress") for item in getattr(eni, "private_ip_addresses", []) or []]
+            addresses += [_get(item, "ipv6Address") for item in getattr(eni, "ipv6_addresses", []) or []]
+            pending[eni_id] = {
+                "kind": "network-interface",
+                "vpc_id": getattr(eni, "vpc_id", ""),
+                "subnet_id": getattr(eni, "subnet_id", ""),
+                "addresses": addresses,
+                "public": [_get(getattr(eni, "association", None), "publicIp")],
+                "groups": [_get(group, "GroupId", "groupId") for group in getattr(eni, "group_set", []) or []],
+                "instance_id": _get(getattr(eni, "attachment", None), "instanceId", "InstanceId") or "",
+            }
+
+        for instance_id, instance in self.state.instances.items():
+            if (getattr(instance, "instance_state", None) or {}).get("name") in ("terminated", "shutting-down"):
+                continue
+            pending[instance_id] = {
+                "kind": "instance",
+                "vpc_id": getattr(instance, "vpc_id", ""),
+                "subnet_id": getattr(instance, "subnet_id", ""),
+                "addresses": [getattr(instance, "private_ip_address", "")],
+                "public": [getattr(instance, "ip_address", "")],
+                "groups": [_get(group, "GroupId", "groupId") for group in getattr(instance, "group_set", []) or []],
+                "instance_id": instance_id,
+            }
+
+        for nat_id, nat in self.state.nat_gateways.items():
+            if getattr(nat, "state", "") in ("deleting", "deleted", "failed"):
+                continue
+            address_set = getattr(nat, "nat_gateway_address_set", []) or []
+            pending[nat_id] = {
+                "kind": "nat-gateway",
+                "vpc_id": getattr(nat, "vpc_id", ""),
+                "subnet_id": getattr(nat, "subnet_id", ""),
+                "addresses": [_get(item, "privateIp") for item in address_set],
+                "public": [_get(item, "publicIp") for item in address_set],
+                "groups": [],
+                "instance_id": "",
+            }
+
+        for eip in self.state.elastic_ip_addresses.values():
+            owner = getattr(eip, "network_interface_id", "") or getattr(eip, "instance_id", "")
+            if owner in pending:
+                pending[owner]["public"].append(getattr(eip, "public_ip", ""))
+
+        endpoints: Dict[str, Endpoint] = {}
+        by_instance: Dict[str, List[str]] = {}
+        private: Dict[Tuple[str, Address], List[str]] = {}
+        public: Dict[Address, str] = {}
+        for endpoint_id, info in pending.items():
+            addresses = tuple(dict.fromkeys(a for a in map(_address, info["addresses"]) if a is not None))
+            public_addresses = tuple(dict.fromkeys(a for a in map(_address, info["public"]) if a is not None))
+            endpoint = Endpoint(
+                id=endpoint_id,
+                kind=info["kind"],
+                vpc_id=info["vpc_id"],
+                subnet_id=info["subnet_id"],
+                addresses=addresses,
+                public_addresses=public_addresses,
+                groups=frozenset(group for group in info["groups"] if group),
+                instance_id=info["instance_id"],
+            )
+            endpoints[endpoint_id] = endpoint
+            if endpoint.instance_id:
+                by_instance.setdefault(endpoint.instance_id, []).append(endpoint_id)
+            for address in addresses:
+                private.setdefault((endpoint.vpc_id, address), []).append(endpoint_id)
+            for address in public_addresses:
+                public.setdefault(address, endpoint_id)
+
+        # An instance's own record sorts ahead of the ENIs attached to it
+        for members in by_instance.values():
+            members.sort(key=lambda member: (endpoints[member].kind != "instance", member))
+        return {"endpoints": endpoints, "by_instance": by_instance, "private": private, "public": public}
+
+    def _build_filters(self) -> Dict[str, Any]:
+        subnet_acl: Dict[str, str] = {}
+        default_acl: Dict[str, str] = {}
+        for acl_id, acl in self.state.network_acls.items():
+            if getattr(acl, "default", False):
+                default_acl.setdefault(getattr(acl, "vpc_id", ""), acl_id)
+            for association in getattr(acl, "association_set", []) or []:
+                if _get(association, "subnetId"):
+                    subnet_acl[association["subnetId"]] = acl_id
+        return {"subnet_acl": subnet_acl, "default_acl": default_acl}
+
+    def _build_gateways(self) -> Dict[str, Any]:
+        internet_gateways: Dict[str, str] = {}
+        vpc_gateway: Dict[str, str] = {}
+        for igw_id, igw in self.state.internet_gateways.items():
+            for attachment in getattr(igw, "attachment_set", []) or []:
+                vpc_id = _get(attachment, "vpcId")
+                if vpc_id and _get(attachment, "state") in (None, "available", "attached"):
+                    internet_gateways[igw_id] = vpc_id
+                    if not getattr(igw, "is_egress_only", False):
+                        vpc_gateway.setdefault(vpc_id, igw_id)
+
+        peerings: Dict[str, Tuple[str, str, str]] = {}
+        for pcx_id, pcx in self.state.vpc_peering.items():
+            peerings[pcx_id] = (
+                _get(getattr(pcx, "requester_vpc_info", None), "vpcId") or "",
+                _get(getattr(pcx, "accepter_vpc_info", None), "vpcId") or "",
+                _get(getattr(pcx, "status", None), "code") or "",
+            )
+
+        transit_vpcs: Dict[str, List[str]] = {}
+        attachments = getattr(self.state, "transit_gateway_vpc_attachments", None) or {}
+        for attachment in attachments.values():
+            if _get(attachment, "state") == "available" and _get(attachment, "transitGatewayId") in self.state.transit_gateways:
+                transit_vpcs.setdefault(attachment["transitGatewayId"], []).append(_get(attachment, "vpcId") or "")
+        return {
+            "internet_gateways": internet_gateways,
+            "vpc_gateway": vpc_gateway,
+            "peerings": peerings,
+            "transit_vpcs": transit_vpcs,
+        }
+
+    # ---------------------------------------------------------------- lookups
+
+    def subnet_vpc(self, subnet_id: str) -> str:
+        return self._section("routing")["subnet_vpc"].get(subnet_id, "")
+
+    def route_table(self, subnet_id: str) -> Tuple[Optional[str], List[_Route]]:
+        """The table routing ``subnet_id``: its own association, else the VPC main table."""
+        routing = self._section("routing")
+        table_id = routing["subnet_table"].get(subnet_id)
+        if table_id is None:
+            table_id = routing["main_table"].get(routing["subnet_vpc"].get(subnet_id, ""))
+        if table_id is None:
+            return None, routing["implicit"].get(routing["subnet_vpc"].get(subnet_id, ""), [])
+        return table_id, routing["tables"].get(table_id, [])
+
+    def endpoint(self, endpoint_id: str) -> Optional[Endpoint]:
+        return self._section("endpoints")["endpoints"].get(endpoint_id)
+
+    def endpoints_for(self, resource_id: str) -> List[Endpoint]:
+        """Endpoints standing for a path source or destination (an instance has one per ENI)."""
+        section = self._section("endpoints")
+        if resource_id in section["by_instance"]:
+            return [section["endpoints"][member] for member in section["by_instance"][resource_id]]
+        endpoint = section["endpoints"].get(resource_id)
+        return [endpoint] if endpoint else []
+
+    def owners(self, vpc_id: str, address: Optional[Address]) -> List[Endpoint]:
+        section = self._section("endpoints")
+        return [section["endpoints"][member] for member in section["private"].get((vpc_id, address), [])]
+
+    def public_owner(self, address: Optional[Address]) -> Optional[Endpoint]:
+        section = self._section("endpoints")
+        owner = section["public"].get(address)
+        return section["endpoints"].get(owner) if owner else None
+
+    def match_security_groups(
+        self, group_ids: Iterable[str], egress: bool, packet: "Packet", peer: Optional[Address], peer_groups: Iterable[str]
+    ) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        """(known group IDs, the security_group_rules entry admitting ``packet`` or None).
+
+        Groups keep their own compiled rule index (rulematch.security_group_rules),
+        maintained by the security group backend, so nothing is cached here.
+        """
+        known: List[str] = []
+        resolve = prefix_list_resolver(self.state)
+        for group_id in sorted(group_ids):
+            group = self.state.security_groups.get(group_id)
+            if group is None:
+                continue
+            known.append(group_id)
+            rule_id = security_group_rules(group).match(
+                egress, packet.protocol, packet.destination_port, peer, peer_groups, resolve
+            )
+            if rule_id:
+                return known, group.security_group_rules.get(rule_id)
+        return known, None
+
+    def network_acl(self, subnet_id: str) -> Tuple[Optional[str], Optional[NetworkAclRules]]:
+        """The ACL guarding ``subnet_id`` and its compiled entries; (None, None) if none applies."""
+        filters = self._section("filters")
+        acl_id = filters["subnet_acl"].get(subnet_id) or filters["default_acl"].get(self.subnet_vpc(subnet_id))
+        acl = self.state.network_acls.get(acl_id) if acl_id else None
+        if acl is None:
+            return None, None
+        return acl_id, network_acl_rules(acl)
+
+    def internet_gateway_vpc(self, igw_id: str) -> Optional[str]:
+        return self._section("gateways")["internet_gateways"].get(igw_id)
+
+    def vpc_internet_gateway(self, vpc_id: str) -> Optional[str]:
+        return self._section("gateways")["vpc_gateway"].get(vpc_id)
+
+    def peering(self, pcx_id: str) -> Optional[Tuple[str, str, str]]:
+        return self._section("gateways")["peerings"].get(pcx_id)
+
+    def transit_gateway_vpcs(self, tgw_id: str) -> List[str]:
+        return self._section("gateways")["transit_vpcs"].get(tgw_id, [])
+
+
+def _compile_routes(route_set: List[Dict[str, Any]]) -> List[_Route]:
+    routes: List[_Route] = []
+    for route in route_set:
+        network = _network(_get(route, "destinationCidrBlock", "destinationIpv6CidrBlock"))
+        if network is None:
+            continue
+        gateway_id = _get(route, "gatewayId") or ""
+        if gateway_id == "local":
+            kind, target = "local", "local"
+        elif gateway_id.startswith("igw-"):
+            kind, target = "internet-gateway", gateway_id
+        elif gateway_id:
+            kind, target = gateway_id.split("-")[0], gateway_id
+        else:
+            kind, target = "unknown", ""
+            for key, key_kind in _ROUTE_TARGETS:
+                if _get(route, key):
+                    kind, target = key_kind, route[key]
+                    break
+        routes.append(_Route(network, kind, target, _get(route, "state") == "blackhole", route))
+    # Longest prefix first; lookups take the first covering route
+    routes.sort(key=lambda item: -item.network.prefixlen)
+    return routes
+
+
+def _lookup(routes: List[_Route], address: Optional[Address]) -> Optional[_Route]:
+    for route in routes:
+        if _covers(route.network, address):
+            return route
+    return None
+
+
+# ---------------------------------------------------------------- search
+
+# A step of the path: the component shown to callers plus the stateless check
+# the reply has to pass there ("acl", subnet, egress, packet) or
+# ("route", subnet, packet, kind the reply must route through)
+_Step = Tuple[Dict[str, Any], Optional[Tuple[Any, ...]]]
+
+
+@dataclass(frozen=True)
+class _Hop:
+    kind: str                 # "send" | "route" | "arrive" | "internet"
+    node: str                 # endpoint, subnet or gateway ID
+    packet: Packet
+    sender: str               # endpoint whose addresses the packet carries
+    subnet: str = ""          # subnet the packet is leaving ("" outside any VPC)
+    via: str = "local"        # route kind that delivered an "arrive" hop
+    steps: Tuple[_Step, ...] = ()
+
+
+@dataclass
+class PathResult:
+    found: bool = False
+    forward: List[Dict[str, Any]] = field(default_factory=list)
+    reverse: List[Dict[str, Any]] = field(default_factory=list)
+    explanations: List[Dict[str, Any]] = field(default_factory=list)
+    destination: Optional[Address] = None
+
+
+def _component(resource_id: str, **extra: Any) -> Dict[str, Any]:
+    component = {"component": {"id": resource_id, "arn": resource_arn(resource_id)}}
+    component.update({key: value for key, value in extra.items() if value is not None})
+    return component
+
+
+def _ref(resource_id: Optional[str]) -> Optional[Dict[str, str]]:
+    return {"id": resource_id, "arn": resource_arn(resource_id)} if resource_id else None
+
+
+def _acl_allows(entry: Optional[Dict[str, Any]]) -> bool:
+    return entry is not None and str(_get(entry, "ruleAction") or "").lower() == "allow"
+
+
+def _acl_rule(entry: Optional[Dict[str, Any]], egress: bool) -> Dict[str, Any]:
+    if entry is None:
+        return {"egress": egress, "ruleAction": "deny", "ruleNumber": 32767, "protocol": "-1", "cidr": "0.0.0.0/0"}
+    rule = {
+        "cidr": _get(entry, "cidrBlock", "ipv6CidrBlock"),
+        "egress": egress,
+        "protocol": protocol_number(_get(entry, "protocol")),
+        "ruleAction": "allow" if _acl_allows(entry) else "deny",
+        "ruleNumber": _port(_get(entry, "ruleNumber")),
+    }
+    port_range = _get(entry, "portRange") or {}
+    from_port, to_port = _port(_get(port_range, "from", "From")), _port(_get(port_range, "to", "To"))
+    if from_port is not None and to_port is not None:
+        rule["portRange"] = {"from": from_port, "to": to_port}
+    return rule
+
+
+def _sg_rule(rule: Dict[str, Any], egress: bool) -> Dict[str, Any]:
+    protocol = protocol_number(rule.get("ipProtocol"))
+    result = {
+        "direction": "egress" if egress else "ingress",
+        "securityGroupId": rule.get("groupId"),
+        "protocol": protocol,
+        "cidr": rule.get("cidrIpv4") or rule.get("cidrIpv6"),
+        "prefixListId": rule.get("prefixListId"),
+    }
+    from_port, to_port = _port(rule.get("fromPort")), _port(rule.get("toPort"))
+    if protocol in PORTED_PROTOCOLS and from_port is not None and to_port is not None:
+        result["portRange"] = {"from": from_port, "to": to_port}
+    return result
+
+
+def _route_summary(route: _Route) -> Dict[str, Any]:
+    summary = {
+        "destinationCidr": str(route.network),
+        "state": "blackhole" if route.blackhole else "active",
+        "origin": _get(route.raw, "origin"),
+    }
+    key = {
+        "local": "gatewayId",
+        "internet-gateway": "gatewayId" if route.target.startswith("igw-") else "egressOnlyInternetGatewayId",
+        "nat-gateway": "natGatewayId",
+        "transit-gateway": "transitGatewayId",
+        "peering": "vpcPeeringConnectionId",
+        "network-interface": "networkInterfaceId",
+        "instance": "instanceId",
+    }.get(route.kind, "gatewayId")
+    summary[key] = route.target
+    return summary
+
+
+class PathFinder:
+    """
+    Breadth-first search for one packet through a NetworkTopology.
+
+    Example:
+        finder = PathFinder(topology, packet, targets={"i-0abc"})
+        result = finder.search([finder.start("eni-0def")])
+    """
+
+    def __init__(self, topology: NetworkTopology, packet: Packet, targets: Iterable[str] = ()) -> None:
+        self.topology = topology
+        self.packet = packet
+        self.targets = set(targets)
+        self.explanations: List[Dict[str, Any]] = []
+        self._explained: set = set()
+
+    # ---------------------------------------------------------------- entry points
+
+    def start(self, source_id: str) -> Optional[_Hop]:
+        if source_id.startswith("igw-"):
+            return _Hop("internet", source_id, self.packet, sender="")
+        endpoint = self.topology.endpoint(source_id)
+        if endpoint is None:
+            return None
+        packet = self.packet
+        if packet.source is None:
+            version = packet.destination.version if packet.destination else 4
+            packet = replace(packet, source=next((a for a in endpoint.addresses if a.version == version), None))
+        return _Hop("send", endpoint.id, packet, sender=endpoint.id, subnet=endpoint.subnet_id)
+
+    def search(self, starts: Iterable[_Hop]) -> PathResult:
+        queue = deque(hop for hop in starts if hop is not None)
+        seen: set = set()
+        while queue:
+            hop = queue.popleft()
+            key = (hop.kind, hop.node, hop.packet.source, hop.packet.destination)
+            if key in seen:
+                continue
+            seen.add(key)
+            for successor in self._expand(hop):
+                if isinstance(successor, PathResult):
+                    return successor
+                queue.append(successor)
+        return PathResult(found=False, explanations=list(self.explanations))
+
+    # ---------------------------------------------------------------- helpers
+
+    def _explain(self, code: str, resource_id: Optional[str], direction: str = "egress", **extra: Any) -> None:
+        token = (code, resource_id, direction)
+        if token in self._explained:
+            return
+        self._explained.add(token)
+        explanation = {"explanationCode": code, "direction": direction, "component": _ref(resource_id)}
+        explanation.update({key: value for key, value in extra.items() if value is not None})
+        self.explanations.append(explanation)
+
+    def _is_target(self, endpoint: Endpoint) -> bool:
+        return endpoint.id in self.targets or (bool(endpoint.instance_id) and endpoint.instance_id in self.targets)
+
+    def _check_acl(self, subnet_id: str, egress: bool, packet: Packet, direction: str = "") -> Tuple[bool, Optional[_Step]]:
+        """Evaluate the subnet's ACL; entries are first-match, no match is the implicit deny."""
+        acl_id, rules = self.topology.network_acl(subnet_id)
+        if acl_id is None:
+            return True, None
+        peer = packet.destination if egress else packet.source
+        matched = rules.evaluate(egress, packet.protocol, peer, packet.destination_port)
+        rule = _acl_rule(matched, egress)
+        if not _acl_allows(matched):
+            self._explain(
+                "SUBNET_ACL_RESTRICTION",
+                acl_id,
+                direction or ("egress" if egress else "ingress"),
+                aclRule=rule,
+                subnet=_ref(subnet_id),
+                vpc=_ref(self.topology.subnet_vpc(subnet_id)),
+            )
+            return False, None
+        component = _component(acl_id, aclRule=rule, subnet=_ref(subnet_id))
+        return True, (component, ("acl", subnet_id, egress, packet))
+
+    def _check_groups(self, endpoint: Endpoint, egress: bool, packet: Packet, peer_groups: frozenset) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        if endpoint.kind == "nat-gateway" or not endpoint.groups:
+            return True, None
+        peer = packet.destination if egress else packet.source
+        known, matched = self.topology.match_security_groups(endpoint.groups, egress, packet, peer, peer_groups)
+        if matched is None:
+            self._explain(
+                "ENI_SG_RULES_MISMATCH",
+                endpoint.id,
+                "egress" if egress else "ingress",
+                securityGroups=[_ref(group_id) for group_id in known],
+                subnet=_ref(endpoint.subnet_id),
+                vpc=_ref(endpoint.vpc_id),
+            )
+            return False, None
+        return True, _sg_rule(matched, egress)
+
+    def _peer_groups(self, vpc_id: str, address: Optional[Address]) -> frozenset:
+        groups: frozenset = frozenset()
+        for owner in self.topology.owners(vpc_id, address):
+            groups |= owner.groups
+        return groups
+
+    # ---------------------------------------------------------------- expansion
+
+    def _expand(self, hop: _Hop) -> Iterator[Union[_Hop, PathResult]]:
+        if hop.kind == "send":
+            yield from self._send(hop)
+        elif hop.kind == "route":
+            yield from self._route(hop)
+        elif hop.kind == "arrive":
+            yield from self._arrive(hop)
+        elif hop.kind == "internet":
+            yield from self._from_internet(hop, hop.node)
+
+    def _send(self, hop: _Hop) -> Iterator[_Hop]:
+        endpoint = self.topology.endpoint(hop.node)
+        packet = hop.packet
+        peer_groups = self._peer_groups(endpoint.vpc_id, packet.destination)
+        allowed, rule = self._check_groups(endpoint, True, packet, peer_groups)
+        if not allowed:
+            return
+        component = _component(
+            endpoint.id,
+            vpc=_ref(endpoint.vpc_id),
+            subnet=_ref(endpoint.subnet_id),
+            outboundHeader=packet.header(),
+            securityGroupRule=rule,
+        )
+        yield _Hop("route", endpoint.subnet_id, packet, hop.sender, endpoint.subnet_id,
+                   steps=hop.steps + ((component, None),))
+
+    def _route(self, hop: _Hop) -> Iterator[_Hop]:
+        packet = hop.packet
+        vpc_id = self.topology.subnet_vpc(hop.node)
+        table_id, routes = self.topology.route_table(hop.node)
+        route = _lookup(routes, packet.destination)
+        if route is None:
+            self._explain("NO_ROUTE_TO_DESTINATION", table_id or hop.node, subnet=_ref(hop.node), vpc=_ref(vpc_id))
+            return
+        if route.blackhole:
+            self._explain("BAD_STATE_ROUTE", table_id or hop.node, routeTableRoute=_route_summary(route), vpc=_ref(vpc_id))
+            return
+        steps = hop.steps
+        if table_id:
+            steps += ((_component(table_id, routeTableRoute=_route_summary(route), vpc=_ref(vpc_id)), None),)
+
+        if route.kind == "local":
+            owners = self.topology.owners(vpc_id, packet.destination)
+            if not owners:
+                self._explain("NO_DESTINATION_ADDRESS", table_id or hop.node, vpc=_ref(vpc_id),
+                              address=str(packet.destination) if packet.destination else None)
+            for owner in owners:
+                yield _Hop("arrive", owner.id, packet, hop.sender, hop.subnet, "local", steps)
+        elif route.kind == "internet-gateway":
+            yield from self._to_internet(hop, route.target, vpc_id, steps)
+        elif route.kind in ("nat-gateway", "network-interface", "instance"):
+            appliances = self.topology.endpoints_for(route.target)
+            if not appliances:
+                self._explain("BAD_STATE_ROUTE", table_id or hop.node, routeTableRoute=_route_summary(route), vpc=_ref(vpc_id))
+            for appliance in appliances[:1]:
+                yield _Hop("arrive", appliance.id, packet, hop.sender, hop.subnet, "local", steps)
+        elif route.kind == "peering":
+            yield from self._to_peer(hop, route, vpc_id, steps)
+        elif route.kind == "transit-gateway":
+            yield from self._to_transit_gateway(hop, route, vpc_id, steps)
+        else:
+            self._explain("UNSUPPORTED_ROUTE_TARGET", route.target or table_id, routeTableRoute=_route_summary(route), vpc=_ref(vpc_id))
+
+    def _leave_subnet(self, hop: _Hop, steps: Tuple[_Step, ...]) -> Optional[Tuple[_Step, ...]]:
+        allowed, step = self._check_acl(hop.subnet, True, hop.packet)
+        if not allowed:
+            return None
+        return steps + ((step,) if step else ())
+
+    def _to_internet(self, hop: _Hop, igw_id: str, vpc_id: str, steps: Tuple[_Step, ...]) -> Iterator[Union[_Hop, PathResult]]:
+        if self.topology.internet_gateway_vpc(igw_id) != vpc_id:
+            self._explain("IGW_NOT_ATTACHED", igw_id, vpc=_ref(vpc_id))
+            return
+        steps = self._leave_subnet(hop, steps)
+        if steps is None:
+            return
+        packet = hop.packet
+        sender = self.topology.endpoint(hop.sender) if hop.sender else None
+        if packet.source is not None and packet.source.version == 4 and packet.source.is_private:
+            public = [address for address in (sender.public_addresses if sender else ()) if address.version == 4]
+            if not public:
+                self._explain("NO_PUBLIC_ADDRESS", hop.sender or igw_id, vpc=_ref(vpc_id))
+                return
+            packet = Packet(packet.protocol, public[0], packet.destination, packet.source_port, packet.destination_port)
+        steps += ((_component(igw_id, vpc=_ref(vpc_id), outboundHeader=packet.header()), None),)
+
+        if igw_id in self.targets:
+            yield self._result(steps, packet.destination)
+            return
+        owner = self.topology.public_owner(packet.destination)
+        if owner is not None:
+            yield from self._from_internet(replace(hop, packet=packet, steps=steps), self.topology.vpc_internet_gateway(owner.vpc_id))
+        elif not self.targets:
+            # Nothing in the emulator owns the address: it is out on the internet
+            yield self._result(steps, packet.destination)
+        else:
+            self._explain("NO_ROUTE_TO_DESTINATION", igw_id, vpc=_ref(vpc_id))
+
+    def _from_internet(self, hop: _Hop, igw_id: Optional[str]) -> Iterator[_Hop]:
+        packet = hop.packet
+        owner = self.topology.public_owner(packet.destination)
+        if owner is None:
+            self._explain("NO_DESTINATION_ADDRESS", igw_id or hop.node, "ingress",
+                          address=str(packet.destination) if packet.destination else None)
+            return
+        if not igw_id or self.topology.vpc_internet_gateway(owner.vpc_id) != igw_id:
+            self._explain("IGW_NOT_ATTACHED", igw_id or owner.id, "ingress", vpc=_ref(owner.vpc_id))
+            return
+        private = next((address for address in owner.addresses if address.version == packet.destination.version), None)
+        inbound = Packet(packet.protocol, packet.source, private, packet.source_port, packet.destination_port)
+        steps = hop.steps + ((_component(igw_id, vpc=_ref(owner.vpc_id), inboundHeader=inbound.header()), None),)
+        yield _Hop("arrive", owner.id, inbound, hop.sender, "", "internet-gateway", steps)
+
+    def _to_peer(self, hop: _Hop, route: _Route, vpc_id: str, steps: Tuple[_Step, ...]) -> Iterator[_Hop]:
+        peering = self.topology.peering(route.target)
+        if peering is None or vpc_id not in peering[:2]:
+            self._explain("BAD_STATE_ROUTE", route.target, routeTableRoute=_route_summary(route), vpc=_ref(vpc_id))
+            return
+        if peering[2] != "active":
+            self._explain("PCX_NOT_ACTIVE", route.target, vpc=_ref(vpc_id))
+            return
+        peer_vpc = peering[1] if peering[0] == vpc_id else peering[0]
+        owners = self.topology.owners(peer_vpc, hop.packet.destination)
+        if not owners:
+            self._explain("NO_DESTINATION_ADDRESS", route.target, vpc=_ref(peer_vpc),
+                          address=str(hop.packet.destination) if hop.packet.destination else None)
+            return
+        steps += ((_component(route.target, sourceVpc=_ref(vpc_id), destinationVpc=_ref(peer_vpc)), None),)
+        for owner in owners:
+            yield _Hop("arrive", owner.id, hop.packet, hop.sender, hop.subnet, "peering", steps)
+
+    def _to_transit_gateway(self, hop: _Hop, route: _Route, vpc_id: str, steps: Tuple[_Step, ...]) -> Iterator[_Hop]:
+        attached = self.topology.transit_gateway_vpcs(route.target)
+        if vpc_id not in attached:
+            self._explain("TGW_ATTACHMENT_NOT_FOUND", route.target, vpc=_ref(vpc_id))
+            return
+        found = False
+        for peer_vpc in attached:
+            if peer_vpc == vpc_id:
+                continue
+            for owner in self.topology.owners(peer_vpc, hop.packet.destination):
+                found = True
+                component = _component(route.target, sourceVpc=_ref(vpc_id), destinationVpc=_ref(peer_vpc))
+                yield _Hop("arrive", owner.id, hop.packet, hop.sender, hop.subnet, "transit-gateway",
+                           steps + ((component, None),))
+        if not found:
+            self._explain("NO_DESTINATION_ADDRESS", route.target,
+                          address=str(hop.packet.destination) if hop.packet.destination else None)
+
+    def _arrive(self, hop: _Hop) -> Iterator[Union[_Hop, PathResult]]:
+        endpoint = self.topology.endpoint(hop.node)
+        packet = hop.packet
+        steps = hop.steps
+        if hop.subnet != endpoint.subnet_id:
+            # Network ACLs only see traffic crossing a subnet boundary
+            if hop.subnet:
+                steps = self._leave_subnet(hop, steps)
+                if steps is None:
+                    return
+            allowed, step = self._check_acl(endpoint.subnet_id, False, packet)
+            if not allowed:
+                return
+            if step:
+                steps += (step,)
+        sender = self.topology.endpoint(hop.sender) if hop.sender else None
+        allowed, rule = self._check_groups(endpoint, False, packet, sender.groups if sender else frozenset())
+        if not allowed:
+            return
+        component = _component(
+            endpoint.id,
+            vpc=_ref(endpoint.vpc_id),
+            subnet=_ref(endpoint.subnet_id),
+            inboundHeader=packet.header(),
+            securityGroupRule=rule,
+        )
+        steps += ((component, ("route", endpoint.subnet_id, packet, hop.via)),)
+
+        if packet.destination in endpoint.addresses:
+            if self._is_target(endpoint) or not self.targets:
+                yield self._result(steps, packet.destination)
+            else:
+                self._explain("NO_DESTINATION_ADDRESS", endpoint.id, "ingress", address=str(packet.destination))
+        elif endpoint.kind == "nat-gateway":
+            private = next((address for address in endpoint.addresses if address.version == 4), None)
+            translated = Packet(packet.protocol, private, packet.destination, packet.source_port, packet.destination_port)
+            yield _Hop("route", endpoint.subnet_id, translated, endpoint.id, endpoint.subnet_id, steps=steps)
+        else:
+            # Middlebox named as a route target: it forwards the packet unchanged
+            yield _Hop("send", endpoint.id, packet, hop.sender, endpoint.subnet_id, steps=steps)
+
+    # ---------------------------------------------------------------- results
+
+    def _result(self, steps: Tuple[_Step, ...], destination: Optional[Address]) -> PathResult:
+        forward = [dict(component, sequenceNumber=index) for index, (component, _) in enumerate(steps, 1)]
+        reverse = self._return_steps(steps)
+        if reverse is None:
+            return PathResult(False, forward, [], list(self.explanations), destination)
+        return PathResult(True, forward, [dict(component, sequenceNumber=index) for index, component in enumerate(reverse, 1)], [], destination)
+
+    def _return_steps(self, steps: Tuple[_Step, ...]) -> Optional[List[Dict[str, Any]]]:
+        """Components of the reply path, or None (with an explanation) if the reply is dropped."""
+        components: List[Dict[str, Any]] = []
+        for component, check in reversed(steps):
+            if check is None:
+                components.append(component)
+            elif check[0] == "acl":
+                _, subnet_id, egress, packet = check
+                allowed, step = self._check_acl(subnet_id, not egress, packet.reply(), direction="return")
+                if not allowed:
+                    return None
+                components.append(step[0])
+            else:
+                _, subnet_id, packet, via = check
+                components.append(component)
+                reply = packet.reply()
+                table_id, routes = self.topology.route_table(subnet_id)
+                route = _lookup(routes, reply.destination)
+                if route is None or route.blackhole or (via != "local" and route.kind != via):
+                    self._explain(
+                        "NO_ROUTE_TO_DESTINATION",
+                        table_id or subnet_id,
+                        "return",
+                        routeTableRoute=_route_summary(route) if route else None,
+                        subnet=_ref(subnet_id),
+                        address=str(reply.destination) if reply.destination else None,
+                    )
+                    return None
+                if table_id:
+                    components.append(_component(table_id, routeTableRoute=_route_summary(route)))
+        return components
+
+
+def analyze(
+    topology: NetworkTopology,
+    source: str,
+    destination: str = "",
+    protocol: Any = "-1",
+    source_ip: str = "",
+    destination_ip: str = "",
+    destination_port: Any = None,
+) -> PathResult:
+    """
+    Find the shortest feasible path between two resources (IDs with a prefix
+    in ENDPOINT_PREFIXES). Without a destination IP every address of the
+    destination is tried in turn, private addresses first.
+    """
+    targets = {destination} if destination else set()
+    from_internet = source.startswith("igw-")
+    if destination_ip:
+        candidates: List[Optional[Address]] = [_address(destination_ip)]
+    elif destination.startswith("igw-"):
+        candidates = [None]
+    else:
+        endpoints = topology.endpoints_for(destination)
+        candidates = [] if from_internet else [address for endpoint in endpoints for address in endpoint.addresses]
+        candidates += [address for endpoint in endpoints for address in endpoint.public_addresses]
+    sources = [source] if from_internet else [endpoint.id for endpoint in topology.endpoints_for(source)]
+
+    first: Optional[PathResult] = None
+    for address in dict.fromkeys(candidates):
+        packet = Packet(protocol_number(protocol), _address(source_ip), address, None, _port(destination_port))
+        finder = PathFinder(topology, packet, targets)
+        result = finder.search(finder.start(source_id) for source_id in sources)
+        if result.found:
+            return result
+        first = first or result
+    if first is None:
+        first = PathResult(explanations=[{
+            "explanationCode": "NO_DESTINATION_ADDRESS",
+            "direction": "ingress",
+            "component": _ref(destination or source),
+        }])
+    return first
@@ -0,0 +1,162 @@
+"""
+Request logging: a sampled summary line per request, opt-in payloads, and
+a ring buffer of the last requests for GET /_admin/requests.
+
+Nothing is formatted unless a log record is actually emitted: summary
+lines use %-style arguments, and payloads (params, results, XML) are only
+logged when enabled and DEBUG is on for the logger. Even then they are cut
+to max_chars, and non-string payloads are formatted with reprlib, which
+stops descending once the limit is reached instead of formatting a whole
+describe result first.
+
+Successful requests log one line in every N per action (set_sampling());
+failed ones always log. Every request goes into the ring buffer, which
+keeps references only; they are formatted when the buffer is read.
+
+Example:
+    requests = RequestLog(logger, "action", payloads=False)
+    requests.set_sampling(["DescribeInstances=100"])
+    entry = requests.begin()
+    entry.name = action
+    params = parser.parse_request(action, values)
+    entry.params = params
+    requests.payload(entry, "Params", params)
+    ...
+    requests.finish(entry, code=None)
+    requests.recent(limit=20)  # for GET /_admin/requests
+"""
+
+import collections
+import logging
+import reprlib
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+# Requests kept in the ring buffer by default (--request-buffer)
+DEFAULT_CAPACITY = 256
+# Characters of a payload kept in log lines and the ring buffer by default
+DEFAULT_MAX_CHARS = 2048
+
+
+def clip(value: Any, max_chars: int) -> str:
+    """``value`` (a string, else its repr) cut to about ``max_chars`` characters."""
+    if not isinstance(value, str):
+        shortened = reprlib.Repr()
+        shortened.maxlevel = 4
+        shortened.maxdict = shortened.maxlist = shortened.maxtuple = shortened.maxset = 32
+        shortened.maxstring = shortened.maxother = max(max_chars // 4, 16)
+        value = shortened.repr(value)
+    if len(value) <= max_chars:
+        return value
+    return f"{value[:max_chars]}... ({len(value)} chars)"
+
+
+class _Clipped:
+    """clip() deferred until a handler formats the log record."""
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: int) -> None:
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        return clip(self.value, self.max_chars)
+
+
+class RequestEntry:
+    """One request: filled in by the gateway as it goes, kept in the ring buffer once finished."""
+
+    __slots__ = ("request_id", "at", "started", "name", "params", "code", "seconds")
+
+    def __init__(self) -> None:
+        self.request_id = str(uuid.uuid4())
+        self.at = time.time()
+        self.started = time.perf_counter()
+        self.name = ""
+        self.params: Any = None
+        self.code: Optional[str] = None
+        self.seconds = 0.0
+
+
+class RequestLog:
+    """
+    Summary lines of ``logger`` and the ring buffer of the last ``capacity``
+    requests, named by ``label`` (action or route).
+    """
+
+    def __init__(self, logger: logging.Logger, label: str, capacity: int = DEFAULT_CAPACITY,
+                 payloads: bool = False, max_chars: int = DEFAULT_MAX_CHARS) -> None:
+        self.logger = logger
+        self.label = label
+        self.payloads = payloads
+        self.max_chars = max_chars
+        self._entries: "collections.deque[RequestEntry]" = collections.deque(maxlen=max(capacity, 0))
+        # Name -> log one in this many successful requests (0: none); default for the rest
+        self._every: Dict[str, int] = {}
+        self._default_every = 1
+        self._seen: Dict[str, int] = {}
+
+    def set_sampling(self, specs: Iterable[str]) -> None:
+        """
+        Sampling of summary lines from ``NAME=N`` specs (one line in every N
+        successful requests to NAME; ``*=N`` or a bare N for all other names,
+        0 for none). Raises ValueError for a malformed spec.
+        """
+        for spec in specs:
+            name, _, every = spec.rpartition("=")
+            try:
+                count = int(every)
+            except ValueError:
+                raise ValueError(f"Invalid sampling '{spec}': expected NAME=N") from None
+            if count < 0:
+                raise ValueError(f"Invalid sampling '{spec}': N must be 0 or more")
+            if name in ("", "*"):
+                self._default_every = count
+            else:
+                self._every[name] = count
+
+    def begin(self) -> RequestEntry:
+        """A new entry for the current request, with its request ID."""
+        return RequestEntry()
+
+    def payload(self, entry: RequestEntry, kind: str, value: Any) -> None:
+        """Log ``value`` (``kind``: Params, Result, XML) at DEBUG, if payloads are on."""
+        if self.payloads and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("[%s] %s %s: %s", entry.name, entry.request_id, kind,
+                              _Clipped(value, self.max_chars))
+
+    def finish(self, entry: RequestEntry, code: Optional[str]) -> None:
+        """Close ``entry`` with error ``code`` (None on success), buffer it and log it."""
+        entry.seconds = time.perf_counter() - entry.started
+        entry.code = code
+        name = entry.name
+        self._entries.append(entry)
+        if code is not None:
+            self.logger.info("[%s] %s failed: %s (%.1f ms)", name, entry.request_id, code, entry.seconds * 1e3)
+            return
+        every = self._every.get(name, self._default_every)
+        if every == 0 or not self.logger.isEnabledFor(logging.INFO):
+            return
+        seen = self._seen.get(name, 0)
+        self._seen[name] = seen + 1
+        if seen % every == 0:
+            self.logger.info("[%s] %s ok (%.1f ms)", name, entry.request_id, entry.seconds * 1e3)
+
+    def recent(self, limit: Optional[int] = None, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The buffered requests, newest first, optionally only those to ``name``."""
+        entries = list(self._entries)
+        entries.reverse()
+        if name:
+            entries = [entry for entry in entries if entry.name == name]
+        if limit is not None:
+            entries = entries[:max(limit, 0)]
+        return [{
+            "requestId": entry.request_id,
+            "time": entry.at,
+            self.label: entry.name,
+            "code": entry.code,
+            "ms": round(entry.seconds * 1e3, 3),
+            "params": None if entry.params is None else clip(entry.params, self.max_chars),
+        } for entry in entries]
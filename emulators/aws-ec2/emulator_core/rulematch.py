@@ -0,0 +1,517 @@
+"""
+Compiled packet filters shared by the security group and network ACL
+backends and the Reachability Analyzer path engine.
+
+PrefixTable answers "which stored CIDRs contain this address" and
+PortRanges answers "which stored port interval contains this port".
+SecurityGroupRules combines them into an index over one security group's
+rules, per direction and protocol, that is updated rule by rule as rules are
+authorized, modified and revoked. NetworkAclRules does the same for a
+network ACL's numbered entries, where the lowest-numbered match decides.
+"""
+
+import bisect
+import heapq
+import ipaddress
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+Address = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+_PROTOCOL_NUMBERS = {"tcp": "6", "udp": "17", "icmp": "1", "icmpv6": "58", "all": "-1", "-1": "-1"}
+
+# Protocols whose rules carry a port range; for the others (ICMP, all
+# traffic) the rule's "ports" are type/code or unused and match everything
+PORTED_PROTOCOLS = ("6", "17")
+
+ALL_PORTS = (-1, 65535)
+
+
+def protocol_number(value: Any) -> str:
+    """Normalize 'tcp', 'TCP', '6' and friends to the IANA number as a string."""
+    text = str(value if value not in (None, "") else "-1").strip().lower()
+    return _PROTOCOL_NUMBERS.get(text, text)
+
+
+def port_interval(protocol: str, from_port: Any, to_port: Any) -> Tuple[int, int]:
+    """The inclusive port interval a rule covers; ALL_PORTS when ports do not apply."""
+    if protocol not in PORTED_PROTOCOLS:
+        return ALL_PORTS
+    try:
+        low = int(from_port)
+    except (TypeError, ValueError):
+        return ALL_PORTS
+    try:
+        high = int(to_port)
+    except (TypeError, ValueError):
+        high = low
+    if low < 0:
+        return ALL_PORTS
+    return low, max(low, high)
+
+
+class PrefixTable:
+    """
+    Map from CIDR blocks of one address family to values, queried by address.
+
+    The binary prefix trie is stored level by level (one dict per prefix
+    length in use), so a lookup probes each populated level once, longest
+    prefix first, instead of walking the address bit by bit.
+
+    Example:
+        table = PrefixTable(4)
+        table.setdefault("10.0.0.0/16", "a")
+        table.setdefault("10.0.1.0/24", "b")
+        list(table.matches(ipaddress.ip_address("10.0.1.9")))  # Returns: ["b", "a"]
+    """
+
+    def __init__(self, version: int = 4) -> None:
+        self.version = version
+        self.bits = 32 if version == 4 else 128
+        self._levels: Dict[int, Dict[int, Any]] = {}
+        self._masks: Dict[int, int] = {}
+        self._lengths: List[int] = []  # populated prefix lengths, longest first
+
+    def _key(self, cidr: Union[str, Network]) -> Tuple[int, int]:
+        network = cidr if not isinstance(cidr, str) else ipaddress.ip_network(cidr, strict=False)
+        if network.version != self.version:
+            raise ValueError(f"'{cidr}' is not an IPv{self.version} CIDR")
+        return network.prefixlen, int(network.network_address)
+
+    def __len__(self) -> int:
+        return sum(len(level) for level in self._levels.values())
+
+    def get(self, cidr: Union[str, Network], default: Any = None) -> Any:
+        plen, addr = self._key(cidr)
+        return self._levels.get(plen, {}).get(addr, default)
+
+    def setdefault(self, cidr: Union[str, Network], default: Any) -> Any:
+        plen, addr = self._key(cidr)
+        level = self._levels.get(plen)
+        if level is None:
+            level = self._levels[plen] = {}
+            self._masks[plen] = ((1 << plen) - 1) << (self.bits - plen)
+            self._lengths = sorted(self._levels, reverse=True)
+        return level.setdefault(addr, default)
+
+    def pop(self, cidr: Union[str, Network], default: Any = None) -> Any:
+        plen, addr = self._key(cidr)
+        level = self._levels.get(plen)
+        if level is None or addr not in level:
+            return default
+        value = level.pop(addr)
+        if not level:
+            del self._levels[plen]
+            del self._masks[plen]
+            self._lengths = sorted(self._levels, reverse=True)
+        return value
+
+    def longest(self, address: Optional[Address]) -> Any:
+        """Value of the longest stored CIDR containing ``address``, or None."""
+        if address is None:
+            return self._levels.get(0, {}).get(0)
+        if address.version != self.version:
+            return None
+        value = int(address)
+        for plen in self._lengths:
+            found = self._levels[plen].get(value & self._masks[plen])
+            if found is not None:
+                return found
+        return None
+
+    def matches(self, address: Optional[Address], max_length: Optional[int] = None) -> Iterator[Any]:
+        """Values of every stored CIDR containing ``address``, longest prefix first.
+
+        An unknown address (None) stands for "anywhere" and only matches /0.
+        ``max_length`` skips CIDRs with a longer prefix than that.
+        """
+        if address is None:
+            level = self._levels.get(0)
+            if level:
+                yield from level.values()
+            return
+        if address.version != self.version:
+            return
+        value = int(address)
+        for plen in self._lengths:
+            if max_length is not None and plen > max_length:
+                continue
+            found = self._levels[plen].get(value & self._masks[plen])
+            if found is not None:
+                yield found
+
+
+class PortRanges:
+    """
+    Inclusive port intervals, each tagged with the rule that owns it.
+
+    Intervals are kept sorted by start alongside a running maximum of their
+    ends, so whether any interval contains a port is one bisect; finding
+    which one walks back from there.
+    """
+
+    def __init__(self) -> None:
+        self._items: List[Tuple[int, int, str]] = []
+        self._starts: List[int] = []
+        self._reach: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _reindex(self) -> None:
+        self._starts = [low for low, _, _ in self._items]
+        reach: List[int] = []
+        highest = -2
+        for _, high, _ in self._items:
+            highest = max(highest, high)
+            reach.append(highest)
+        self._reach = reach
+
+    def add(self, low: int, high: int, tag: str) -> None:
+        bisect.insort(self._items, (low, high, tag))
+        self._reindex()
+
+    def remove(self, tag: str) -> bool:
+        kept = [item for item in self._items if item[2] != tag]
+        if len(kept) == len(self._items):
+            return False
+        self._items = kept
+        self._reindex()
+        return True
+
+    def find(self, port: Optional[int]) -> Optional[str]:
+        """Tag of an interval containing ``port``; any tag when the port is unknown."""
+        if not self._items:
+            return None
+        if port is None:
+            return self._items[0][2]
+        index = bisect.bisect_right(self._starts, port) - 1
+        if index < 0 or self._reach[index] < port:
+            return None
+        while self._items[index][1] < port:
+            index -= 1
+        return self._items[index][2]
+
+
+# A rule's place in the index: (kind, bucket key, peer key)
+_Slot = Tuple[str, Tuple[Any, ...], Any]
+
+
+class SecurityGroupRules:
+    """
+    Index over the rules of one security group.
+
+    CIDR rules go into a PrefixTable per (direction, protocol, address
+    family) whose values are PortRanges; rules referencing a security group
+    or a prefix list go into a PortRanges per referenced ID. Rules are keyed
+    by their security group rule ID, so authorizing, modifying or revoking a
+    rule touches only that rule's slot.
+
+    Example:
+        index = SecurityGroupRules(group.security_group_rules.values())
+        index.match(False, "6", 22, ipaddress.ip_address("10.0.0.5"))  # Returns: "sgr-..."
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]] = ()) -> None:
+        self._slots: Dict[str, _Slot] = {}
+        self._cidrs: Dict[Tuple[bool, str, int], PrefixTable] = {}
+        self._groups: Dict[Tuple[bool, str], Dict[str, PortRanges]] = {}
+        self._prefix_lists: Dict[Tuple[bool, str], Dict[str, PortRanges]] = {}
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, rule: Dict[str, Any]) -> None:
+        """Index ``rule`` (a security_group_rules entry), replacing any earlier version of it."""
+        rule_id = rule.get("securityGroupRuleId")
+        if not rule_id:
+            return
+        self.discard(rule_id)
+        egress = bool(rule.get("isEgress"))
+        protocol = protocol_number(rule.get("ipProtocol"))
+        low, high = port_interval(protocol, rule.get("fromPort"), rule.get("toPort"))
+
+        cidr = rule.get("cidrIpv4") or rule.get("cidrIpv6")
+        referenced = (rule.get("referencedGroupInfo") or {}).get("groupId")
+        prefix_list = rule.get("prefixListId")
+        if cidr:
+            try:
+                network = ipaddress.ip_network(str(cidr), strict=False)
+            except ValueError:
+                return
+            bucket = (egress, protocol, network.version)
+            table = self._cidrs.setdefault(bucket, PrefixTable(network.version))
+            ranges = table.setdefault(network, PortRanges())
+            slot: _Slot = ("cidr", bucket, network)
+        elif referenced or prefix_list:
+            kind = "group" if referenced else "prefix-list"
+            store = self._groups if referenced else self._prefix_lists
+            bucket = (egress, protocol)
+            ranges = store.setdefault(bucket, {}).setdefault(referenced or prefix_list, PortRanges())
+            slot = (kind, bucket, referenced or prefix_list)
+        else:
+            return
+        ranges.add(low, high, rule_id)
+        self._slots[rule_id] = slot
+
+    def discard(self, rule_id: str) -> None:
+        slot = self._slots.pop(rule_id, None)
+        if slot is None:
+            return
+        kind, bucket, key = slot
+        if kind == "cidr":
+            table = self._cidrs[bucket]
+            ranges = table.get(key)
+            ranges.remove(rule_id)
+            if not ranges:
+                table.pop(key)
+                if not len(table):
+                    del self._cidrs[bucket]
+            return
+        store = self._groups if kind == "group" else self._prefix_lists
+        members = store[bucket]
+        members[key].remove(rule_id)
+        if not members[key]:
+            del members[key]
+            if not members:
+                del store[bucket]
+
+    def match(
+        self,
+        egress: bool,
+        protocol: str,
+        port: Optional[int],
+        address: Optional[Address] = None,
+        groups: Iterable[str] = (),
+        prefix_list_cidrs: Optional[Callable[[str], Iterable[Network]]] = None,
+    ) -> Optional[str]:
+        """
+        ID of a rule allowing the traffic, or None.
+
+        ``address`` is the peer (source for ingress, destination for egress),
+        ``groups`` the peer's security groups and ``prefix_list_cidrs``
+        resolves a prefix list ID to its current CIDRs.
+        """
+        protocol = protocol_number(protocol)
+        for candidate in ((protocol, "-1") if protocol != "-1" else ("-1",)):
+            if address is not None:
+                tables = [self._cidrs.get((egress, candidate, address.version))]
+            else:
+                tables = [self._cidrs.get((egress, candidate, 4)), self._cidrs.get((egress, candidate, 6))]
+            for table in tables:
+                if table is None:
+                    continue
+                for ranges in table.matches(address):
+                    found = ranges.find(port)
+                    if found:
+                        return found
+
+            members = self._groups.get((egress, candidate))
+            if members:
+                for group_id in groups:
+                    ranges = members.get(group_id)
+                    found = ranges.find(port) if ranges else None
+                    if found:
+                        return found
+
+            prefix_lists = self._prefix_lists.get((egress, candidate))
+            if prefix_lists and address is not None and prefix_list_cidrs is not None:
+                for prefix_list_id, ranges in prefix_lists.items():
+                    found = ranges.find(port)
+                    if found and any(
+                        address.version == network.version and address in network
+                        for network in prefix_list_cidrs(prefix_list_id)
+                    ):
+                        return found
+        return None
+
+
+def security_group_rules(group: Any) -> SecurityGroupRules:
+    """The group's rule index, compiled from security_group_rules on first use."""
+    index = getattr(group, "compiled_rules", None)
+    if index is None:
+        index = SecurityGroupRules((getattr(group, "security_group_rules", None) or {}).values())
+        group.compiled_rules = index
+    return index
+
+
+def prefix_list_resolver(state: Any) -> Callable[[str], List[Network]]:
+    """Resolve managed prefix list IDs in ``state`` to their current CIDR entries."""
+
+    def resolve(prefix_list_id: str) -> List[Network]:
+        prefix_list = state.managed_prefix_lists.get(prefix_list_id)
+        networks: List[Network] = []
+        for entry in getattr(prefix_list, "entries", None) or []:
+            cidr = entry.get("Cidr") or entry.get("cidr") if isinstance(entry, dict) else None
+            try:
+                networks.append(ipaddress.ip_network(str(cidr), strict=False))
+            except ValueError:
+                continue
+        return networks
+
+    return resolve
+
+
+class FirstMatchPorts:
+    """
+    Numbered port intervals flattened into disjoint segments, each labelled
+    with the lowest-numbered interval covering it, so the first match for a
+    port is one bisect.
+
+    Example:
+        ports = FirstMatchPorts([(100, 0, 65535, "a"), (90, 22, 22, "b")])
+        ports.find(22)  # Returns: (90, "b")
+        ports.find(80)  # Returns: (100, "a")
+    """
+
+    def __init__(self, items: Iterable[Tuple[int, int, int, Any]]) -> None:
+        items = sorted(items, key=lambda item: (item[1], item[0]))
+        self._first: Optional[Tuple[int, Any]] = None
+        for number, _, _, value in items:
+            if self._first is None or number < self._first[0]:
+                self._first = (number, value)
+
+        bounds = sorted({low for _, low, _, _ in items} | {high + 1 for _, _, high, _ in items})
+        starts: List[int] = []
+        ends: List[int] = []
+        winners: List[Tuple[int, Any]] = []
+        active: List[Tuple[int, int, int]] = []  # heap of (number, position, high)
+        position = 0
+        for index, start in enumerate(bounds[:-1]):
+            while position < len(items) and items[position][1] <= start:
+                number, _, high, _ = items[position]
+                heapq.heappush(active, (number, position, high))
+                position += 1
+            while active and active[0][2] < start:
+                heapq.heappop(active)
+            if not active:
+                continue
+            number, item_position, _ = active[0]
+            end = bounds[index + 1] - 1
+            if ends and ends[-1] == start - 1 and winners[-1][0] == number:
+                ends[-1] = end
+                continue
+            starts.append(start)
+            ends.append(end)
+            winners.append((number, items[item_position][3]))
+        self._starts = starts
+        self._ends = ends
+        self._winners = winners
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def find(self, port: Optional[int]) -> Optional[Tuple[int, Any]]:
+        """(number, value) of the first interval containing ``port``; an unknown port matches every interval."""
+        if port is None:
+            return self._first
+        index = bisect.bisect_right(self._starts, port) - 1
+        if index < 0 or self._ends[index] < port:
+            return None
+        return self._winners[index]
+
+
+class NetworkAclRules:
+    """
+    Compiled form of one network ACL's entries.
+
+    Entries are sorted by rule number once, then grouped per (direction,
+    protocol, address family), with "all traffic" entries folded into every
+    protocol's group. Each group is a PrefixTable whose values are
+    FirstMatchPorts built from the entries of that CIDR and of every stored
+    CIDR containing it, so the longest stored prefix containing the peer
+    address already knows the first matching entry for every port: a
+    decision is one longest-prefix probe plus one bisect.
+
+    Example:
+        rules = NetworkAclRules(acl.entry_set)
+        rules.evaluate(False, "6", ipaddress.ip_address("10.0.0.5"), 443)  # Returns: entry dict or None
+    """
+
+    def __init__(self, entries: Iterable[Dict[str, Any]] = ()) -> None:
+        numbered: List[Tuple[int, Dict[str, Any]]] = []
+        for entry in entries:
+            try:
+                numbered.append((int(entry.get("ruleNumber")), entry))
+            except (TypeError, ValueError):
+                continue
+        numbered.sort(key=lambda item: item[0])
+        self.entries = [entry for _, entry in numbered]
+
+        grouped: Dict[Tuple[bool, str, int], Dict[Network, List[Tuple[int, int, int, Any]]]] = {}
+        for number, entry in numbered:
+            cidr = entry.get("cidrBlock") or entry.get("ipv6CidrBlock")
+            try:
+                network = ipaddress.ip_network(str(cidr), strict=False)
+            except ValueError:
+                continue
+            protocol = protocol_number(entry.get("protocol"))
+            port_range = entry.get("portRange") or {}
+            low, high = port_interval(
+                protocol,
+                port_range.get("from", port_range.get("From")),
+                port_range.get("to", port_range.get("To")),
+            )
+            egress = entry.get("egress") is True or str(entry.get("egress")).lower() == "true"
+            bucket = grouped.setdefault((egress, protocol, network.version), {})
+            bucket.setdefault(network, []).append((number, low, high, entry))
+
+        self._tables: Dict[Tuple[bool, str, int], PrefixTable] = {}
+        for (egress, protocol, version), networks in grouped.items():
+            if protocol != "-1":
+                for network, items in grouped.get((egress, "-1", version), {}).items():
+                    networks.setdefault(network, []).extend(items)
+            self._tables[(egress, protocol, version)] = self._compile(version, networks)
+
+    @staticmethod
+    def _compile(version: int, networks: Dict[Network, List[Tuple[int, int, int, Any]]]) -> PrefixTable:
+        table = PrefixTable(version)
+        for network, items in networks.items():
+            table.setdefault(network, items)
+        compiled = PrefixTable(version)
+        for network, items in networks.items():
+            # Every stored CIDR containing this one; a packet landing here matched those too
+            inherited = list(items)
+            for ancestor in table.matches(network.network_address, network.prefixlen - 1):
+                inherited.extend(ancestor)
+            compiled.setdefault(network, FirstMatchPorts(inherited))
+        return compiled
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def evaluate(
+        self, egress: bool, protocol: str, address: Optional[Address], port: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The entry deciding the packet, or None for the implicit deny.
+
+        ``address`` is the peer (source for inbound, destination for
+        outbound); the caller reads the verdict from the entry's ruleAction.
+        """
+        protocol = protocol_number(protocol)
+        best: Optional[Tuple[int, Any]] = None
+        for version in ((address.version,) if address is not None else (4, 6)):
+            table = self._tables.get((egress, protocol, version))
+            if table is None:
+                table = self._tables.get((egress, "-1", version))
+            ports = table.longest(address) if table is not None else None
+            found = ports.find(port) if ports is not None else None
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found
+        return best[1] if best is not None else None
+
+    def allows(self, egress: bool, protocol: str, address: Optional[Address], port: Optional[int] = None) -> bool:
+        entry = self.evaluate(egress, protocol, address, port)
+        return entry is not None and str(entry.get("ruleAction") or "").lower() == "allow"
+
+
+def network_acl_rules(acl: Any) -> NetworkAclRules:
+    """The ACL's compiled entries, rebuilt on first use after each entry change."""
+    compiled = getattr(acl, "compiled_entries", None)
+    if compiled is None:
+        compiled = NetworkAclRules(getattr(acl, "entry_set", None) or [])
+        acl.compiled_entries = compiled
+    return compiled
@@ -1,12 +1,13 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
 
 class ResourceState(Enum):
@@ -33,7 +34,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class AFI:
     fpga_image_global_id: str = ""
     fpga_image_id: str = ""
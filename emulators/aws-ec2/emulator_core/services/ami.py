@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids, dependency_violation
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class Ami:
     image_id: str = ""
     launch_template: Dict[str, Any] = field(default_factory=dict)
@@ -46,8 +48,8 @@ class Ami:
     state_transition_time: str = ""
 
     # Internal dependency tracking — not in API response
-    instance_ids: List[str] = field(default_factory=list)  # tracks Instance children
-    vm_export_ids: List[str] = field(default_factory=list)  # tracks VmExport children
+    instance_ids: ChildIds = child_ids("Instance")  # tracks Instance children
+    vm_export_ids: ChildIds = child_ids("VmExport")  # tracks VmExport children
 
     name: str = ""
     description: str = ""
@@ -460,11 +462,9 @@ class Ami_Backend:
         image, error = self._get_ami_or_error(image_id, "InvalidAMIID.NotFound")
         if error:
             return error
-
-        if getattr(image, "instance_ids", []):
-            return create_error_response("DependencyViolation", "Ami has dependent Instance(s) and cannot be deleted.")
-        if getattr(image, "vm_export_ids", []):
-            return create_error_response("DependencyViolation", "Ami has dependent VmExport(s) and cannot be deleted.")
+        dependency_error = dependency_violation(image, "Ami")
+        if dependency_error:
+            return dependency_error
 
         delete_snapshots = str2bool(params.get("DeleteAssociatedSnapshots"))
         delete_results = []
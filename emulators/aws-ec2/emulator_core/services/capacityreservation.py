@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids, dependency_violation
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class CapacityReservation:
     availability_zone: str = ""
     availability_zone_id: str = ""
@@ -68,8 +70,8 @@ class CapacityReservation:
     unused_reservation_billing_owner_id: str = ""
 
     # Internal dependency tracking — not in API response
-    ec2_topology_ids: List[str] = field(default_factory=list)  # tracks Ec2Topology children
-    instance_ids: List[str] = field(default_factory=list)  # tracks Instance children
+    ec2_topology_ids: ChildIds = child_ids("Ec2Topology")  # tracks Ec2Topology children
+    instance_ids: ChildIds = child_ids("Instance")  # tracks Instance children
 
     billing_requests: List[Dict[str, Any]] = field(default_factory=list)
     group_arns: List[str] = field(default_factory=list)
@@ -227,11 +229,9 @@ class CapacityReservation_Backend:
         resource = self._get_capacity_reservation_or_error(capacity_reservation_id)
         if is_error_response(resource):
             return resource
-
-        if getattr(resource, 'ec2_topology_ids', []):
-            return create_error_response('DependencyViolation', 'CapacityReservation has dependent Ec2Topology(s) and cannot be deleted.')
-        if getattr(resource, 'instance_ids', []):
-            return create_error_response('DependencyViolation', 'CapacityReservation has dependent Instance(s) and cannot be deleted.')
+        dependency_error = dependency_violation(resource, "CapacityReservation")
+        if dependency_error:
+            return dependency_error
 
         resource.state = "cancelled"
         resource.available_instance_count = 0
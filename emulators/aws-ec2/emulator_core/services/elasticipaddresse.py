@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..ipalloc import AMAZON_POOL_ID, public_address_pool
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class ElasticIpAddresse:
     allocation_id: str = ""
     association_id: str = ""
@@ -171,6 +173,19 @@ class ElasticIpAddresse_Backend:
                 if resource_id in parent.elastic_ip_addresse_ids:
                     parent.elastic_ip_addresse_ids.remove(resource_id)
 
+    def _address_pool(self, pool_id: str):
+        """Return the address pool backing an Elastic IP pool ID, or an error."""
+        if not pool_id or pool_id == AMAZON_POOL_ID:
+            return public_address_pool(self.state), None
+        pool = self.state.pools.get(pool_id)
+        if not pool or getattr(pool, "pool_type", "") != "public-ipv4":
+            pool = self.state.byoip.get(pool_id)
+            if not pool or getattr(pool, "resource_type", "") != "public-ipv4-pool":
+                return None, create_error_response(
+                    "InvalidPublicIpv4PoolID.NotFound", f"The ID '{pool_id}' does not exist")
+        cidrs = [entry.get("cidr") for entry in pool.pool_address_range_set if entry.get("cidr")]
+        return public_address_pool(self.state, pool_id, cidrs), None
+
     def _utc_now_iso(self) -> str:
         return datetime.now(timezone.utc).isoformat()
 
@@ -217,8 +232,28 @@ class ElasticIpAddresse_Backend:
                 if tag:
                     tag_set.append(tag)
 
+        pool_id = params.get("PublicIpv4Pool") or AMAZON_POOL_ID
+        address_pool, error = self._address_pool(pool_id)
+        if error:
+            return error
+
+        public_ip = params.get("Address") or ""
+        if public_ip:
+            if address_pool.contains(public_ip):
+                if not address_pool.reserve(public_ip):
+                    return create_error_response("InvalidAddress.InUse", f"Address {public_ip} is already allocated.")
+            elif pool_id != AMAZON_POOL_ID:
+                return create_error_response(
+                    "InvalidParameterValue", f"Address {public_ip} is not in pool '{pool_id}'.")
+            elif self._find_by_public_ip(public_ip):
+                return create_error_response("InvalidAddress.InUse", f"Address {public_ip} is already allocated.")
+        else:
+            public_ip = address_pool.allocate() or ""
+            if not public_ip:
+                return create_error_response(
+                    "InsufficientAddressCapacity", f"There are no free addresses left in pool '{pool_id}'.")
+
         allocation_id = self._generate_id("eipalloc")
-        public_ip = params.get("Address") or f"198.51.100.{(uuid.uuid4().int % 250) + 1}"
         resource = ElasticIpAddresse(
             allocation_id=allocation_id,
             carrier_ip="",
@@ -227,7 +262,7 @@ class ElasticIpAddresse_Backend:
             domain=params.get("Domain") or "vpc",
             network_border_group=params.get("NetworkBorderGroup") or "",
             public_ip=public_ip,
-            public_ipv4_pool=params.get("PublicIpv4Pool") or "",
+            public_ipv4_pool=pool_id,
             tag_set=tag_set,
         )
         self.resources[allocation_id] = resource
@@ -491,6 +526,9 @@ class ElasticIpAddresse_Backend:
 
         if resource.allocation_id in self.resources:
             del self.resources[resource.allocation_id]
+        address_pool = self.state.public_ipv4_address_pools.get(resource.public_ipv4_pool or AMAZON_POOL_ID)
+        if address_pool is not None:
+            address_pool.release(resource.public_ip)
 
         return {
             'return': True,
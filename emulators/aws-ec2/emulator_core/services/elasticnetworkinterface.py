@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..ipalloc import subnet_allocator
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class ElasticNetworkInterface:
     group_id: str = ""
     group_name: str = ""
@@ -149,30 +151,29 @@ class ElasticNetworkInterface_Backend:
         assigned_addresses: List[Dict[str, Any]] = []
 
         existing_addresses = [entry.get("ipv6Address") for entry in network_interface.ipv6_addresses]
-        for address in ipv6_addresses_param:
-            if address and address not in existing_addresses:
-                assigned_entry = {
-                    "ipv6Address": address,
-                    "isPrimaryIpv6": False,
-                    "publicIpv6DnsName": "",
-                }
-                network_interface.ipv6_addresses.append(assigned_entry)
-                assigned_addresses.append(assigned_entry)
-                existing_addresses.append(address)
-
-        if ipv6_count:
-            for index in range(ipv6_count):
-                candidate = f"2001:db8::{len(existing_addresses) + 1}"
-                while candidate in existing_addresses:
-                    candidate = f"2001:db8::{len(existing_addresses) + 1}"
-                assigned_entry = {
-                    "ipv6Address": candidate,
-                    "isPrimaryIpv6": False,
-                    "publicIpv6DnsName": "",
-                }
-                network_interface.ipv6_addresses.append(assigned_entry)
-                assigned_addresses.append(assigned_entry)
-                existing_addresses.append(candidate)
+        requested = list(dict.fromkeys(address for address in ipv6_addresses_param
+                                       if address and address not in existing_addresses))
+        subnet = self.state.subnets.get(network_interface.subnet_id)
+        claimed, error = self._claim_addresses(subnet, requested, ipv6_count, version=6)
+        if error:
+            return error
+        if claimed is None:
+            claimed = list(requested)
+            next_index = len(existing_addresses) + 1
+            while len(claimed) < len(requested) + ipv6_count:
+                candidate = f"2001:db8::{next_index:x}"
+                if candidate not in existing_addresses and candidate not in claimed:
+                    claimed.append(candidate)
+                next_index += 1
+
+        for address in claimed:
+            assigned_entry = {
+                "ipv6Address": address,
+                "isPrimaryIpv6": False,
+                "publicIpv6DnsName": "",
+            }
+            network_interface.ipv6_addresses.append(assigned_entry)
+            assigned_addresses.append(assigned_entry)
 
         ipv6_prefixes_param = params.get("Ipv6Prefix.N", []) or []
         ipv6_prefix_count = int(params.get("Ipv6PrefixCount") or 0)
@@ -226,32 +227,30 @@ class ElasticNetworkInterface_Backend:
         assigned_private_ips: List[Dict[str, Any]] = []
 
         existing_ips = [entry.get("privateIpAddress") for entry in network_interface.private_ip_addresses]
-        for ip_address in requested_ips:
-            if ip_address and ip_address not in existing_ips:
-                entry = {
-                    "association": {},
-                    "primary": False,
-                    "privateDnsName": "",
-                    "privateIpAddress": ip_address,
-                }
-                network_interface.private_ip_addresses.append(entry)
-                assigned_private_ips.append({"privateIpAddress": ip_address})
-                existing_ips.append(ip_address)
-
-        next_index = 2
-        while len(assigned_private_ips) < secondary_count:
-            candidate = f"10.0.0.{next_index}"
-            if candidate not in existing_ips:
-                entry = {
-                    "association": {},
-                    "primary": False,
-                    "privateDnsName": "",
-                    "privateIpAddress": candidate,
-                }
-                network_interface.private_ip_addresses.append(entry)
-                assigned_private_ips.append({"privateIpAddress": candidate})
-                existing_ips.append(candidate)
-            next_index += 1
+        requested = list(dict.fromkeys(ip_address for ip_address in requested_ips
+                                       if ip_address and ip_address not in existing_ips))
+        subnet = self.state.subnets.get(network_interface.subnet_id)
+        claimed, error = self._claim_addresses(subnet, requested, max(secondary_count - len(requested), 0))
+        if error:
+            return error
+        if claimed is None:
+            claimed = list(requested)
+            next_index = 2
+            while len(claimed) < secondary_count:
+                candidate = f"10.0.0.{next_index}"
+                if candidate not in existing_ips and candidate not in claimed:
+                    claimed.append(candidate)
+                next_index += 1
+
+        for ip_address in claimed:
+            entry = {
+                "association": {},
+                "primary": False,
+                "privateDnsName": "",
+                "privateIpAddress": ip_address,
+            }
+            network_interface.private_ip_addresses.append(entry)
+            assigned_private_ips.append({"privateIpAddress": ip_address})
 
         ipv4_prefixes_param = params.get("Ipv4Prefix.N", []) or []
         ipv4_prefix_count = int(params.get("Ipv4PrefixCount") or 0)
@@ -385,58 +384,54 @@ class ElasticNetworkInterface_Backend:
 
         private_ip_addresses_param = params.get("PrivateIpAddresses.N", []) or []
         primary_ip = params.get("PrivateIpAddress") or (private_ip_addresses_param[0] if private_ip_addresses_param else None)
-        if not primary_ip:
-            primary_ip = "10.0.0.1"
+        requested_ips = list(dict.fromkeys(ip_address for ip_address in [primary_ip, *private_ip_addresses_param] if ip_address))
+        secondary_count = int(params.get("SecondaryPrivateIpAddressCount") or 0)
+        if requested_ips:
+            auto_count = max(secondary_count - (len(requested_ips) - 1), 0)
+        else:
+            auto_count = 1 + secondary_count
+        claimed_ips, error = self._claim_addresses(subnet, requested_ips, auto_count)
+        if error:
+            return error
+        if claimed_ips is None:
+            claimed_ips = requested_ips or ["10.0.0.1"]
+            next_index = 2
+            while len(claimed_ips) - 1 < secondary_count:
+                candidate = f"10.0.0.{next_index}"
+                if candidate not in claimed_ips:
+                    claimed_ips.append(candidate)
+                next_index += 1
+        primary_ip = claimed_ips[0]
         private_ip_addresses: List[Dict[str, Any]] = [
             {
                 "association": {},
-                "primary": True,
+                "primary": index == 0,
                 "privateDnsName": "",
-                "privateIpAddress": primary_ip,
+                "privateIpAddress": ip_address,
             }
+            for index, ip_address in enumerate(claimed_ips)
         ]
-        for ip_address in private_ip_addresses_param:
-            if ip_address and ip_address != primary_ip:
-                private_ip_addresses.append({
-                    "association": {},
-                    "primary": False,
-                    "privateDnsName": "",
-                    "privateIpAddress": ip_address,
-                })
-
-        secondary_count = int(params.get("SecondaryPrivateIpAddressCount") or 0)
-        next_index = 2
-        while len(private_ip_addresses) - 1 < secondary_count:
-            candidate = f"10.0.0.{next_index}"
-            if candidate != primary_ip and all(entry["privateIpAddress"] != candidate for entry in private_ip_addresses):
-                private_ip_addresses.append({
-                    "association": {},
-                    "primary": False,
-                    "privateDnsName": "",
-                    "privateIpAddress": candidate,
-                })
-            next_index += 1
 
         ipv4_prefixes = [{"ipv4Prefix": prefix} for prefix in (params.get("Ipv4Prefix.N", []) or [])]
         ipv6_prefixes = [{"ipv6Prefix": prefix} for prefix in (params.get("Ipv6Prefix.N", []) or [])]
 
         ipv6_addresses_param = params.get("Ipv6Addresses.N", []) or []
         ipv6_count = int(params.get("Ipv6AddressCount") or 0)
-        ipv6_addresses: List[Dict[str, Any]] = []
-        for addr in ipv6_addresses_param:
-            if addr:
-                ipv6_addresses.append({
-                    "ipv6Address": addr,
-                    "isPrimaryIpv6": False,
-                    "publicIpv6DnsName": "",
-                })
-        if not ipv6_addresses and ipv6_count:
-            for index in range(ipv6_count):
-                ipv6_addresses.append({
-                    "ipv6Address": f"2001:db8::{index + 1}",
-                    "isPrimaryIpv6": False,
-                    "publicIpv6DnsName": "",
-                })
+        requested_ipv6 = list(dict.fromkeys(addr for addr in ipv6_addresses_param if addr))
+        claimed_ipv6, error = self._claim_addresses(subnet, requested_ipv6, 0 if requested_ipv6 else ipv6_count, version=6)
+        if error:
+            self._release_addresses(subnet, claimed_ips)
+            return error
+        if claimed_ipv6 is None:
+            claimed_ipv6 = requested_ipv6 or [f"2001:db8::{index + 1}" for index in range(ipv6_count)]
+        ipv6_addresses: List[Dict[str, Any]] = [
+            {
+                "ipv6Address": addr,
+                "isPrimaryIpv6": False,
+                "publicIpv6DnsName": "",
+            }
+            for addr in claimed_ipv6
+        ]
 
         enable_primary_ipv6 = str2bool(params.get("EnablePrimaryIpv6"))
         if ipv6_addresses:
@@ -646,6 +641,8 @@ class ElasticNetworkInterface_Backend:
         if subnet and hasattr(subnet, "network_interface_ids"):
             if network_interface_id in subnet.network_interface_ids:
                 subnet.network_interface_ids.remove(network_interface_id)
+        self._release_addresses(subnet, [entry.get("privateIpAddress") for entry in network_interface.private_ip_addresses])
+        self._release_addresses(subnet, [entry.get("ipv6Address") for entry in network_interface.ipv6_addresses], version=6)
 
         vpc = self.state.vpcs.get(network_interface.vpc_id)
         if vpc and hasattr(vpc, "vpc_network_interface_ids"):
@@ -1062,6 +1059,7 @@ class ElasticNetworkInterface_Backend:
                 else:
                     remaining_addresses.append(entry)
             network_interface.ipv6_addresses = remaining_addresses
+            self._release_addresses(self.state.subnets.get(network_interface.subnet_id), unassigned_addresses, version=6)
 
         unassigned_prefixes: List[Dict[str, Any]] = []
         ipv6_prefixes = params.get("Ipv6Prefix.N", []) or []
@@ -1102,12 +1100,15 @@ class ElasticNetworkInterface_Backend:
         private_ips = params.get("PrivateIpAddress.N", []) or []
         if private_ips:
             remaining_private_ips = []
+            released_ips = []
             for entry in network_interface.private_ip_addresses:
                 ip_address = entry.get("privateIpAddress")
                 if ip_address in private_ips and not entry.get("primary"):
+                    released_ips.append(ip_address)
                     continue
                 remaining_private_ips.append(entry)
             network_interface.private_ip_addresses = remaining_private_ips
+            self._release_addresses(self.state.subnets.get(network_interface.subnet_id), released_ips)
 
         ipv4_prefixes = params.get("Ipv4Prefix.N", []) or []
         if ipv4_prefixes:
@@ -1123,6 +1124,52 @@ class ElasticNetworkInterface_Backend:
             'return': True,
             }
 
+    def _claim_addresses(self, subnet: Any, requested: List[str], count: int, version: int = 4):
+        """
+        Reserve the requested addresses and allocate count more from the subnet.
+
+        Returns (addresses, None) on success and (None, error) on failure, in
+        which case nothing stays reserved. Returns (None, None) when the subnet
+        has no CIDR block of that family to allocate from.
+        """
+        allocator = subnet_allocator(subnet, version) if subnet else None
+        if allocator is None:
+            return None, None
+        claimed: List[str] = []
+        for address in requested:
+            if not allocator.reserve(address):
+                self._release_addresses(subnet, claimed, version)
+                if allocator.is_allocated(address):
+                    return None, create_error_response(
+                        "InvalidIPAddress.InUse", f"Address {address} is in use.")
+                return None, create_error_response(
+                    "InvalidParameterValue",
+                    f"Address {address} does not fall within the subnet's address range or is reserved.",
+                )
+            claimed.append(address)
+        for _ in range(count):
+            address = allocator.allocate()
+            if address is None:
+                self._release_addresses(subnet, claimed, version)
+                return None, create_error_response(
+                    "InsufficientFreeAddressesInSubnet",
+                    f"Subnet '{subnet.subnet_id}' does not have enough free addresses.",
+                )
+            claimed.append(address)
+        if version == 4:
+            subnet.available_ip_address_count = allocator.available
+        return claimed, None
+
+    def _release_addresses(self, subnet: Any, addresses: List[str], version: int = 4) -> None:
+        allocator = subnet_allocator(subnet, version) if subnet else None
+        if allocator is None:
+            return
+        for address in addresses:
+            if address:
+                allocator.release(address)
+        if version == 4:
+            subnet.available_ip_address_count = allocator.available
+
     def _generate_id(self, prefix: str = 'sg') -> str:
         return f'{prefix}-{uuid.uuid4().hex[:17]}'
 
@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class FastSnapshotRestore:
     availability_zone: str = ""
     availability_zone_id: str = ""
@@ -49,10 +51,10 @@ class FastSnapshotRestore:
     state_transition_reason: str = ""
 
     # Internal dependency tracking — not in API response
-    capacity_reservation_ids: List[str] = field(default_factory=list)  # tracks CapacityReservation children
-    reserved_instance_ids: List[str] = field(default_factory=list)  # tracks ReservedInstance children
-    subnet_ids: List[str] = field(default_factory=list)  # tracks Subnet children
-    volume_ids: List[str] = field(default_factory=list)  # tracks Volume children
+    capacity_reservation_ids: ChildIds = child_ids("CapacityReservation")  # tracks CapacityReservation children
+    reserved_instance_ids: ChildIds = child_ids("ReservedInstance")  # tracks ReservedInstance children
+    subnet_ids: ChildIds = child_ids("Subnet")  # tracks Subnet children
+    volume_ids: ChildIds = child_ids("Volume")  # tracks Volume children
 
 
     def to_dict(self) -> Dict[str, Any]:
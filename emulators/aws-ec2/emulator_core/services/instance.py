@@ -1,13 +1,16 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids, dependency_violation
+from ..ipalloc import subnet_allocator
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +36,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class Instance:
     ami_launch_index: int = 0
     architecture: str = ""
@@ -97,11 +100,11 @@ class Instance:
     vpc_id: str = ""
 
     # Internal dependency tracking — not in API response
-    bundle_task_ids: List[str] = field(default_factory=list)  # tracks BundleTask children
-    elastic_graphic_ids: List[str] = field(default_factory=list)  # tracks ElasticGraphic children
-    elastic_ip_addresse_ids: List[str] = field(default_factory=list)  # tracks ElasticIpAddresse children
-    route_table_ids: List[str] = field(default_factory=list)  # tracks RouteTable children
-    spot_instance_ids: List[str] = field(default_factory=list)  # tracks SpotInstance children
+    bundle_task_ids: ChildIds = child_ids("BundleTask")  # tracks BundleTask children
+    elastic_graphic_ids: ChildIds = child_ids("ElasticGraphic")  # tracks ElasticGraphic children
+    elastic_ip_addresse_ids: ChildIds = child_ids("ElasticIpAddresse")  # tracks ElasticIpAddresse children
+    route_table_ids: ChildIds = child_ids("RouteTable")  # tracks RouteTable children
+    spot_instance_ids: ChildIds = child_ids("SpotInstance")  # tracks SpotInstance children
 
     disable_api_termination: bool = False
     disable_api_stop: bool = False
@@ -643,13 +646,8 @@ class Instance_Backend:
         if error:
             return error
 
-        output = instance.console_output
-        timestamp = instance.console_output_timestamp
-        if not output:
-            output = ""
-            timestamp = self._now_isoformat()
-            instance.console_output = output
-            instance.console_output_timestamp = timestamp
+        output = instance.console_output or ""
+        timestamp = instance.console_output_timestamp if output else self._now_isoformat()
 
         return {
             'instanceId': instance.instance_id or instance_id,
@@ -670,10 +668,7 @@ class Instance_Backend:
         if error:
             return error
 
-        image_data = instance.console_screenshot
-        if not image_data:
-            image_data = ""
-            instance.console_screenshot = image_data
+        image_data = instance.console_screenshot or ""
 
         return {
             'imageData': image_data,
@@ -732,10 +727,7 @@ class Instance_Backend:
         if error:
             return error
 
-        uefi_data = instance.uefi_data
-        if not uefi_data:
-            uefi_data = ""
-            instance.uefi_data = uefi_data
+        uefi_data = instance.uefi_data or ""
 
         return {
             'instanceId': instance.instance_id or instance_id,
@@ -760,8 +752,6 @@ class Instance_Backend:
         if password_data is None:
             password_data = ""
             timestamp = self._now_isoformat()
-            instance.password_data = password_data
-            instance.password_data_timestamp = timestamp
 
         return {
             'instanceId': instance.instance_id or instance_id,
@@ -1404,10 +1394,14 @@ class Instance_Backend:
         license_set = params.get("LicenseSpecification.N", []) or []
         ipv6_addresses = params.get("Ipv6Address.N", []) or []
 
+        private_ips, error = self._claim_private_ips(subnet, params.get("PrivateIpAddress") or "", max_count)
+        if error:
+            return error
+
         launch_time = self._now_isoformat()
         instances = []
         reservation_id = self._generate_id("r")
-        for _ in range(max_count):
+        for index in range(max_count):
             instance_id = self._generate_id("i")
             instance = Instance(
                 ami_launch_index=0,
@@ -1441,7 +1435,8 @@ class Instance_Backend:
                 operator=params.get("Operator") or {},
                 placement=placement if isinstance(placement, dict) else {},
                 private_dns_name_options=private_dns_options if isinstance(private_dns_options, dict) else {},
-                private_ip_address=params.get("PrivateIpAddress") or "",
+                private_dns_name=f"ip-{private_ips[index].replace('.', '-')}.ec2.internal" if private_ips[index] else "",
+                private_ip_address=private_ips[index],
                 ramdisk_id=params.get("RamdiskId") or "",
                 subnet_id=subnet_id,
                 tag_set=tag_set,
@@ -1593,17 +1588,9 @@ class Instance_Backend:
             instance = self.resources.get(instance_id)
             if not instance:
                 continue
-
-            if getattr(instance, 'bundle_task_ids', []):
-                return create_error_response('DependencyViolation', 'Instance has dependent BundleTask(s) and cannot be deleted.')
-            if getattr(instance, 'elastic_graphic_ids', []):
-                return create_error_response('DependencyViolation', 'Instance has dependent ElasticGraphic(s) and cannot be deleted.')
-            if getattr(instance, 'elastic_ip_addresse_ids', []):
-                return create_error_response('DependencyViolation', 'Instance has dependent ElasticIpAddresse(s) and cannot be deleted.')
-            if getattr(instance, 'route_table_ids', []):
-                return create_error_response('DependencyViolation', 'Instance has dependent RouteTable(s) and cannot be deleted.')
-            if getattr(instance, 'spot_instance_ids', []):
-                return create_error_response('DependencyViolation', 'Instance has dependent SpotInstance(s) and cannot be deleted.')
+            dependency_error = dependency_violation(instance, "Instance")
+            if dependency_error:
+                return dependency_error
 
             previous_state = instance.instance_state or {"code": 0, "name": "pending"}
             self._set_instance_state(instance, "terminated", 48)
@@ -1625,6 +1612,9 @@ class Instance_Backend:
             parent = self.state.subnets.get(instance.subnet_id)
             if parent and hasattr(parent, 'instance_ids') and instance_id in parent.instance_ids:
                 parent.instance_ids.remove(instance_id)
+            allocator = subnet_allocator(parent) if parent else None
+            if allocator is not None and allocator.release(instance.private_ip_address):
+                parent.available_ip_address_count = allocator.available
             parent = self.state.vpcs.get(instance.vpc_id)
             if parent and hasattr(parent, 'instance_ids') and instance_id in parent.instance_ids:
                 parent.instance_ids.remove(instance_id)
@@ -1659,6 +1649,49 @@ class Instance_Backend:
             'instancesSet': instances_set,
             }
 
+    def _claim_private_ips(self, subnet: Any, private_ip: str, count: int):
+        """
+        Assign one primary private IPv4 address per launched instance from the
+        subnet. Returns (addresses, None) or (None, error); without a subnet
+        CIDR to allocate from, the requested address (or "") is used as is.
+        """
+        if count < 1:
+            return [], None
+        if private_ip and count > 1:
+            return None, create_error_response(
+                "InvalidParameterCombination",
+                "Cannot specify PrivateIpAddress when launching more than one instance.",
+            )
+        allocator = subnet_allocator(subnet) if subnet else None
+        if allocator is None:
+            return [private_ip] * count, None
+        if private_ip:
+            if allocator.reserve(private_ip):
+                subnet.available_ip_address_count = allocator.available
+                return [private_ip], None
+            if allocator.is_allocated(private_ip):
+                return None, create_error_response("InvalidIPAddress.InUse", f"Address {private_ip} is in use.")
+            return None, create_error_response(
+                "InvalidParameterValue",
+                f"Address {private_ip} does not fall within the subnet's address range or is reserved.",
+            )
+        if allocator.available < count:
+            return None, create_error_response(
+                "InsufficientFreeAddressesInSubnet",
+                f"Subnet '{subnet.subnet_id}' does not have enough free addresses to launch {count} instances.",
+            )
+        addresses = [allocator.allocate() for _ in range(count)]
+        if None in addresses:
+            for address in addresses:
+                if address:
+                    allocator.release(address)
+            return None, create_error_response(
+                "InsufficientFreeAddressesInSubnet",
+                f"Subnet '{subnet.subnet_id}' does not have enough free addresses to launch {count} instances.",
+            )
+        subnet.available_ip_address_count = allocator.available
+        return addresses, None
+
     def _generate_id(self, prefix: str = 'i') -> str:
         return f'{prefix}-{uuid.uuid4().hex[:17]}'
 
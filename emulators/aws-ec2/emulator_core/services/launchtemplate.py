@@ -1,12 +1,13 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
 
 class ResourceState(Enum):
@@ -33,7 +34,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class LaunchTemplate:
     created_by: str = ""
     create_time: str = ""
@@ -446,9 +447,8 @@ class LaunchTemplate_Backend:
 
             for number in sorted(filtered_numbers):
                 data = available_versions.get(number, {})
-                operator = data.get("operator") or tmpl.operator or {}
-                if not isinstance(operator, dict):
-                    operator = {}
+                operator = data.get("operator") or tmpl.operator
+                operator = dict(operator) if isinstance(operator, dict) else {}
                 operator.setdefault("managed", None)
                 operator.setdefault("principal", None)
                 version_entries.append({
@@ -484,48 +484,34 @@ class LaunchTemplate_Backend:
         if not instance:
             return create_error_response("InvalidInstanceID.NotFound", f"The ID '{instance_id}' does not exist")
 
-        operator = instance.operator or {}
-        if not isinstance(operator, dict):
-            operator = {}
+        # Copies of the instance's settings: the defaults filled in below are only for the response
+        operator = dict(instance.operator) if isinstance(instance.operator, dict) else {}
         operator.setdefault("managed", None)
         operator.setdefault("principal", None)
 
-        capacity_spec = instance.capacity_reservation_specification or {}
-        if not isinstance(capacity_spec, dict):
-            capacity_spec = {}
+        capacity_spec = dict(instance.capacity_reservation_specification) if isinstance(instance.capacity_reservation_specification, dict) else {}
         capacity_spec.setdefault("capacityReservationPreference", None)
         capacity_target = capacity_spec.get("capacityReservationTarget")
-        if not isinstance(capacity_target, dict):
-            capacity_target = {}
+        capacity_target = dict(capacity_target) if isinstance(capacity_target, dict) else {}
         capacity_target.setdefault("capacityReservationId", instance.capacity_reservation_id or None)
         capacity_target.setdefault("capacityReservationResourceGroupArn", None)
         capacity_spec["capacityReservationTarget"] = capacity_target
 
-        cpu_options = instance.cpu_options or {}
-        if not isinstance(cpu_options, dict):
-            cpu_options = {}
+        cpu_options = dict(instance.cpu_options) if isinstance(instance.cpu_options, dict) else {}
         cpu_options.setdefault("amdSevSnp", None)
         cpu_options.setdefault("coreCount", None)
         cpu_options.setdefault("threadsPerCore", None)
 
-        credit_spec = instance.credit_specification or {}
-        if not isinstance(credit_spec, dict):
-            credit_spec = {}
+        credit_spec = dict(instance.credit_specification) if isinstance(instance.credit_specification, dict) else {}
         credit_spec.setdefault("cpuCredits", None)
 
-        enclave_options = instance.enclave_options or {}
-        if not isinstance(enclave_options, dict):
-            enclave_options = {}
+        enclave_options = dict(instance.enclave_options) if isinstance(instance.enclave_options, dict) else {}
         enclave_options.setdefault("enabled", None)
 
-        hibernation_options = instance.hibernation_options or {}
-        if not isinstance(hibernation_options, dict):
-            hibernation_options = {}
+        hibernation_options = dict(instance.hibernation_options) if isinstance(instance.hibernation_options, dict) else {}
         hibernation_options.setdefault("configured", None)
 
-        iam_profile = instance.iam_instance_profile or {}
-        if not isinstance(iam_profile, dict):
-            iam_profile = {}
+        iam_profile = dict(instance.iam_instance_profile) if isinstance(instance.iam_instance_profile, dict) else {}
         iam_profile.setdefault("arn", None)
         iam_profile.setdefault("name", None)
 
@@ -569,14 +555,10 @@ class LaunchTemplate_Backend:
             "VCpuCount": {"Max": None, "Min": None},
         }
 
-        maintenance_options = instance.maintenance_options or {}
-        if not isinstance(maintenance_options, dict):
-            maintenance_options = {}
+        maintenance_options = dict(instance.maintenance_options) if isinstance(instance.maintenance_options, dict) else {}
         maintenance_options.setdefault("autoRecovery", None)
 
-        metadata_options = instance.metadata_options or {}
-        if not isinstance(metadata_options, dict):
-            metadata_options = {}
+        metadata_options = dict(instance.metadata_options) if isinstance(instance.metadata_options, dict) else {}
         metadata_options.setdefault("httpEndpoint", None)
         metadata_options.setdefault("httpProtocolIpv6", None)
         metadata_options.setdefault("httpPutResponseHopLimit", None)
@@ -584,19 +566,13 @@ class LaunchTemplate_Backend:
         metadata_options.setdefault("instanceMetadataTags", None)
         metadata_options.setdefault("state", None)
 
-        monitoring = instance.monitoring or {}
-        if not isinstance(monitoring, dict):
-            monitoring = {}
+        monitoring = dict(instance.monitoring) if isinstance(instance.monitoring, dict) else {}
         monitoring.setdefault("enabled", None)
 
-        network_performance_options = instance.network_performance_options or {}
-        if not isinstance(network_performance_options, dict):
-            network_performance_options = {}
+        network_performance_options = dict(instance.network_performance_options) if isinstance(instance.network_performance_options, dict) else {}
         network_performance_options.setdefault("bandwidthWeighting", None)
 
-        placement = instance.placement or {}
-        if not isinstance(placement, dict):
-            placement = {}
+        placement = dict(instance.placement) if isinstance(instance.placement, dict) else {}
         placement.setdefault("affinity", None)
         placement.setdefault("availabilityZone", None)
         placement.setdefault("availabilityZoneId", None)
@@ -608,9 +584,7 @@ class LaunchTemplate_Backend:
         placement.setdefault("spreadDomain", None)
         placement.setdefault("tenancy", None)
 
-        private_dns_options = instance.private_dns_name_options or {}
-        if not isinstance(private_dns_options, dict):
-            private_dns_options = {}
+        private_dns_options = dict(instance.private_dns_name_options) if isinstance(instance.private_dns_name_options, dict) else {}
         private_dns_options.setdefault("enableResourceNameDnsAAAARecord", None)
         private_dns_options.setdefault("enableResourceNameDnsARecord", None)
         private_dns_options.setdefault("hostnameType", None)
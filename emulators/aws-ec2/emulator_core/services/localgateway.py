@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class LocalGateway:
     local_gateway_id: str = ""
     outpost_arn: str = ""
@@ -42,7 +44,7 @@ class LocalGateway:
     tag_set: List[Any] = field(default_factory=list)
 
     # Internal dependency tracking — not in API response
-    route_table_ids: List[str] = field(default_factory=list)  # tracks RouteTable children
+    route_table_ids: ChildIds = child_ids("RouteTable")  # tracks RouteTable children
 
     tags: Dict[str, str] = field(default_factory=dict)
 
@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids, dependency_violation
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class NatGateway:
     attached_appliance_set: List[Any] = field(default_factory=list)
     auto_provision_zones: str = ""
@@ -54,7 +56,7 @@ class NatGateway:
     vpc_id: str = ""
 
     # Internal dependency tracking — not in API response
-    route_table_ids: List[str] = field(default_factory=list)  # tracks RouteTable children
+    route_table_ids: ChildIds = child_ids("RouteTable")  # tracks RouteTable children
 
 
     def to_dict(self) -> Dict[str, Any]:
@@ -368,8 +370,9 @@ class NatGateway_Backend:
         if error:
             return error
 
-        if getattr(nat_gateway, "route_table_ids", []):
-            return create_error_response("DependencyViolation", "NatGateway has dependent RouteTable(s) and cannot be deleted.")
+        dependency_error = dependency_violation(nat_gateway, "NatGateway")
+        if dependency_error:
+            return dependency_error
 
         for address in list(nat_gateway.nat_gateway_address_set):
             allocation_id = address.get("allocationId")
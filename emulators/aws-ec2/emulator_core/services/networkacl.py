@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..rulematch import NetworkAclRules
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class NetworkACL:
     association_set: List[Any] = field(default_factory=list)
     default: bool = False
@@ -43,6 +45,9 @@ class NetworkACL:
     tag_set: List[Any] = field(default_factory=list)
     vpc_id: str = ""
 
+    # Internal — not in API response
+    compiled_entries: Optional[NetworkAclRules] = None  # sorted and indexed entry_set, rebuilt after entry changes
+
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -101,12 +106,21 @@ class NetworkACL_Backend:
             "egress": egress,
             "icmpTypeCode": params.get("Icmp"),
             "ipv6CidrBlock": params.get("Ipv6CidrBlock"),
-            "portRange": params.get("PortRange"),
+            "portRange": self._build_port_range(params.get("PortRange")),
             "protocol": params.get("Protocol"),
             "ruleAction": params.get("RuleAction"),
             "ruleNumber": rule_number,
         }
 
+    def _build_port_range(self, port_range: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(port_range, dict):
+            return None
+        result = {}
+        for key, value in (("from", port_range.get("From")), ("to", port_range.get("To"))):
+            if value is not None:
+                result[key] = value
+        return result or None
+
     def _find_entry_index(self, entries: List[Dict[str, Any]], egress: Any, rule_number: Any) -> Optional[int]:
         normalized_egress = egress if isinstance(egress, bool) else str2bool(egress)
         for idx, entry in enumerate(entries or []):
@@ -180,6 +194,7 @@ class NetworkACL_Backend:
             return create_error_response("InvalidParameterValue", "Network ACL entry already exists")
 
         resource.entry_set.append(entry)
+        resource.compiled_entries = None
 
         return {
             'return': True,
@@ -248,6 +263,7 @@ class NetworkACL_Backend:
             return create_error_response("InvalidParameterValue", "Network ACL entry not found")
 
         resource.entry_set.pop(entry_index)
+        resource.compiled_entries = None
 
         return {
             'return': True,
@@ -375,6 +391,7 @@ class NetworkACL_Backend:
             resource.entry_set[existing_index] = entry
         else:
             resource.entry_set.append(entry)
+        resource.compiled_entries = None
 
         return {
             'return': True,
@@ -387,6 +404,11 @@ from typing import Dict, List, Any, Optional
 from ..utils import get_scalar, get_int, get_indexed_list, parse_filters, parse_tags, str2bool, esc
 from ..utils import is_error_response, serialize_error_response
 
+def _parse_port_range(md: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    port_range = {key: get_int(md, f"PortRange.{key}") for key in ("From", "To")}
+    return port_range if any(value is not None for value in port_range.values()) else None
+
+
 class networkacl_RequestParser:
     @staticmethod
     def parse_create_network_acl_request(md: Dict[str, Any]) -> Dict[str, Any]:
@@ -406,7 +428,7 @@ class networkacl_RequestParser:
             "Icmp": get_scalar(md, "Icmp"),
             "Ipv6CidrBlock": get_scalar(md, "Ipv6CidrBlock"),
             "NetworkAclId": get_scalar(md, "NetworkAclId"),
-            "PortRange": get_scalar(md, "PortRange"),
+            "PortRange": _parse_port_range(md),
             "Protocol": get_scalar(md, "Protocol"),
             "RuleAction": get_scalar(md, "RuleAction"),
             "RuleNumber": get_int(md, "RuleNumber"),
@@ -455,7 +477,7 @@ class networkacl_RequestParser:
             "Icmp": get_scalar(md, "Icmp"),
             "Ipv6CidrBlock": get_scalar(md, "Ipv6CidrBlock"),
             "NetworkAclId": get_scalar(md, "NetworkAclId"),
-            "PortRange": get_scalar(md, "PortRange"),
+            "PortRange": _parse_port_range(md),
             "Protocol": get_scalar(md, "Protocol"),
             "RuleAction": get_scalar(md, "RuleAction"),
             "RuleNumber": get_int(md, "RuleNumber"),
@@ -1,13 +1,16 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
+import ipaddress
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..ipalloc import PrefixAllocator, public_address_pool
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +36,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class Pool:
     address_family: str = ""
     allocation_default_netmask_length: int = 0
@@ -70,6 +73,9 @@ class Pool:
     total_address_count: int = 0
     total_available_address_count: int = 0
 
+    # Internal allocator state — not in API response
+    cidr_allocator: Optional[PrefixAllocator] = None
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "addressFamily": self.address_family,
@@ -116,15 +122,115 @@ class Pool_Backend:
             return create_error_response(error_code, message)
         return pool
 
+    def _public_address_pool(self, pool: Any):
+        cidrs = [entry.get("cidr") for entry in pool.pool_address_range_set if entry.get("cidr")]
+        return public_address_pool(self.state, pool.pool_id, cidrs)
+
     def _recalculate_public_pool_counts(self, pool: Pool) -> None:
+        address_pool = self._public_address_pool(pool)
         total = 0
         available = 0
         for address_range in pool.pool_address_range_set:
+            if address_range.get("cidr"):
+                address_range.update(address_pool.usage(address_range["cidr"]))
             total += int(address_range.get("addressCount") or 0)
             available += int(address_range.get("availableAddressCount") or 0)
         pool.total_address_count = total
         pool.total_available_address_count = available
 
+    def _pool_allocator(self, pool: Pool) -> PrefixAllocator:
+        if pool.cidr_allocator is None:
+            version = 6 if (pool.address_family or "").lower() == "ipv6" else 4
+            for entry in (pool.ipam_pool_cidrs or {}).values():
+                try:
+                    version = ipaddress.ip_network(entry.get("cidr") or "", strict=False).version
+                    break
+                except ValueError:
+                    continue
+            allocator = PrefixAllocator(version)
+            for entry in (pool.ipam_pool_cidrs or {}).values():
+                try:
+                    allocator.add(entry.get("cidr") or "")
+                except ValueError:
+                    continue
+            for allocation_id, allocation in (pool.ipam_pool_allocations or {}).items():
+                try:
+                    allocator.reserve(allocation.get("cidr") or "", allocation_id)
+                except ValueError:
+                    continue
+            pool.cidr_allocator = allocator
+        return pool.cidr_allocator
+
+    def _check_netmask_length(self, pool: Pool, netmask_length: int) -> Optional[Dict[str, Any]]:
+        min_length = pool.allocation_min_netmask_length or 0
+        max_length = pool.allocation_max_netmask_length or 0
+        if (min_length and netmask_length < min_length) or (max_length and netmask_length > max_length):
+            return create_error_response(
+                "InvalidParameterValue",
+                f"Netmask length {netmask_length} is outside the allocation netmask length rules of pool '{pool.ipam_pool_id}'",
+            )
+        return None
+
+    def _reserve_cidr(self, pool: Pool, params: Dict[str, Any], owner: str) -> Any:
+        """Pick (and unless previewing, reserve) a CIDR for an allocation or child pool."""
+        allocator = self._pool_allocator(pool)
+        pool_id = pool.ipam_pool_id
+        cidr = params.get("Cidr") or ""
+        netmask_length = params.get("NetmaskLength")
+        preview = str2bool(params.get("PreviewNextCidr"))
+
+        if cidr:
+            try:
+                network = ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                return create_error_response("InvalidParameterValue", f"Invalid CIDR '{cidr}'")
+            if network.version != allocator.version:
+                return create_error_response(
+                    "InvalidParameterValue",
+                    f"CIDR '{cidr}' does not match the address family of pool '{pool_id}'",
+                )
+            error = self._check_netmask_length(pool, network.prefixlen)
+            if error:
+                return error
+            cidr = str(network)
+            status = allocator.locate(cidr)
+            if status == "outside":
+                return create_error_response(
+                    "InvalidParameterValue",
+                    f"CIDR '{cidr}' is not within a CIDR provisioned to pool '{pool_id}'",
+                )
+            if status == "conflict":
+                return create_error_response(
+                    "InvalidParameterValue",
+                    f"CIDR '{cidr}' is already allocated in pool '{pool_id}'",
+                )
+        else:
+            if netmask_length is None:
+                netmask_length = pool.allocation_default_netmask_length or None
+            if netmask_length is None:
+                return create_error_response("MissingParameter", "Missing required parameter: Cidr or NetmaskLength")
+            netmask_length = int(netmask_length)
+            error = self._check_netmask_length(pool, netmask_length)
+            if error:
+                return error
+            try:
+                cidr = allocator.find(
+                    netmask_length,
+                    within=params.get("AllowedCidr.N") or None,
+                    exclude=params.get("DisallowedCidr.N") or None,
+                )
+            except ValueError as e:
+                return create_error_response("InvalidParameterValue", str(e))
+            if not cidr:
+                return create_error_response(
+                    "InsufficientCidrBlocks",
+                    f"Pool '{pool_id}' has no free /{netmask_length} CIDR that satisfies the request",
+                )
+
+        if not preview:
+            allocator.reserve(cidr, owner)
+        return cidr
+
     def AllocateIpamPoolCidr(self, params: Dict[str, Any]):
         """Allocate a CIDR from an IPAM pool. The Region you use should be the IPAM pool locale. The locale is the AWS Region where this IPAM pool is available for allocations. In IPAM, an allocation is a CIDR assignment from an IPAM pool to another IPAM pool or to a resource. For more information, seeAllocate"""
 
@@ -147,22 +253,11 @@ class Pool_Backend:
                 f"The ID '{pool_id}' does not exist",
             )
 
-        cidr = params.get("Cidr") or ""
-        netmask_length = params.get("NetmaskLength")
-        if not cidr:
-            if netmask_length:
-                cidr = f"0.0.0.0/{int(netmask_length)}"
-            else:
-                cidr = "0.0.0.0/0"
-
-        for allocation in (pool.ipam_pool_allocations or {}).values():
-            if allocation.get("cidr") == cidr:
-                return create_error_response(
-                    "InvalidParameterValue",
-                    f"CIDR '{cidr}' is already allocated in pool '{pool_id}'",
-                )
-
         allocation_id = self._generate_id("ipam-pool-alloc")
+        cidr = self._reserve_cidr(pool, params, allocation_id)
+        if is_error_response(cidr):
+            return cidr
+
         allocation = {
             "cidr": cidr,
             "description": params.get("Description") or "",
@@ -174,7 +269,6 @@ class Pool_Backend:
         }
 
         if str2bool(params.get("PreviewNextCidr")):
-            allocation = dict(allocation)
             allocation["ipamPoolAllocationId"] = ""
         else:
             pool.ipam_pool_allocations[allocation_id] = allocation
@@ -367,6 +461,7 @@ class Pool_Backend:
             )
 
         del self.resources[pool_id]
+        self.state.public_ipv4_address_pools.pop(pool_id, None)
 
         return {
             'returnValue': True,
@@ -412,6 +507,16 @@ class Pool_Backend:
                 f"CIDR '{cidr}' does not exist in pool '{pool_id}'",
             )
 
+        try:
+            removed = self._pool_allocator(pool).remove(cidr_entry.get("cidr") or "")
+        except ValueError:
+            removed = True
+        if not removed:
+            return create_error_response(
+                "DependencyViolation",
+                f"CIDR '{cidr}' has allocations in pool '{pool_id}' and cannot be deprovisioned.",
+            )
+
         del pool.ipam_pool_cidrs[cidr_id]
 
         netmask_length = cidr_entry.get("netmaskLength")
@@ -424,15 +529,11 @@ class Pool_Backend:
         if pool.source_ipam_pool_id:
             source_pool = self.resources.get(pool.source_ipam_pool_id)
             if source_pool and getattr(source_pool, "pool_type", "ipam") == "ipam":
-                if not any(item.get("cidr") == cidr for item in source_pool.ipam_pool_cidrs.values()):
-                    source_entry_id = self._generate_id("ipam-pool-cidr")
-                    source_pool.ipam_pool_cidrs[source_entry_id] = {
-                        "cidr": cidr,
-                        "failureReason": {},
-                        "ipamPoolCidrId": source_entry_id,
-                        "netmaskLength": netmask_length or 0,
-                        "state": "provisioned",
-                    }
+                for allocation_id, allocation in list(source_pool.ipam_pool_allocations.items()):
+                    if allocation.get("resourceId") == pool_id and allocation.get("cidr") == cidr:
+                        del source_pool.ipam_pool_allocations[allocation_id]
+                        self._pool_allocator(source_pool).release(cidr)
+                        break
 
         response_entry = {
             "cidr": cidr,
@@ -481,6 +582,20 @@ class Pool_Backend:
                 f"CIDR '{cidr}' does not exist in pool '{pool_id}'",
             )
 
+        address_pool = self._public_address_pool(pool)
+        if cidr in address_pool.ranges() and not address_pool.remove(cidr):
+            return create_error_response(
+                "DependencyViolation",
+                f"CIDR '{cidr}' has Elastic IP addresses allocated and cannot be deprovisioned.",
+            )
+        for ipam_pool in self.resources.values():
+            if getattr(ipam_pool, "pool_type", "ipam") != "ipam":
+                continue
+            for allocation_id, allocation in list(ipam_pool.ipam_pool_allocations.items()):
+                if allocation.get("resourceId") == pool_id and allocation.get("cidr") == cidr:
+                    del ipam_pool.ipam_pool_allocations[allocation_id]
+                    self._pool_allocator(ipam_pool).release(cidr)
+
         pool.pool_address_range_set = [
             entry for entry in pool.pool_address_range_set
             if entry.get("cidr") != cidr
@@ -533,16 +648,22 @@ class Pool_Backend:
             for pool_id in pool_ids:
                 pool = self.resources.get(pool_id)
                 if not pool or getattr(pool, "pool_type", "") != "public-ipv4":
-                    return create_error_response(
-                        "InvalidPublicIpv4PoolId.NotFound",
-                        f"The ID '{pool_id}' does not exist",
-                    )
+                    pool = self.state.byoip.get(pool_id)
+                    if not pool or getattr(pool, "resource_type", "") != "public-ipv4-pool":
+                        return create_error_response(
+                            "InvalidPublicIpv4PoolId.NotFound",
+                            f"The ID '{pool_id}' does not exist",
+                        )
                 resources.append(pool)
         else:
             resources = [
                 pool for pool in self.resources.values()
                 if getattr(pool, "pool_type", "") == "public-ipv4"
             ]
+            resources += [
+                pool for pool in self.state.byoip.values()
+                if getattr(pool, "resource_type", "") == "public-ipv4-pool"
+            ]
 
         pool_entries: List[Dict[str, Any]] = []
         for pool in resources:
@@ -590,14 +711,12 @@ class Pool_Backend:
             )
 
         max_results = int(params.get("MaxResults") or 100)
-        allocations = list((pool.ipam_pool_allocations or {}).values())
-
         allocation_id = params.get("IpamPoolAllocationId")
         if allocation_id:
-            allocations = [
-                allocation for allocation in allocations
-                if allocation.get("ipamPoolAllocationId") == allocation_id
-            ]
+            allocation = (pool.ipam_pool_allocations or {}).get(allocation_id)
+            allocations = [allocation] if allocation else []
+        else:
+            allocations = list((pool.ipam_pool_allocations or {}).values())
 
         allocations = apply_filters(allocations, params.get("Filter.N", []))
 
@@ -629,7 +748,14 @@ class Pool_Backend:
             )
 
         max_results = int(params.get("MaxResults") or 100)
-        cidrs = list((pool.ipam_pool_cidrs or {}).values())
+        allocator = self._pool_allocator(pool)
+        cidrs: List[Dict[str, Any]] = []
+        for entry in (pool.ipam_pool_cidrs or {}).values():
+            try:
+                usage = allocator.usage(entry.get("cidr") or "")
+            except ValueError:
+                usage = {}
+            cidrs.append({**entry, **usage})
         cidrs = apply_filters(cidrs, params.get("Filter.N", []))
 
         return {
@@ -723,42 +849,58 @@ class Pool_Backend:
 
         cidr = params.get("Cidr")
         netmask_length = params.get("NetmaskLength")
-        if not cidr:
-            if netmask_length:
-                cidr = f"0.0.0.0/{int(netmask_length)}"
-            else:
-                return create_error_response("MissingParameter", "Missing required parameter: Cidr")
+        source_pool = None
+        if pool.source_ipam_pool_id:
+            source_pool = self.resources.get(pool.source_ipam_pool_id)
+            if source_pool and getattr(source_pool, "pool_type", "ipam") != "ipam":
+                source_pool = None
+        if not cidr and source_pool is None:
+            # Only pools with a source pool can be given a NetmaskLength to carve a CIDR from
+            return create_error_response("MissingParameter", "Missing required parameter: Cidr")
 
-        if any(entry.get("cidr") == cidr for entry in (pool.ipam_pool_cidrs or {}).values()):
+        allocator = self._pool_allocator(pool)
+        source_allocation_id = ""
+        if source_pool is not None:
+            source_allocation_id = self._generate_id("ipam-pool-alloc")
+            cidr = self._reserve_cidr(source_pool, {"Cidr": cidr, "NetmaskLength": netmask_length}, source_allocation_id)
+            if is_error_response(cidr):
+                return cidr
+
+        try:
+            cidr = str(ipaddress.ip_network(cidr, strict=False))
+            added = allocator.add(cidr)
+        except ValueError as e:
+            if source_allocation_id:
+                self._pool_allocator(source_pool).release(cidr)
+            return create_error_response("InvalidParameterValue", f"Invalid CIDR '{cidr}': {e}")
+        if not added:
+            if source_allocation_id:
+                self._pool_allocator(source_pool).release(cidr)
             return create_error_response(
                 "InvalidParameterValue",
-                f"CIDR '{cidr}' already exists in pool '{pool_id}'",
+                f"CIDR '{cidr}' overlaps a CIDR already provisioned to pool '{pool_id}'",
             )
 
         cidr_id = self._generate_id("ipam-pool-cidr")
-        if netmask_length is None and "/" in cidr:
-            try:
-                netmask_length = int(cidr.split("/")[-1])
-            except ValueError:
-                netmask_length = 0
-
         entry = {
             "cidr": cidr,
             "failureReason": {},
             "ipamPoolCidrId": cidr_id,
-            "netmaskLength": int(netmask_length or 0),
+            "netmaskLength": int(cidr.split("/")[-1]),
             "state": "provisioned",
         }
         pool.ipam_pool_cidrs[cidr_id] = entry
 
-        if pool.source_ipam_pool_id:
-            source_pool = self.resources.get(pool.source_ipam_pool_id)
-            if source_pool and getattr(source_pool, "pool_type", "ipam") == "ipam":
-                source_pool.ipam_pool_cidrs = {
-                    entry_id: item
-                    for entry_id, item in source_pool.ipam_pool_cidrs.items()
-                    if item.get("cidr") != cidr
-                }
+        if source_allocation_id:
+            source_pool.ipam_pool_allocations[source_allocation_id] = {
+                "cidr": cidr,
+                "description": "",
+                "ipamPoolAllocationId": source_allocation_id,
+                "resourceId": pool_id,
+                "resourceOwner": pool.owner_id or "",
+                "resourceRegion": pool.locale or pool.ipam_region or "",
+                "resourceType": "ipam-pool",
+            }
 
         return {
             'ipamPoolCidr': entry,
@@ -795,20 +937,37 @@ class Pool_Backend:
             )
 
         netmask_length = int(params.get("NetmaskLength") or 0)
-        cidr = f"0.0.0.0/{netmask_length}"
-        if any(entry.get("cidr") == cidr for entry in pool.pool_address_range_set):
+        ipam_allocator = self._pool_allocator(ipam_pool)
+        if ipam_allocator.version != 4:
             return create_error_response(
                 "InvalidParameterValue",
-                f"CIDR '{cidr}' already exists in pool '{pool_id}'",
+                f"IPAM pool '{ipam_pool_id}' is not an IPv4 pool",
             )
-
-        address_range = {
+        allocation_id = self._generate_id("ipam-pool-alloc")
+        cidr = ipam_allocator.allocate(netmask_length, allocation_id)
+        if not cidr:
+            return create_error_response(
+                "InsufficientCidrBlocks",
+                f"Pool '{ipam_pool_id}' has no free /{netmask_length} CIDR to provision",
+            )
+        address_pool = self._public_address_pool(pool)
+        if not address_pool.add(cidr):
+            ipam_allocator.release(cidr)
+            return create_error_response(
+                "InvalidParameterValue",
+                f"CIDR '{cidr}' overlaps a CIDR already in pool '{pool_id}'",
+            )
+        ipam_pool.ipam_pool_allocations[allocation_id] = {
             "cidr": cidr,
-            "addressCount": 0,
-            "availableAddressCount": 0,
-            "firstAddress": "",
-            "lastAddress": "",
+            "description": "",
+            "ipamPoolAllocationId": allocation_id,
+            "resourceId": pool_id,
+            "resourceOwner": ipam_pool.owner_id or "",
+            "resourceRegion": ipam_pool.locale or ipam_pool.ipam_region or "",
+            "resourceType": "ec2-public-ipv4-pool",
         }
+
+        address_range = {"cidr": cidr}
         pool.pool_address_range_set.append(address_range)
         self._recalculate_public_pool_counts(pool)
 
@@ -853,6 +1012,7 @@ class Pool_Backend:
             )
 
         del pool.ipam_pool_allocations[allocation_id]
+        self._pool_allocator(pool).release(allocation.get("cidr") or "")
 
         return {
             'success': [allocation_id],
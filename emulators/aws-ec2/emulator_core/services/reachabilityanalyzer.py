@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..reachability import ENDPOINT_PREFIXES, NetworkTopology, analyze
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class ReachabilityAnalyzer:
     additional_account_set: List[Any] = field(default_factory=list)
     alternate_path_hint_set: List[Any] = field(default_factory=list)
@@ -104,6 +106,7 @@ class ReachabilityAnalyzer_Backend:
     def __init__(self):
         self.state = EC2State.get()
         self.resources = self.state.reachability_analyzer  # alias to shared store
+        self.topology = NetworkTopology(self.state)
 
     def _utcnow(self) -> str:
         return datetime.now(timezone.utc).isoformat()
@@ -443,7 +446,7 @@ class ReachabilityAnalyzer_Backend:
             return error
 
         path_id = params.get("NetworkInsightsPathId") or ""
-        _, error = self._get_resource_or_error(
+        path, error = self._get_resource_or_error(
             path_id,
             "InvalidNetworkInsightsPathId.NotFound",
             f"The ID '{path_id}' does not exist",
@@ -465,6 +468,30 @@ class ReachabilityAnalyzer_Backend:
         analysis_arn = f"arn:aws:ec2:::network-insights-analysis/{analysis_id}"
         start_date = self._utcnow()
 
+        status = "succeeded"
+        status_message = ""
+        unsupported = [
+            endpoint for endpoint in (path.source, path.destination)
+            if endpoint and endpoint.split("-")[0] not in ENDPOINT_PREFIXES
+        ]
+        if unsupported:
+            status = "failed"
+            status_message = f"Analysis from or to '{unsupported[0]}' is not supported"
+            result = None
+        else:
+            # The state is swapped under the backend on restores and fork routing
+            if self.topology.state is not self.state:
+                self.topology = NetworkTopology(self.state)
+            result = analyze(
+                self.topology,
+                path.source,
+                path.destination,
+                protocol=path.protocol,
+                source_ip=path.source_ip,
+                destination_ip=path.destination_ip,
+                destination_port=path.destination_port,
+            )
+
         resource = ReachabilityAnalyzer(
             resource_type="analysis",
             network_insights_analysis_id=analysis_id,
@@ -472,15 +499,15 @@ class ReachabilityAnalyzer_Backend:
             network_insights_path_id=path_id,
             additional_account_set=params.get("AdditionalAccount.N", []) or [],
             alternate_path_hint_set=[],
-            explanation_set=[],
+            explanation_set=result.explanations if result else [],
             filter_in_arn_set=params.get("FilterInArn.N", []) or [],
             filter_out_arn_set=params.get("FilterOutArn.N", []) or [],
-            forward_path_component_set=[],
-            network_path_found=False,
-            return_path_component_set=[],
+            forward_path_component_set=result.forward if result and result.found else [],
+            network_path_found=bool(result and result.found),
+            return_path_component_set=result.reverse if result and result.found else [],
             start_date=start_date,
-            status="succeeded",
-            status_message="",
+            status=status,
+            status_message=status_message,
             suggested_account_set=[],
             tag_set=tag_set,
             warning_message="",
@@ -816,7 +843,11 @@ class reachabilityanalyzer_ResponseSerializer:
         if _networkInsightsAnalysis_key:
             param_data = data[_networkInsightsAnalysis_key]
             indent_str = "    " * 1
-            if param_data:
+            if isinstance(param_data, dict):
+                xml_parts.append(f'{indent_str}<networkInsightsAnalysis>')
+                xml_parts.extend(reachabilityanalyzer_ResponseSerializer._serialize_nested_fields(param_data, 2))
+                xml_parts.append(f'{indent_str}</networkInsightsAnalysis>')
+            elif param_data:
                 xml_parts.append(f'{indent_str}<networkInsightsAnalysisSet>')
                 for item in param_data:
                     xml_parts.append(f'{indent_str}    <item>')
@@ -1,13 +1,18 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
+import ipaddress
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
+from ..rulematch import prefix_list_resolver, security_group_rules
+from ..sgreferences import security_group_references
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +38,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class SecurityGroup:
     group_description: str = ""
     group_id: str = ""
@@ -46,11 +51,12 @@ class SecurityGroup:
     vpc_id: str = ""
 
     # Internal dependency tracking — not in API response
-    authorization_rule_ids: List[str] = field(default_factory=list)  # tracks AuthorizationRule children
+    authorization_rule_ids: ChildIds = child_ids("AuthorizationRule")  # tracks AuthorizationRule children
 
     associated_vpc_ids: List[str] = field(default_factory=list)
     vpc_association_states: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     security_group_rules: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    compiled_rules: Optional[Any] = None  # rulematch.SecurityGroupRules, built on first evaluation
 
 
     def to_dict(self) -> Dict[str, Any]:
@@ -66,6 +72,17 @@ class SecurityGroup:
             "vpcId": self.vpc_id,
         }
 
+# ModifySecurityGroupRules request fields -> security_group_rules keys
+_RULE_REQUEST_KEYS = {
+    "CidrIpv4": "cidrIpv4",
+    "CidrIpv6": "cidrIpv6",
+    "Description": "description",
+    "FromPort": "fromPort",
+    "IpProtocol": "ipProtocol",
+    "PrefixListId": "prefixListId",
+    "ToPort": "toPort",
+}
+
 class SecurityGroup_Backend:
     def __init__(self):
         self.state = EC2State.get()
@@ -160,6 +177,22 @@ class SecurityGroup_Backend:
     def _generate_rule_id(self) -> str:
         return self._generate_id("sgr")
 
+    def _index_rule(self, group: SecurityGroup, rule: Dict[str, Any]):
+        # Until a group is first evaluated its index does not exist and is built from scratch;
+        # the same goes for the shared reference index
+        if group.compiled_rules is not None:
+            group.compiled_rules.add(rule)
+        references = getattr(self.state, "security_group_references", None)
+        if references is not None:
+            references.add_rule(group, rule, self.resources)
+
+    def _unindex_rule(self, group: SecurityGroup, rule_id: str):
+        if group.compiled_rules is not None:
+            group.compiled_rules.discard(rule_id)
+        references = getattr(self.state, "security_group_references", None)
+        if references is not None:
+            references.discard_rule(rule_id)
+
     def _list_rules(self, group: SecurityGroup) -> List[Dict[str, Any]]:
         return list(group.security_group_rules.values())
 
@@ -225,6 +258,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
             for ip_range in ipv6_ranges:
@@ -246,6 +280,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
             for prefix in prefix_lists:
@@ -267,6 +302,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
             for pair in user_groups:
@@ -299,6 +335,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
         return {
@@ -356,6 +393,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
             for ip_range in ipv6_ranges:
@@ -377,6 +415,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
             for prefix in prefix_lists:
@@ -398,6 +437,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
             for pair in user_groups:
@@ -430,6 +470,7 @@ class SecurityGroup_Backend:
                     "toPort": to_port,
                 }
                 group.security_group_rules[rule_id] = rule
+                self._index_rule(group, rule)
                 created_rules.append(rule)
 
         return {
@@ -501,22 +542,24 @@ class SecurityGroup_Backend:
                 "SecurityGroup has dependent AuthorizationRule(s) and cannot be deleted.",
             )
 
-        if group.associated_vpc_ids:
+        # CreateSecurityGroup records the group's own VPC as an association; only
+        # AssociateSecurityGroupVpc associations block deletion
+        if any(vpc_id != group.vpc_id for vpc_id in group.associated_vpc_ids):
             return create_error_response(
                 "DependencyViolation",
                 "SecurityGroup has VPC associations and cannot be deleted.",
             )
 
-        for other in self.resources.values():
-            if other.group_id == group.group_id:
-                continue
-            for rule in other.security_group_rules.values():
-                ref_info = rule.get("referencedGroupInfo") or {}
-                if ref_info.get("groupId") == group.group_id:
-                    return create_error_response(
-                        "DependencyViolation",
-                        "SecurityGroup is referenced by another security group.",
-                    )
+        # Only references from the same VPC block deletion; references across a
+        # peering connection become stale instead
+        references = security_group_references(self.state)
+        for referencing_id in references.referencing(group.group_id).values():
+            other = self.resources.get(referencing_id)
+            if other is not None and other.group_id != group.group_id and other.vpc_id == group.vpc_id:
+                return create_error_response(
+                    "DependencyViolation",
+                    "SecurityGroup is referenced by another security group.",
+                )
 
         parent = self.state.vpcs.get(group.vpc_id)
         if parent and hasattr(parent, "security_group_ids") and group.group_id in parent.security_group_ids:
@@ -527,6 +570,7 @@ class SecurityGroup_Backend:
             if vpc and hasattr(vpc, "security_group_ids") and group.group_id in vpc.security_group_ids:
                 vpc.security_group_ids.remove(group.group_id)
 
+        references.discard_group(group)
         self.resources.pop(group.group_id, None)
 
         return {
@@ -641,8 +685,12 @@ class SecurityGroup_Backend:
             for key, value in rule_data.items():
                 if value is None:
                     continue
-                rule[key] = value
+                if key == "ReferencedGroupId":
+                    rule["referencedGroupInfo"] = {"groupId": value, "groupOwnerId": group.owner_id}
+                    continue
+                rule[_RULE_REQUEST_KEYS.get(key, key)] = value
             group.security_group_rules[rule_id] = rule
+            self._index_rule(group, rule)
 
         return {
             'return': True,
@@ -695,6 +743,7 @@ class SecurityGroup_Backend:
                     }
                 )
                 group.security_group_rules.pop(rule_id, None)
+                self._unindex_rule(group, rule_id)
 
         ip_permissions = self._normalize_ip_permissions(params)
         if ip_permissions:
@@ -749,6 +798,7 @@ class SecurityGroup_Backend:
                         }
                     )
                     group.security_group_rules.pop(rule_id, None)
+                    self._unindex_rule(group, rule_id)
 
                 if not matched:
                     unknown_permissions.append(
@@ -810,6 +860,7 @@ class SecurityGroup_Backend:
                     }
                 )
                 group.security_group_rules.pop(rule_id, None)
+                self._unindex_rule(group, rule_id)
 
         ip_permissions = self._normalize_ip_permissions(params)
         if ip_permissions:
@@ -864,6 +915,7 @@ class SecurityGroup_Backend:
                         }
                     )
                     group.security_group_rules.pop(rule_id, None)
+                    self._unindex_rule(group, rule_id)
 
                 if not matched:
                     unknown_permissions.append(
@@ -1057,7 +1109,8 @@ class SecurityGroup_Backend:
         if not group_ids:
             return create_error_response("MissingParameter", "Missing required parameter: GroupId.N")
 
-        references: List[Dict[str, Any]] = []
+        references = security_group_references(self.state)
+        reference_set: List[Dict[str, Any]] = []
         for group_id in group_ids:
             group = self.resources.get(group_id)
             if not group:
@@ -1065,22 +1118,23 @@ class SecurityGroup_Backend:
                     "InvalidGroup.NotFound",
                     f"The ID '{group_id}' does not exist",
                 )
-            for sg in self.resources.values():
-                for rule in sg.security_group_rules.values():
-                    ref_info = rule.get("referencedGroupInfo") or {}
-                    if ref_info.get("groupId") != group_id:
-                        continue
-                    referencing_vpc_id = ref_info.get("vpcId") or sg.vpc_id
-                    entry = {
-                        "groupId": group_id,
-                        "referencingVpcId": referencing_vpc_id,
-                        "transitGatewayId": ref_info.get("transitGatewayId"),
-                        "vpcPeeringConnectionId": ref_info.get("vpcPeeringConnectionId"),
-                    }
-                    references.append(entry)
+            for rule_id, referencing_id in references.referencing(group_id).items():
+                sg = self.resources.get(referencing_id)
+                rule = sg.security_group_rules.get(rule_id) if sg else None
+                if rule is None:
+                    continue
+                ref_info = rule.get("referencedGroupInfo") or {}
+                referencing_vpc_id = ref_info.get("vpcId") or sg.vpc_id
+                entry = {
+                    "groupId": group_id,
+                    "referencingVpcId": referencing_vpc_id,
+                    "transitGatewayId": ref_info.get("transitGatewayId"),
+                    "vpcPeeringConnectionId": ref_info.get("vpcPeeringConnectionId"),
+                }
+                reference_set.append(entry)
 
         return {
-            'securityGroupReferenceSet': references,
+            'securityGroupReferenceSet': reference_set,
             }
 
     def DescribeSecurityGroupVpcAssociations(self, params: Dict[str, Any]):
@@ -1129,17 +1183,21 @@ class SecurityGroup_Backend:
                 f"VPC '{vpc_id}' does not exist.",
             )
 
+        stale_rules: Dict[str, List[str]] = {}
+        for group_id, rule_id in security_group_references(self.state).stale_rules(vpc_id, self.resources):
+            stale_rules.setdefault(group_id, []).append(rule_id)
+
         stale_groups: List[Dict[str, Any]] = []
-        for group in self.resources.values():
-            if group.vpc_id != vpc_id:
+        for group_id, rule_ids in stale_rules.items():
+            group = self.resources.get(group_id)
+            if group is None:
                 continue
             stale_ingress: List[Dict[str, Any]] = []
             stale_egress: List[Dict[str, Any]] = []
-            for rule in group.security_group_rules.values():
+            for rule_id in rule_ids:
+                rule = group.security_group_rules[rule_id]
                 ref_info = rule.get("referencedGroupInfo") or {}
                 ref_group_id = ref_info.get("groupId")
-                if not ref_group_id or ref_group_id in self.resources:
-                    continue
                 permission = {
                     "FromPort": rule.get("fromPort"),
                     "ToPort": rule.get("toPort"),
@@ -1255,6 +1313,94 @@ class SecurityGroup_Backend:
             ],
             }
 
+    def CheckSecurityGroupConnection(self, params: Dict[str, Any]):
+        """Emulator extension, not part of the EC2 API. Reports whether the security groups of a network
+         interface admit traffic from a source on a protocol and port. The source may be an IP address, a
+         network interface, an instance or a security group; for interfaces and instances their own egress
+         rules are checked too."""
+
+        error = self._require_params(params, ["NetworkInterfaceId", "Protocol", "Source"])
+        if error:
+            return error
+
+        network_interface_id = params.get("NetworkInterfaceId")
+        network_interface = self.state.elastic_network_interfaces.get(network_interface_id)
+        if not network_interface:
+            return create_error_response(
+                "InvalidNetworkInterfaceID.NotFound",
+                f"The ID '{network_interface_id}' does not exist",
+            )
+
+        source = params.get("Source")
+        source_groups: List[str] = []
+        source_address = None
+        check_egress = False
+        if source.startswith("sg-"):
+            if source not in self.resources:
+                return create_error_response("InvalidGroup.NotFound", f"Security group '{source}' does not exist.")
+            source_groups = [source]
+        elif source.startswith("eni-") or source.startswith("i-"):
+            store = self.state.elastic_network_interfaces if source.startswith("eni-") else self.state.instances
+            source_resource = store.get(source)
+            if not source_resource:
+                code = "InvalidNetworkInterfaceID.NotFound" if source.startswith("eni-") else "InvalidInstanceID.NotFound"
+                return create_error_response(code, f"The ID '{source}' does not exist")
+            source_groups = self._group_ids(source_resource)
+            source_address = self._parse_address(getattr(source_resource, "private_ip_address", ""))
+            check_egress = True
+        else:
+            source_address = self._parse_address(source)
+            if source_address is None:
+                return create_error_response(
+                    "InvalidParameterValue",
+                    f"Source '{source}' is not an IP address, network interface, instance or security group ID",
+                )
+
+        protocol = params.get("Protocol")
+        port = params.get("Port")
+        target_groups = self._group_ids(network_interface)
+        target_address = self._parse_address(network_interface.private_ip_address)
+
+        ingress_rule = self._match_rule(target_groups, False, protocol, port, source_address, source_groups)
+        egress_rule = None
+        if check_egress:
+            egress_rule = self._match_rule(source_groups, True, protocol, port, target_address, target_groups)
+
+        allowed = (ingress_rule is not None or not target_groups) and (
+            not check_egress or egress_rule is not None or not source_groups
+        )
+        return {
+            'allowed': allowed,
+            'egressRule': egress_rule,
+            'ingressRule': ingress_rule,
+            }
+
+    def _group_ids(self, resource: Any) -> List[str]:
+        group_ids = []
+        for group in getattr(resource, "group_set", []) or []:
+            group_id = group.get("GroupId") or group.get("groupId") if isinstance(group, dict) else None
+            if group_id:
+                group_ids.append(group_id)
+        return group_ids
+
+    def _parse_address(self, value: Any):
+        try:
+            return ipaddress.ip_address(str(value))
+        except ValueError:
+            return None
+
+    def _match_rule(self, group_ids: List[str], egress: bool, protocol: Any, port: Optional[int],
+                    address: Any, peer_groups: List[str]) -> Optional[Dict[str, Any]]:
+        resolve = prefix_list_resolver(self.state)
+        for group_id in group_ids:
+            group = self.resources.get(group_id)
+            if not group:
+                continue
+            rule_id = security_group_rules(group).match(egress, protocol, port, address, peer_groups, resolve)
+            if rule_id:
+                return group.security_group_rules.get(rule_id)
+        return None
+
     def _generate_id(self, prefix: str = 'sg') -> str:
         return f'{prefix}-{uuid.uuid4().hex[:17]}'
 
@@ -1443,6 +1589,15 @@ class securitygroup_RequestParser:
             "VpcId": get_scalar(md, "VpcId"),
         }
 
+    @staticmethod
+    def parse_check_security_group_connection_request(md: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "NetworkInterfaceId": get_scalar(md, "NetworkInterfaceId"),
+            "Port": get_int(md, "Port"),
+            "Protocol": get_scalar(md, "Protocol"),
+            "Source": get_scalar(md, "Source"),
+        }
+
     @staticmethod
     def parse_request(action: str, md: Dict[str, Any]) -> Dict[str, Any]:
         parsers = {
@@ -1463,6 +1618,7 @@ class securitygroup_RequestParser:
             "DescribeStaleSecurityGroups": securitygroup_RequestParser.parse_describe_stale_security_groups_request,
             "DisassociateSecurityGroupVpc": securitygroup_RequestParser.parse_disassociate_security_group_vpc_request,
             "GetSecurityGroupsForVpc": securitygroup_RequestParser.parse_get_security_groups_for_vpc_request,
+            "CheckSecurityGroupConnection": securitygroup_RequestParser.parse_check_security_group_connection_request,
         }
         if action not in parsers:
             raise ValueError(f"Unknown action: {action}")
@@ -2071,6 +2227,21 @@ class securitygroup_ResponseSerializer:
         xml_parts.append(f'</DisassociateSecurityGroupVpcResponse>')
         return "\n".join(xml_parts)
 
+    @staticmethod
+    def serialize_check_security_group_connection_response(data: Dict[str, Any], request_id: str) -> str:
+        xml_parts = []
+        xml_parts.append(f'<CheckSecurityGroupConnectionResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">')
+        xml_parts.append(f'    <requestId>{esc(request_id)}</requestId>')
+        xml_parts.append(f'    <allowed>{str(bool(data.get("allowed"))).lower()}</allowed>')
+        for key in ("ingressRule", "egressRule"):
+            rule = data.get(key)
+            if rule:
+                xml_parts.append(f'    <{key}>')
+                xml_parts.extend(securitygroup_ResponseSerializer._serialize_dict_to_xml(rule, key, 2))
+                xml_parts.append(f'    </{key}>')
+        xml_parts.append(f'</CheckSecurityGroupConnectionResponse>')
+        return "\n".join(xml_parts)
+
     @staticmethod
     def serialize_get_security_groups_for_vpc_response(data: Dict[str, Any], request_id: str) -> str:
         xml_parts = []
@@ -2133,6 +2304,7 @@ class securitygroup_ResponseSerializer:
             "DescribeStaleSecurityGroups": securitygroup_ResponseSerializer.serialize_describe_stale_security_groups_response,
             "DisassociateSecurityGroupVpc": securitygroup_ResponseSerializer.serialize_disassociate_security_group_vpc_response,
             "GetSecurityGroupsForVpc": securitygroup_ResponseSerializer.serialize_get_security_groups_for_vpc_response,
+            "CheckSecurityGroupConnection": securitygroup_ResponseSerializer.serialize_check_security_group_connection_response,
         }
         if action not in serializers:
             raise ValueError(f"Unknown action: {action}")
@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class Snapshot:
     availability_zone: str = ""
     completion_duration_minutes: int = 0
@@ -60,8 +62,8 @@ class Snapshot:
     volume_size: int = 0
 
     # Internal dependency tracking — not in API response
-    fast_snapshot_restore_ids: List[str] = field(default_factory=list)  # tracks FastSnapshotRestore children
-    volume_ids: List[str] = field(default_factory=list)  # tracks Volume children
+    fast_snapshot_restore_ids: ChildIds = child_ids("FastSnapshotRestore")  # tracks FastSnapshotRestore children
+    volume_ids: ChildIds = child_ids("Volume")  # tracks Volume children
 
     create_volume_permissions: List[Dict[str, Any]] = field(default_factory=list)
     product_codes: List[Dict[str, Any]] = field(default_factory=list)
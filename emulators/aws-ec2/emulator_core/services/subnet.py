@@ -1,6 +1,6 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
@@ -8,7 +8,10 @@ import ipaddress
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids, dependency_violation
+from ..ipalloc import subnet_allocator, vpc_cidr_index
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -34,7 +37,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class Subnet:
     assign_ipv6_address_on_creation: bool = False
     availability_zone: str = ""
@@ -61,15 +64,19 @@ class Subnet:
     vpc_id: str = ""
 
     # Internal dependency tracking — not in API response
-    ec2_instance_connect_endpoint_ids: List[str] = field(default_factory=list)  # tracks Ec2InstanceConnectEndpoint children
-    elastic_ip_addresse_ids: List[str] = field(default_factory=list)  # tracks ElasticIpAddresse children
-    instance_ids: List[str] = field(default_factory=list)  # tracks Instance children
-    nat_gateway_ids: List[str] = field(default_factory=list)  # tracks NatGateway children
-    transit_gateway_multicast_ids: List[str] = field(default_factory=list)  # tracks TransitGatewayMulticast children
-    network_interface_ids: List[str] = field(default_factory=list)  # tracks ElasticNetworkInterface children
+    ec2_instance_connect_endpoint_ids: ChildIds = child_ids("Ec2InstanceConnectEndpoint")  # tracks Ec2InstanceConnectEndpoint children
+    elastic_ip_addresse_ids: ChildIds = child_ids("ElasticIpAddresse")  # tracks ElasticIpAddresse children
+    instance_ids: ChildIds = child_ids("Instance")  # tracks Instance children
+    nat_gateway_ids: ChildIds = child_ids("NatGateway")  # tracks NatGateway children
+    transit_gateway_multicast_ids: ChildIds = child_ids("TransitGatewayMulticast")  # tracks TransitGatewayMulticast children
+    network_interface_ids: ChildIds = child_ids("ElasticNetworkInterface")  # tracks ElasticNetworkInterface children
 
     subnet_cidr_reservations: List[Dict[str, Any]] = field(default_factory=list)
 
+    # Internal address allocation state — not in API response
+    ipv4_allocator: Optional[Any] = None
+    ipv6_allocator: Optional[Any] = None
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "assignIpv6AddressOnCreation": self.assign_ipv6_address_on_creation,
@@ -132,6 +139,32 @@ class Subnet_Backend:
     def _get_subnet_or_error(self, subnet_id: str, error_code: str = "InvalidSubnetID.NotFound"):
         return self._get_resource_or_error(self.resources, subnet_id, error_code, f"The ID '{subnet_id}' does not exist")
 
+    def _check_subnet_cidr(self, vpc: Any, cidr: str, version: int = 4) -> Optional[Dict[str, Any]]:
+        """Reject a subnet CIDR that falls outside the VPC or overlaps a sibling subnet."""
+        try:
+            location = vpc_cidr_index(vpc, self.resources, version).locate(cidr)
+        except ValueError:
+            location = "outside"
+        if location == "outside":
+            return create_error_response("InvalidSubnet.Range", f"The CIDR '{cidr}' is invalid.")
+        if location == "conflict":
+            return create_error_response("InvalidSubnet.Conflict", f"The CIDR '{cidr}' conflicts with another subnet")
+        return None
+
+    def _release_subnet_cidrs(self, subnet: Subnet) -> None:
+        vpc = self.state.vpcs.get(subnet.vpc_id)
+        if not vpc:
+            return
+        cidrs = [(subnet.cidr_block, 4)]
+        cidrs += [(item.get("ipv6CidrBlock"), 6) for item in subnet.ipv6_cidr_block_association_set]
+        for cidr, version in cidrs:
+            if not cidr:
+                continue
+            try:
+                vpc_cidr_index(vpc, self.resources, version).release(cidr)
+            except ValueError:
+                continue
+
     def _extract_tags(self, tag_specs: List[Dict[str, Any]], resource_type: str) -> List[Dict[str, Any]]:
         tags: List[Dict[str, Any]] = []
         for spec in tag_specs or []:
@@ -167,6 +200,13 @@ class Subnet_Backend:
         if not ipv6_cidr_block and not ipam_pool_id and params.get("Ipv6NetmaskLength") is None:
             return create_error_response("InvalidParameterValue", "Missing IPv6 CIDR block parameters.")
 
+        vpc = self.state.vpcs.get(subnet.vpc_id)
+        if ipv6_cidr_block and vpc:
+            error = self._check_subnet_cidr(vpc, ipv6_cidr_block, 6)
+            if error:
+                return error
+            vpc_cidr_index(vpc, self.resources, 6).reserve(ipv6_cidr_block, subnet_id)
+
         association = {
             "associationId": self._generate_id("subnet-cidr-assoc"),
             "ipSource": "amazon",
@@ -237,16 +277,16 @@ class Subnet_Backend:
 
         vpc_cidr = getattr(default_vpc, "cidr_block", "") or getattr(default_vpc, "cidrBlock", "")
         cidr_block = ""
+        cidr_index = vpc_cidr_index(default_vpc, self.resources, 4)
         if vpc_cidr:
             try:
                 vpc_net = ipaddress.ip_network(vpc_cidr, strict=False)
-                desired_prefix = 20 if vpc_net.prefixlen < 20 else vpc_net.prefixlen
-                candidates = [vpc_net] if vpc_net.prefixlen >= desired_prefix else list(vpc_net.subnets(new_prefix=desired_prefix))
-                used_cidrs = {s.cidr_block for s in self.resources.values() if s.vpc_id == vpc_id and s.cidr_block}
-                for candidate in candidates:
-                    if str(candidate) not in used_cidrs:
-                        cidr_block = str(candidate)
-                        break
+                cidr_block = cidr_index.find(max(vpc_net.prefixlen, 20)) or ""
+                if not cidr_block:
+                    return create_error_response(
+                        "InvalidSubnet.Conflict",
+                        f"No free /{max(vpc_net.prefixlen, 20)} CIDR block remains in the default VPC.",
+                    )
             except ValueError:
                 cidr_block = vpc_cidr
         if not cidr_block:
@@ -312,6 +352,10 @@ class Subnet_Backend:
             parent.subnet_ids.append(subnet_id)
         if default_vpc and hasattr(default_vpc, "subnet_ids"):
             default_vpc.subnet_ids.append(subnet_id)
+        try:
+            cidr_index.reserve(cidr_block, subnet_id)
+        except ValueError:
+            pass
 
         return {
             'subnet': resource.to_dict(),
@@ -353,6 +397,15 @@ class Subnet_Backend:
                 },
             }]
 
+        if cidr_block:
+            error = self._check_subnet_cidr(vpc, cidr_block, 4)
+            if error:
+                return error
+        if ipv6_cidr_block:
+            error = self._check_subnet_cidr(vpc, ipv6_cidr_block, 6)
+            if error:
+                return error
+
         available_ip_address_count = 0
         if cidr_block:
             try:
@@ -399,6 +452,10 @@ class Subnet_Backend:
             parent.subnet_ids.append(subnet_id)
         if vpc and hasattr(vpc, "subnet_ids"):
             vpc.subnet_ids.append(subnet_id)
+        if cidr_block:
+            vpc_cidr_index(vpc, self.resources, 4).reserve(cidr_block, subnet_id)
+        if ipv6_cidr_block:
+            vpc_cidr_index(vpc, self.resources, 6).reserve(ipv6_cidr_block, subnet_id)
 
         return {
             'subnet': resource.to_dict(),
@@ -417,6 +474,18 @@ class Subnet_Backend:
         if error:
             return error
 
+        cidr = params.get("Cidr") or ""
+        try:
+            version = ipaddress.ip_network(cidr, strict=False).version
+        except ValueError:
+            return create_error_response("InvalidParameterValue", f"Value ({cidr}) for parameter Cidr is invalid.")
+        allocator = subnet_allocator(subnet, version)
+        if allocator is None or not allocator.block(cidr):
+            return create_error_response(
+                "InvalidParameterValue",
+                f"The CIDR '{cidr}' is not within the CIDR blocks of subnet '{subnet_id}'.",
+            )
+
         tag_set = self._extract_tags(params.get("TagSpecification.N", []) or [], "subnet-cidr-reservation")
         reservation_id = self._generate_id("subnet-cidr-resv")
         owner_id = subnet.owner_id
@@ -426,7 +495,7 @@ class Subnet_Backend:
                 owner_id = getattr(vpc, "owner_id", "")
 
         reservation = {
-            "cidr": params.get("Cidr") or "",
+            "cidr": cidr,
             "description": params.get("Description") or "",
             "ownerId": owner_id,
             "reservationType": params.get("ReservationType") or "",
@@ -451,20 +520,11 @@ class Subnet_Backend:
         subnet, error = self._get_subnet_or_error(subnet_id)
         if error:
             return error
+        dependency_error = dependency_violation(subnet, "Subnet")
+        if dependency_error:
+            return dependency_error
 
-        if getattr(subnet, "ec2_instance_connect_endpoint_ids", []):
-            return create_error_response('DependencyViolation', 'Subnet has dependent Ec2InstanceConnectEndpoint(s) and cannot be deleted.')
-        if getattr(subnet, "elastic_ip_addresse_ids", []):
-            return create_error_response('DependencyViolation', 'Subnet has dependent ElasticIpAddresse(s) and cannot be deleted.')
-        if getattr(subnet, "instance_ids", []):
-            return create_error_response('DependencyViolation', 'Subnet has dependent Instance(s) and cannot be deleted.')
-        if getattr(subnet, "nat_gateway_ids", []):
-            return create_error_response('DependencyViolation', 'Subnet has dependent NatGateway(s) and cannot be deleted.')
-        if getattr(subnet, "transit_gateway_multicast_ids", []):
-            return create_error_response('DependencyViolation', 'Subnet has dependent TransitGatewayMulticast(s) and cannot be deleted.')
-        if getattr(subnet, "network_interface_ids", []):
-            return create_error_response('DependencyViolation', 'Subnet has dependent ElasticNetworkInterface(s) and cannot be deleted.')
-
+        self._release_subnet_cidrs(subnet)
         self.resources.pop(subnet_id, None)
 
         parent = self.state.fast_snapshot_restores.get(subnet.availability_zone_id)
@@ -502,6 +562,9 @@ class Subnet_Backend:
 
         if reservation in target_subnet.subnet_cidr_reservations:
             target_subnet.subnet_cidr_reservations.remove(reservation)
+        for allocator in (target_subnet.ipv4_allocator, target_subnet.ipv6_allocator):
+            if allocator is not None:
+                allocator.unblock(reservation.get("cidr") or "")
 
         return {
             'deletedSubnetCidrReservation': reservation,
@@ -559,6 +622,10 @@ class Subnet_Backend:
 
         if association in target_subnet.ipv6_cidr_block_association_set:
             target_subnet.ipv6_cidr_block_association_set.remove(association)
+        target_subnet.ipv6_allocator = None
+        vpc = self.state.vpcs.get(target_subnet.vpc_id)
+        if vpc and association.get("ipv6CidrBlock"):
+            vpc_cidr_index(vpc, self.resources, 6).release(association.get("ipv6CidrBlock"))
 
         return {
             'ipv6CidrBlockAssociation': association,
@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class TransitGateway:
     creation_time: str = ""
     description: str = ""
@@ -45,12 +47,12 @@ class TransitGateway:
     transit_gateway_id: str = ""
 
     # Internal dependency tracking — not in API response
-    route_table_ids: List[str] = field(default_factory=list)  # tracks RouteTable children
-    transit_gateway_connect_ids: List[str] = field(default_factory=list)  # tracks TransitGatewayConnect children
-    transit_gateway_policy_table_ids: List[str] = field(default_factory=list)  # tracks TransitGatewayPolicyTable children
-    transit_gateway_route_table_ids: List[str] = field(default_factory=list)  # tracks TransitGatewayRouteTable children
-    vpn_concentrator_ids: List[str] = field(default_factory=list)  # tracks VpnConcentrator children
-    vpn_connection_ids: List[str] = field(default_factory=list)  # tracks VpnConnection children
+    route_table_ids: ChildIds = child_ids("RouteTable")  # tracks RouteTable children
+    transit_gateway_connect_ids: ChildIds = child_ids("TransitGatewayConnect")  # tracks TransitGatewayConnect children
+    transit_gateway_policy_table_ids: ChildIds = child_ids("TransitGatewayPolicyTable")  # tracks TransitGatewayPolicyTable children
+    transit_gateway_route_table_ids: ChildIds = child_ids("TransitGatewayRouteTable")  # tracks TransitGatewayRouteTable children
+    vpn_concentrator_ids: ChildIds = child_ids("VpnConcentrator")  # tracks VpnConcentrator children
+    vpn_connection_ids: ChildIds = child_ids("VpnConnection")  # tracks VpnConnection children
 
     tags: List[Dict[str, Any]] = field(default_factory=list)
     transit_gateway_vpc_attachment_ids: List[str] = field(default_factory=list)
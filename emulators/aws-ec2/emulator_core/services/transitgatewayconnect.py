@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class TransitGatewayConnect:
     creation_time: str = ""
     options: Dict[str, Any] = field(default_factory=dict)
@@ -44,11 +46,11 @@ class TransitGatewayConnect:
     transport_transit_gateway_attachment_id: str = ""
 
     # Internal dependency tracking — not in API response
-    transit_gateway_multicast_ids: List[str] = field(default_factory=list)  # tracks TransitGatewayMulticast children
-    transit_gateway_peering_attachment_ids: List[str] = field(default_factory=list)  # tracks TransitGatewayPeeringAttachment children
-    vpn_concentrator_ids: List[str] = field(default_factory=list)  # tracks VpnConcentrator children
+    transit_gateway_multicast_ids: ChildIds = child_ids("TransitGatewayMulticast")  # tracks TransitGatewayMulticast children
+    transit_gateway_peering_attachment_ids: ChildIds = child_ids("TransitGatewayPeeringAttachment")  # tracks TransitGatewayPeeringAttachment children
+    vpn_concentrator_ids: ChildIds = child_ids("VpnConcentrator")  # tracks VpnConcentrator children
 
-    transit_gateway_connect_peer_ids: List[str] = field(default_factory=list)  # tracks TransitGatewayConnectPeer children
+    transit_gateway_connect_peer_ids: ChildIds = child_ids("TransitGatewayConnectPeer")  # tracks TransitGatewayConnectPeer children
 
 
     def to_dict(self) -> Dict[str, Any]:
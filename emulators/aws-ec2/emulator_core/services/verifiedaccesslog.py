@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,14 +35,14 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class VerifiedAccessLog:
     access_logs: Dict[str, Any] = field(default_factory=dict)
     verified_access_instance_id: str = ""
 
     # Internal dependency tracking — not in API response
-    verified_access_endpoint_ids: List[str] = field(default_factory=list)  # tracks VerifiedAccessEndpoint children
-    verified_access_group_ids: List[str] = field(default_factory=list)  # tracks VerifiedAccessGroup children
+    verified_access_endpoint_ids: ChildIds = child_ids("VerifiedAccessEndpoint")  # tracks VerifiedAccessEndpoint children
+    verified_access_group_ids: ChildIds = child_ids("VerifiedAccessGroup")  # tracks VerifiedAccessGroup children
 
 
     def to_dict(self) -> Dict[str, Any]:
@@ -1,13 +1,15 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +35,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class Volume:
     attachment_set: List[Any] = field(default_factory=list)
     availability_zone: str = ""
@@ -58,7 +60,7 @@ class Volume:
     volume_type: str = ""
 
     # Internal dependency tracking — not in API response
-    snapshot_ids: List[str] = field(default_factory=list)  # tracks Snapshot children
+    snapshot_ids: ChildIds = child_ids("Snapshot")  # tracks Snapshot children
 
     auto_enable_io: bool = True
     product_codes: List[Dict[str, Any]] = field(default_factory=list)
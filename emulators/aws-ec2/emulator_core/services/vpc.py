@@ -1,13 +1,16 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids, dependency_violation, subtree
+from ..ipalloc import vpc_cidr_index
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +36,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class Vpc:
     block_public_access_states: Dict[str, Any] = field(default_factory=dict)
     cidr_block: str = ""
@@ -48,24 +51,28 @@ class Vpc:
     vpc_id: str = ""
 
     # Internal dependency tracking — not in API response
-    carrier_gateway_ids: List[str] = field(default_factory=list)  # tracks CarrierGateway children
-    client_vpn_endpoint_ids: List[str] = field(default_factory=list)  # tracks ClientVpnEndpoint children
-    ec2_instance_connect_endpoint_ids: List[str] = field(default_factory=list)  # tracks Ec2InstanceConnectEndpoint children
-    instance_ids: List[str] = field(default_factory=list)  # tracks Instance children
-    nat_gateway_ids: List[str] = field(default_factory=list)  # tracks NatGateway children
-    network_acl_ids: List[str] = field(default_factory=list)  # tracks NetworkACL children
-    security_group_ids: List[str] = field(default_factory=list)  # tracks SecurityGroup children
-    subnet_ids: List[str] = field(default_factory=list)  # tracks Subnet children
-    target_network_ids: List[str] = field(default_factory=list)  # tracks TargetNetwork children
-    vpc_endpoint_ids: List[str] = field(default_factory=list)  # tracks VpcEndpoint children
-    route_table_ids: List[str] = field(default_factory=list)  # tracks RouteTable children
-    internet_gateway_ids: List[str] = field(default_factory=list)  # tracks InternetGateway children
-    vpc_network_interface_ids: List[str] = field(default_factory=list)  # tracks ElasticNetworkInterface children
+    carrier_gateway_ids: ChildIds = child_ids("CarrierGateway")  # tracks CarrierGateway children
+    client_vpn_endpoint_ids: ChildIds = child_ids("ClientVpnEndpoint")  # tracks ClientVpnEndpoint children
+    ec2_instance_connect_endpoint_ids: ChildIds = child_ids("Ec2InstanceConnectEndpoint")  # tracks Ec2InstanceConnectEndpoint children
+    instance_ids: ChildIds = child_ids("Instance")  # tracks Instance children
+    nat_gateway_ids: ChildIds = child_ids("NatGateway")  # tracks NatGateway children
+    network_acl_ids: ChildIds = child_ids("NetworkACL")  # tracks NetworkACL children
+    security_group_ids: ChildIds = child_ids("SecurityGroup")  # tracks SecurityGroup children
+    subnet_ids: ChildIds = child_ids("Subnet")  # tracks Subnet children
+    target_network_ids: ChildIds = child_ids("TargetNetwork")  # tracks TargetNetwork children
+    vpc_endpoint_ids: ChildIds = child_ids("VpcEndpoint")  # tracks VpcEndpoint children
+    route_table_ids: ChildIds = child_ids("RouteTable")  # tracks RouteTable children
+    internet_gateway_ids: ChildIds = child_ids("InternetGateway")  # tracks InternetGateway children
+    vpc_network_interface_ids: ChildIds = child_ids("ElasticNetworkInterface")  # tracks ElasticNetworkInterface children
 
     enable_dns_support: bool = True
     enable_dns_hostnames: bool = False
     enable_network_address_usage_metrics: bool = False
 
+    # Internal CIDR index of VPC blocks and subnets — not in API response
+    ipv4_cidr_index: Optional[Any] = None
+    ipv6_cidr_index: Optional[Any] = None
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "blockPublicAccessStates": self.block_public_access_states,
@@ -81,6 +88,23 @@ class Vpc:
             "vpcId": self.vpc_id,
         }
 
+# Dependent kinds DeleteVpcCascade knows how to tear down, with the EC2
+# resource type reported for each
+_CASCADE_RESOURCE_TYPES = {
+    "CarrierGateway": "carrier-gateway",
+    "Ec2InstanceConnectEndpoint": "instance-connect-endpoint",
+    "ElasticIpAddresse": "elastic-ip",
+    "ElasticNetworkInterface": "network-interface",
+    "Instance": "instance",
+    "InternetGateway": "internet-gateway",
+    "NatGateway": "natgateway",
+    "NetworkACL": "network-acl",
+    "RouteTable": "route-table",
+    "SecurityGroup": "security-group",
+    "Subnet": "subnet",
+    "VpcEndpoint": "vpc-endpoint",
+}
+
 class Vpc_Backend:
     def __init__(self):
         self.state = EC2State.get()
@@ -112,6 +136,19 @@ class Vpc_Backend:
                 tags.append({"Key": key, "Value": tag.get("Value")})
         return tags
 
+    def _add_vpc_cidr(self, vpc: Vpc, cidr_block: str, version: int) -> Optional[Dict[str, Any]]:
+        """Add a CIDR block to the VPC's index, rejecting malformed or overlapping blocks."""
+        try:
+            added = vpc_cidr_index(vpc, self.state.subnets, version).add(cidr_block)
+        except ValueError:
+            return create_error_response("InvalidParameterValue", f"Value ({cidr_block}) for parameter cidrBlock is invalid.")
+        if not added:
+            return create_error_response(
+                "InvalidVpc.Range",
+                f"The CIDR '{cidr_block}' overlaps with a CIDR block already associated with VPC '{vpc.vpc_id}'.",
+            )
+        return None
+
     def _build_cidr_association(self, association_id: str, cidr_block: str) -> Dict[str, Any]:
         return {
             "associationId": association_id,
@@ -174,6 +211,9 @@ class Vpc_Backend:
             if not cidr_block:
                 netmask = params.get("Ipv4NetmaskLength") or 16
                 cidr_block = f"10.0.0.0/{netmask}"
+            error = self._add_vpc_cidr(vpc, cidr_block, 4)
+            if error:
+                return error
             cidr_assoc = self._build_cidr_association(self._generate_id("vpc-cidr-assoc"), cidr_block)
             vpc.cidr_block_association_set.append(cidr_assoc)
 
@@ -183,7 +223,13 @@ class Vpc_Backend:
         if ipv6_cidr_block or params.get("Ipv6Pool") or params.get("Ipv6IpamPoolId"):
             if not ipv6_cidr_block:
                 netmask = params.get("Ipv6NetmaskLength") or 56
-                ipv6_cidr_block = f"2001:db8:0:1::{netmask}"
+                ipv6_cidr_block = f"2001:db8:0:1::/{netmask}"
+            error = self._add_vpc_cidr(vpc, ipv6_cidr_block, 6)
+            if error:
+                if cidr_assoc:
+                    vpc.cidr_block_association_set.remove(cidr_assoc)
+                    vpc_cidr_index(vpc, self.state.subnets, 4).remove(cidr_block)
+                return error
             ipv6_assoc = self._build_ipv6_association(
                 self._generate_id("vpc-cidr-assoc"),
                 ipv6_cidr_block,
@@ -333,33 +379,9 @@ class Vpc_Backend:
         vpc = self.resources.get(vpc_id)
         if not vpc:
             return create_error_response("InvalidVpcID.NotFound", f"The ID '{vpc_id}' does not exist")
-
-        if getattr(vpc, 'carrier_gateway_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent CarrierGateway(s) and cannot be deleted.')
-        if getattr(vpc, 'client_vpn_endpoint_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent ClientVpnEndpoint(s) and cannot be deleted.')
-        if getattr(vpc, 'ec2_instance_connect_endpoint_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent Ec2InstanceConnectEndpoint(s) and cannot be deleted.')
-        if getattr(vpc, 'instance_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent Instance(s) and cannot be deleted.')
-        if getattr(vpc, 'nat_gateway_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent NatGateway(s) and cannot be deleted.')
-        if getattr(vpc, 'network_acl_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent NetworkACL(s) and cannot be deleted.')
-        if getattr(vpc, 'security_group_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent SecurityGroup(s) and cannot be deleted.')
-        if getattr(vpc, 'subnet_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent Subnet(s) and cannot be deleted.')
-        if getattr(vpc, 'target_network_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent TargetNetwork(s) and cannot be deleted.')
-        if getattr(vpc, 'vpc_endpoint_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent VpcEndpoint(s) and cannot be deleted.')
-        if getattr(vpc, 'route_table_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent RouteTable(s) and cannot be deleted.')
-        if getattr(vpc, 'internet_gateway_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent InternetGateway(s) and cannot be deleted.')
-        if getattr(vpc, 'vpc_network_interface_ids', []):
-            return create_error_response('DependencyViolation', 'Vpc has dependent ElasticNetworkInterface(s) and cannot be deleted.')
+        dependency_error = dependency_violation(vpc, "Vpc")
+        if dependency_error:
+            return dependency_error
 
         parent = self.state.dhcp_options.get(vpc.dhcp_options_id)
         if parent and hasattr(parent, 'vpc_ids') and vpc_id in parent.vpc_ids:
@@ -371,6 +393,259 @@ class Vpc_Backend:
             'return': True,
             }
 
+    def DeleteVpcCascade(self, params: Dict[str, Any]):
+        """Emulator extension, not part of the EC2 API. Deletes a VPC together with everything that depends on it:
+         route tables, NAT gateways, instances, endpoints, network interfaces, subnets, network ACLs and security
+         groups are deleted, Elastic IP addresses are disassociated and internet gateways detached. Every step goes
+         through the regular action for that resource; the teardown stops at the first step that fails, and its
+         error then lists what was already removed (also returned as its resourceSet)."""
+
+        vpc_id = params.get("VpcId")
+        if not vpc_id:
+            return create_error_response("MissingParameter", "Missing required parameter: VpcId")
+
+        vpc = self.resources.get(vpc_id)
+        if not vpc:
+            return create_error_response("InvalidVpcID.NotFound", f"The ID '{vpc_id}' does not exist")
+
+        plan = subtree(self.state, vpc)
+        for kind in plan:
+            if kind not in _CASCADE_RESOURCE_TYPES:
+                return create_error_response(
+                    "DependencyViolation",
+                    f"Vpc has dependent {kind}(s) that cannot be deleted in a cascade.",
+                )
+
+        removed: List[Dict[str, str]] = []
+        error = self._cascade_teardown(removed, vpc_id, plan)
+        if error:
+            return self._cascade_failed(error, removed)
+
+        return {
+            'resourceSet': removed,
+            'return': True,
+            }
+
+    def _cascade_teardown(self, removed: List[Dict[str, str]], vpc_id: str, plan: Dict[str, List[str]]):
+        """The steps of DeleteVpcCascade, in order; returns the error of the first one that fails."""
+        from .carriergateway import CarrierGateway_Backend
+        from .ec2instanceconnectendpoint import Ec2InstanceConnectEndpoint_Backend
+        from .elasticipaddresse import ElasticIpAddresse_Backend
+        from .elasticnetworkinterface import ElasticNetworkInterface_Backend
+        from .instance import Instance_Backend
+        from .internetgateway import InternetGateway_Backend
+        from .natgateway import NatGateway_Backend
+        from .networkacl import NetworkACL_Backend
+        from .routetable import RouteTable_Backend
+        from .securitygroup import SecurityGroup_Backend
+        from .subnet import Subnet_Backend
+        from .vpcendpoint import VpcEndpoint_Backend
+
+        route_tables = RouteTable_Backend()
+        for route_table_id in plan.get("RouteTable", []):
+            route_table = route_tables.resources.get(route_table_id)
+            if not route_table:
+                continue
+            main_associations = []
+            for association in list(route_table.association_set):
+                if association.get("main"):
+                    # The main association goes with the VPC; DisassociateRouteTable refuses it
+                    main_associations.append(association)
+                    continue
+                error = self._cascade_step(removed, route_tables, "DisassociateRouteTable",
+                                           {"AssociationId": association.get("routeTableAssociationId")})
+                if error:
+                    return error
+            # DeleteRouteTable refuses the main route table: unmark it just for that step
+            was_main = route_table.is_main
+            for association in main_associations:
+                route_table.association_index.pop(association.get("routeTableAssociationId"), None)
+                route_table.association_set.remove(association)
+            route_table.is_main = False
+            error = self._cascade_step(removed, route_tables, "DeleteRouteTable", {"RouteTableId": route_table_id},
+                                       "RouteTable", route_table_id)
+            if error:
+                route_table.is_main = was_main
+                route_table.association_set[:0] = main_associations
+                for association in main_associations:
+                    route_table.association_index[association.get("routeTableAssociationId")] = association
+                return error
+
+        addresses = ElasticIpAddresse_Backend()
+        for allocation_id in plan.get("ElasticIpAddresse", []):
+            address = addresses.resources.get(allocation_id)
+            if not address or not address.association_id:
+                continue
+            error = self._cascade_step(removed, addresses, "DisassociateAddress", {"AssociationId": address.association_id},
+                                       "ElasticIpAddresse", allocation_id, "disassociated")
+            if error:
+                return error
+
+        nat_gateways = NatGateway_Backend()
+        for nat_gateway_id in plan.get("NatGateway", []):
+            error = self._cascade_step(removed, nat_gateways, "DeleteNatGateway", {"NatGatewayId": nat_gateway_id},
+                                       "NatGateway", nat_gateway_id)
+            if error:
+                return error
+
+        instances = Instance_Backend()
+        for instance_id in plan.get("Instance", []):
+            if instance_id not in instances.resources:
+                continue
+            error = self._cascade_step(removed, instances, "TerminateInstances", {"InstanceId.N": [instance_id]},
+                                       "Instance", instance_id)
+            if error:
+                return error
+
+        endpoint_steps = [
+            (VpcEndpoint_Backend(), "DeleteVpcEndpoints", "VpcEndpoint",
+             lambda resource_id: {"VpcEndpointId.N": [resource_id]}),
+            (Ec2InstanceConnectEndpoint_Backend(), "DeleteInstanceConnectEndpoint", "Ec2InstanceConnectEndpoint",
+             lambda resource_id: {"InstanceConnectEndpointId": resource_id}),
+            (CarrierGateway_Backend(), "DeleteCarrierGateway", "CarrierGateway",
+             lambda resource_id: {"CarrierGatewayId": resource_id}),
+        ]
+        for backend, action, kind, build_params in endpoint_steps:
+            for resource_id in plan.get(kind, []):
+                error = self._cascade_step(removed, backend, action, build_params(resource_id), kind, resource_id)
+                if error:
+                    return error
+
+        network_interfaces = ElasticNetworkInterface_Backend()
+        for network_interface_id in plan.get("ElasticNetworkInterface", []):
+            network_interface = network_interfaces.resources.get(network_interface_id)
+            if not network_interface:
+                continue
+            attachment = network_interface.attachment if isinstance(network_interface.attachment, dict) else {}
+            attachment_id = network_interface.attachment_id or attachment.get("attachmentId")
+            if attachment_id:
+                error = self._cascade_step(removed, network_interfaces, "DetachNetworkInterface", {"AttachmentId": attachment_id})
+                if error:
+                    return error
+            error = self._cascade_step(removed, network_interfaces, "DeleteNetworkInterface",
+                                       {"NetworkInterfaceId": network_interface_id},
+                                       "ElasticNetworkInterface", network_interface_id)
+            if error:
+                return error
+
+        subnets = Subnet_Backend()
+        for subnet_id in plan.get("Subnet", []):
+            error = self._cascade_step(removed, subnets, "DeleteSubnet", {"SubnetId": subnet_id}, "Subnet", subnet_id)
+            if error:
+                return error
+
+        network_acls = NetworkACL_Backend()
+        for network_acl_id in plan.get("NetworkACL", []):
+            network_acl = network_acls.resources.get(network_acl_id)
+            if not network_acl:
+                continue
+            # Subnet associations and the default flag go with the VPC
+            network_acl.association_set = []
+            network_acl.default = False
+            error = self._cascade_step(removed, network_acls, "DeleteNetworkAcl", {"NetworkAclId": network_acl_id},
+                                       "NetworkACL", network_acl_id)
+            if error:
+                return error
+
+        error = self._cascade_security_groups(removed, SecurityGroup_Backend(), vpc_id, plan.get("SecurityGroup", []))
+        if error:
+            return error
+
+        internet_gateways = InternetGateway_Backend()
+        for gateway_id in plan.get("InternetGateway", []):
+            gateway = internet_gateways.resources.get(gateway_id)
+            if not gateway:
+                continue
+            if gateway.is_egress_only:
+                error = self._cascade_step(removed, internet_gateways, "DeleteEgressOnlyInternetGateway",
+                                           {"EgressOnlyInternetGatewayId": gateway_id},
+                                           "InternetGateway", gateway_id)
+            else:
+                error = self._cascade_step(removed, internet_gateways, "DetachInternetGateway",
+                                           {"InternetGatewayId": gateway_id, "VpcId": vpc_id},
+                                           "InternetGateway", gateway_id, "detached")
+            if error:
+                return error
+
+        result = self.DeleteVpc({"VpcId": vpc_id})
+        if is_error_response(result):
+            return result
+        removed.append({"resourceId": vpc_id, "resourceType": "vpc", "operation": "deleted"})
+        return None
+
+    @staticmethod
+    def _cascade_failed(error: Dict[str, Any], removed: List[Dict[str, str]]):
+        """The error of the step DeleteVpcCascade stopped at, naming what it had removed before that step."""
+        if not removed:
+            return error
+        done = ", ".join(f"{item['resourceType']} {item['resourceId']} ({item['operation']})" for item in removed)
+        failed = create_error_response(
+            error["Error"].get("Code", "InternalError"),
+            f"{error['Error'].get('Message', '')} The cascade stopped there; already removed: {done}.",
+        )
+        failed["resourceSet"] = removed
+        return failed
+
+    def _cascade_step(self, removed: List[Dict[str, str]], backend: Any, action: str, action_params: Dict[str, Any],
+                      kind: Optional[str] = None, resource_id: Optional[str] = None, operation: str = "deleted"):
+        """Run one teardown action of DeleteVpcCascade; records ``resource_id`` in ``removed`` on success."""
+        result = getattr(backend, action)(action_params)
+        if is_error_response(result):
+            return result
+        self.state.note_write(backend.resources)
+        if kind:
+            removed.append({
+                "resourceId": resource_id,
+                "resourceType": _CASCADE_RESOURCE_TYPES[kind],
+                "operation": operation,
+            })
+        return None
+
+    def _cascade_security_groups(self, removed: List[Dict[str, str]], groups: Any, vpc_id: str, group_ids: List[str]):
+        """
+        Security group part of DeleteVpcCascade. Groups from other VPCs are only
+        disassociated from this one. Rules referencing a group that is about to
+        go are revoked first, since DeleteSecurityGroup refuses referenced groups.
+        """
+        owned = [group_id for group_id in group_ids
+                 if group_id in groups.resources and groups.resources[group_id].vpc_id == vpc_id]
+        doomed = set(owned)
+
+        for group_id in group_ids:
+            group = groups.resources.get(group_id)
+            if group and group_id not in doomed:
+                error = self._cascade_step(removed, groups, "DisassociateSecurityGroupVpc",
+                                           {"GroupId": group_id, "VpcId": vpc_id},
+                                           "SecurityGroup", group_id, "disassociated")
+                if error:
+                    return error
+
+        for group_id in owned:
+            group = groups.resources[group_id]
+            for egress, action in ((False, "RevokeSecurityGroupIngress"), (True, "RevokeSecurityGroupEgress")):
+                rule_ids = [
+                    rule_id for rule_id, rule in group.security_group_rules.items()
+                    if bool(rule.get("isEgress")) == egress
+                    and (rule.get("referencedGroupInfo") or {}).get("groupId") in doomed
+                ]
+                if rule_ids:
+                    error = self._cascade_step(removed, groups, action, {"GroupId": group_id, "SecurityGroupRuleId.N": rule_ids})
+                    if error:
+                        return error
+
+        for group_id in owned:
+            group = groups.resources[group_id]
+            for other_vpc_id in [item for item in group.associated_vpc_ids if item != vpc_id]:
+                error = self._cascade_step(removed, groups, "DisassociateSecurityGroupVpc",
+                                           {"GroupId": group_id, "VpcId": other_vpc_id})
+                if error:
+                    return error
+            error = self._cascade_step(removed, groups, "DeleteSecurityGroup", {"GroupId": group_id},
+                                       "SecurityGroup", group_id)
+            if error:
+                return error
+        return None
+
     def DescribeVpcAttribute(self, params: Dict[str, Any]):
         """Describes the specified attribute of the specified VPC. You can specify only one attribute at a time."""
 
@@ -472,6 +747,22 @@ class Vpc_Backend:
         if not target_vpc or (not cidr_assoc and not ipv6_assoc):
             return create_error_response("InvalidAssociationID.NotFound", f"The ID '{association_id}' does not exist")
 
+        if cidr_assoc:
+            cidr, version = cidr_assoc.get("cidrBlock") or "", 4
+        else:
+            cidr, version = ipv6_assoc.get("ipv6CidrBlock") or "", 6
+        if cidr:
+            cidr_index = vpc_cidr_index(target_vpc, self.state.subnets, version)
+            try:
+                if cidr_index.locate(cidr) == "conflict":
+                    return create_error_response(
+                        "DependencyViolation",
+                        f"The CIDR block '{cidr}' has dependent subnet(s) and cannot be disassociated.",
+                    )
+                cidr_index.remove(cidr)
+            except ValueError:
+                pass
+
         if cidr_assoc:
             state = cidr_assoc.get("cidrBlockState") or {}
             state["state"] = "disassociated"
@@ -621,6 +912,12 @@ class vpc_RequestParser:
             "VpcId": get_scalar(md, "VpcId"),
         }
 
+    @staticmethod
+    def parse_delete_vpc_cascade_request(md: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "VpcId": get_scalar(md, "VpcId"),
+        }
+
     @staticmethod
     def parse_describe_vpc_attribute_request(md: Dict[str, Any]) -> Dict[str, Any]:
         return {
@@ -669,6 +966,7 @@ class vpc_RequestParser:
             "CreateDefaultVpc": vpc_RequestParser.parse_create_default_vpc_request,
             "CreateVpc": vpc_RequestParser.parse_create_vpc_request,
             "DeleteVpc": vpc_RequestParser.parse_delete_vpc_request,
+            "DeleteVpcCascade": vpc_RequestParser.parse_delete_vpc_cascade_request,
             "DescribeVpcAttribute": vpc_RequestParser.parse_describe_vpc_attribute_request,
             "DescribeVpcs": vpc_RequestParser.parse_describe_vpcs_request,
             "DisassociateVpcCidrBlock": vpc_RequestParser.parse_disassociate_vpc_cidr_block_request,
@@ -846,6 +1144,21 @@ class vpc_ResponseSerializer:
         xml_parts.append(f'</DeleteVpcResponse>')
         return "\n".join(xml_parts)
 
+    @staticmethod
+    def serialize_delete_vpc_cascade_response(data: Dict[str, Any], request_id: str) -> str:
+        xml_parts = []
+        xml_parts.append(f'<DeleteVpcCascadeResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">')
+        xml_parts.append(f'    <requestId>{esc(request_id)}</requestId>')
+        xml_parts.append(f'    <resourceSet>')
+        for item in data.get("resourceSet") or []:
+            xml_parts.append(f'        <item>')
+            xml_parts.extend(vpc_ResponseSerializer._serialize_dict_to_xml(item, "item", 3))
+            xml_parts.append(f'        </item>')
+        xml_parts.append(f'    </resourceSet>')
+        xml_parts.append(f'    <return>{str(bool(data.get("return"))).lower()}</return>')
+        xml_parts.append(f'</DeleteVpcCascadeResponse>')
+        return "\n".join(xml_parts)
+
     @staticmethod
     def serialize_describe_vpc_attribute_response(data: Dict[str, Any], request_id: str) -> str:
         xml_parts = []
@@ -1039,6 +1352,7 @@ class vpc_ResponseSerializer:
             "CreateDefaultVpc": vpc_ResponseSerializer.serialize_create_default_vpc_response,
             "CreateVpc": vpc_ResponseSerializer.serialize_create_vpc_response,
             "DeleteVpc": vpc_ResponseSerializer.serialize_delete_vpc_response,
+            "DeleteVpcCascade": vpc_ResponseSerializer.serialize_delete_vpc_cascade_response,
             "DescribeVpcAttribute": vpc_ResponseSerializer.serialize_describe_vpc_attribute_response,
             "DescribeVpcs": vpc_ResponseSerializer.serialize_describe_vpcs_response,
             "DisassociateVpcCidrBlock": vpc_ResponseSerializer.serialize_disassociate_vpc_cidr_block_response,
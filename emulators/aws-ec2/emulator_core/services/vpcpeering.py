@@ -1,13 +1,16 @@
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field, asdict
+from dataclasses import field, asdict
 from enum import Enum
 import uuid
 import re
 from ..utils import (get_scalar, get_int, get_indexed_list, parse_filters, apply_filters,
                     parse_tags, str2bool, esc, create_error_response,
                     is_error_response, serialize_error_response)
+from ..models import resource_model
 from ..state import EC2State
+from ..depgraph import ChildIds, child_ids
+from ..sgreferences import note_peering
 
 class ResourceState(Enum):
     PENDING = 'pending'
@@ -33,7 +36,7 @@ class ErrorCode(Enum):
     INVALID_STATE_TRANSITION = 'InvalidStateTransition'
     DEPENDENCY_VIOLATION = 'DependencyViolation'
 
-@dataclass
+@resource_model
 class VpcPeering:
     accepter_vpc_info: Dict[str, Any] = field(default_factory=dict)
     expiration_time: str = ""
@@ -43,7 +46,7 @@ class VpcPeering:
     vpc_peering_connection_id: str = ""
 
     # Internal dependency tracking — not in API response
-    route_table_ids: List[str] = field(default_factory=list)  # tracks RouteTable children
+    route_table_ids: ChildIds = child_ids("RouteTable")  # tracks RouteTable children
 
 
     def to_dict(self) -> Dict[str, Any]:
@@ -102,6 +105,7 @@ class VpcPeering_Backend:
             "code": "active",
             "message": "Active",
         }
+        note_peering(self.state, resource, True)
 
         return {
             'vpcPeeringConnection': resource.to_dict(),
@@ -222,6 +226,7 @@ class VpcPeering_Backend:
             )
 
         self.resources.pop(vpc_peering_connection_id, None)
+        note_peering(self.state, resource, False)
 
         return {
             'return': True,
@@ -0,0 +1,138 @@
+"""
+Reverse index of security group rules that reference other security groups.
+
+Rules can reference a group in their own VPC, in a peered VPC, or one that
+no longer exists. DescribeSecurityGroupReferences, DescribeStaleSecurityGroups
+and the DeleteSecurityGroup dependency check all ask "who references this
+group" or "which of this VPC's references point elsewhere". The index
+answers both directly instead of scanning every group's rules. It also keeps
+the set of active VPC peerings, which decides whether a cross-VPC reference
+is still valid.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class SecurityGroupReferences:
+    """
+    Referencing rules keyed by the group they reference and, for rules that
+    point outside their own VPC, by the referencing VPC.
+
+    Rules are added and discarded one at a time by the security group backend;
+    peerings are switched on and off by the VPC peering backend.
+
+    Example:
+        refs = security_group_references(state)
+        for rule_id, group_id in refs.referencing("sg-123").items(): ...
+    """
+
+    def __init__(self) -> None:
+        self._rules: Dict[str, Tuple[str, str, str]] = {}  # rule ID -> (group ID, referenced group ID, VPC ID)
+        self._by_referenced: Dict[str, Dict[str, str]] = {}  # referenced group ID -> {rule ID: group ID}
+        self._cross_vpc: Dict[str, Dict[str, str]] = {}  # referencing VPC ID -> {rule ID: group ID}
+        self._peers: Dict[str, Dict[str, str]] = {}  # VPC ID -> {peer VPC ID: peering connection ID}
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def add_rule(self, group: Any, rule: Dict[str, Any], groups: Dict[str, Any]) -> None:
+        """Index ``rule`` of ``group`` if it references a group, replacing any earlier version of it."""
+        rule_id = rule.get("securityGroupRuleId")
+        if not rule_id:
+            return
+        self.discard_rule(rule_id)
+        referenced = (rule.get("referencedGroupInfo") or {}).get("groupId")
+        if not referenced:
+            return
+        vpc_id = getattr(group, "vpc_id", "") or ""
+        self._rules[rule_id] = (group.group_id, referenced, vpc_id)
+        self._by_referenced.setdefault(referenced, {})[rule_id] = group.group_id
+        target = groups.get(referenced)
+        if target is None or (getattr(target, "vpc_id", "") or "") != vpc_id:
+            self._cross_vpc.setdefault(vpc_id, {})[rule_id] = group.group_id
+
+    def discard_rule(self, rule_id: str) -> None:
+        entry = self._rules.pop(rule_id, None)
+        if entry is None:
+            return
+        _, referenced, vpc_id = entry
+        _pop(self._by_referenced, referenced, rule_id)
+        _pop(self._cross_vpc, vpc_id, rule_id)
+
+    def discard_group(self, group: Any) -> None:
+        """Drop the rules ``group`` owns; rules referencing it stay (they are now stale)."""
+        for rule_id in getattr(group, "security_group_rules", {}) or {}:
+            self.discard_rule(rule_id)
+
+    def referencing(self, group_id: str) -> Dict[str, str]:
+        """{rule ID: referencing group ID} for every rule that references ``group_id``."""
+        return self._by_referenced.get(group_id, {})
+
+    def cross_vpc(self, vpc_id: str) -> Dict[str, str]:
+        """{rule ID: group ID} for rules in ``vpc_id`` whose referenced group is elsewhere or gone."""
+        return self._cross_vpc.get(vpc_id, {})
+
+    def referenced_group(self, rule_id: str) -> Optional[str]:
+        entry = self._rules.get(rule_id)
+        return entry[1] if entry else None
+
+    def set_peering(self, peering_id: str, vpc_id: str, peer_vpc_id: str, active: bool) -> None:
+        for one, other in ((vpc_id, peer_vpc_id), (peer_vpc_id, vpc_id)):
+            if not one or not other:
+                continue
+            if active:
+                self._peers.setdefault(one, {})[other] = peering_id
+            elif self._peers.get(one, {}).get(other) == peering_id:
+                _pop(self._peers, one, other)
+
+    def peering(self, vpc_id: str, peer_vpc_id: str) -> Optional[str]:
+        """ID of an active peering connection between the two VPCs, if any."""
+        return self._peers.get(vpc_id, {}).get(peer_vpc_id)
+
+    def stale_rules(self, vpc_id: str, groups: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+        """(group ID, rule ID) of rules in ``vpc_id`` referencing a deleted or no longer peered group."""
+        for rule_id, group_id in list(self.cross_vpc(vpc_id).items()):
+            target = groups.get(self._rules[rule_id][1])
+            if target is None:
+                yield group_id, rule_id
+                continue
+            target_vpc = getattr(target, "vpc_id", "") or ""
+            if target_vpc != vpc_id and self.peering(vpc_id, target_vpc) is None:
+                yield group_id, rule_id
+
+
+def _pop(index: Dict[str, Dict[str, str]], key: str, member: str) -> None:
+    members = index.get(key)
+    if members is None:
+        return
+    members.pop(member, None)
+    if not members:
+        del index[key]
+
+
+def _peering_vpcs(peering: Any) -> Tuple[str, str]:
+    requester = getattr(peering, "requester_vpc_info", None) or {}
+    accepter = getattr(peering, "accepter_vpc_info", None) or {}
+    return requester.get("vpcId", ""), accepter.get("vpcId", "")
+
+
+def security_group_references(state: Any) -> SecurityGroupReferences:
+    """The shared reference index, built from every group and peering on first use."""
+    index = getattr(state, "security_group_references", None)
+    if index is None:
+        index = SecurityGroupReferences()
+        for group in state.security_groups.values():
+            for rule in (getattr(group, "security_group_rules", None) or {}).values():
+                index.add_rule(group, rule, state.security_groups)
+        for peering_id, peering in state.vpc_peering.items():
+            if (getattr(peering, "status", None) or {}).get("code") == "active":
+                index.set_peering(peering_id, *_peering_vpcs(peering), True)
+        setattr(state, "security_group_references", index)
+    return index
+
+
+def note_peering(state: Any, peering: Any, active: bool) -> None:
+    """Tell the index (if built) that ``peering`` became active or stopped being active."""
+    index = getattr(state, "security_group_references", None)
+    if index is not None:
+        index.set_peering(peering.vpc_peering_connection_id, *_peering_vpcs(peering), active)
@@ -74,6 +74,7 @@ class EC2State:
         self.nitro_tpm: Dict[str, Any] = {}
         self.placement_groups: Dict[str, Any] = {}
         self.pools: Dict[str, Any] = {}
+        self.public_ipv4_address_pools: Dict[str, Any] = {}
         self.reachability_analyzer: Dict[str, Any] = {}
         self.regions_and_zones: Dict[str, Any] = {}
         self.reserved_instances: Dict[str, Any] = {}
@@ -118,3 +119,14 @@ class EC2State:
         self.vpn_concentrators: Dict[str, Any] = {}
         self.vpn_connections: Dict[str, Any] = {}
 
+        # Write counter per store name, bumped by the request dispatcher; caches
+        # derived from a store compare it to decide when to rebuild
+        self.store_versions: Dict[str, int] = {}
+
+    def note_write(self, store: Dict[str, Any]) -> None:
+        """Record that an action may have changed ``store`` (one of the dicts above)."""
+        for name, value in vars(self).items():
+            if value is store:
+                self.store_versions[name] = self.store_versions.get(name, 0) + 1
+                return
+
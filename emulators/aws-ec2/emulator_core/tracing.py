@@ -0,0 +1,174 @@
+"""
+Per-request trace spans, exported in batches to a local file (--trace).
+
+Each request becomes one trace: a root span named after its action, with
+its request ID, HTTP status, error code, response bytes and store size as
+attributes, and a child span per phase timed by its RequestTimer (route,
+parse, wait, backend, serialize) plus "write", which ends once the server
+has sent the response. The trace ID is the request ID, so traces line up
+with log lines and GET /_admin/requests.
+
+Requests only hand their timer to a queue; a background thread turns them
+into spans and appends them to the file in batches. The queue is bounded:
+past max_pending waiting requests, new ones are dropped (and counted)
+rather than slowing requests down or growing memory.
+
+Two formats:
+
+- jsonl: one span per line, {"traceId", "spanId", "parentSpanId", "name",
+  "startTimeUnixNano", "endTimeUnixNano", "attributes": {...}}.
+- otlp: one OTLP/JSON ExportTraceServiceRequest per batch and line, as the
+  OpenTelemetry collector's file exporter writes it (otelcol's otlpjsonfile
+  receiver and most trace viewers read it back).
+
+Example:
+    tracer = Tracer("/tmp/ec2.spans", "action", service="vera-aws-ec2")
+    timer = metrics.timer()
+    ...
+    tracer.trace(response, timer, entry.request_id, "DescribeVpcs", code=None)
+    tracer.close()  # writes what is still queued
+"""
+
+import collections
+import json
+import random
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+FORMATS = ("jsonl", "otlp")
+# Requests written per batch, and how long a partial batch may wait
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+# Requests waiting to be written by default; more are dropped
+DEFAULT_MAX_PENDING = 10000
+
+# (trace ID, start in Unix seconds, laps, root span name, attributes, failed)
+_Trace = Tuple[str, float, List[Tuple[str, float]], str, Dict[str, Any], bool]
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """
+    Exports the spans of traced requests to ``path`` (appending) in
+    ``fmt`` (see FORMATS), naming roots by the ``label`` (action or route)
+    passed to trace(). Raises ValueError for an unknown format and OSError
+    if the file cannot be opened.
+    """
+
+    def __init__(self, path: str, label: str, fmt: str = "jsonl", service: str = "vera",
+                 max_pending: int = DEFAULT_MAX_PENDING) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown trace format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        self.path = path
+        self.label = label
+        self.fmt = fmt
+        self.service = service
+        self.max_pending = max_pending
+        self.exported = 0
+        self.dropped = 0
+        self._handle = open(path, "a", encoding="utf-8")
+        self._pending: Deque[_Trace] = collections.deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="vera-span-exporter", daemon=True)
+        self._thread.start()
+
+    def trace(self, response: Any, timer: Any, request_id: str, name: str, code: Optional[str]) -> None:
+        """
+        Queue the trace of a request once ``response`` (a werkzeug Response)
+        is closed, i.e. written. ``code`` is its error code (None on success).
+        """
+        def written() -> None:
+            timer.lap("write")
+            attributes = {f"vera.{self.label}": name, "vera.request_id": request_id,
+                          "http.status_code": response.status_code,
+                          "vera.response_bytes": response.calculate_content_length() or 0}
+            if code is not None:
+                attributes["vera.error_code"] = code
+            if timer.attributes:
+                attributes.update(timer.attributes)
+            start = time.time() - (time.perf_counter() - timer.started)
+            self._queue((request_id.replace("-", ""), start, timer.laps, name, attributes, code is not None))
+
+        response.call_on_close(written)
+
+    def _queue(self, trace: _Trace) -> None:
+        pending = self._pending
+        if len(pending) >= self.max_pending or self._closed:
+            self.dropped += 1
+            return
+        pending.append(trace)
+        if len(pending) >= BATCH_SIZE:
+            self._wake.set()
+
+    def close(self) -> None:
+        """Write what is queued and stop exporting."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._handle.close()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            closed = self._closed
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < BATCH_SIZE:
+                    batch.append(self._pending.popleft())
+                self._write(batch)
+            if closed:
+                return
+
+    def _spans(self, trace: _Trace) -> List[Dict[str, Any]]:
+        """The spans of one trace, root first, as jsonl records."""
+        trace_id, start, laps, name, attributes, _ = trace
+        root_id = f"{random.getrandbits(64):016x}"
+        spans = []
+        at = start
+        for phase, seconds in laps:
+            spans.append({"traceId": trace_id, "spanId": f"{random.getrandbits(64):016x}",
+                          "parentSpanId": root_id, "name": phase,
+                          "startTimeUnixNano": int(at * 1e9), "endTimeUnixNano": int((at + seconds) * 1e9),
+                          "attributes": {}})
+            at += seconds
+        root = {"traceId": trace_id, "spanId": root_id, "parentSpanId": "", "name": name or "request",
+                "startTimeUnixNano": int(start * 1e9), "endTimeUnixNano": int(at * 1e9),
+                "attributes": attributes}
+        return [root] + spans
+
+    def _write(self, batch: List[_Trace]) -> None:
+        if self.fmt == "jsonl":
+            lines = [json.dumps(span, separators=(",", ":")) for trace in batch for span in self._spans(trace)]
+        else:
+            spans = []
+            for trace in batch:
+                for span in self._spans(trace):
+                    root = not span["parentSpanId"]
+                    span["kind"] = 2 if root else 1  # SERVER, INTERNAL
+                    span["startTimeUnixNano"] = str(span["startTimeUnixNano"])
+                    span["endTimeUnixNano"] = str(span["endTimeUnixNano"])
+                    span["attributes"] = [{"key": key, "value": _otlp_value(value)}
+                                          for key, value in span["attributes"].items()]
+                    span["status"] = {"code": 2 if root and trace[5] else 0}  # ERROR, UNSET
+                    spans.append(span)
+            lines = [json.dumps({"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service}}]},
+                "scopeSpans": [{"scope": {"name": "vera"}, "spans": spans}],
+            }]}, separators=(",", ":"))]
+        self._handle.write("\n".join(lines) + "\n")
+        self._handle.flush()
+        self.exported += len(batch)
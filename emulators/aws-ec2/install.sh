@@ -92,6 +92,14 @@ mkdir -p "$BIN_DIR"
 
 cat > "$BIN_DIR/awscli" << EOF
 #!/bin/bash
+# Through the warm CLI driver (tests/cli_driver.py) while one is running
+if [ -S "\${VERA_CLI_SOCKET:-$(pwd)/.venv/vera-awscli.sock}" ]; then
+    exec python3 -I -S "$(pwd)/tests/cli_driver.py" run --endpoint-url="$ENDPOINT" --profile vera "\$@"
+fi
+# To an emulator on a Unix socket (main.py --unix-socket), through a forwarder on a free port
+if [ -n "\$VERA_UNIX_SOCKET" ]; then
+    exec python3 "$(pwd)/tests/unix_forward.py" -- aws --endpoint-url={endpoint} --profile vera "\$@"
+fi
 exec aws --endpoint-url="$ENDPOINT" --profile vera "\$@"
 EOF
 chmod +x "$BIN_DIR/awscli"
@@ -118,6 +126,10 @@ provider "aws" {
 INNER
 fi
 
+# To an emulator on a Unix socket (main.py --unix-socket --no-tcp), forwarded from the endpoint's port
+if [ -n "\$VERA_UNIX_SOCKET" ]; then
+    exec python3 "$(pwd)/tests/unix_forward.py" --listen "${ENDPOINT#*://}" -- terraform "\$@"
+fi
 terraform "\$@"
 TEOF
 chmod +x "$BIN_DIR/terlocal"
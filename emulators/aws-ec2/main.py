@@ -1,6 +1,10 @@
 import os
+import re
 import sys
-import uuid
+import json
+import time
+import atexit
+import argparse
 import html
 import importlib
 import inspect
@@ -8,6 +12,7 @@ import traceback
 import logging
 from typing import Dict, Any, Tuple
 from flask import Flask, request, Response
+from werkzeug.datastructures import MultiDict
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +25,44 @@ ACTION_REGISTRY: Dict[str, Tuple[Any, Any, Any]] = {}
 
 # Populated by load_resources()
 _serialize_error_response = None
+_core_package = None
+
+# Default file for POST /_admin/checkpoint and /_admin/restore (--checkpoint)
+_checkpoint_path = None
+
+# Write-ahead journal of mutating requests (--journal), see open_journal()
+_journal = None
+
+# Copy-on-write forks of the state and the lock requests run under, see load_resources()
+_forks = None
+
+# Actions with these prefixes never change state...
+_READ_ONLY_PREFIXES = ("Describe", "Get", "List", "Search")
+
+# ...except these, which store what they return (a key generated on the first call)
+_WRITING_ACTIONS = frozenset({"GetInstanceTpmEkPub"})
+
+# Actions without such a prefix that never change state either
+_READ_ONLY_ACTIONS = frozenset({"CheckSecurityGroupConnection"})
+
+# emulator_core.models, whose to_dict() memos only last across Describe requests, see load_resources()
+_models = None
+
+# Request counts and per-phase latencies by action, see load_resources() and GET /_admin/metrics
+_metrics = None
+
+# Summary lines, opt-in payload logging and the last requests, see load_resources() and GET /_admin/requests
+_requests = None
+
+# cProfile, stack sampler and tracemalloc, driven by /_admin/profile, see load_resources()
+_profiler = None
+
+# Exports per-phase trace spans of every request (--trace)
+_tracer = None
+
+# Requests select a fork with this header, or by an access key mapped to it
+FORK_HEADER = "X-Vera-Fork"
+_CREDENTIAL_RE = re.compile(r"Credential=([^/,\s]+)")
 
 def esc(s):
     return html.escape(str(s), quote=True)
@@ -45,6 +88,9 @@ def load_resources(code_dir: str):
     package_name = os.path.basename(abs_path)
     logger.info(f"Loading resources from package: {package_name}")
 
+    global _core_package
+    _core_package = package_name
+
     try:
         module = importlib.import_module(package_name)
     except Exception as e:
@@ -183,56 +229,445 @@ def load_resources(code_dir: str):
 
     logger.info(f"Total actions registered: {len(ACTION_REGISTRY)}")
 
+    global _forks, _models, _metrics, _requests, _profiler
+    _models = importlib.import_module(f"{package_name}.models")
+    _metrics = importlib.import_module(f"{package_name}.metrics").Metrics("action")
+    _requests = importlib.import_module(f"{package_name}.requestlog").RequestLog(logger, "action")
+    _profiler = importlib.import_module(f"{package_name}.profiler").Profiler()
+    fork = importlib.import_module(f"{package_name}.fork")
+    _forks = fork.ForkRegistry(importlib.import_module(f"{package_name}.state").EC2State, _backends)
+
+def _access_key():
+    """The access key ID a request was signed with (SigV4 header or query, or SigV2), if any."""
+    match = _CREDENTIAL_RE.search(request.headers.get("Authorization", ""))
+    if match:
+        return match.group(1)
+    credential = request.values.get("X-Amz-Credential")
+    if credential:
+        return credential.split("/", 1)[0]
+    return request.values.get("AWSAccessKeyId")
+
+
+def _is_writing(action: str) -> bool:
+    """Whether ``action`` may change state: it is then journaled, and copies what it reads in a fork."""
+    if action in _WRITING_ACTIONS:
+        return True
+    return action not in _READ_ONLY_ACTIONS and not action.startswith(_READ_ONLY_PREFIXES)
+
 @app.route("/", methods=["GET", "POST"])
 def handle_request():
-    req_id = str(uuid.uuid4())
+    timer = _metrics.timer()
+    entry = _requests.begin()
+    response, action, code = _handle_request(timer, entry)
+    _metrics.record(action, timer.laps, code)
+    _requests.finish(entry, code)
+    if _tracer is not None:
+        _tracer.trace(response, timer, entry.request_id, entry.name, code)
+    return response
+
+def _handle_request(timer, entry):
+    """The response to the current request, the action it counts under and its error code (None on success)."""
+    req_id = entry.request_id
 
     action = request.values.get("Action")
+    entry.name = action or ""
     if not action:
-        return Response(error_xml("MissingParameter", "The parameter Action is missing", req_id), status=400, mimetype="text/xml")
+        return Response(error_xml("MissingParameter", "The parameter Action is missing", req_id), status=400, mimetype="text/xml"), "", "MissingParameter"
 
     handler = ACTION_REGISTRY.get(action)
     if not handler:
         logger.warning(f"Unknown action: {action}")
-        return Response(error_xml("InvalidAction", f"The action {action} is not valid for this endpoint", req_id), status=400, mimetype="text/xml")
+        # Not counted under the action itself: clients could make up any number of them
+        return Response(error_xml("InvalidAction", f"The action {action} is not valid for this endpoint", req_id), status=400, mimetype="text/xml"), "", "InvalidAction"
 
     backend, parser, serializer = handler
 
+    fork_id = request.headers.get(FORK_HEADER)
+    access_key = _access_key()
+    try:
+        # With --tenants, every access key gets its own state namespace
+        fork = _forks.resolve(fork_id, access_key, tenant=access_key)
+    except KeyError:
+        return Response(error_xml("InvalidParameterValue", f"Unknown emulator fork: {fork_id}", req_id), status=400, mimetype="text/xml"), action, "InvalidParameterValue"
+
+    timer.lap("route")
+
+    profiling = _profiler.begin(action)
     try:
         params = parser.parse_request(action, request.values)
-        logger.info(f"[{action}] Params: {params}")
+        entry.params = params
+        _requests.payload(entry, "Params", params)
+        timer.lap("parse")
 
         method = getattr(backend, action)
-        result = method(params)
+        writing = _is_writing(action)
+        with _forks.route(fork, writing), _models.memoizing(action.startswith("Describe")):
+            timer.lap("wait")
+            # Forks are scratch worlds and stay out of the journal
+            if _journal is not None and writing and fork is None:
+                # Also when it fails: a failed request may have changed something first
+                with _journal.mutation([action, list(request.values.items(multi=True))]):
+                    result = method(params)
+            else:
+                result = method(params)
+
+            state = getattr(backend, "state", None)
+            if state is not None and writing:
+                state.note_write(getattr(backend, "resources", None))
+            if _tracer is not None and isinstance(getattr(backend, "resources", None), dict):
+                timer.attributes = {"vera.store_resources": len(backend.resources)}
+            timer.lap("backend")
 
         # Normalize nextToken: None -> ""
         if isinstance(result, dict) and result.get("nextToken") is None:
             result["nextToken"] = ""
 
-        logger.info(f"[{action}] Result: {result}")
+        _requests.payload(entry, "Result", result)
 
         # Check if backend returned an error response
         if isinstance(result, dict) and "Error" in result:
+            err = result["Error"]
             if _serialize_error_response is not None:
                 xml_error = _serialize_error_response(result, req_id)
             else:
-                err = result["Error"]
                 xml_error = error_xml(err.get("Code", "InternalError"), err.get("Message", ""), req_id)
-            return Response(xml_error, status=400, mimetype="text/xml")
+            timer.lap("serialize")
+            return Response(xml_error, status=400, mimetype="text/xml"), action, err.get("Code", "InternalError")
 
         xml_response = serializer.serialize(action, result, req_id)
-        logger.info(f"[{action}] XML: {xml_response}")
+        _requests.payload(entry, "XML", xml_response)
+        timer.lap("serialize")
 
-        return Response(xml_response, mimetype="text/xml")
+        return Response(xml_response, mimetype="text/xml"), action, None
 
     except Exception as e:
         logger.error(f"Error handling {action}: {e}")
         traceback.print_exc()
         msg = str(e)
         code = msg if (" " not in msg and len(msg) < 50) else "InternalFailure"
-        return Response(error_xml(code, msg, req_id), status=400, mimetype="text/xml")
+        return Response(error_xml(code, msg, req_id), status=400, mimetype="text/xml"), action, code
+    finally:
+        if profiling:
+            _profiler.end()
+
+def _backends():
+    """Every distinct backend instance in the registry."""
+    return list({id(backend): backend for backend, _, _ in ACTION_REGISTRY.values()}.values())
+
+def save_checkpoint(path: str) -> Dict[str, Any]:
+    """Write the current state to a checkpoint file (see emulator_core/checkpoint.py)."""
+    checkpoint = importlib.import_module(f"{_core_package}.checkpoint")
+    state_cls = importlib.import_module(f"{_core_package}.state").EC2State
+    with _forks.route():
+        if _journal is None:
+            return checkpoint.write_checkpoint(state_cls.get(), path)
+        with _journal.lock:
+            return _journal_checkpoint(checkpoint, state_cls.get(), path)
+
+def restore_checkpoint(path: str) -> Dict[str, Any]:
+    """Replace the current state with the one saved in a checkpoint file."""
+    checkpoint = importlib.import_module(f"{_core_package}.checkpoint")
+    state_cls = importlib.import_module(f"{_core_package}.state").EC2State
+    if _journal is not None and not _checkpoint_path:
+        raise ValueError("Restoring a checkpoint while journaling needs a --checkpoint file to rebase the journal on")
+    state = checkpoint.read_checkpoint(path, state_cls)
+    with _forks.route():
+        if _journal is None:
+            checkpoint.install_state(state, _backends())
+        else:
+            # The journal only replays on top of --checkpoint, so that file has to hold the restored state
+            with _journal.lock:
+                checkpoint.install_state(state, _backends())
+                _journal_checkpoint(checkpoint, state, _checkpoint_path)
+    stores = [value for value in vars(state).values() if isinstance(value, checkpoint.LazyStore)]
+    return {"stores": len(stores), "resources": sum(len(store) for store in stores)}
+
+def _journal_checkpoint(checkpoint, state, path: str) -> Dict[str, Any]:
+    """Checkpoint ``state`` with the journal position it covers; drop the journal up to there if it is --checkpoint."""
+    summary = checkpoint.write_checkpoint(state, path, meta={"journal": _journal.position})
+    summary["journal"] = _journal.position
+    if _checkpoint_path and os.path.abspath(path) == os.path.abspath(_checkpoint_path):
+        summary["compacted_segments"] = _journal.compact(_journal.position)
+    return summary
+
+def _replay_request(record) -> None:
+    """Apply a journaled request again (see open_journal)."""
+    action, pairs = record
+    backend, parser, _ = ACTION_REGISTRY[action]
+    try:
+        with _models.memoizing(False):
+            getattr(backend, action)(parser.parse_request(action, MultiDict(pairs)))
+    except Exception as e:
+        # As it did when journaled; what it changed before raising stays
+        logger.warning(f"Replaying journaled {action} failed: {e}")
+    state = getattr(backend, "state", None)
+    if state is not None:
+        state.note_write(getattr(backend, "resources", None))
+
+def open_journal(directory: str, sync_interval: float, after: int = 0) -> None:
+    """
+    Journal mutating requests to ``directory`` from now on, first replaying
+    the records written after position ``after`` (that of the restored
+    checkpoint, 0 for the empty state). See emulator_core/journal.py.
+    """
+    global _journal
+    journal = importlib.import_module(f"{_core_package}.journal").Journal(directory, sync_interval)
+    if journal.truncated:
+        logger.warning(f"Journal {directory}: dropped a torn record ({journal.truncated} bytes) at the end")
+    start = time.perf_counter()
+    replayed = journal.replay(after, _replay_request)
+    logger.info(f"Replayed {replayed} journal records from {directory} in {time.perf_counter() - start:.3f}s")
+    atexit.register(journal.close)
+    _journal = journal
+
+def _checkpoint_request(action) -> Response:
+    path = request.values.get("path") or _checkpoint_path
+    if not path:
+        body = json.dumps({"error": "No checkpoint path given and no --checkpoint default set"})
+        return Response(body, status=400, mimetype="application/json")
+    start = time.perf_counter()
+    try:
+        summary = action(path)
+    except (OSError, ValueError) as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype="application/json")
+    summary.update(path=path, seconds=round(time.perf_counter() - start, 6))
+    logger.info(f"{action.__name__}({path}): {summary}")
+    return Response(json.dumps(summary), mimetype="application/json")
+
+@app.route("/_admin/checkpoint", methods=["POST"])
+def admin_checkpoint():
+    """Emulator extension: write the state to ``path`` (default: --checkpoint)."""
+    return _checkpoint_request(save_checkpoint)
+
+@app.route("/_admin/restore", methods=["POST"])
+def admin_restore():
+    """Emulator extension: replace the state with the checkpoint at ``path`` (default: --checkpoint)."""
+    return _checkpoint_request(restore_checkpoint)
+
+@app.route("/_admin/forks", methods=["POST"])
+def admin_create_fork():
+    """
+    Emulator extension: fork the state. Requests with an X-Vera-Fork: <forkId>
+    header, or signed with ``access_key`` if given, then run in the fork.
+    """
+    start = time.perf_counter()
+    try:
+        fork = _forks.create(request.values.get("name", ""), request.values.get("access_key", ""))
+    except ValueError as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype="application/json")
+    summary = fork.to_dict()
+    summary["seconds"] = round(time.perf_counter() - start, 6)
+    logger.info(f"Created fork {fork.fork_id} ({fork.name}) in {summary['seconds']}s")
+    return Response(json.dumps(summary), mimetype="application/json")
+
+@app.route("/_admin/forks", methods=["GET"])
+def admin_list_forks():
+    """Emulator extension: the live forks."""
+    return Response(json.dumps({"forks": [fork.to_dict() for fork in _forks.list()]}), mimetype="application/json")
+
+@app.route("/_admin/forks/<fork_id>", methods=["DELETE"])
+def admin_drop_fork(fork_id):
+    """Emulator extension: drop a fork and everything created in it."""
+    try:
+        fork = _forks.drop(fork_id)
+    except KeyError:
+        return Response(json.dumps({"error": f"Unknown fork: {fork_id}"}), status=404, mimetype="application/json")
+    logger.info(f"Dropped fork {fork_id} ({fork.name})")
+    return Response(json.dumps(fork.to_dict()), mimetype="application/json")
+
+@app.route("/_admin/requests", methods=["GET"])
+def admin_requests():
+    """
+    Emulator extension: the last requests (--request-buffer), newest first;
+    ``limit`` caps how many, ``action`` keeps those to one action.
+    """
+    try:
+        limit = int(request.values["limit"]) if "limit" in request.values else None
+    except ValueError:
+        return Response(json.dumps({"error": "limit must be an integer"}), status=400, mimetype="application/json")
+    entries = _requests.recent(limit, request.values.get("action"))
+    return Response(json.dumps({"requests": entries}), mimetype="application/json")
+
+_PROFILING_TOOLS = ("cprofile", "sampler", "tracemalloc")
+
+def _int_value(name, default):
+    value = request.values.get(name)
+    return default if value in (None, "") else int(value)
+
+def _profile_request(tool, action) -> Response:
+    """Run an /_admin/profile action for ``tool``; ValueError (misuse, bad numbers) becomes a 400."""
+    if tool not in _PROFILING_TOOLS:
+        return Response(json.dumps({"error": f"Unknown profiling tool: {tool}"}), status=404, mimetype="application/json")
+    try:
+        result = action()
+    except ValueError as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype="application/json")
+    if isinstance(result, Response):
+        return result
+    return Response(json.dumps(_profiler.status()), mimetype="application/json")
+
+@app.route("/_admin/profile", methods=["GET"])
+def admin_profile_status():
+    """Emulator extension: whether each profiling tool runs, and what it has collected."""
+    return Response(json.dumps(_profiler.status()), mimetype="application/json")
+
+@app.route("/_admin/profile/<tool>", methods=["POST"])
+def admin_profile_start(tool):
+    """
+    Emulator extension: start a profiling tool, dropping its earlier results.
+    cprofile profiles requests to ``action`` (default: all), sampler samples
+    every thread each ``interval`` seconds, tracemalloc keeps ``frames``
+    frames per allocation.
+    """
+    def start():
+        logger.info(f"Starting profiler {tool}")
+        if tool == "cprofile":
+            return _profiler.start_cprofile(request.values.get("action", ""))
+        if tool == "sampler":
+            return _profiler.start_sampler(float(request.values.get("interval") or 0.005))
+        return _profiler.start_tracemalloc(_int_value("frames", 16))
+
+    return _profile_request(tool, start)
+
+@app.route("/_admin/profile/<tool>", methods=["DELETE"])
+def admin_profile_stop(tool):
+    """Emulator extension: stop a profiling tool; its results stay downloadable."""
+    def stop():
+        logger.info(f"Stopping profiler {tool}")
+        getattr(_profiler, f"stop_{tool}")()
+
+    return _profile_request(tool, stop)
+
+@app.route("/_admin/profile/<tool>", methods=["GET"])
+def admin_profile_download(tool):
+    """
+    Emulator extension: the results of a profiling tool. cprofile: a pstats
+    file, or with format=text the top ``limit`` functions by ``sort``;
+    sampler: collapsed stacks for flamegraphs; tracemalloc: the top ``limit``
+    allocation sites, or with format=snapshot a tracemalloc.Snapshot dump.
+    """
+    def download():
+        fmt = request.values.get("format", "")
+        if tool == "cprofile" and fmt == "text":
+            text = _profiler.pstats_text(_int_value("limit", 50), request.values.get("sort", "cumulative"))
+            return Response(text, mimetype="text/plain")
+        if tool == "cprofile":
+            return Response(_profiler.pstats_data(), mimetype="application/octet-stream",
+                            headers={"Content-Disposition": "attachment; filename=emulator.pstats"})
+        if tool == "sampler":
+            return Response(_profiler.collapsed(), mimetype="text/plain",
+                            headers={"Content-Disposition": "attachment; filename=emulator.collapsed"})
+        if fmt == "snapshot":
+            return Response(_profiler.tracemalloc_data(), mimetype="application/octet-stream",
+                            headers={"Content-Disposition": "attachment; filename=emulator.tracemalloc"})
+        return Response(_profiler.tracemalloc_text(_int_value("limit", 50)), mimetype="text/plain")
+
+    return _profile_request(tool, download)
+
+@app.route("/_admin/metrics", methods=["GET"])
+def admin_metrics():
+    """Emulator extension: request and store metrics in the Prometheus text format (main state's stores)."""
+    state_cls = importlib.import_module(f"{_core_package}.state").EC2State
+    with _forks.route():
+        body = _metrics.render(state_cls.get())
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EC2 Emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5003)
+    parser.add_argument("--unix-socket", metavar="PATH",
+                        help="Also listen on this Unix socket (co-located clients skip TCP loopback)")
+    parser.add_argument("--no-tcp", action="store_true",
+                        help="Only listen on --unix-socket, not on --host/--port")
+    parser.add_argument("--server", action="store_true",
+                        help="Serve with waitress (thread pool, keep-alive, limits, graceful shutdown) instead "
+                             "of Flask's development server; needs the 'server' extra")
+    parser.add_argument("--threads", metavar="N", type=int, default=8,
+                        help="Worker threads of --server (one process: the state is shared in memory)")
+    parser.add_argument("--connection-limit", metavar="N", type=int, default=100,
+                        help="Open connections --server accepts at most")
+    parser.add_argument("--max-request-size", metavar="BYTES", type=int, default=16 * 1024 * 1024,
+                        help="Largest request body --server accepts (larger ones get a 413)")
+    parser.add_argument("--idle-timeout", metavar="SECONDS", type=float, default=120,
+                        help="How long --server keeps an idle keep-alive connection open")
+    parser.add_argument("--shutdown-timeout", metavar="SECONDS", type=float, default=10,
+                        help="How long --server lets requests in progress finish on SIGTERM/SIGINT")
+    parser.add_argument("--restore", metavar="PATH",
+                        help="Restore the state from this checkpoint file at startup")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="Default file for POST /_admin/checkpoint and /_admin/restore")
+    parser.add_argument("--journal", metavar="DIR",
+                        help="Journal mutating requests to this directory and replay it at startup "
+                             "(on top of --restore, or of --checkpoint if that file exists)")
+    parser.add_argument("--journal-sync", metavar="SECONDS", type=float, default=0.05,
+                        help="How often journaled requests are fsynced (0: before each response)")
+    parser.add_argument("--tenants", metavar="N", type=int, default=0,
+                        help="Give each access key its own state, keeping at most N (least recently used "
+                             "are dropped; 0: one shared state)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Level of the emulator's own and the HTTP server's log lines")
+    parser.add_argument("--log-payloads", action="store_true",
+                        help="Also log (truncated) params, results and XML responses, at DEBUG")
+    parser.add_argument("--log-sample", metavar="ACTION=N", action="append", default=[],
+                        help="Log one in every N successful requests to ACTION (*=N: every other action; "
+                             "0: none). Failed requests are always logged")
+    parser.add_argument("--payload-chars", metavar="N", type=int, default=2048,
+                        help="Characters of each payload kept in log lines and GET /_admin/requests")
+    parser.add_argument("--request-buffer", metavar="N", type=int, default=256,
+                        help="How many of the last requests GET /_admin/requests keeps")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Append per-phase trace spans of every request to this file")
+    parser.add_argument("--trace-format", choices=["jsonl", "otlp"], default="jsonl",
+                        help="One span per line (jsonl) or one OTLP/JSON export request per batch (otlp)")
+    parser.add_argument("--trace-buffer", metavar="N", type=int, default=10000,
+                        help="Requests whose spans may wait to be written; more are dropped")
+    args = parser.parse_args()
+    if args.no_tcp and not args.unix_socket:
+        parser.error("--no-tcp needs --unix-socket")
+
+    logging.getLogger().setLevel(args.log_level)
+    if args.log_payloads:
+        logger.setLevel(logging.DEBUG)
     logger.info("Starting EC2 Emulator...")
     load_resources("emulator_core")
-    app.run(port=5003, debug=True)
+    requestlog = importlib.import_module(f"{_core_package}.requestlog")
+    _requests = requestlog.RequestLog(logger, "action", capacity=args.request_buffer,
+                                      payloads=args.log_payloads, max_chars=args.payload_chars)
+    try:
+        _requests.set_sampling(args.log_sample)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.trace:
+        try:
+            _tracer = importlib.import_module(f"{_core_package}.tracing").Tracer(
+                args.trace, "action", args.trace_format, service="vera-aws-ec2", max_pending=args.trace_buffer)
+        except OSError as e:
+            parser.error(f"Cannot open trace file: {e}")
+        atexit.register(_tracer.close)
+    _forks.max_tenants = args.tenants
+    _checkpoint_path = args.checkpoint
+    base = args.restore
+    if base is None and args.journal and _checkpoint_path and os.path.exists(_checkpoint_path):
+        base = _checkpoint_path
+    position = 0
+    if base:
+        start = time.perf_counter()
+        summary = restore_checkpoint(base)
+        position = importlib.import_module(f"{_core_package}.checkpoint").checkpoint_meta(base).get("journal", 0)
+        logger.info(f"Restored {summary['resources']} resources from {base} "
+                    f"in {time.perf_counter() - start:.3f}s")
+    if args.journal:
+        open_journal(args.journal, args.journal_sync, position)
+    server = importlib.import_module(f"{_core_package}.server")
+    if args.server:
+        try:
+            server.serve(app, args.host, args.port, unix_socket=args.unix_socket, tcp=not args.no_tcp,
+                         threads=args.threads, connection_limit=args.connection_limit,
+                         max_request_size=args.max_request_size, idle_timeout=args.idle_timeout,
+                         shutdown_timeout=args.shutdown_timeout)
+        except (RuntimeError, OSError) as e:
+            parser.error(str(e))
+    else:
+        server.run_development(app, args.host, args.port, debug=True, unix_socket=args.unix_socket,
+                               tcp=not args.no_tcp)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark of the request pipeline (parse, backend, serialize) per action.
+
+Loads the backends the way main.py does, then for each scale fills a fresh
+state with the synthetic baseline from bench_checkpoint.py (1k, 10k, 100k
+and 1M resources by default) and runs every case below against it: the
+action's parser, the backend method (under the same memoizing() and
+note_write() as in the gateway) and the XML serializer, with no HTTP in
+between. Each case runs for --seconds and reports throughput and p50/p99
+latency. Cases that change state undo what they did, so the store sizes
+stay put.
+
+Results can be written as JSON (--output) and compared with an earlier run
+(--compare): a case whose p50 latency grew, or whose throughput fell, by
+more than --threshold is flagged as a regression and the exit status is 1.
+
+Usage:
+    python bench_backends.py --scales 1000,10000 --output before.json
+    python bench_backends.py --scales 1000,10000 --compare before.json
+    python bench_backends.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from werkzeug.datastructures import MultiDict  # noqa: E402
+
+from bench_checkpoint import build_baseline  # noqa: E402
+
+DEFAULT_SCALES = "1000,10000,100000,1000000"
+
+
+def _cases(fixture):
+    """
+    (case name, action, values) of each request of the workload; a callable
+    values gets the result of the previous request of the case.
+    """
+    vpc, subnet, group, instance = fixture["vpc"], fixture["subnet"], fixture["group"], fixture["instance"]
+    return [
+        [("DescribeVpcs/id", "DescribeVpcs", {"VpcId.1": vpc})],
+        [("DescribeSubnets/vpc-id", "DescribeSubnets", {"Filter.1.Name": "vpc-id", "Filter.1.Value.1": vpc})],
+        [("DescribeSecurityGroups/id", "DescribeSecurityGroups", {"GroupId.1": group})],
+        [("DescribeInstances/id", "DescribeInstances", {"InstanceId.1": instance})],
+        [("DescribeInstances/page", "DescribeInstances", {"MaxResults": "100"})],
+        [("DescribeNetworkInterfaces/subnet-id", "DescribeNetworkInterfaces",
+          {"Filter.1.Name": "subnet-id", "Filter.1.Value.1": subnet})],
+        [("StopInstances", "StopInstances", {"InstanceId.1": instance}),
+         ("StartInstances", "StartInstances", {"InstanceId.1": instance})],
+        [("CreateSecurityGroup", "CreateSecurityGroup",
+          {"GroupName": "bench", "GroupDescription": "bench", "VpcId": vpc}),
+         ("DeleteSecurityGroup", "DeleteSecurityGroup", lambda created: {"GroupId": created["groupId"]})],
+        [("CreateVpc", "CreateVpc", {"CidrBlock": "10.255.0.0/16"}),
+         ("DeleteVpc", "DeleteVpc", lambda created: {"VpcId": created["vpc"]["vpcId"]})],
+    ]
+
+
+class Pipeline:
+    """What main.py does with a request once it knows the action, minus HTTP and the fork lock."""
+
+    def __init__(self):
+        logging.disable(logging.WARNING)
+        os.chdir(ROOT)
+        import main
+        main.load_resources("emulator_core")
+        from emulator_core import models
+        from emulator_core.checkpoint import install_state
+        from emulator_core.state import EC2State
+        self.main = main
+        self.models = models
+        self.install_state = install_state
+        self.state_cls = EC2State
+        # Stores filled by load_resources() (regions, instance types), kept at every scale
+        self.seeds = {name: dict(value) for name, value in vars(EC2State.get()).items()
+                      if isinstance(value, dict) and value}
+
+    def fill(self, resources):
+        """A fresh state with the seeds and about ``resources`` baseline resources; returns the fixture IDs."""
+        state = self.state_cls()
+        for name, value in self.seeds.items():
+            setattr(state, name, dict(value))
+        build_baseline(state, resources)
+        self.install_state(state, self.main._backends())
+
+        def middle(store):
+            keys = list(store)
+            return keys[len(keys) // 2]
+
+        fixture = {"vpc": middle(state.vpcs), "subnet": middle(state.subnets),
+                   "group": middle(state.security_groups), "instance": middle(state.instances)}
+        fixture["resources"] = sum(len(value) for value in vars(state).values() if isinstance(value, dict))
+        return fixture
+
+    def run(self, action, values):
+        """The result of one request; raises RuntimeError if the backend returned an error."""
+        backend, parser, serializer = self.main.ACTION_REGISTRY[action]
+        params = parser.parse_request(action, MultiDict(values))
+        writing = self.main._is_writing(action)
+        with self.models.memoizing(action.startswith("Describe")):
+            result = getattr(backend, action)(params)
+            if writing:
+                backend.state.note_write(getattr(backend, "resources", None))
+        if isinstance(result, dict) and "Error" in result:
+            raise RuntimeError(f"{action}: {result['Error']}")
+        serializer.serialize(action, result, "bench")
+        return result
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(pipeline, case, seconds, min_calls):
+    """Run the requests of ``case`` in turn until ``seconds`` passed; latencies per request."""
+    latencies = {name: [] for name, _, _ in case}
+    perf_counter = time.perf_counter
+    deadline = perf_counter() + seconds
+    rounds = 0
+    while rounds < min_calls or perf_counter() < deadline:
+        previous = None
+        for name, action, values in case:
+            if callable(values):
+                values = values(previous)
+            start = perf_counter()
+            previous = pipeline.run(action, values)
+            latencies[name].append(perf_counter() - start)
+        rounds += 1
+    results = []
+    for name, action, _ in case:
+        ordered = sorted(latencies[name])
+        total = sum(ordered)
+        results.append({
+            "case": name,
+            "action": action,
+            "calls": len(ordered),
+            "throughput": round(len(ordered) / total, 1) if total else None,
+            "p50_ms": round(_percentile(ordered, 0.50) * 1e3, 4),
+            "p99_ms": round(_percentile(ordered, 0.99) * 1e3, 4),
+            "mean_ms": round(total / len(ordered) * 1e3, 4),
+        })
+    return results
+
+
+def compare(before, after, threshold):
+    """Lines comparing two runs and the number of regressions among them."""
+    old = {(row["scale"], row["case"]): row for row in before["results"]}
+    lines = [f"{'scale':>8}  {'case':<38} {'p50 before':>11} {'p50 after':>10} {'change':>8}  "
+             f"{'ops/s before':>12} {'ops/s after':>11}"]
+    regressions = 0
+    for row in after["results"]:
+        base = old.get((row["scale"], row["case"]))
+        if base is None:
+            continue
+        change = row["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        slower = change > threshold
+        if base["throughput"] and row["throughput"]:
+            slower = slower or row["throughput"] < base["throughput"] * (1 - threshold)
+        regressions += slower
+        lines.append(f"{row['scale']:>8}  {row['case']:<38} {base['p50_ms']:>11.4f} {row['p50_ms']:>10.4f} "
+                     f"{change:>+8.1%}  {base['throughput'] or 0:>12.1f} {row['throughput'] or 0:>11.1f}"
+                     f"{'  REGRESSION' if slower else ''}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma-separated numbers of baseline resources")
+    parser.add_argument("--seconds", type=float, default=1.0, help="how long each case runs per scale")
+    parser.add_argument("--min-calls", type=int, default=20, help="fewest rounds of each case, however slow")
+    parser.add_argument("--cases", help="comma-separated case names to run (default: all)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs="+", metavar="RUN",
+                        help="compare with an earlier JSON run; given two runs, only compare them")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="flag cases whose p50 grew or throughput fell by more than this fraction")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two runs")
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            lines, regressions = compare(json.load(before), json.load(after), args.threshold)
+        print("\n".join(lines))
+        return 1 if regressions else 0
+
+    pipeline = Pipeline()
+    wanted = set(args.cases.split(",")) if args.cases else None
+    run = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "started": time.time(),
+        "seconds": args.seconds,
+        "results": [],
+    }
+    print(f"{'scale':>8}  {'case':<38} {'calls':>7} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for scale in (int(value) for value in args.scales.split(",")):
+        start = time.perf_counter()
+        fixture = pipeline.fill(scale)
+        print(f"-- {fixture['resources']} resources (built in {time.perf_counter() - start:.2f} s)")
+        for case in _cases(fixture):
+            if wanted is not None and not wanted.intersection(name for name, _, _ in case):
+                continue
+            for row in measure(pipeline, case, args.seconds, args.min_calls):
+                row.update(scale=scale, resources=fixture["resources"])
+                run["results"].append(row)
+                print(f"{scale:>8}  {row['case']:<38} {row['calls']:>7} {row['throughput'] or 0:>10.1f} "
+                      f"{row['p50_ms']:>9.4f} {row['p99_ms']:>9.4f}")
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(run, handle, indent=2)
+    if args.compare:
+        with open(args.compare[0]) as before:
+            lines, regressions = compare(json.load(before), run, args.threshold)
+        print()
+        print("\n".join(lines))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
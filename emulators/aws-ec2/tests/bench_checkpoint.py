@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark for state checkpoints (emulator_core.checkpoint).
+
+Fills the state with a synthetic baseline (VPCs, subnets, security groups,
+network interfaces and instances; 500k resources by default), writes a
+checkpoint, then times restoring it: mapping the file, the first lookup in
+the largest store (which unpickles that store) and unpickling everything.
+
+Usage:
+    python bench_checkpoint.py
+    python bench_checkpoint.py --resources 100000 --path /tmp/baseline.ckpt
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from emulator_core.checkpoint import LazyStore, read_checkpoint, write_checkpoint  # noqa: E402
+from emulator_core.services.elasticnetworkinterface import ElasticNetworkInterface  # noqa: E402
+from emulator_core.services.instance import Instance  # noqa: E402
+from emulator_core.services.securitygroup import SecurityGroup  # noqa: E402
+from emulator_core.services.subnet import Subnet  # noqa: E402
+from emulator_core.services.vpc import Vpc  # noqa: E402
+from emulator_core.state import EC2State  # noqa: E402
+
+# Each VPC gets this many subnets and groups; each subnet this many instances,
+# each with one network interface
+SUBNETS_PER_VPC = 4
+GROUPS_PER_VPC = 2
+INSTANCES_PER_SUBNET = 24
+
+
+def build_baseline(state, resources):
+    """Add about ``resources`` resources to ``state``, wired up like the API would."""
+    per_vpc = 1 + GROUPS_PER_VPC + SUBNETS_PER_VPC * (1 + 2 * INSTANCES_PER_SUBNET)
+    for v in range(max(1, resources // per_vpc)):
+        vpc_id = f"vpc-{v:017x}"
+        vpc = Vpc(vpc_id=vpc_id, cidr_block=f"10.{v % 256}.0.0/16", state="available", instance_tenancy="default")
+        state.vpcs[vpc_id] = vpc
+        groups = []
+        for g in range(GROUPS_PER_VPC):
+            group_id = f"sg-{v:012x}{g:05x}"
+            state.security_groups[group_id] = SecurityGroup(group_id=group_id, group_name=f"group-{g}",
+                                                            group_description="baseline", vpc_id=vpc_id)
+            vpc.security_group_ids.append(group_id)
+            groups.append({"groupId": group_id, "groupName": f"group-{g}"})
+        for s in range(SUBNETS_PER_VPC):
+            subnet_id = f"subnet-{v:012x}{s:05x}"
+            subnet = Subnet(subnet_id=subnet_id, vpc_id=vpc_id, cidr_block=f"10.{v % 256}.{s}.0/24",
+                            availability_zone="us-east-1a", state="available")
+            state.subnets[subnet_id] = subnet
+            vpc.subnet_ids.append(subnet_id)
+            for i in range(INSTANCES_PER_SUBNET):
+                suffix = f"{v:010x}{s:02x}{i:05x}"
+                address = f"10.{v % 256}.{s}.{i + 4}"
+                eni_id = f"eni-{suffix}"
+                instance_id = f"i-{suffix}"
+                state.elastic_network_interfaces[eni_id] = ElasticNetworkInterface(
+                    network_interface_id=eni_id, subnet_id=subnet_id, vpc_id=vpc_id,
+                    private_ip_address=address, status="in-use", group_set=list(groups))
+                subnet.network_interface_ids.append(eni_id)
+                vpc.vpc_network_interface_ids.append(eni_id)
+                state.instances[instance_id] = Instance(
+                    instance_id=instance_id, image_id="ami-00000000000000000", instance_type="t3.micro",
+                    subnet_id=subnet_id, vpc_id=vpc_id, private_ip_address=address,
+                    instance_state={"code": 16, "name": "running"}, group_set=list(groups))
+                subnet.instance_ids.append(instance_id)
+                vpc.instance_ids.append(instance_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=500000, help="approximate number of resources")
+    parser.add_argument("--path", help="checkpoint file to write (default: a temporary file)")
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), "baseline.ckpt")
+    EC2State.reset()
+    state = EC2State.get()
+
+    start = time.perf_counter()
+    build_baseline(state, args.resources)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary = write_checkpoint(state, path)
+    written = time.perf_counter() - start
+
+    start = time.perf_counter()
+    restored = read_checkpoint(path, EC2State)
+    mapped = time.perf_counter() - start
+
+    largest = max((name for name, value in vars(restored).items() if isinstance(value, LazyStore)),
+                  key=lambda name: len(getattr(restored, name)))
+    store = getattr(restored, largest)
+    key = next(iter(getattr(state, largest)))
+    start = time.perf_counter()
+    found = store.get(key)
+    first_lookup = time.perf_counter() - start
+    if found != getattr(state, largest)[key]:
+        print(f"MISMATCH for {key} in restored {largest}: {found}")
+        return 1
+
+    start = time.perf_counter()
+    for value in vars(restored).values():
+        if isinstance(value, LazyStore):
+            len(value.keys())
+    decoded = time.perf_counter() - start
+
+    print(f"resources: {summary['resources']} in {summary['stores']} stores (built in {built:.2f} s)")
+    print(f"write:     {written:8.3f} s, {summary['bytes'] / 1e6:.1f} MB")
+    print(f"restore:   {mapped * 1e3:8.3f} ms (map file, read table of contents)")
+    print(f"first use: {first_lookup:8.3f} s (unpickle {largest}, {len(store)} resources)")
+    print(f"decode:    {decoded:8.3f} s (unpickle every other store)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for memoized to_dict() across read-only requests (emulator_core.models).
+
+Fills the state with the synthetic baseline from bench_checkpoint.py (100k
+resources by default), then times DescribeInstances pages the way the
+gateway runs them: without memos (as after a write), and again while they
+hold (repeated describes of an unchanged fleet). Checks that a write in
+between is visible to the next describe.
+
+Usage:
+    python bench_describe.py
+    python bench_describe.py --resources 500000 --page 500
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_checkpoint import build_baseline  # noqa: E402
+from emulator_core.models import memoizing  # noqa: E402
+from emulator_core.services.instance import Instance_Backend, instance_ResponseSerializer  # noqa: E402
+from emulator_core.state import EC2State  # noqa: E402
+
+
+def describe(backend, params, read_only=True):
+    with memoizing(read_only):
+        return backend.DescribeInstances(params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=100000, help="approximate number of resources")
+    parser.add_argument("--page", type=int, default=1000, help="instances per DescribeInstances page")
+    parser.add_argument("--repeat", type=int, default=20, help="describes per measurement")
+    args = parser.parse_args()
+
+    EC2State.reset()
+    build_baseline(EC2State.get(), args.resources)
+    backend = Instance_Backend()
+    params = {"MaxResults": str(args.page)}
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        with memoizing(False):
+            pass
+        describe(backend, params)
+    cold = (time.perf_counter() - start) / args.repeat
+
+    describe(backend, params)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result = describe(backend, params)
+    warm = (time.perf_counter() - start) / args.repeat
+
+    start = time.perf_counter()
+    instance_ResponseSerializer.serialize("DescribeInstances", result, "bench")
+    serialized = time.perf_counter() - start
+
+    first = result["reservationSet"][0]["instancesSet"][0]["instanceId"]
+    with memoizing(False):
+        EC2State.get().instances[first].instance_type = "m5.large"
+    described = describe(backend, params)["reservationSet"][0]["instancesSet"][0]
+    if described["instanceType"] != "m5.large":
+        print("MISMATCH: a describe after a write returned the memoized instance")
+        return 1
+
+    print(f"instances: {len(EC2State.get().instances)}, {args.page} per page")
+    print(f"cold:      {cold * 1e3:8.3f} ms per page (to_dict() of every instance)")
+    print(f"memoized:  {warm * 1e3:8.3f} ms per page")
+    print(f"serialize: {serialized * 1e3:8.3f} ms per page (XML, not memoized)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark for copy-on-write state forks (emulator_core.fork).
+
+Fills the state with the synthetic baseline from bench_checkpoint.py (100k
+resources by default), then times forking it, a change made in the fork,
+routing requests to it and dropping it. Checks that the fork's change stays
+out of the main state and that untouched resources are shared.
+
+Usage:
+    python bench_fork.py
+    python bench_fork.py --resources 500000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_checkpoint import build_baseline  # noqa: E402
+from emulator_core.fork import ForkRegistry  # noqa: E402
+from emulator_core.services.subnet import Subnet_Backend  # noqa: E402
+from emulator_core.services.vpc import Vpc_Backend  # noqa: E402
+from emulator_core.state import EC2State  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=100000, help="approximate number of resources")
+    parser.add_argument("--routes", type=int, default=10000, help="number of routed no-op requests")
+    args = parser.parse_args()
+
+    EC2State.reset()
+    build_baseline(EC2State.get(), args.resources)
+    backends = [Vpc_Backend(), Subnet_Backend()]
+    forks = ForkRegistry(EC2State, lambda: backends)
+    vpc_backend = backends[0]
+    vpc_id = next(iter(EC2State.get().vpcs))
+
+    start = time.perf_counter()
+    fork = forks.create(name="bench")
+    forked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with forks.route(fork, writing=True):
+        vpc_backend.resources[vpc_id].tag_set.append({"Key": "fork", "Value": "yes"})
+    written = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.routes):
+        with forks.route(fork):
+            pass
+    routed = time.perf_counter() - start
+
+    with forks.route():
+        main_vpc = vpc_backend.resources[vpc_id]
+        other_id = list(vpc_backend.resources)[-1]
+        shared = vpc_backend.resources[other_id]
+    with forks.route(fork):
+        fork_vpc = vpc_backend.resources[vpc_id]
+        fork_shared = vpc_backend.resources[other_id]
+    if {"Key": "fork", "Value": "yes"} in main_vpc.tag_set or {"Key": "fork", "Value": "yes"} not in fork_vpc.tag_set:
+        print("MISMATCH: the fork's change leaked into the main state or was lost")
+        return 1
+    if shared is not fork_shared:
+        print("MISMATCH: an untouched resource is not shared with the fork")
+        return 1
+
+    start = time.perf_counter()
+    forks.drop(fork.fork_id)
+    dropped = time.perf_counter() - start
+
+    print(f"resources: {sum(len(v) for v in vars(EC2State.get()).values() if isinstance(v, dict))}")
+    print(f"fork:      {forked * 1e3:8.3f} ms")
+    print(f"write:     {written * 1e3:8.3f} ms (first change in the fork)")
+    print(f"route:     {routed / args.routes * 1e6:8.2f} us per request (install the fork and back)")
+    print(f"drop:      {dropped * 1e3:8.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the memory footprint of resource models (emulator_core.models).
+
+Fills the state with the synthetic baseline from bench_checkpoint.py (1M
+resources by default) and reports the resident memory it added per
+resource and how long building it took. Then reads every resource's list
+and dict fields, as describing them does, and checks that reading did not
+allocate them.
+
+Usage:
+    python bench_memory.py
+    python bench_memory.py --resources 200000
+"""
+
+import argparse
+import dataclasses
+import gc
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_checkpoint import build_baseline  # noqa: E402
+from emulator_core.state import EC2State  # noqa: E402
+
+
+def resident_bytes():
+    """Resident set size of this process (Linux)."""
+    with open("/proc/self/statm") as handle:
+        return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=1000000, help="approximate number of resources")
+    args = parser.parse_args()
+
+    EC2State.reset()
+    state = EC2State.get()
+    gc.collect()
+    before = resident_bytes()
+    start = time.perf_counter()
+    build_baseline(state, args.resources)
+    built = time.perf_counter() - start
+    gc.collect()
+    after = resident_bytes()
+    stores = [value for value in vars(state).values() if isinstance(value, dict)]
+    count = sum(len(store) for store in stores)
+
+    # Names of the lazily allocated list/dict fields of each model
+    containers = {}
+    start = time.perf_counter()
+    reads = 0
+    for store in stores:
+        for resource in store.values():
+            names = containers.get(type(resource))
+            if names is None:
+                names = [item.name for item in dataclasses.fields(resource)
+                         if item.metadata.get("factory") in (list, dict)]
+                containers[type(resource)] = names
+            for name in names:
+                getattr(resource, name)
+            reads += len(names)
+    read = time.perf_counter() - start
+    gc.collect()
+    if resident_bytes() - after > count * 8:
+        print("MISMATCH: reading empty list/dict fields allocated them")
+        return 1
+
+    print(f"resources: {count}")
+    print(f"memory:    {(after - before) / count:8.0f} bytes per resource ({(after - before) / 2**20:.0f} MB)")
+    print(f"build:     {built:8.3f} s")
+    print(f"read:      {read / max(reads, 1) * 1e9:8.0f} ns per list/dict field ({reads} fields)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
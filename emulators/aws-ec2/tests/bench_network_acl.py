@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the compiled network ACL evaluator (emulator_core.rulematch).
+
+Builds network ACLs at the maximum AWS entry count (40 inbound and 40
+outbound rules), checks every decision against a plain first-match scan
+of the entries sorted by rule number, and times both.
+
+Usage:
+    python bench_network_acl.py
+    python bench_network_acl.py --entries 40 --packets 200000 --seed 7
+"""
+
+import argparse
+import ipaddress
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from emulator_core.rulematch import NetworkAclRules, port_interval, protocol_number  # noqa: E402
+
+AWS_MAX_ENTRIES_PER_DIRECTION = 40
+PROTOCOLS = ["6", "17", "1", "-1"]
+
+
+def random_entries(rng, count):
+    """``count`` inbound and ``count`` outbound entries with distinct rule numbers."""
+    entries = []
+    for egress in (False, True):
+        for number in rng.sample(range(1, 32767), count):
+            protocol = rng.choice(PROTOCOLS)
+            prefix = rng.choice([16, 20, 24, 24, 28, 32, 32])
+            address = ipaddress.ip_address(rng.getrandbits(32) & 0x0AFFFFFF | 0x0A000000)
+            low = rng.randrange(0, 65536)
+            entries.append({
+                "cidrBlock": str(ipaddress.ip_network(f"{address}/{prefix}", strict=False)),
+                "egress": egress,
+                "portRange": {"from": low, "to": min(65535, low + rng.choice([0, 0, 10, 1000, 30000]))},
+                "protocol": protocol,
+                "ruleAction": rng.choice(["allow", "deny"]),
+                "ruleNumber": number,
+            })
+    return entries
+
+
+def random_packets(rng, count):
+    packets = []
+    for _ in range(count):
+        address = ipaddress.ip_address(rng.getrandbits(32) & 0x0AFFFFFF | 0x0A000000)
+        packets.append((rng.random() < 0.5, rng.choice(PROTOCOLS[:3]), address, rng.randrange(0, 65536)))
+    return packets
+
+
+def linear_rules(entries):
+    """Entries pre-parsed and sorted by rule number for the reference scan."""
+    rules = []
+    for entry in sorted(entries, key=lambda item: item["ruleNumber"]):
+        protocol = protocol_number(entry["protocol"])
+        low, high = port_interval(protocol, entry["portRange"]["from"], entry["portRange"]["to"])
+        rules.append((entry["egress"], protocol, low, high, ipaddress.ip_network(entry["cidrBlock"]), entry))
+    return rules
+
+
+def linear_evaluate(rules, egress, protocol, address, port):
+    """Reference first-match evaluation: walk the entries in rule-number order."""
+    for rule_egress, rule_protocol, low, high, network, entry in rules:
+        if rule_egress != egress or rule_protocol not in ("-1", protocol):
+            continue
+        if (low, high) != (-1, 65535) and not low <= port <= high:
+            continue
+        if address in network:
+            return entry
+    return None
+
+
+def timed(function, packets):
+    start = time.perf_counter()
+    for packet in packets:
+        function(*packet)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=AWS_MAX_ENTRIES_PER_DIRECTION,
+                        help="entries per direction (default: the AWS maximum, 40)")
+    parser.add_argument("--acls", type=int, default=20, help="number of random ACLs to build")
+    parser.add_argument("--packets", type=int, default=50000, help="packets evaluated per ACL")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    compile_time = compiled_time = linear_time = 0.0
+    decisions = 0
+    for _ in range(args.acls):
+        entries = random_entries(rng, args.entries)
+        packets = random_packets(rng, args.packets)
+
+        start = time.perf_counter()
+        rules = NetworkAclRules(entries)
+        compile_time += time.perf_counter() - start
+
+        ordered = linear_rules(entries)
+        for packet in packets[:2000]:
+            expected = linear_evaluate(ordered, *packet)
+            actual = rules.evaluate(*packet)
+            if expected is not actual:
+                print(f"MISMATCH for {packet}: expected {expected}, got {actual}")
+                return 1
+
+        compiled_time += timed(rules.evaluate, packets)
+        linear_time += timed(lambda *packet: linear_evaluate(ordered, *packet), packets)
+        decisions += len(packets)
+
+    print(f"ACLs: {args.acls} x {args.entries} entries per direction, {decisions} decisions")
+    print(f"compile:  {compile_time / args.acls * 1e3:8.3f} ms per ACL")
+    print(f"compiled: {compiled_time / decisions * 1e6:8.3f} us per decision")
+    print(f"linear:   {linear_time / decisions * 1e6:8.3f} us per decision")
+    print(f"speedup:  {linear_time / compiled_time:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
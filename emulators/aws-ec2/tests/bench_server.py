@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the HTTP servers: Flask's development server against --server
+(waitress).
+
+Starts the emulator once per mode on a spare port, then replays the
+read-only commands of the CLI corpus at it with loadgen.py at each
+--concurrency level for --seconds (after a short warm-up), and reports
+throughput, p50/p99 latency and errors per mode and level. The emulator's
+state is left as it is by the replay, so the modes see the same workload.
+
+The dev mode is main.py as `uv run main.py` starts it (debug and reloader
+on); --threads sets the worker threads of --server.
+
+Usage:
+    uv run --extra server bench_server.py
+    uv run --extra server bench_server.py --concurrency 1,8,32 --threads 16 --output servers.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import loadgen  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+MODES = ("dev", "server")
+
+
+def _spare_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_emulator(mode, port, threads, extra=()):
+    """Start main.py in ``mode`` on ``port`` (plus ``extra`` options) and wait until it answers; returns the process."""
+    command = [sys.executable, "main.py", "--port", str(port), "--log-level", "WARNING", *extra]
+    if mode == "server":
+        command += ["--server", "--threads", str(threads)]
+    # Its own process group: the dev server's reloader runs the app in a child
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"main.py ({mode}) exited with status {process.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_admin/metrics", timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_emulator(process)
+    raise RuntimeError(f"main.py ({mode}) did not answer within 60 s")
+
+
+def stop_emulator(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=15)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def measure(requests, endpoint, concurrency, seconds):
+    """Replay ``requests`` at ``concurrency`` for ``seconds``; throughput, latency and errors."""
+    asyncio.run(loadgen.replay(requests, endpoint, concurrency, concurrency, 0, min(1.0, seconds), 0, 30))
+    stats, elapsed = asyncio.run(loadgen.replay(requests, endpoint, concurrency, concurrency, 0, seconds, 0, 30))
+    latencies = [latency for values in stats.latencies.values() for latency in values]
+    transport = sum(count for counter in stats.errors.values()
+                    for (status, _), count in counter.items() if status == "transport")
+    return {"concurrency": concurrency, "requests": len(latencies),
+            "throughput": round(len(latencies) / elapsed, 1), "transportErrors": transport,
+            **loadgen._percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes to run (dev, server)")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated numbers of requests in flight")
+    parser.add_argument("--seconds", type=float, default=5, help="how long each level runs")
+    parser.add_argument("--threads", type=int, default=8, help="worker threads of --server")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    if not set(modes) <= set(MODES):
+        parser.error(f"--modes: expected some of {', '.join(MODES)}")
+    requests = loadgen.load_corpus(read_only=True, pattern=None)
+    run = {"python": platform.python_version(), "cpus": os.cpu_count(), "threads": args.threads,
+           "seconds": args.seconds, "results": []}
+    print(f"{'mode':<8} {'concurrency':>11} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode in modes:
+        port = _spare_port()
+        process = start_emulator(mode, port, args.threads)
+        try:
+            for concurrency in (int(value) for value in args.concurrency.split(",")):
+                row = measure(requests, f"http://127.0.0.1:{port}", concurrency, args.seconds)
+                row["mode"] = mode
+                run["results"].append(row)
+                print(f"{mode:<8} {concurrency:>11} {row['requests']:>9} {row['throughput']:>9.1f} "
+                      f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['transportErrors']:>7}")
+        finally:
+            stop_emulator(process)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(run, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
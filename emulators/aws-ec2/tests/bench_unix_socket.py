@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark of request latency over TCP loopback against a Unix socket
+(main.py --unix-socket).
+
+Starts the emulator (--server by default, --mode dev for the development
+server) listening on both a spare TCP port and a Unix socket, then sends
+the same requests one at a time over each transport, in two ways:
+
+- keep-alive: all requests over one connection, as SDKs and Terraform do;
+- connect: a new connection per request, as one-shot CLI commands do.
+
+Reports p50/p99/mean latency per action, transport and way, and the Unix
+socket's change against TCP.
+
+Usage:
+    uv run --extra server bench_unix_socket.py
+    uv run --extra server bench_unix_socket.py --requests 5000 --output transports.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_server import MODES, _spare_port, start_emulator, stop_emulator  # noqa: E402
+
+# (name, Query parameters): a small response and a large one (196 instance types)
+ACTIONS = [
+    ("DescribeVpcs", {"Action": "DescribeVpcs", "Version": "2016-11-15"}),
+    ("DescribeInstanceTypes", {"Action": "DescribeInstanceTypes", "Version": "2016-11-15"}),
+]
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def _request(connection, body):
+    connection.request("POST", "/", body, {"Content-Type": "application/x-www-form-urlencoded; charset=utf-8"})
+    response = connection.getresponse()
+    response.read()
+    if response.status != 200:
+        raise RuntimeError(f"HTTP {response.status}")
+
+
+def measure(connect, body, requests, keep_alive):
+    """Latencies of ``requests`` requests, over one connection or one each."""
+    latencies = []
+    perf_counter = time.perf_counter
+    connection = connect() if keep_alive else None
+    for _ in range(requests):
+        start = perf_counter()
+        if keep_alive:
+            _request(connection, body)
+        else:
+            connection = connect()
+            _request(connection, body)
+            connection.close()
+        latencies.append(perf_counter() - start)
+    if keep_alive:
+        connection.close()
+    ordered = sorted(latencies)
+    return {"p50_ms": round(ordered[len(ordered) // 2] * 1e3, 4),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1e3, 4),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1e3, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=MODES, default="server", help="which HTTP server the emulator runs")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per action, transport and way")
+    parser.add_argument("--threads", type=int, default=8, help="worker threads of --server")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    port = _spare_port()
+    path = os.path.join(tempfile.mkdtemp(prefix="vera-bench-"), "emulator.sock")
+    process = start_emulator(args.mode, port, args.threads, ["--unix-socket", path])
+    transports = {"tcp": lambda: http.client.HTTPConnection("127.0.0.1", port, timeout=30),
+                  "unix": lambda: UnixHTTPConnection(path)}
+    run = {"python": platform.python_version(), "mode": args.mode, "requests": args.requests, "results": []}
+    print(f"{'action':<24} {'way':<11} {'transport':<9} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'vs tcp':>8}")
+    try:
+        for name, params in ACTIONS:
+            body = urlencode(params).encode()
+            for way in ("keep-alive", "connect"):
+                baseline = None
+                for transport, connect in transports.items():
+                    measure(connect, body, min(100, args.requests), way == "keep-alive")  # warm-up
+                    row = measure(connect, body, args.requests, way == "keep-alive")
+                    row.update(action=name, way=way, transport=transport)
+                    run["results"].append(row)
+                    change = f"{row['mean_ms'] / baseline['mean_ms'] - 1:+.1%}" if baseline else ""
+                    baseline = baseline or row
+                    print(f"{name:<24} {way:<11} {transport:<9} {row['p50_ms']:>9.4f} {row['p99_ms']:>9.4f} "
+                          f"{row['mean_ms']:>9.4f} {change:>8}")
+    finally:
+        stop_emulator(process)
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(run, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
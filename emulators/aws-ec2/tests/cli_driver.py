@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Warm AWS CLI driver: runs `aws` commands without paying its start-up time.
+
+Every `aws` invocation spends 0.5-1 s importing botocore and loading the
+EC2 model before the emulator sees a request. The driver does that once,
+then serves commands over a Unix socket: for each one it forks a child of
+its warm self, which runs the CLI in process (awscli v1, the pip package)
+and exits with the CLI's exit code.
+
+The client stub hands its own stdin, stdout and stderr over the socket,
+along with its argv, working directory and environment, so a command
+behaves as if `aws` had been run in its place: same output streams
+(terminal detection included), same environment (profiles, credentials
+files) and same exit code. Ctrl-C and SIGTERM are passed on to the child.
+If no driver is listening, the stub execs the real `aws` instead.
+
+Usage:
+    uv run --with awscli cli_driver.py start      # in the background
+    cli_driver.py run ec2 describe-vpcs --endpoint-url http://localhost:5003
+    cli_driver.py stop
+
+The awscli wrapper from install.sh goes through the driver whenever its
+socket exists (VERA_CLI_SOCKET, default .venv/vera-awscli.sock).
+
+If the command's environment has VERA_UNIX_SOCKET (the socket of an
+emulator started with --unix-socket), its requests to --endpoint-url go
+over that socket instead of TCP.
+"""
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              ".venv", "vera-awscli.sock")
+# Unix socket of the emulator (main.py --unix-socket), if requests should go over it
+EMULATOR_SOCKET_ENV = "VERA_UNIX_SOCKET"
+# Length of the JSON header in front of it, and exit status in the reply
+_LENGTH = struct.Struct("!I")
+_STATUS = struct.Struct("!i")
+
+
+def socket_path():
+    return os.environ.get("VERA_CLI_SOCKET") or DEFAULT_SOCKET
+
+
+# ---------------------------------------------------------------------------
+# Client stub
+# ---------------------------------------------------------------------------
+
+def _recv_exactly(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("driver closed the connection")
+        data += chunk
+    return data
+
+
+def _request(conn, header, fds=()):
+    payload = json.dumps(header).encode()
+    socket.send_fds(conn, [_LENGTH.pack(len(payload)) + payload], list(fds))
+
+
+def run(args):
+    """Run ``aws args`` through the driver; returns its exit code (execs the real aws if none is running)."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path())
+    except OSError:
+        conn.close()
+        os.execvp("aws", ["aws"] + args)
+
+    def forward(signum, frame):
+        conn.send(bytes([signum]))
+
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, forward)
+    _request(conn, {"op": "run", "argv": args, "cwd": os.getcwd(), "env": dict(os.environ)}, (0, 1, 2))
+    return _STATUS.unpack(_recv_exactly(conn, _STATUS.size))[0]
+
+
+def stop():
+    """Ask the driver to exit; returns 0, or 1 if none is running."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path())
+    except OSError:
+        print(f"No driver listening on {socket_path()}", file=sys.stderr)
+        return 1
+    _request(conn, {"op": "stop"})
+    conn.recv(1)
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+class Driver:
+    """A warm AWS CLI that forks a child per command; see the module docstring."""
+
+    def __init__(self, path):
+        self.path = path
+        from awscli import clidriver
+        self.clidriver = clidriver
+        # Loading the EC2 model and endpoint data is most of the start-up
+        # time; the loader caches them and does not depend on the environment
+        warm = clidriver.create_clidriver()
+        self.loader = warm.session.get_component("data_loader")
+        self.loader.load_data("endpoints")
+        self.loader.load_data("partitions")
+        for kind in ("service-2", "paginators-1", "waiters-2"):
+            self.loader.load_service_model("ec2", kind)
+        # Import what the CLI imports lazily on its first command
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                warm.main(["ec2", "describe-vpcs", "--generate-cli-skeleton"])
+            finally:
+                sys.stdout = stdout
+
+    def serve(self, ready=None):
+        """Serve commands until stopped; ``ready`` (a file descriptor) is written to once listening."""
+        import threading
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        listener.listen(128)
+        if ready is not None:
+            os.write(ready, b"1")
+            os.close(ready)
+        try:
+            while True:
+                conn, _ = listener.accept()
+                try:
+                    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+                    length = _LENGTH.unpack(data[:_LENGTH.size])[0]
+                    payload = data[_LENGTH.size:]
+                    if len(payload) < length:
+                        payload += _recv_exactly(conn, length - len(payload))
+                    header = json.loads(payload)
+                except (OSError, ValueError, struct.error):
+                    conn.close()
+                    continue
+                if header.get("op") == "stop":
+                    conn.close()
+                    return
+                # Fork from this thread only: the others just wait on children
+                pid = os.fork()
+                if pid == 0:
+                    listener.close()
+                    conn.close()
+                    self._child(header, fds)
+                for fd in fds:
+                    os.close(fd)
+                threading.Thread(target=self._wait, args=(conn, pid), daemon=True).start()
+        finally:
+            listener.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def _child(self, header, fds):
+        """Run one command in this forked child, as the client would have; never returns."""
+        status = 255
+        try:
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            sys.stdin = os.fdopen(0, "r", closefd=False)
+            sys.stdout = os.fdopen(1, "w", closefd=False)
+            sys.stderr = os.fdopen(2, "w", closefd=False)
+            os.environ.clear()
+            os.environ.update(header["env"])
+            os.chdir(header["cwd"])
+            sys.argv = ["aws"] + header["argv"]
+            endpoint = _endpoint_url(header["argv"])
+            if os.environ.get(EMULATOR_SOCKET_ENV) and endpoint:
+                _connect_unix(os.environ[EMULATOR_SOCKET_ENV], endpoint)
+            # A fresh session reads this environment; only the loader's cache is reused
+            driver = self.clidriver.create_clidriver()
+            driver.session.register_component("data_loader", self.loader)
+            status = driver.main(header["argv"])
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (0 if e.code is None else 255)
+        except KeyboardInterrupt:
+            status = 130
+        except BaseException as e:
+            print(f"cli_driver: {e!r}", file=sys.stderr)
+        finally:
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+            os._exit(status & 0xFF)
+
+    def _wait(self, conn, pid):
+        """Pass the client's signals to child ``pid`` and send back its exit status."""
+        import threading
+        done = threading.Event()
+
+        def relay():
+            while True:
+                try:
+                    data = conn.recv(16)
+                except OSError:
+                    data = b""
+                if done.is_set():
+                    return
+                try:
+                    if not data:
+                        # The client went away: stop its command
+                        os.kill(pid, signal.SIGTERM)
+                        return
+                    for signum in data:
+                        os.kill(pid, signum)
+                except ProcessLookupError:
+                    return
+
+        threading.Thread(target=relay, daemon=True).start()
+        _, status = os.waitpid(pid, 0)
+        done.set()
+        code = os.waitstatus_to_exitcode(status)
+        try:
+            conn.sendall(_STATUS.pack(code if code >= 0 else 128 - code))
+        except OSError:
+            pass
+        conn.close()
+
+
+def _endpoint_url(argv):
+    for index, arg in enumerate(argv):
+        if arg.startswith("--endpoint-url="):
+            return arg.split("=", 1)[1]
+        if arg == "--endpoint-url" and index + 1 < len(argv):
+            return argv[index + 1]
+    return None
+
+
+def _connect_unix(path, endpoint):
+    """Make this process's CLI send its requests to ``endpoint`` (http://host:port) over the Unix socket ``path``."""
+    from urllib.parse import urlsplit
+    from botocore import awsrequest
+    from urllib3.exceptions import NewConnectionError
+    target = urlsplit(endpoint)
+    if target.scheme != "http":
+        return
+    address = (target.hostname, target.port or 80)
+
+    class UnixHTTPConnection(awsrequest.AWSHTTPConnection):
+        def _new_conn(self):
+            if (self.host, self.port) != address:
+                return super()._new_conn()
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if isinstance(self.timeout, (int, float)):
+                sock.settimeout(self.timeout)
+            try:
+                sock.connect(path)
+            except OSError as e:
+                sock.close()
+                raise NewConnectionError(self, f"Failed to connect to unix:{path}: {e}") from e
+            return sock
+
+    awsrequest.AWSHTTPConnectionPool.ConnectionCls = UnixHTTPConnection
+
+
+def start(path):
+    """Start a driver in the background; returns once it listens."""
+    read, write = os.pipe()
+    if os.fork():
+        os.close(write)
+        ready = os.read(read, 1)
+        if not ready:
+            print("The driver failed to start (is awscli importable? try: uv run --with awscli ...)",
+                  file=sys.stderr)
+            return 1
+        print(f"AWS CLI driver listening on {path}")
+        return 0
+    os.close(read)
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+    with open(os.devnull, "r+") as devnull:
+        for fd in (0, 1, 2):
+            os.dup2(devnull.fileno(), fd)
+    try:
+        Driver(path).serve(ready=write)
+    finally:
+        os._exit(0)
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "run":
+        # The stub: no argparse, so that nothing but the socket stands between the caller and the CLI
+        return run(sys.argv[2:])
+
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["start", "serve", "stop", "run"],
+                        help="start in the background, serve in the foreground, stop, or run an aws command")
+    parser.add_argument("--socket", help=f"socket path (default: $VERA_CLI_SOCKET or {DEFAULT_SOCKET})")
+    args = parser.parse_args()
+    if args.socket:
+        os.environ["VERA_CLI_SOCKET"] = args.socket
+    if args.command == "stop":
+        return stop()
+    if args.command == "start":
+        return start(socket_path())
+    Driver(socket_path()).serve()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
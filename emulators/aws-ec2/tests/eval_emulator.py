@@ -6,12 +6,22 @@ Runs each command against a running emulator instance.
 
 import json
 import os
+import re
+import shlex
 import subprocess
 import sys
+import tempfile
+import threading
 import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+# Resource IDs (vpc-1a2b3c4d, sg-0b0384b66d7d692f9, ipv4pool-ec2-1234567890abcdef0)
+RESOURCE_ID_RE = re.compile(r"\b[a-z][a-z0-9]*(?:-[a-z0-9]+)*-[0-9a-f]{8,17}\b")
+
 
 def parse_bash_script(script_file):
     """Parse bash script and extract commands line by line."""
@@ -30,9 +40,12 @@ def parse_bash_script(script_file):
     return commands
 
 
-def run_command(cmd, timeout=30):
+def run_command(cmd, timeout=30, env=None):
     """
     Run a command and capture output and status.
+
+    Args:
+        env: Environment of the command (default: this process's)
     
     Returns:
         dict: {'success': bool, 'exit_code': int, 'stdout': str, 'stderr': str, 'error': str}
@@ -52,7 +65,7 @@ def run_command(cmd, timeout=30):
             capture_output=True,
             text=True,
             timeout=timeout,
-            env=os.environ,
+            env=env if env is not None else os.environ,
             executable='/bin/bash'
         )
         
@@ -69,6 +82,53 @@ def run_command(cmd, timeout=30):
     return result
 
 
+def check_json_response(cmd_result):
+    """
+    Apply the custom success check to a command result; returns whether it succeeded.
+
+    AWS CLI fails if it receives JSON instead of XML, but we consider it success if the JSON is valid and not an error
+    """
+    is_success = cmd_result['success']
+    if not is_success and cmd_result['exit_code'] == 255 and "invalid XML" in cmd_result['stderr']:
+        output = cmd_result['stderr']
+
+        # Look for b'{...}' pattern which is how AWS CLI dumps the response body
+        start_marker = "b'{"
+        end_marker = "}'"
+
+        start_idx = output.find(start_marker)
+        if start_idx != -1:
+            # Find the end marker after start_marker
+            # We use rfind from the end, but limiting to reasonably close to end of string if needed
+            # But simple logic: find matching closing brace quote
+            # Ideally we want the last }'
+            end_idx = output.rfind(end_marker)
+
+            if end_idx != -1 and end_idx > start_idx:
+                # Extract the content inside b'{...}'
+                # start_marker is 3 chars: b ' {
+                # We want to extract { ... }
+                # So from start_idx + 2 to end_idx + 1 (to include })
+                json_bytes_repr = output[start_idx + 2 : end_idx + 1]
+
+                try:
+                    # AWS CLI output is repr(bytes), so newlines are escaped as \n
+                    # quotes might be escaped? json.loads handles escaped quotes inside strings
+                    # But we need to convert literal \n to actual newlines
+                    json_str = json_bytes_repr.replace("\\n", "\n")
+
+                    response = json.loads(json_str)
+                    # If response doesn't contain "Error" (or Error is inside ResponseMetadata which we don't have), it's likely success
+                    # Also check for lower case "error" just in case
+                    if "Error" not in response and "error" not in response:
+                        is_success = True
+                        cmd_result['success'] = True
+                        cmd_result['note'] = "Marked success despite XML parse error (valid JSON received)"
+                except Exception:
+                    pass
+    return is_success
+
+
 def check_emulator_health(endpoint_url, timeout=10, retry=3):
     """
     Check if emulator is running and healthy.
@@ -90,6 +150,129 @@ def check_emulator_health(endpoint_url, timeout=10, retry=3):
     return False
 
 
+def infer_chains(commands):
+    """
+    Group commands that depend on each other, from the script order.
+
+    Two commands are linked when they act on the same kind of resource
+    (allocate-address, release-address and describe-addresses), which also
+    covers singletons and IDs the emulator hands out, or name the same
+    resource: a resource ID, or the value of a --*-name(s) flag (key pairs,
+    placement groups, ...). Each chain keeps script order and runs as a
+    unit; different chains can run in parallel.
+
+    Returns:
+        list: Chains (lists of command indices), ordered by their first command
+    """
+    parent = list(range(len(commands)))
+
+    def find(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    first_use = {}
+    for idx, cmd in enumerate(commands):
+        keys = set(RESOURCE_ID_RE.findall(cmd))
+        try:
+            tokens = shlex.split(cmd)
+        except ValueError:
+            tokens = cmd.split()
+        if len(tokens) > 2:
+            # The resource of the action, singular: describe-addresses -> address
+            noun = tokens[2].partition('-')[2] or tokens[2]
+            keys.add('kind:' + re.sub(r'(?<=ss|sh|ch)es$|(?<!s)s$', '', noun))
+        for flag, value in zip(tokens, tokens[1:]):
+            if flag.startswith('--') and flag.endswith(('-name', '-names')):
+                keys.add(value)
+        for key in keys:
+            if key in first_use:
+                parent[find(idx)] = find(first_use[key])
+            else:
+                first_use[key] = idx
+
+    chains = {}
+    for idx in range(len(commands)):
+        chains.setdefault(find(idx), []).append(idx)
+    return sorted(chains.values(), key=lambda chain: chain[0])
+
+
+class ForkNamespace:
+    """
+    An isolated state namespace for one chain: an emulator fork, selected
+    by an access key of its own. The awscli wrapper always uses the [vera]
+    profile, so the chain's commands get a credentials file whose [vera]
+    profile has that key (AWS_SHARED_CREDENTIALS_FILE).
+    """
+
+    def __init__(self, endpoint_url, number, directory):
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.access_key = f"AKIAVERAEVAL{number:08d}"
+        name = f"eval-{number}"
+        query = urllib.parse.urlencode({'name': name, 'access_key': self.access_key})
+        request = urllib.request.Request(f"{self.endpoint_url}/_admin/forks?{query}", method='POST')
+        with urllib.request.urlopen(request, timeout=30) as response:
+            self.fork_id = json.load(response)['forkId']
+        self.credentials_file = os.path.join(directory, f"{name}.credentials")
+        with open(self.credentials_file, 'w', encoding='utf-8') as f:
+            f.write(f"[vera]\naws_access_key_id = {self.access_key}\n"
+                    f"aws_secret_access_key = test\nregion = us-east-1\n")
+        self.env = dict(os.environ, AWS_SHARED_CREDENTIALS_FILE=self.credentials_file)
+
+    def close(self):
+        """Drop the fork and everything created in it."""
+        request = urllib.request.Request(f"{self.endpoint_url}/_admin/forks/{self.fork_id}", method='DELETE')
+        try:
+            urllib.request.urlopen(request, timeout=30).close()
+        except OSError:
+            pass
+        os.remove(self.credentials_file)
+
+
+def run_parallel(commands, indices, results, checkpoint_file, endpoint_url, jobs):
+    """
+    Run ``indices`` of ``commands`` on ``jobs`` workers, chain by chain (see
+    infer_chains), each chain in a fork of its own, saving results into
+    ``results`` in the sequential checkpoint format as they arrive.
+    """
+    wanted = set(indices)
+    chains = [[idx for idx in chain if idx in wanted] for chain in infer_chains(commands)]
+    chains = [chain for chain in chains if chain]
+    print(f"Running {len(indices)} commands as {len(chains)} independent chains on {jobs} workers\n")
+    lock = threading.Lock()
+    done = [0]
+
+    def run_chain(number, chain, directory):
+        namespace = ForkNamespace(endpoint_url, number, directory)
+        try:
+            for idx in chain:
+                cmd = commands[idx]
+                cmd_result = run_command(cmd, timeout=30, env=namespace.env)
+                is_success = check_json_response(cmd_result)
+                with lock:
+                    done[0] += 1
+                    mark = '✓' if is_success else '✗'
+                    print(f"[{done[0]}/{len(indices)}] {mark} {idx}: {cmd[:100]}{'...' if len(cmd) > 100 else ''}",
+                          flush=True)
+                    results['commands'][idx] = {
+                        'command': cmd,
+                        'index': idx,
+                        'result': cmd_result,
+                        'timestamp': datetime.now().isoformat(),
+                        'chain': number
+                    }
+                    save_checkpoint(results, checkpoint_file)
+        finally:
+            namespace.close()
+
+    with tempfile.TemporaryDirectory(prefix='vera-eval-') as directory:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(run_chain, number, chain, directory) for number, chain in enumerate(chains)]
+            for future in as_completed(futures):
+                future.result()
+
+
 def save_checkpoint(results, checkpoint_file):
     """Save results to checkpoint file."""
     with open(checkpoint_file, 'w', encoding='utf-8') as f:
@@ -97,7 +280,7 @@ def save_checkpoint(results, checkpoint_file):
 
 
 def run_evaluation(script_file, checkpoint_file='eval_results_emulator.json',
-                   start_from=0, endpoint_url='http://localhost:5003'):
+                   start_from=0, endpoint_url='http://localhost:5003', jobs=1):
     """
     Run evaluation of commands from bash script.
     
@@ -106,6 +289,7 @@ def run_evaluation(script_file, checkpoint_file='eval_results_emulator.json',
         checkpoint_file: Path to save results JSON
         start_from: Command index to start from (for resuming)
         endpoint_url: Endpoint URL for the emulator (used for health check)
+        jobs: Parallel workers; above 1, each chain of dependent commands runs in its own fork
     """
     # Parse commands
     print(f"Parsing commands from: {script_file}")
@@ -139,84 +323,51 @@ def run_evaluation(script_file, checkpoint_file='eval_results_emulator.json',
         with open(checkpoint_file, 'r', encoding='utf-8') as f:
             results = json.load(f)
     
-    # Main evaluation loop
-    for idx in range(start_from, len(commands)):
-        cmd = commands[idx]
-
-        print(f"\n{'='*80}")
-        print(f"Command {idx + 1}/{len(commands)}")
-        print(f"{'='*80}")
-        print(f"Command: {cmd[:100]}{'...' if len(cmd) > 100 else ''}")
-
-        # Run the command
-        print(f"  → Running command...", flush=True)
-        cmd_result = run_command(cmd, timeout=30)
+    if jobs > 1:
+        # Resuming skips the commands the checkpoint already has
+        indices = [idx for idx in range(start_from, len(commands))
+                   if idx not in results['commands'] and str(idx) not in results['commands']]
+        run_parallel(commands, indices, results, checkpoint_file, endpoint_url, jobs)
+    else:
+        # Main evaluation loop
+        for idx in range(start_from, len(commands)):
+            cmd = commands[idx]
+
+            print(f"\n{'='*80}")
+            print(f"Command {idx + 1}/{len(commands)}")
+            print(f"{'='*80}")
+            print(f"Command: {cmd[:100]}{'...' if len(cmd) > 100 else ''}")
+
+            # Run the command
+            print(f"  → Running command...", flush=True)
+            cmd_result = run_command(cmd, timeout=30)
         
-        # Custom success check for JSON/XML mismatch
-        # AWS CLI fails if it receives JSON instead of XML, but we consider it success if the JSON is valid and not an error
-        is_success = cmd_result['success']
-        if not is_success and cmd_result['exit_code'] == 255 and "invalid XML" in cmd_result['stderr']:
-            output = cmd_result['stderr']
-            
-            # Look for b'{...}' pattern which is how AWS CLI dumps the response body
-            start_marker = "b'{"
-            end_marker = "}'"
-            
-            start_idx = output.find(start_marker)
-            if start_idx != -1:
-                # Find the end marker after start_marker
-                # We use rfind from the end, but limiting to reasonably close to end of string if needed
-                # But simple logic: find matching closing brace quote
-                # Ideally we want the last }'
-                end_idx = output.rfind(end_marker)
-                
-                if end_idx != -1 and end_idx > start_idx:
-                    # Extract the content inside b'{...}'
-                    # start_marker is 3 chars: b ' {
-                    # We want to extract { ... }
-                    # So from start_idx + 2 to end_idx + 1 (to include })
-                    json_bytes_repr = output[start_idx + 2 : end_idx + 1]
-                    
-                    try:
-                        # AWS CLI output is repr(bytes), so newlines are escaped as \n
-                        # quotes might be escaped? json.loads handles escaped quotes inside strings
-                        # But we need to convert literal \n to actual newlines
-                        json_str = json_bytes_repr.replace("\\n", "\n")
-                        
-                        response = json.loads(json_str)
-                        # If response doesn't contain "Error" (or Error is inside ResponseMetadata which we don't have), it's likely success
-                        # Also check for lower case "error" just in case
-                        if "Error" not in response and "error" not in response:
-                            is_success = True
-                            cmd_result['success'] = True
-                            cmd_result['note'] = "Marked success despite XML parse error (valid JSON received)"
-                    except Exception:
-                        pass
-
-        # Print result summary
-        if is_success:
-            print(f"  ✓ Success (exit code: {cmd_result['exit_code']})")
-            if cmd_result.get('note'):
-                print(f"    Note: {cmd_result['note']}")
-        else:
-            print(f"  ✗ Failed (exit code: {cmd_result['exit_code']})")
-            if cmd_result['error']:
-                print(f"    Error: {cmd_result['error']}")
-            if cmd_result['stderr']:
-                stderr_preview = cmd_result['stderr'][:200]
-                print(f"    Stderr: {stderr_preview}{'...' if len(cmd_result['stderr']) > 200 else ''}")
+            is_success = check_json_response(cmd_result)
+
+            # Print result summary
+            if is_success:
+                print(f"  ✓ Success (exit code: {cmd_result['exit_code']})")
+                if cmd_result.get('note'):
+                    print(f"    Note: {cmd_result['note']}")
+            else:
+                print(f"  ✗ Failed (exit code: {cmd_result['exit_code']})")
+                if cmd_result['error']:
+                    print(f"    Error: {cmd_result['error']}")
+                if cmd_result['stderr']:
+                    stderr_preview = cmd_result['stderr'][:200]
+                    print(f"    Stderr: {stderr_preview}{'...' if len(cmd_result['stderr']) > 200 else ''}")
         
-        # Save result
-        results['commands'][idx] = {
-            'command': cmd,
-            'index': idx,
-            'result': cmd_result,
-            'timestamp': datetime.now().isoformat()
-        }
+            # Save result
+            results['commands'][idx] = {
+                'command': cmd,
+                'index': idx,
+                'result': cmd_result,
+                'timestamp': datetime.now().isoformat()
+            }
         
-        # Save checkpoint
-        print(f"  → Saving checkpoint...", flush=True)
-        save_checkpoint(results, checkpoint_file)
+            # Save checkpoint
+            print(f"  → Saving checkpoint...", flush=True)
+            save_checkpoint(results, checkpoint_file)
     
     # Final summary
     print(f"\n\n{'='*80}")
@@ -267,6 +418,9 @@ Examples:
   
   # Use custom checkpoint file
   python eval_emulator.py test.sh --checkpoint my_results.json
+
+  # Run on 8 parallel workers, each chain of dependent commands in its own fork
+  python eval_emulator.py test.sh --jobs 8
         """
     )
     
@@ -297,6 +451,14 @@ Examples:
         help='Emulator endpoint URL (default: http://localhost:5003)'
     )
     
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=1,
+        help='Parallel workers; 0 for one per CPU (default: 1, sequential on the shared state)'
+    )
+    
     args = parser.parse_args()
 
     # Check if script file exists
@@ -308,7 +470,7 @@ Examples:
     # Run evaluation
     try:
         run_evaluation(script_path, args.checkpoint, args.start_from,
-                      args.endpoint)
+                      args.endpoint, args.jobs or os.cpu_count())
     except KeyboardInterrupt:
         print("\n\nInterrupted by user. Progress has been saved.")
         sys.exit(0)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator: replays the CLI corpus against a running emulator.
+
+Sends the Query-protocol requests the AWS CLI sends for the `aws ec2`
+commands of cli/aws_commands.json (extracted from the cli/ec2/*.rst
+examples), round-robin from --concurrency workers over a pool of
+keep-alive connections (asyncio, no dependencies beyond the standard
+library), optionally capped at --rate requests per second.
+
+The requests come from cli/aws_requests.json, which --regenerate writes by
+running each corpus command through the AWS CLI in-process, so parameter
+names, list and structure encodings and timestamps are exactly the CLI's.
+Commands the CLI sends nothing for are skipped and counted by reason:
+waiters, commands that read local files and commands the CLI rejects.
+Rerun --regenerate after changing the corpus.
+
+Reports throughput, latency percentiles overall and per action, and errors
+broken down by HTTP status and error code. Many corpus commands name IDs
+that do not exist, so NotFound-style errors are expected; --read-only
+replays only the Describe/Get/List commands, which leave the state as is.
+
+Usage:
+    python loadgen.py --endpoint http://localhost:5003 --concurrency 32 --duration 30
+    python loadgen.py --read-only --rate 500 --requests 20000 --output load.json
+    uv run --with awscli loadgen.py --regenerate
+"""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import io
+import json
+import os
+import re
+import shlex
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+CORPUS = Path(__file__).resolve().parent / "cli" / "aws_commands.json"
+# The Query parameters the AWS CLI sends for each corpus command, see regenerate()
+REQUESTS = Path(__file__).resolve().parent / "cli" / "aws_requests.json"
+READ_ONLY_PREFIXES = ("Describe", "Get", "List", "Search")
+
+
+class Request(NamedTuple):
+    name: str
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+# ---------------------------------------------------------------------------
+# Corpus -> Query-protocol requests
+# ---------------------------------------------------------------------------
+
+def regenerate() -> Dict[str, int]:
+    """
+    Run every corpus command through the AWS CLI in-process and write the
+    Query parameters it sends (or why it sends none) to REQUESTS. Needs
+    awscli importable; no request leaves the process. Returns counts by
+    outcome.
+    """
+    # Dummy credentials and no config files: the user's profile must not shape the requests
+    os.environ.update(AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing", AWS_DEFAULT_REGION="us-east-1",
+                      AWS_CONFIG_FILE=os.devnull, AWS_SHARED_CREDENTIALS_FILE=os.devnull)
+    os.environ.pop("AWS_PROFILE", None)
+    import awscli
+    from awscli.clidriver import create_clidriver
+    from botocore.awsrequest import AWSResponse
+
+    class _Empty:
+        def stream(self, **kwargs: Any) -> Any:
+            yield b'<Response xmlns="http://ec2.amazonaws.com/doc/2016-11-15/"><requestId>0</requestId></Response>'
+
+    # Body of each request the CLI sends, answered with an empty response
+    sent: List[bytes] = []
+
+    def capture(request: Any, **kwargs: Any) -> Any:
+        body = request.body or b""
+        sent.append(body.encode() if isinstance(body, str) else body)
+        return AWSResponse(request.url, 200, {}, _Empty())
+
+    def new_driver() -> Any:
+        # A fresh CLI per command (customizations leave handlers behind); only the loader's cache is shared
+        driver = create_clidriver()
+        driver.session.register_component("data_loader", loader)
+        driver.session.register("before-send.ec2", capture)
+        return driver
+
+    loader = create_clidriver().session.get_component("data_loader")
+    with open(CORPUS) as handle:
+        corpus = json.load(handle)
+    commands: Dict[str, Dict[str, Any]] = {}
+    for entries in corpus.values():
+        for entry in entries:
+            command = entry["cmd"]
+            if command not in commands:
+                commands[command] = _translate(command, new_driver, sent)
+    with open(REQUESTS, "w") as handle:
+        json.dump({"awscli": awscli.__version__, "commands": commands}, handle, indent=1, sort_keys=True)
+        handle.write("\n")
+    return dict(collections.Counter(result.get("skipped", "replayable") for result in commands.values()))
+
+
+def _translate(command: str, new_driver: Any, sent: List[bytes]) -> Dict[str, Any]:
+    """{"params": Query parameters} of one corpus command, or {"skipped": reason, ...}."""
+    try:
+        tokens = shlex.split(command.replace("\\\n", " "))
+    except ValueError as e:
+        return {"skipped": "not valid shell syntax", "error": str(e)}
+    if len(tokens) < 3 or tokens[:2] != ["aws", "ec2"]:
+        return {"skipped": "not an aws ec2 command"}
+    if tokens[2] == "wait":
+        return {"skipped": "waiter"}
+    if any("file://" in token or "fileb://" in token for token in tokens):
+        return {"skipped": "reads local files"}
+    del sent[:]
+    errors = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+        try:
+            new_driver().main(tokens[1:] + ["--endpoint-url", "http://localhost:5003"])
+        except (Exception, SystemExit):
+            pass
+    if not sent:
+        # The message, not the usage text around it
+        lines = [line for line in errors.getvalue().splitlines()
+                 if line.strip() and not line.startswith((" ", "usage:", "To see help", "Note:"))]
+        error = next((line for line in lines if "error" in line.lower()), lines[0] if lines else "")
+        return {"skipped": "rejected by the AWS CLI", "error": error}
+    return {"params": dict(parse_qsl(sent[0].decode(), keep_blank_values=True))}
+
+
+def load_corpus(read_only: bool, pattern: Optional[str],
+                skipped: Optional["collections.Counter[str]"] = None) -> List[Request]:
+    """
+    The replayable requests of the corpus, in corpus order. ``skipped``, if
+    given, counts the commands left out because they cannot be replayed, by
+    reason.
+    """
+    with open(CORPUS) as handle:
+        corpus = json.load(handle)
+    with open(REQUESTS) as handle:
+        translated = json.load(handle)["commands"]
+    requests = []
+    for entries in corpus.values():
+        for entry in entries:
+            result = translated.get(entry["cmd"], {"skipped": f"not in {REQUESTS.name} (run --regenerate)"})
+            if "params" not in result:
+                if skipped is not None:
+                    skipped[result["skipped"]] += 1
+                continue
+            params = result["params"]
+            action = params["Action"]
+            if read_only and not action.startswith(READ_ONLY_PREFIXES):
+                continue
+            if pattern and not re.search(pattern, action):
+                continue
+            body = urlencode(params).encode()
+            headers = {"Content-Type": "application/x-www-form-urlencoded; charset=utf-8"}
+            requests.append(Request(action, "POST", "/", headers, body))
+    return requests
+
+
+def error_code(status: int, body: bytes) -> Optional[str]:
+    """The error code of a response (None on success)."""
+    if status < 400:
+        return None
+    match = re.search(rb"<Code>(.*?)</Code>", body)
+    return match.group(1).decode(errors="replace") if match else f"HTTP{status}"
+
+
+# ---------------------------------------------------------------------------
+# Keep-alive HTTP/1.1 client
+# ---------------------------------------------------------------------------
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reopened after the server closes it."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, request: Request) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        head = [f"{request.method} {request.path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                f"Content-Length: {len(request.body)}", "Connection: keep-alive"]
+        head.extend(f"{name}: {value}" for name, value in request.headers.items())
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + request.body)
+        try:
+            return await self._response()
+        except BaseException:
+            self.close()
+            raise
+
+    async def _response(self) -> Tuple[int, bytes]:
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the server")
+        version, status = status_line.split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close" or version == b"HTTP/1.0":
+            self.close()
+        return int(status), body
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class Pool:
+    """Up to ``size`` keep-alive connections, handed out one request at a time."""
+
+    def __init__(self, endpoint: str, size: int) -> None:
+        parts = urlsplit(endpoint)
+        self._idle: "asyncio.Queue[Connection]" = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(Connection(parts.hostname or "localhost", parts.port or 80))
+
+    async def request(self, request: Request) -> Tuple[int, bytes]:
+        connection = await self._idle.get()
+        try:
+            return await connection.request(request)
+        finally:
+            self._idle.put_nowait(connection)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+# ---------------------------------------------------------------------------
+# Replay and report
+# ---------------------------------------------------------------------------
+
+class Stats:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, "collections.Counter[Tuple[str, str]]"] = collections.defaultdict(collections.Counter)
+
+    def record(self, name: str, seconds: float, status: str, code: Optional[str]) -> None:
+        self.latencies[name].append(seconds)
+        if code is not None:
+            self.errors[name][(status, code)] += 1
+
+
+async def replay(requests: List[Request], endpoint: str, concurrency: int, connections: int, rate: float,
+                 duration: float, total: int, timeout: float) -> Tuple[Stats, float]:
+    """Replay ``requests`` round-robin until ``duration`` seconds or ``total`` requests; returns stats and seconds."""
+    pool = Pool(endpoint, connections)
+    stats = Stats()
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration else float("inf")
+
+    async def worker() -> None:
+        nonlocal sent
+        while True:
+            index = sent
+            if (total and index >= total) or time.perf_counter() >= deadline:
+                return
+            sent += 1
+            if rate:
+                delay = start + index / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            request = requests[index % len(requests)]
+            began = time.perf_counter()
+            try:
+                status, body = await asyncio.wait_for(pool.request(request), timeout)
+                stats.record(request.name, time.perf_counter() - began, str(status), error_code(status, body))
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                stats.record(request.name, time.perf_counter() - began, "transport", type(e).__name__)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    pool.close()
+    return stats, time.perf_counter() - start
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e3, 3)
+
+    return {"p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1e3, 3)}
+
+
+def report(stats: Stats, seconds: float, args: argparse.Namespace) -> Dict[str, Any]:
+    everything = [latency for latencies in stats.latencies.values() for latency in latencies]
+    errors: "collections.Counter[Tuple[str, str]]" = collections.Counter()
+    for counter in stats.errors.values():
+        errors.update(counter)
+    return {
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "connections": args.connections or args.concurrency,
+        "rate": args.rate,
+        "seconds": round(seconds, 3),
+        "requests": len(everything),
+        "throughput": round(len(everything) / seconds, 1) if seconds else None,
+        "errors": sum(errors.values()),
+        "latency": _percentiles(everything) if everything else {},
+        "errorsByCode": [{"status": status, "code": code, "count": count}
+                         for (status, code), count in errors.most_common()],
+        "actions": {name: {"requests": len(latencies), "errors": sum(stats.errors[name].values()),
+                           **_percentiles(latencies)}
+                    for name, latencies in sorted(stats.latencies.items())},
+    }
+
+
+def print_report(summary: Dict[str, Any], top: int) -> None:
+    latency = summary["latency"]
+    print(f"requests:   {summary['requests']} in {summary['seconds']:.1f} s "
+          f"({summary['throughput']} req/s, concurrency {summary['concurrency']})")
+    if latency:
+        print(f"latency:    p50 {latency['p50_ms']} ms, p90 {latency['p90_ms']} ms, "
+              f"p99 {latency['p99_ms']} ms, max {latency['max_ms']} ms")
+    print(f"errors:     {summary['errors']}")
+    for row in summary["errorsByCode"][:top]:
+        print(f"  {row['count']:>8}  {row['status']:<9} {row['code']}")
+    print()
+    print(f"{'action':<48} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    slowest = sorted(summary["actions"].items(), key=lambda item: -item[1]["p99_ms"])
+    for name, row in slowest[:top]:
+        print(f"{name:<48} {row['requests']:>8} {row['errors']:>7} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", default="http://localhost:5003", help="emulator URL")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--connections", type=int, default=0, help="keep-alive connections (default: concurrency)")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second over all workers (0: unlimited)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run (0: until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="requests to send (0: until --duration)")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a request counts as failed")
+    parser.add_argument("--read-only", action="store_true", help="only replay Describe/Get/List/Search commands")
+    parser.add_argument("--actions", metavar="REGEX", help="only replay actions matching this pattern")
+    parser.add_argument("--top", type=int, default=20, help="error codes and slowest actions to print")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--regenerate", action="store_true",
+                        help=f"rewrite cli/{REQUESTS.name} with the AWS CLI (needs awscli) and exit")
+    args = parser.parse_args()
+    if args.regenerate:
+        try:
+            counts = regenerate()
+        except ImportError as e:
+            parser.error(f"--regenerate needs awscli ({e}); try: uv run --with awscli loadgen.py --regenerate")
+        print(f"wrote {REQUESTS}: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(counts.items())))
+        return 0
+    if not args.duration and not args.requests:
+        parser.error("give --duration or --requests")
+
+    skipped: "collections.Counter[str]" = collections.Counter()
+    requests = load_corpus(args.read_only, args.actions, skipped)
+    if not requests:
+        parser.error("no corpus commands left to replay")
+    if skipped:
+        print(f"skipping {sum(skipped.values())} corpus commands: "
+              + ", ".join(f"{count} {reason}" for reason, count in skipped.most_common()))
+    print(f"replaying {len(requests)} corpus requests against {args.endpoint}")
+    stats, seconds = asyncio.run(replay(requests, args.endpoint, args.concurrency,
+                                        args.connections or args.concurrency, args.rate,
+                                        args.duration, args.requests, args.timeout))
+    summary = report(stats, seconds, args)
+    summary["skipped"] = dict(skipped)
+    print_report(summary, args.top)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(summary, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
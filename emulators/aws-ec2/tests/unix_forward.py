@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+TCP to Unix socket forwarder, for clients that only speak TCP (the AWS CLI,
+Terraform) and an emulator listening on a Unix socket (main.py
+--unix-socket, with or without --no-tcp).
+
+Listens on --listen (default: a free loopback port) and forwards each
+connection to --socket. Given a command after `--`, runs it while
+forwarding, with `{endpoint}` in its arguments and VERA_ENDPOINT in its
+environment set to the forwarder's URL, and exits with its exit code;
+otherwise forwards until interrupted.
+
+Usage:
+    unix_forward.py --socket /tmp/vera.sock -- aws ec2 describe-vpcs --endpoint-url {endpoint}
+    unix_forward.py --socket /tmp/vera.sock --listen 127.0.0.1:5003 -- terraform apply
+    unix_forward.py --socket /tmp/vera.sock --listen 127.0.0.1:5003
+
+The awscli and terlocal wrappers from install.sh go through it when
+VERA_UNIX_SOCKET is set (awscli only when no CLI driver is running: the
+driver sends requests over the socket itself, see cli_driver.py).
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+CHUNK = 65536
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(CHUNK)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        try:
+            writer.write_eof()
+        except (OSError, RuntimeError):
+            writer.close()
+
+
+async def _forward(path, client_reader, client_writer):
+    try:
+        server_reader, server_writer = await asyncio.open_unix_connection(path)
+    except OSError as e:
+        print(f"unix_forward: cannot connect to {path}: {e}", file=sys.stderr)
+        client_writer.close()
+        return
+    await asyncio.gather(_pipe(client_reader, server_writer), _pipe(server_reader, client_writer))
+    server_writer.close()
+    client_writer.close()
+
+
+async def run(path, host, port, command):
+    """Forward host:port to ``path``, while ``command`` runs (forever if None); returns an exit code."""
+    server = await asyncio.start_server(lambda r, w: _forward(path, r, w), host, port)
+    port = server.sockets[0].getsockname()[1]
+    endpoint = f"http://{host}:{port}"
+    async with server:
+        if command is None:
+            print(f"Forwarding {endpoint} to unix:{path}", file=sys.stderr)
+            await server.serve_forever()
+        env = dict(os.environ, VERA_ENDPOINT=endpoint)
+        argv = [arg.replace("{endpoint}", endpoint) for arg in command]
+        try:
+            process = await asyncio.create_subprocess_exec(*argv, env=env)
+        except OSError as e:
+            print(f"unix_forward: {argv[0]}: {e}", file=sys.stderr)
+            return 127
+        loop = asyncio.get_running_loop()
+        # Ctrl-C reaches the command through the terminal; pass SIGTERM and SIGHUP on
+        loop.add_signal_handler(signal.SIGINT, lambda: None)
+        for signum in (signal.SIGTERM, signal.SIGHUP):
+            loop.add_signal_handler(signum, process.send_signal, signum)
+        code = await process.wait()
+    return code if code >= 0 else 128 - code
+
+
+def main():
+    argv = sys.argv[1:]
+    command = None
+    if "--" in argv:
+        index = argv.index("--")
+        argv, command = argv[:index], argv[index + 1:]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=os.environ.get("VERA_UNIX_SOCKET"),
+                        help="the emulator's Unix socket (default: $VERA_UNIX_SOCKET)")
+    parser.add_argument("--listen", default="127.0.0.1:0", help="HOST:PORT to listen on (port 0: any free one)")
+    args = parser.parse_args(argv)
+    if not args.socket:
+        parser.error("give --socket or set VERA_UNIX_SOCKET")
+    if command == []:
+        parser.error("no command after --")
+    host, _, port = args.listen.rpartition(":")
+    try:
+        return asyncio.run(run(args.socket, host or "127.0.0.1", int(port), command))
+    except KeyboardInterrupt:
+        return 130
+    except OSError as e:
+        print(f"unix_forward: cannot listen on {args.listen}: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+Checkpoint and restore of the whole emulator state.
+
+A checkpoint file holds one section per state store (the dicts on GCPState)
+and one more for the remaining plain attributes. Sections are pickles laid
+out back to back after a small JSON table of contents. Restoring maps the
+file and reads only that table; each store is unpickled in place the first
+time it is used, so start-up cost does not grow with the number of
+resources.
+
+Layout:
+    b"VERACKPT"   magic
+    u32           format version
+    u32           length of the table of contents
+    JSON          {"state": state class name,
+                   "attributes": [offset, length],
+                   "stores": {name: [offset, length, resource count]},
+                   "meta": caller-supplied metadata}
+    sections      pickle protocol 5; offsets count from the end of the table
+"""
+
+import contextlib
+import dataclasses
+import gc
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"VERACKPT"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+
+_load_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Suspend the cyclic garbage collector. Unpickling a store allocates
+    containers by the million, and the collections they would trigger find
+    nothing to free while costing as much as the unpickling itself.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class LazyStore(dict):
+    """
+    A state store restored from a checkpoint section, unpickled on first use.
+
+    Backends alias their store when they are constructed, so a restored store
+    has to stay the object they hold: it starts empty and fills itself in
+    place. Until then len() answers from the table of contents, and writing
+    the store to a new checkpoint copies the section without unpickling it.
+
+    Example:
+        store = LazyStore(section, 3)
+        len(store)  # Returns: 3 (nothing unpickled yet)
+        store.get("default")  # unpickles the section, then behaves as a dict
+    """
+
+    __slots__ = ("_section", "_count")
+
+    def __init__(self, section: Optional[memoryview], count: int) -> None:
+        super().__init__()
+        self._section = section
+        self._count = count
+
+    @property
+    def loaded(self) -> bool:
+        return self._section is None
+
+    def _load(self) -> None:
+        with _load_lock:
+            section = self._section
+            if section is not None:
+                with _gc_paused():
+                    dict.update(self, pickle.loads(section))
+                self._section = None
+
+    def __len__(self) -> int:
+        if self._section is not None:
+            return self._count
+        return dict.__len__(self)
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # Copies and pickles of a restored store are plain dicts
+        return dict, (dict(self.items()),)
+
+
+def _loading(name: str) -> Any:
+    method = getattr(dict, name)
+
+    def wrapper(self: LazyStore, *args: Any, **kwargs: Any) -> Any:
+        if self._section is not None:
+            self._load()
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__qualname__ = f"LazyStore.{name}"
+    return wrapper
+
+
+for _name in ("__contains__", "__delitem__", "__eq__", "__getitem__", "__ior__", "__iter__", "__ne__", "__or__",
+              "__repr__", "__reversed__", "__setitem__", "clear", "copy", "get", "items", "keys", "pop", "popitem",
+              "setdefault", "update", "values"):
+    setattr(LazyStore, _name, _loading(_name))
+del _name
+
+
+class _Layout:
+    """
+    Per-model field defaults: ``template`` for plain defaults, ``factories``
+    for default_factory fields. ``slotted`` models (see models.py) keep
+    their fields in slots rather than in __dict__.
+    """
+
+    __slots__ = ("template", "factories", "blank", "slotted")
+
+    def __init__(self, cls: type) -> None:
+        self.template: Dict[str, Any] = {}
+        self.factories: List[Tuple[str, Any]] = []
+        self.slotted = hasattr(cls, "__model_raw__")
+        for item in dataclasses.fields(cls):
+            if item.default is not dataclasses.MISSING:
+                self.template[item.name] = item.default
+            elif item.default_factory is not dataclasses.MISSING:
+                self.factories.append((item.name, item.default_factory))
+        # What a freshly constructed model holds, to compare fields against
+        self.blank = dict(self.template)
+        self.blank.update((name, factory()) for name, factory in self.factories)
+
+
+_layouts: Dict[type, Optional[_Layout]] = {}
+
+
+def _layout(cls: type) -> Optional[_Layout]:
+    """The field layout of a resource model class, None for any other class."""
+    try:
+        return _layouts[cls]
+    except KeyError:
+        layout = _Layout(cls) if dataclasses.is_dataclass(cls) else None
+        _layouts[cls] = layout
+        return layout
+
+
+def _rebuild_model(cls: type, values: Dict[str, Any]) -> Any:
+    """Unpickle a resource model written by _Pickler: defaults plus the fields that differ."""
+    layout = _layout(cls)
+    attributes = layout.template.copy()
+    for name, factory in layout.factories:
+        if name not in values:
+            attributes[name] = factory()
+    attributes.update(values)
+    model = cls.__new__(cls)
+    if layout.slotted:
+        model.__setstate__(attributes)
+    else:
+        model.__dict__ = attributes
+    return model
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickles resource models (dataclass instances) as only the fields that
+    differ from their defaults. Most of a model's fields are empty
+    containers, so this keeps sections small and quick to unpickle.
+    """
+
+    def reducer_override(self, obj: Any) -> Any:
+        cls = type(obj)
+        layout = _layouts[cls] if cls in _layouts else _layout(cls)
+        if layout is None or isinstance(obj, type):
+            return NotImplemented
+        attributes = obj.__getstate__() if layout.slotted else getattr(obj, "__dict__", None)
+        if attributes is None:
+            return NotImplemented
+        blank = layout.blank
+        values = {}
+        for name, value in attributes.items():
+            default = blank.get(name, _MISSING)
+            if type(value) is not type(default) or value != default:
+                values[name] = value
+        return _rebuild_model, (cls, values)
+
+
+_MISSING = object()
+
+
+def _dumps(value: Any) -> bytes:
+    buffer = io.BytesIO()
+    _Pickler(buffer, protocol=5).dump(value)
+    return buffer.getvalue()
+
+
+def write_checkpoint(state: Any, path: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Write ``state`` to ``path`` (atomically, through a temporary file next to
+    it) and return a summary: number of stores, resources and bytes written.
+    ``meta`` is kept alongside it (see checkpoint_meta).
+    """
+    stores: Dict[str, Dict[str, Any]] = {}
+    attributes: Dict[str, Any] = {}
+    for name, value in vars(state).items():
+        if isinstance(value, dict):
+            stores[name] = value
+        else:
+            attributes[name] = value
+
+    sections = []
+    table: Dict[str, Any] = {"state": type(state).__name__, "stores": {}, "meta": meta or {}}
+    offset = 0
+    with _gc_paused():
+        for name in sorted(stores):
+            store = stores[name]
+            # A store nobody has touched since the restore is copied as is
+            unread = store._section if isinstance(store, LazyStore) else None
+            payload = unread if unread is not None else _dumps(store)
+            table["stores"][name] = [offset, len(payload), len(store)]
+            sections.append(payload)
+            offset += len(payload)
+        payload = _dumps(attributes)
+    table["attributes"] = [offset, len(payload)]
+    sections.append(payload)
+
+    encoded = json.dumps(table, separators=(",", ":")).encode()
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+    try:
+        with os.fdopen(handle, "wb") as output:
+            output.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            output.write(encoded)
+            for payload in sections:
+                output.write(payload)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    return {
+        "stores": len(stores),
+        "resources": sum(len(store) for store in stores.values()),
+        "bytes": _HEADER.size + len(encoded) + offset + len(payload),
+    }
+
+
+def _read_table(path: str) -> Tuple[memoryview, Dict[str, Any], int]:
+    """Map ``path`` and parse its header: (file view, table of contents, offset of the first section)."""
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size < _HEADER.size:
+            raise ValueError(f"{path} is not a checkpoint file")
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, table_length = _HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has checkpoint format {version}, expected {FORMAT_VERSION}")
+    view = memoryview(mapped)
+    table = json.loads(bytes(view[_HEADER.size:_HEADER.size + table_length]))
+    return view, table, _HEADER.size + table_length
+
+
+def read_checkpoint(path: str, state_cls: type) -> Any:
+    """
+    A new ``state_cls`` instance holding the state saved in ``path``. The file
+    is memory-mapped and stays mapped while any of its stores is unread.
+    Raises ValueError if ``path`` is not a checkpoint of ``state_cls``.
+    """
+    view, table, base = _read_table(path)
+    if table.get("state") != state_cls.__name__:
+        raise ValueError(f"{path} holds {table.get('state')} state, not {state_cls.__name__}")
+
+    state = state_cls()
+    for name, (offset, length, count) in table["stores"].items():
+        setattr(state, name, LazyStore(view[base + offset:base + offset + length], count))
+    offset, length = table["attributes"]
+    for name, value in pickle.loads(view[base + offset:base + offset + length]).items():
+        setattr(state, name, value)
+    return state
+
+
+def checkpoint_meta(path: str) -> Dict[str, Any]:
+    """The ``meta`` the checkpoint at ``path`` was written with."""
+    return _read_table(path)[1].get("meta", {})
+
+
+def install_state(state: Any, backends: Iterable[Any]) -> Any:
+    """
+    Make ``state`` the shared singleton and point ``backends`` (and their
+    store aliases) at it. Returns the state it replaced.
+    """
+    state_cls = type(state)
+    previous = state_cls.get()
+    names = {id(value): name for name, value in vars(previous).items()}
+    for backend in backends:
+        if getattr(backend, "state", None) is not previous:
+            continue
+        backend.state = state
+        name = names.get(id(getattr(backend, "resources", None)))
+        if name is not None:
+            if not hasattr(state, name):
+                setattr(state, name, {})
+            backend.resources = getattr(state, name)
+    state_cls._instance = state
+    return previous
@@ -0,0 +1,389 @@
+"""
+Named copy-on-write forks of the emulator state, for per-test isolation.
+
+Forking freezes the current stores: the live state and the new fork both
+get a CowStore per store, layered over the same frozen dict. A CowStore
+shares the frozen resources until a mutating request touches one; it then
+copies that resource into its own layer first, so nothing frozen is ever
+changed in place. Creating a fork therefore costs O(number of stores), and
+unchanged resources stay shared in memory between all forks.
+
+Tenants are forks too: with max_tenants set, each tenant key (an access
+key, a project and token) gets its own fork of the main state on first use,
+and the least recently used tenant is dropped once there are too many.
+
+Only one request runs against the backends at a time (see
+ForkRegistry.route): the backends alias a single state, so routing a
+request to a fork means installing that fork's state for its duration.
+
+Example:
+    forks = ForkRegistry(GCPState, backends)
+    fork = forks.create(name="test_firewall_rules")
+    with forks.route(fork, writing=True):
+        network_backend.insert(params)  # only in the fork
+    forks.drop(fork.fork_id)
+"""
+
+import collections
+import contextlib
+import copy
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .checkpoint import install_state
+
+# Set while a mutating request runs: CowStores copy the frozen resources it reads
+_copying = False
+
+_MISSING = object()
+
+
+class CowStore(dict):
+    """
+    A state store layered over a frozen dict shared with other forks.
+
+    The dict itself holds the resources this fork added or copied, and
+    ``_deleted`` the frozen keys it removed. Reads made while a mutating
+    request runs copy the resource they return (deepcopy) into the dict, so
+    the request can change it freely; other reads return the shared object.
+    keys(), values() and items() return lists.
+
+    Example:
+        store = CowStore({"default": network})
+        store["default"] is network  # Returns: True (outside a mutating request)
+        del store["default"]         # the frozen dict still holds it
+    """
+
+    __slots__ = ("_base", "_deleted", "_extra")
+
+    def __init__(self, base: Dict[str, Any]) -> None:
+        super().__init__()
+        self._base = base
+        self._deleted: set = set()
+        # Keys held in the dict but not in the frozen one
+        self._extra = 0
+
+    @property
+    def touched(self) -> bool:
+        """Whether this store has diverged from its frozen dict."""
+        return bool(dict.__len__(self) or self._deleted)
+
+    def _lookup(self, key: Any, default: Any) -> Any:
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        if key in self._deleted:
+            return default
+        value = self._base.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        if _copying:
+            value = copy.deepcopy(value)
+            dict.__setitem__(self, key, value)
+        return value
+
+    def _iter_keys(self) -> Iterator[Any]:
+        deleted = self._deleted
+        for key in self._base:
+            if key not in deleted:
+                yield key
+        if self._extra:
+            base = self._base
+            for key in list(dict.keys(self)):
+                if key not in base:
+                    yield key
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self._lookup(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self._lookup(key, default)
+
+    def __contains__(self, key: Any) -> bool:
+        if dict.__contains__(self, key):
+            return True
+        return key not in self._deleted and key in self._base
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if key in self._base:
+            self._deleted.discard(key)
+        elif not dict.__contains__(self, key):
+            self._extra += 1
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        if dict.__contains__(self, key):
+            dict.__delitem__(self, key)
+            if key in self._base:
+                self._deleted.add(key)
+            else:
+                self._extra -= 1
+        elif key in self._base and key not in self._deleted:
+            self._deleted.add(key)
+        else:
+            raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._deleted) + self._extra
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._iter_keys()))
+
+    def __reversed__(self) -> Iterator[Any]:
+        return reversed(list(self._iter_keys()))
+
+    def keys(self) -> List[Any]:
+        return list(self._iter_keys())
+
+    def values(self) -> List[Any]:
+        return [self._lookup(key, None) for key in self._iter_keys()]
+
+    def items(self) -> List[Any]:
+        return [(key, self._lookup(key, None)) for key in self._iter_keys()]
+
+    def pop(self, key: Any, default: Any = _MISSING) -> Any:
+        value = self._lookup(key, _MISSING)
+        if value is _MISSING:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        del self[key]
+        return value
+
+    def popitem(self) -> Any:
+        for key in reversed(list(self._iter_keys())):
+            return key, self.pop(key)
+        raise KeyError("popitem(): dictionary is empty")
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        value = self._lookup(key, _MISSING)
+        if value is _MISSING:
+            self[key] = value = default
+        return value
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other: Any) -> "CowStore":
+        self.update(other)
+        return self
+
+    def __or__(self, other: Any) -> Dict[str, Any]:
+        merged = dict(self.items())
+        merged.update(other)
+        return merged
+
+    def clear(self) -> None:
+        dict.clear(self)
+        self._deleted = set(self._base)
+        self._extra = 0
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        return dict(self.items()) == other
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # Copies and pickles of a forked store are plain dicts
+        return dict, (dict(self.items()),)
+
+
+def _frozen(store: Dict[str, Any]) -> Dict[str, Any]:
+    """A dict holding what ``store`` holds now, that nobody will write to again."""
+    if not isinstance(store, CowStore):
+        return store
+    if not store.touched:
+        return store._base
+    merged = dict(store._base)
+    for key in store._deleted:
+        del merged[key]
+    merged.update(dict.items(store))
+    return merged
+
+
+class Fork:
+    """One named fork: its state and how requests select it."""
+
+    __slots__ = ("fork_id", "name", "access_key", "tenant", "state", "created")
+
+    def __init__(self, fork_id: str, name: str, access_key: str, state: Any, tenant: str = "") -> None:
+        self.fork_id = fork_id
+        self.name = name
+        self.access_key = access_key
+        self.tenant = tenant
+        self.state = state
+        self.created = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        stores = [value for name, value in vars(self.state).items() if isinstance(value, CowStore)]
+        return {
+            "forkId": self.fork_id,
+            "name": self.name,
+            "accessKey": self.access_key,
+            "tenant": self.tenant,
+            "created": self.created,
+            "resources": sum(len(store) for store in stores),
+            "changedStores": sum(1 for store in stores if store.touched),
+        }
+
+
+class ForkRegistry:
+    """
+    The forks of one emulator, and the lock every request runs under.
+
+    ``backends`` returns the backend instances aliasing the state. Outside
+    route() the installed state is always the main (unforked) one.
+    ``max_tenants`` caps the tenant forks (0: no tenancy).
+    """
+
+    def __init__(self, state_cls: type, backends: Callable[[], Iterable[Any]], max_tenants: int = 0) -> None:
+        self.state_cls = state_cls
+        self._backends = backends
+        self.max_tenants = max_tenants
+        self.lock = threading.RLock()
+        self._forks: Dict[str, Fork] = {}
+        self._access_keys: Dict[str, str] = {}
+        # Tenant key -> fork ID, least recently used first
+        self._tenants: "collections.OrderedDict[str, str]" = collections.OrderedDict()
+        # (backend, name of the store it aliases), see _switch()
+        self._aliases: Optional[List[Tuple[Any, Optional[str]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._forks)
+
+    def list(self) -> List[Fork]:
+        return list(self._forks.values())
+
+    def create(self, name: str = "", access_key: str = "") -> Fork:
+        """
+        Fork the main state. Requests carrying ``access_key`` (if given) are
+        routed to the new fork. Raises ValueError if the key is taken.
+        """
+        with self.lock:
+            if access_key and access_key in self._access_keys:
+                raise ValueError(f"Access key {access_key} already maps to fork {self._access_keys[access_key]}")
+            main = self.state_cls.get()
+            if self._aliases is None:
+                names = {id(value): attr for attr, value in vars(main).items()}
+                self._aliases = [(backend, names.get(id(getattr(backend, "resources", None))))
+                                 for backend in self._backends() if getattr(backend, "state", None) is main]
+            relayered = self.state_cls()
+            forked = self.state_cls()
+            for attr, value in vars(main).items():
+                if not isinstance(value, dict):
+                    setattr(relayered, attr, value)
+                    setattr(forked, attr, copy.deepcopy(value))
+                    continue
+                frozen = _frozen(value)
+                setattr(relayered, attr, CowStore(frozen))
+                setattr(forked, attr, CowStore(frozen))
+            install_state(relayered, self._backends())
+
+            fork = Fork(f"fork-{uuid.uuid4().hex[:17]}", name, access_key, forked)
+            self._forks[fork.fork_id] = fork
+            if access_key:
+                self._access_keys[access_key] = fork.fork_id
+            return fork
+
+    def drop(self, fork_id: str) -> Fork:
+        """
+        Forget a fork. Once none is left the main state goes back to plain
+        dict stores. Raises KeyError for an unknown fork.
+        """
+        with self.lock:
+            fork = self._forks.pop(fork_id)
+            if fork.access_key:
+                self._access_keys.pop(fork.access_key, None)
+            if fork.tenant:
+                self._tenants.pop(fork.tenant, None)
+            if not self._forks:
+                main = self.state_cls.get()
+                flat = self.state_cls()
+                for attr, value in vars(main).items():
+                    setattr(flat, attr, _frozen(value))
+                install_state(flat, self._backends())
+            return fork
+
+    def tenant(self, key: str) -> Fork:
+        """
+        The fork of tenant ``key``, forked from the main state on first use.
+        Creating one past max_tenants drops the least recently used tenant.
+        """
+        with self.lock:
+            fork_id = self._tenants.get(key)
+            if fork_id is not None:
+                self._tenants.move_to_end(key)
+                return self._forks[fork_id]
+            while self._tenants and len(self._tenants) >= self.max_tenants:
+                self.drop(next(iter(self._tenants.values())))
+            fork = self.create(name=key)
+            fork.tenant = key
+            self._tenants[key] = fork.fork_id
+            return fork
+
+    def resolve(self, fork_id: Optional[str] = None, access_key: Optional[str] = None,
+                tenant: Optional[str] = None) -> Optional[Fork]:
+        """
+        The fork a request selects by fork ID or access key, else the fork of
+        its tenant key if tenancy is on, else None for the main state.
+        Raises KeyError for an unknown fork ID.
+        """
+        if fork_id:
+            return self._forks[fork_id]
+        if access_key and self._access_keys:
+            fork_id = self._access_keys.get(access_key)
+            if fork_id is not None:
+                return self._forks.get(fork_id)
+        if tenant and self.max_tenants > 0:
+            return self.tenant(tenant)
+        return None
+
+    @contextlib.contextmanager
+    def route(self, fork: Optional[Fork] = None, writing: bool = False) -> Iterator[Any]:
+        """
+        Run a request against ``fork`` (None: the main state) and yield its
+        state. ``writing`` marks a mutating request, whose reads of shared
+        resources must copy them.
+        """
+        global _copying
+        with self.lock:
+            main = None
+            if fork is not None:
+                main = self._switch(fork.state)
+            _copying = writing
+            try:
+                yield self.state_cls.get()
+            finally:
+                _copying = False
+                if main is not None:
+                    self._switch(main)
+
+    def _switch(self, state: Any) -> Any:
+        """
+        install_state() for routing: the backends and their store names are
+        known since the first fork, so this only reassigns them. Returns the
+        state it replaced.
+        """
+        for backend, attr in self._aliases:
+            backend.state = state
+            if attr is not None:
+                store = getattr(state, attr, None)
+                if store is None:
+                    store = {}
+                    setattr(state, attr, store)
+                backend.resources = store
+        previous = self.state_cls._instance
+        self.state_cls._instance = state
+        return previous
@@ -0,0 +1,134 @@
+"""
+Per-route request metrics, rendered in the Prometheus text format.
+
+The gateway times each request in phases (parse, wait for the state lock,
+backend, serialize) with a RequestTimer and hands the laps to
+Metrics.record() together with the error code, if any. Durations go into
+fixed-bucket histograms, so recording costs a lock, a few dict lookups and
+one bisect per phase, and memory stays constant however many requests are
+served. Store sizes are read from the state when the metrics are rendered.
+
+Example:
+    metrics = Metrics("route")
+    timer = metrics.timer()
+    params = parser_cls.parse_request(method_name, path_params, query_params, body)
+    timer.lap("parse")
+    ...
+    metrics.record("Instance.list", timer.laps, error=None)
+    metrics.render(GCPState.get())  # text for GET /_admin/metrics
+"""
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds of the latency buckets, in seconds (+Inf is implied)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_PREFIX = "vera"
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum."""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+
+
+class RequestTimer:
+    """
+    Laps of one request: lap(phase) records the time since the previous lap.
+    ``attributes`` holds whatever the gateway notes for tracing (None: nothing).
+    """
+
+    __slots__ = ("laps", "started", "attributes", "_last")
+
+    def __init__(self) -> None:
+        self.laps: List[Tuple[str, float]] = []
+        self.started = self._last = time.perf_counter()
+        self.attributes: Optional[Dict[str, Any]] = None
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.laps.append((phase, now - self._last))
+        self._last = now
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Request counts, error counts and phase latencies, by ``label`` (action or route)."""
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._phases: Dict[Tuple[str, str], Histogram] = {}
+
+    def timer(self) -> RequestTimer:
+        """A RequestTimer started now."""
+        return RequestTimer()
+
+    def record(self, name: str, laps: List[Tuple[str, float]], error: Optional[str] = None) -> None:
+        """Count one request to ``name`` and add its laps; ``error`` is its error code."""
+        with self._lock:
+            self._requests[name] = self._requests.get(name, 0) + 1
+            if error is not None:
+                key = (name, error)
+                self._errors[key] = self._errors.get(key, 0) + 1
+            for phase, seconds in laps:
+                histogram = self._phases.get((name, phase))
+                if histogram is None:
+                    histogram = self._phases[(name, phase)] = Histogram()
+                histogram.observe(seconds)
+
+    def render(self, state: Any = None) -> str:
+        """The metrics, and the size of every store of ``state``, in the Prometheus text format."""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            errors = sorted(self._errors.items())
+            phases = sorted((key, list(h.counts), h.total) for key, h in self._phases.items())
+        label = self.label
+        lines = [
+            f"# HELP {_PREFIX}_uptime_seconds Seconds since the emulator started.",
+            f"# TYPE {_PREFIX}_uptime_seconds gauge",
+            f"{_PREFIX}_uptime_seconds {time.time() - self.started:.3f}",
+            f"# HELP {_PREFIX}_requests_total Requests handled, by {label}.",
+            f"# TYPE {_PREFIX}_requests_total counter",
+        ]
+        lines.extend(f'{_PREFIX}_requests_total{{{label}="{_label(name)}"}} {count}' for name, count in requests)
+        lines.append(f"# HELP {_PREFIX}_request_errors_total Requests answered with an error, by {label} and code.")
+        lines.append(f"# TYPE {_PREFIX}_request_errors_total counter")
+        lines.extend(f'{_PREFIX}_request_errors_total{{{label}="{_label(name)}",code="{_label(code)}"}} {count}'
+                     for (name, code), count in errors)
+        lines.append(f"# HELP {_PREFIX}_request_phase_seconds Time spent per request phase, by {label}.")
+        lines.append(f"# TYPE {_PREFIX}_request_phase_seconds histogram")
+        for (name, phase), counts, total in phases:
+            labels = f'{label}="{_label(name)}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, counts):
+                cumulative += count
+                lines.append(f'{_PREFIX}_request_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{_PREFIX}_request_phase_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{_PREFIX}_request_phase_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{_PREFIX}_request_phase_seconds_count{{{labels}}} {cumulative}")
+        if state is not None:
+            lines.append(f"# HELP {_PREFIX}_store_resources Resources held, by state store.")
+            lines.append(f"# TYPE {_PREFIX}_store_resources gauge")
+            for name, store in sorted(vars(state).items()):
+                if isinstance(store, dict):
+                    lines.append(f'{_PREFIX}_store_resources{{store="{name}"}} {len(store)}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,233 @@
+"""
+Compact resource models: slotted dataclasses with lazily allocated containers.
+
+Most list and dict fields of a resource stay empty for its whole life, yet a
+plain dataclass allocates every one of them (plus an instance __dict__)
+for each resource. @resource_model gives the class __slots__ instead and
+leaves list/dict fields (and lazy_field() fields) holding the shared LAZY
+sentinel: reading one returns a fresh empty container that is only stored
+on the resource once something is put into it. Resources that are only
+read therefore never allocate their empty containers.
+
+Attributes that are not fields can still be set; they go to an instance
+__dict__ that is allocated on the first one.
+"""
+
+import collections
+import dataclasses
+import itertools
+import operator
+from dataclasses import Field, dataclass, field
+from typing import Any, Callable, Dict, Tuple
+
+
+class _Lazy:
+    """Default of a field allocated on first use (see resource_model)."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "LAZY"
+
+    def __reduce__(self) -> str:
+        return "LAZY"
+
+
+LAZY = _Lazy()
+
+
+class _PendingList(list):
+    """An unset list field of ``_owner``: the first change stores it there."""
+
+    __slots__ = ("_owner", "_member")
+
+    def _attach(self) -> None:
+        owner = getattr(self, "_owner", None)
+        if owner is not None:
+            self._owner = None
+            self._member.__set__(owner, self)
+
+    def append(self, item: Any) -> None:
+        self._attach()
+        list.append(self, item)
+
+    def extend(self, items: Any) -> None:
+        self._attach()
+        list.extend(self, items)
+
+    def insert(self, index: int, item: Any) -> None:
+        self._attach()
+        list.insert(self, index, item)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._attach()
+        list.__setitem__(self, index, value)
+
+    def __iadd__(self, items: Any) -> "_PendingList":
+        self._attach()
+        return list.__iadd__(self, items)
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # Copies and pickles are plain lists
+        return list, (list(self),)
+
+
+class _PendingDict(dict):
+    """An unset dict field of ``_owner``: the first change stores it there."""
+
+    __slots__ = ("_owner", "_member")
+
+    def _attach(self) -> None:
+        owner = getattr(self, "_owner", None)
+        if owner is not None:
+            self._owner = None
+            self._member.__set__(owner, self)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._attach()
+        dict.__setitem__(self, key, value)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._attach()
+        dict.update(self, *args, **kwargs)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self._attach()
+        return dict.setdefault(self, key, default)
+
+    def __ior__(self, other: Any) -> "_PendingDict":
+        self._attach()
+        return dict.__ior__(self, other)
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # Copies and pickles are plain dicts
+        return dict, (dict(self),)
+
+
+_PENDING = {list: _PendingList, dict: _PendingDict}
+
+
+class _LazySlot:
+    """
+    Descriptor wrapping the slot of a lazily allocated field, which holds
+    LAZY until the field is set. Then a list or dict field reads as a
+    pending container; any other factory's value is built and stored on
+    first read.
+    """
+
+    __slots__ = ("member", "factory", "pending")
+
+    def __init__(self, member: Any, factory: Callable[[], Any]) -> None:
+        self.member = member
+        self.factory = factory
+        self.pending = _PENDING.get(factory)
+
+    def __get__(self, obj: Any, owner: Any = None) -> Any:
+        if obj is None:
+            return self
+        value = self.member.__get__(obj, owner)
+        if value is not LAZY:
+            return value
+        pending = self.pending
+        if pending is None:
+            value = self.factory()
+            self.member.__set__(obj, value)
+            return value
+        value = pending()
+        value._owner = obj
+        value._member = self.member
+        return value
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        self.member.__set__(obj, value)
+
+    def __delete__(self, obj: Any) -> None:
+        self.member.__delete__(obj)
+
+
+def lazy_field(factory: Callable[[], Any], **kwargs: Any) -> Any:
+    """A dataclass field whose ``factory`` value is only built when first read."""
+    return field(default=LAZY, metadata={"factory": factory}, **kwargs)
+
+
+class _Model:
+    """
+    Base of every resource model. Its __dict__ slot keeps setting attributes
+    that are not fields working; the dict is only allocated by the first one.
+    """
+
+    __slots__ = ("__dict__",)
+
+
+def _tuple_getter(names: Tuple[str, ...]) -> Callable[[Any], Tuple[Any, ...]]:
+    """attrgetter(*names), always returning a tuple."""
+    if len(names) > 1:
+        return operator.attrgetter(*names)
+    if names:
+        getter = operator.attrgetter(names[0])
+        return lambda model: (getter(model),)
+    return lambda model: ()
+
+
+def _getstate(self: Any) -> Dict[str, Any]:
+    cls = type(self)
+    # Raw slot values: unallocated fields come out as LAZY
+    state = dict(zip(cls.__model_fields__, cls.__model_getter__(self)))
+    extra = self.__dict__
+    if extra:
+        state.update(extra)
+    else:
+        # Reading __dict__ allocated it
+        del self.__dict__
+    return state
+
+
+def _setstate(self: Any, state: Dict[str, Any]) -> None:
+    # setattr() on the raw slot names, looped in C
+    raw = type(self).__model_raw__
+    collections.deque(map(setattr, itertools.repeat(self), map(raw.get, state, state), state.values()), 0)
+
+
+def resource_model(cls: type) -> type:
+    """
+    @dataclass for resource models, with __slots__ and list/dict fields
+    (default_factory=list or dict) allocated only once they are written.
+
+    Example:
+        @resource_model
+        class Network:
+            name: str = ""
+            peerings: List[Any] = field(default_factory=list)
+
+        network = Network(name="default")
+        network.peerings     # Returns: [] (not stored on network)
+        network.peerings.append({"name": "peer-1"})  # now it is
+    """
+    namespace = {}
+    for name, value in vars(cls).items():
+        if name in ("__dict__", "__weakref__"):
+            continue
+        if isinstance(value, Field) and value.default_factory in _PENDING:
+            value = field(default=LAZY, repr=value.repr, hash=value.hash, compare=value.compare,
+                          metadata={**value.metadata, "factory": value.default_factory})
+        namespace[name] = value
+    qualname = cls.__qualname__
+    cls = dataclass(slots=True)(type(cls.__name__, (_Model,), namespace))
+    cls.__qualname__ = qualname
+    names = []
+    # Field name -> name of its slot descriptor, bypassing _LazySlot
+    raw: Dict[str, str] = {}
+    for item in dataclasses.fields(cls):
+        names.append(item.name)
+        raw[item.name] = item.name
+        if item.default is LAZY:
+            member = vars(cls)[item.name]
+            raw[item.name] = f"_slot_{item.name}"
+            setattr(cls, raw[item.name], member)
+            setattr(cls, item.name, _LazySlot(member, item.metadata["factory"]))
+    cls.__model_fields__ = tuple(names)
+    cls.__model_raw__ = raw
+    cls.__model_getter__ = _tuple_getter(tuple(raw.values()))
+    cls.__getstate__ = _getstate
+    cls.__setstate__ = _setstate
+    return cls
@@ -0,0 +1,190 @@
+"""
+HTTP listeners of the emulator: the production server (--server, waitress
+instead of Flask's development server) and Unix socket listeners
+(--unix-socket) for either.
+
+With --server the app runs in one process on a pool of ``threads`` worker
+threads, with HTTP/1.1 keep-alive, at most ``connection_limit`` open
+connections, request bodies capped at ``max_request_size`` bytes (larger
+ones get a 413) and idle connections closed after ``idle_timeout`` seconds.
+
+There is a single worker process on purpose: the state lives in that
+process's memory and every request runs under the fork registry's lock, so
+several processes would each have their own, diverging state. Threads are
+what scale: they overlap parsing, serializing and socket I/O around the
+lock, and keep slow clients from holding up the others.
+
+On SIGTERM or SIGINT the server shuts down gracefully: it stops accepting
+connections, lets the requests it already has finish and their responses
+go out (for up to ``shutdown_timeout`` seconds), closes the idle
+connections and returns, so that atexit handlers (journal, tracer) run
+after the last request. A second signal while it waits skips the rest of
+the wait; any later one is ignored until the server is closed.
+
+Either server can listen on a Unix socket (``unix_socket``) as well as on
+host:port, or only there (``tcp=False``); co-located clients then skip TCP
+loopback. A leftover socket file is replaced.
+
+waitress is an optional dependency (the ``server`` extra):
+    uv run --extra server main.py --server --threads 16 --unix-socket /tmp/vera.sock
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS = 8
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_MAX_REQUEST_SIZE = 16 * 1024 * 1024
+DEFAULT_IDLE_TIMEOUT = 120.0
+DEFAULT_SHUTDOWN_TIMEOUT = 10.0
+
+
+class _Stop(KeyboardInterrupt):
+    """
+    Raised in the event loop by the SIGTERM/SIGINT handler (a
+    KeyboardInterrupt, which the loop does not swallow as a handler error).
+    """
+
+
+class _StopHandler:
+    """
+    The SIGTERM/SIGINT handler of serve(): raises _Stop once while
+    ``armed``, and ignores the signal otherwise (while closing).
+    """
+
+    def __init__(self) -> None:
+        self.armed = True
+
+    def __call__(self, signum, frame):
+        if self.armed:
+            self.armed = False
+            raise _Stop(signal.Signals(signum).name)
+
+
+def _bind_unix(path: str) -> socket.socket:
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    return listener
+
+
+def _bind_tcp(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    return socket.create_server((host, port), family=family)
+
+
+def serve(app: Any, host: str, port: int, unix_socket: Optional[str] = None, tcp: bool = True,
+          threads: int = DEFAULT_THREADS, connection_limit: int = DEFAULT_CONNECTION_LIMIT,
+          max_request_size: int = DEFAULT_MAX_REQUEST_SIZE, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+          shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT) -> None:
+    """
+    Serve the WSGI ``app`` with waitress on host:port (unless ``tcp`` is
+    false) and on ``unix_socket`` until SIGTERM or SIGINT. Raises
+    RuntimeError if waitress is not installed and OSError if an address
+    cannot be bound.
+    """
+    try:
+        from waitress import wasyncore
+        from waitress.server import UnixWSGIServer, create_server
+    except ImportError:
+        raise RuntimeError("--server needs waitress (uv run --extra server main.py --server, "
+                           "or pip install waitress)") from None
+    sockets: List[socket.socket] = []
+    listening = []
+    try:
+        if tcp:
+            sockets.append(_bind_tcp(host, port))
+            listening.append(f"http://{host}:{sockets[-1].getsockname()[1]}")
+        if unix_socket:
+            sockets.append(_bind_unix(unix_socket))
+            listening.append(f"unix:{unix_socket}")
+    except OSError:
+        for listener in sockets:
+            listener.close()
+        raise
+    socket_map: dict = {}
+    first, *rest = sockets
+    server = create_server(app, map=socket_map, sockets=[first], threads=threads,
+                           connection_limit=connection_limit, max_request_body_size=max_request_size,
+                           channel_timeout=idle_timeout, ident="vera", clear_untrusted_proxy_headers=True)
+    for listener in rest:
+        # waitress does not mix TCP and Unix sockets in one server: run this one on the same loop and threads
+        UnixWSGIServer(app, map=socket_map, _sock=listener, dispatcher=server.task_dispatcher, adj=server.adj,
+                       bind_socket=False)
+    stop = _StopHandler()
+    previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+    logger.info(f"Serving on {' and '.join(listening)} with waitress "
+                f"({threads} threads, up to {connection_limit} connections)")
+    try:
+        wasyncore.loop(timeout=server.adj.asyncore_loop_timeout, map=socket_map)
+    except _Stop as e:
+        logger.info(f"{e}: shutting down (up to {shutdown_timeout:g}s for requests in progress)")
+    finally:
+        try:
+            _shutdown(socket_map, server.task_dispatcher, shutdown_timeout, stop)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            if unix_socket and os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+
+
+def _shutdown(socket_map: dict, task_dispatcher: Any, timeout: float, stop: _StopHandler) -> None:
+    """
+    Stop accepting, run the event loop until in-flight requests are
+    answered (or another signal comes), then close everything.
+    """
+    from waitress import wasyncore
+    from waitress.server import BaseWSGIServer
+    for dispatcher in list(socket_map.values()):
+        if isinstance(dispatcher, BaseWSGIServer):
+            dispatcher.accepting = False
+            # The listening socket only: the loop still needs the trigger
+            wasyncore.dispatcher.close(dispatcher)
+    deadline = time.monotonic() + timeout
+    stop.armed = True
+    try:
+        while True:
+            busy = [channel for channel in list(socket_map.values())
+                    if getattr(channel, "requests", None) or getattr(channel, "total_outbufs_len", 0)]
+            if not busy:
+                break
+            if time.monotonic() >= deadline:
+                logger.warning(f"Closing {len(busy)} connection(s) with requests still in progress")
+                break
+            wasyncore.loop(timeout=0.05, map=socket_map, count=1)
+        # Inside the try: a signal before this line is caught below, one after it ignored
+        stop.armed = False
+    except _Stop as e:
+        logger.warning(f"{e} again: closing the connections without waiting")
+    task_dispatcher.shutdown(cancel_pending=True, timeout=1)
+    wasyncore.close_all(socket_map)
+
+
+def run_development(app: Any, host: str, port: int, debug: bool, unix_socket: Optional[str] = None,
+                    tcp: bool = True) -> None:
+    """
+    app.run() (Flask's development server) on host:port, on ``unix_socket``
+    as well, or only on ``unix_socket`` if ``tcp`` is false.
+    """
+    if not tcp:
+        app.run(host=f"unix://{os.path.abspath(unix_socket)}", debug=debug)
+        return
+    if unix_socket:
+        from werkzeug.serving import is_running_from_reloader, make_server
+        # With the reloader, only its child serves requests; the parent just watches files
+        if not debug or is_running_from_reloader():
+            server = make_server(f"unix://{os.path.abspath(unix_socket)}", 0, app, threaded=True)
+            os.chmod(unix_socket, 0o600)
+            threading.Thread(target=server.serve_forever, name="vera-unix-socket", daemon=True).start()
+            logger.info(f"Also serving on unix:{unix_socket}")
+    app.run(host=host, port=port, debug=debug)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
-from dataclasses import dataclass, field
+from dataclasses import field
 import uuid
 import random
 import json as _json
@@ -10,9 +10,10 @@ from ..utils import (
     create_gcp_error, is_error_response,
     make_operation, parse_labels, get_body_param,
 )
+from ..models import resource_model
 from ..state import GCPState
 
-@dataclass
+@resource_model
 class BackendBucket:
     params: Dict[str, Any] = field(default_factory=dict)
     enable_cdn: bool = False
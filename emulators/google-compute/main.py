@@ -19,12 +19,14 @@ import os
 import sys
 import re
 import json
-import uuid
+import hashlib
+import time
 import importlib
 import inspect
 import traceback
 import logging
 import argparse
+import atexit
 from typing import Dict, Any, Tuple, List, Optional
 from flask import Flask, request, Response
 
@@ -43,15 +45,29 @@ _ROUTES: List[Tuple] = []
 _serialize_gcp_error = None
 _get_error_http_code = None
 
-# ============================================================================
-# In-memory operation cache
-# ============================================================================
-# Keyed by operation name (e.g. "operation-1234567890").
-# Every mutating backend call whose response looks like a GCP Operation is
-# stored here automatically.  The operation GET/wait interceptor below serves
-# these directly, bypassing the generated ZoneOperation/RegionOperation/
-# GlobalOperation backends (which know nothing about cross-backend operations).
-_OPERATIONS: Dict[str, Dict] = {}
+# Default file for POST /_admin/checkpoint and /_admin/restore (--checkpoint)
+_checkpoint_path: Optional[str] = None
+
+# Write-ahead journal of mutating requests (--journal), see open_journal()
+_journal = None
+
+# Copy-on-write forks of the state and the lock requests run under, see load_resources()
+_forks = None
+
+# Request counts and per-phase latencies by route, see load_resources() and GET /_admin/metrics
+_metrics = None
+
+# Summary lines, opt-in payload logging and the last requests, see load_resources() and GET /_admin/requests
+_requests = None
+
+# cProfile, stack sampler and tracemalloc, driven by /_admin/profile, see load_resources()
+_profiler = None
+
+# Exports per-phase trace spans of every request (--trace)
+_tracer = None
+
+# Requests select a fork with this header
+FORK_HEADER = "X-Vera-Fork"
 
 # Some backend class names use inflected/plural forms that differ from the
 # GCP resource type name the parsers actually expect in the request body.
@@ -82,6 +98,7 @@ _BACKEND_TO_RESOURCE_TYPE: Dict[str, str] = {
 _OPS_GET_RE  = re.compile(r"/operations/([^/]+)$")
 _OPS_WAIT_RE = re.compile(r"/operations/([^/]+)/wait$")
 _OPS_LIST_RE = re.compile(r"/operations$")
+_OPS_PROJECT_RE = re.compile(r"(?:^|/)projects/([^/]+)/")
 
 # Pre-compiled regexes for machine-types (read-only, no service module)
 _MT_LIST_RE = re.compile(r"zones/([^/]+)/machineTypes$")
@@ -190,7 +207,7 @@ def _path_template_to_regex(path_template: str) -> Tuple[re.Pattern, List[str]]:
 
 def load_resources(code_dir: str) -> None:
     """Load emulator_core service modules and register REST routes."""
-    global _serialize_gcp_error, _get_error_http_code
+    global _serialize_gcp_error, _get_error_http_code, _forks, _metrics, _requests, _profiler
 
     abs_path = os.path.abspath(code_dir)
     parent = os.path.dirname(abs_path)
@@ -279,6 +296,17 @@ def load_resources(code_dir: str) -> None:
     logger.info(f"Registered {registered} routes ({skipped} skipped — missing components)")
     _seed_defaults()
 
+    state_cls = importlib.import_module(f"{package_name}.state").GCPState
+    _forks = importlib.import_module(f"{package_name}.fork").ForkRegistry(state_cls, _backends)
+    _metrics = importlib.import_module(f"{package_name}.metrics").Metrics("route")
+    _requests = importlib.import_module(f"{package_name}.requestlog").RequestLog(logger, "route")
+    _profiler = importlib.import_module(f"{package_name}.profiler").Profiler()
+
+
+def _backends() -> List[Any]:
+    """Every distinct backend instance behind a route."""
+    return list({id(route[3]): route[3] for route in _ROUTES}.values())
+
 
 def _seed_defaults() -> None:
     """Pre-populate GCP resources that exist by default in every project."""
@@ -344,30 +372,85 @@ def dispatch_root(path_rest: str):
     return _dispatch(path_rest)
 
 
-def _dispatch(path_rest: str) -> Response:
-    req_id = str(uuid.uuid4())
-    http_method = request.method.upper()
+def _tenant_key(path_params: Dict[str, str]) -> Optional[str]:
+    """The state namespace of a request under --tenants: its project plus (a digest of) its auth token."""
+    project = path_params.get("project") or request.args.get("project")
+    if not project:
+        return None
+    _, _, token = request.headers.get("Authorization", "").partition(" ")
+    if not token:
+        return project
+    return f"{project}/{hashlib.sha256(token.encode()).hexdigest()[:16]}"
 
-    if http_method == "GET" and _OPS_LIST_RE.search(path_rest):
-        items = list(_OPERATIONS.values())
-        result = {"kind": "compute#operationList", "id": "0", "items": items}
-        logger.info(f"[{http_method}] /{path_rest} → operations list ({len(items)} ops)")
-        return Response(json.dumps(result), status=200, mimetype="application/json")
 
+def _resolve_fork(path_params: Dict[str, str]) -> Tuple[Any, Optional[Response]]:
+    """The fork the current request runs in (None: the main state), or a 404 response for an unknown fork."""
+    fork_id = request.headers.get(FORK_HEADER)
+    try:
+        return _forks.resolve(fork_id, tenant=_tenant_key(path_params)), None
+    except KeyError:
+        return None, Response(
+            json.dumps({"error": {"code": 404, "message": f"Unknown emulator fork: {fork_id}", "status": "NOT_FOUND"}}),
+            status=404, mimetype="application/json"
+        )
+
+
+def _operation_request(path_rest: str, http_method: str) -> Tuple[Response, str, Optional[str]]:
+    """
+    operations list/get/wait, served from the operations every mutating
+    call returned, kept in the state of the fork or tenant the call ran in
+    (see _dispatch_request). They bypass the generated ZoneOperation/
+    RegionOperation/GlobalOperation backends, which know nothing about
+    cross-backend operations.
+    """
+    m = _OPS_PROJECT_RE.search(path_rest)
+    fork, error = _resolve_fork({"project": m.group(1)} if m else {})
     op_name = _intercept_operation(path_rest, http_method)
-    if op_name is not None:
-        op = _OPERATIONS.get(op_name)
-        if op is None:
-            op = {
-                "kind": "compute#operation",
-                "name": op_name,
-                "status": "DONE",
-                "progress": 100,
-                "operationType": "unknown",
-                "id": "0",
-            }
-        logger.info(f"[{http_method}] /{path_rest} → operation cache hit: {op_name}")
-        return Response(json.dumps(op), status=200, mimetype="application/json")
+    route = "operations.list" if op_name is None else "operations.get"
+    if error is not None:
+        return error, route, "NOT_FOUND"
+    with _forks.route(fork) as state:
+        if op_name is None:
+            items = list(state.operations.values())
+        else:
+            op = state.operations.get(op_name)
+    if op_name is None:
+        result = {"kind": "compute#operationList", "id": "0", "items": items}
+        logger.debug("[%s] /%s → operations list (%d ops)", http_method, path_rest, len(items))
+        return Response(json.dumps(result), status=200, mimetype="application/json"), route, None
+    if op is None:
+        op = {
+            "kind": "compute#operation",
+            "name": op_name,
+            "status": "DONE",
+            "progress": 100,
+            "operationType": "unknown",
+            "id": "0",
+        }
+    logger.debug("[%s] /%s → operation cache hit: %s", http_method, path_rest, op_name)
+    return Response(json.dumps(op), status=200, mimetype="application/json"), route, None
+
+
+def _dispatch(path_rest: str) -> Response:
+    timer = _metrics.timer()
+    entry = _requests.begin()
+    response, route, code = _dispatch_request(path_rest, timer, entry)
+    _metrics.record(route, timer.laps, code)
+    entry.name = route
+    _requests.finish(entry, code)
+    if _tracer is not None:
+        _tracer.trace(response, timer, entry.request_id, route, code)
+    return response
+
+
+def _dispatch_request(path_rest: str, timer, entry) -> Tuple[Response, str, Optional[str]]:
+    """The response to the current request, the route it counts under and its error status (None on success)."""
+    req_id = entry.request_id
+    http_method = request.method.upper()
+    entry.target = f"{http_method} /{path_rest}"
+
+    if (http_method == "GET" and _OPS_LIST_RE.search(path_rest)) or _intercept_operation(path_rest, http_method):
+        return _operation_request(path_rest, http_method)
 
     # Machine-types interceptor (read-only, no service module)
     if http_method == "GET":
@@ -375,17 +458,17 @@ def _dispatch(path_rest: str) -> Response:
         if m:
             zone_name, mt_name = m.group(1), m.group(2)
             project = request.args.get("project", "vera-project")
-            logger.info(f"[GET] /{path_rest} → machine-types get: {mt_name} in {zone_name}")
+            logger.debug("[GET] /%s → machine-types get: %s in %s", path_rest, mt_name, zone_name)
             mt = _make_machine_type_dict(mt_name, zone_name, project)
-            return Response(json.dumps(mt), status=200, mimetype="application/json")
+            return Response(json.dumps(mt), status=200, mimetype="application/json"), "machineTypes.get", None
         m = _MT_LIST_RE.search(path_rest)
         if m:
             zone_name = m.group(1)
             project = request.args.get("project", "vera-project")
-            logger.info(f"[GET] /{path_rest} → machine-types list in {zone_name}")
+            logger.debug("[GET] /%s → machine-types list in %s", path_rest, zone_name)
             items = [_make_machine_type_dict(n, zone_name, project) for n in _MACHINE_TYPES]
             result = {"kind": "compute#machineTypeList", "id": "0", "items": items}
-            return Response(json.dumps(result), status=200, mimetype="application/json")
+            return Response(json.dumps(result), status=200, mimetype="application/json"), "machineTypes.list", None
 
     # Image family/get interceptor — gcloud resolves image-family before sending create
     if http_method == "GET":
@@ -393,37 +476,46 @@ def _dispatch(path_rest: str) -> Response:
         if m:
             img_project, family = m.group(1), m.group(2)
             key = f"{img_project}/{family}"
-            logger.info(f"[GET] /{path_rest} → image family lookup: {key}")
+            logger.debug("[GET] /%s → image family lookup: %s", path_rest, key)
             img_info = _IMAGE_FAMILIES.get(key)
             if img_info:
-                return Response(json.dumps(_make_image_dict(img_info, img_project)), status=200, mimetype="application/json")
+                return Response(json.dumps(_make_image_dict(img_info, img_project)), status=200, mimetype="application/json"), "images.getFromFamily", None
             # Also try without project prefix (e.g. just family name)
             for k, v in _IMAGE_FAMILIES.items():
                 if k.endswith(f"/{family}") or v.get("family") == family:
-                    return Response(json.dumps(_make_image_dict(v, img_project)), status=200, mimetype="application/json")
+                    return Response(json.dumps(_make_image_dict(v, img_project)), status=200, mimetype="application/json"), "images.getFromFamily", None
             err = {"error": {"code": 404, "message": f"The resource '{family}' was not found", "status": "NOT_FOUND"}}
-            return Response(json.dumps(err), status=404, mimetype="application/json")
+            return Response(json.dumps(err), status=404, mimetype="application/json"), "images.getFromFamily", "NOT_FOUND"
         m = _IMG_GET_RE.search(path_rest)
         if m:
             img_project, img_name = m.group(1), m.group(2)
-            logger.info(f"[GET] /{path_rest} → image get: {img_name} in {img_project}")
+            logger.debug("[GET] /%s → image get: %s in %s", path_rest, img_name, img_project)
             for img_info in _IMAGE_FAMILIES.values():
                 if img_info["name"] == img_name or img_info.get("family") == img_name:
-                    return Response(json.dumps(_make_image_dict(img_info, img_project)), status=200, mimetype="application/json")
+                    return Response(json.dumps(_make_image_dict(img_info, img_project)), status=200, mimetype="application/json"), "images.get", None
             err = {"error": {"code": 404, "message": f"The resource '{img_name}' was not found", "status": "NOT_FOUND"}}
-            return Response(json.dumps(err), status=404, mimetype="application/json")
+            return Response(json.dumps(err), status=404, mimetype="application/json"), "images.get", "NOT_FOUND"
 
     match = _match_route(path_rest, http_method)
     if match is None:
         logger.warning(f"No route: {http_method} /{path_rest}")
+        # Not counted under the path itself: clients could make up any number of them
         return Response(
             json.dumps({"error": {"code": 404, "message": f"Unknown API path: /{path_rest}", "status": "NOT_FOUND"}}),
             status=404, mimetype="application/json"
-        )
+        ), "", "NOT_FOUND"
 
     path_params, backend, parser_cls, serializer_cls, method_name = match
-    logger.info(f"[{http_method}] /{path_rest} → {type(backend).__name__}.{method_name}  path_params={path_params}")
+    route = entry.name = f"{type(backend).__name__[:-len('_Backend')]}.{method_name}"
+    logger.debug("[%s] /%s → %s  path_params=%s", http_method, path_rest, route, path_params)
+
+    fork, error = _resolve_fork(path_params)
+    if error is not None:
+        return error, route, "NOT_FOUND"
+
+    timer.lap("route")
 
+    profiling = _profiler.begin(route)
     try:
         body: Dict[str, Any] = {}
         if request.content_type and "json" in request.content_type and request.data:
@@ -450,22 +542,38 @@ def _dispatch(path_rest: str) -> Response:
                     body = {resource_type: body}
 
         params = parser_cls.parse_request(method_name, path_params, query_params, body)
-        logger.debug(f"  params={params}")
+        entry.params = params
+        _requests.payload(entry, "Params", params)
+        timer.lap("parse")
 
         method = getattr(backend, method_name)
-        result = method(params)
+        writing = http_method != "GET"
+        with _forks.route(fork, writing) as state:
+            timer.lap("wait")
+            # Forks are scratch worlds and stay out of the journal
+            if _journal is not None and writing and fork is None:
+                # Also when it fails: a failed request may have changed something first
+                with _journal.mutation([http_method, path_rest, query_params, body]):
+                    result = method(params)
+            else:
+                result = method(params)
+            if _tracer is not None and isinstance(getattr(backend, "resources", None), dict):
+                timer.attributes = {"vera.store_resources": len(backend.resources)}
+            if _is_operation(result):
+                state.operations[result["name"]] = result
+                logger.debug("  Cached operation: %s", result["name"])
+            timer.lap("backend")
 
         if isinstance(result, dict) and "Error" in result:
             body_str = _serialize_gcp_error(result) if _serialize_gcp_error else json.dumps(result)
             http_code = _get_error_http_code(result) if _get_error_http_code else 400
-            return Response(body_str, status=http_code, mimetype="application/json")
-
-        if _is_operation(result):
-            _OPERATIONS[result["name"]] = result
-            logger.debug(f"  Cached operation: {result['name']}")
+            timer.lap("serialize")
+            return Response(body_str, status=http_code, mimetype="application/json"), route, result["Error"].get("status", "INVALID_ARGUMENT")
 
         resp_body = serializer_cls.serialize(method_name, result, req_id)
-        return Response(resp_body, status=200, mimetype="application/json")
+        _requests.payload(entry, "Response", resp_body)
+        timer.lap("serialize")
+        return Response(resp_body, status=200, mimetype="application/json"), route, None
 
     except Exception as e:
         logger.error(f"Error handling {http_method} /{path_rest}: {e}")
@@ -473,7 +581,10 @@ def _dispatch(path_rest: str) -> Response:
         err_body = json.dumps({
             "error": {"code": 500, "message": str(e), "status": "INTERNAL"}
         })
-        return Response(err_body, status=500, mimetype="application/json")
+        return Response(err_body, status=500, mimetype="application/json"), route, "INTERNAL"
+    finally:
+        if profiling:
+            _profiler.end()
 
 
 # ============================================================================
@@ -488,6 +599,262 @@ def health():
     )
 
 
+# ============================================================================
+# Checkpoints (emulator extension)
+# ============================================================================
+
+def save_checkpoint(path: str) -> Dict[str, Any]:
+    """Write the current state to a checkpoint file (see emulator_core/checkpoint.py)."""
+    from emulator_core.checkpoint import write_checkpoint
+    from emulator_core.state import GCPState
+    with _forks.route():
+        if _journal is None:
+            return write_checkpoint(GCPState.get(), path)
+        with _journal.lock:
+            return _journal_checkpoint(GCPState.get(), path)
+
+
+def restore_checkpoint(path: str) -> Dict[str, Any]:
+    """Replace the current state with the one saved in a checkpoint file."""
+    from emulator_core.checkpoint import LazyStore, install_state, read_checkpoint
+    from emulator_core.state import GCPState
+    if _journal is not None and not _checkpoint_path:
+        raise ValueError("Restoring a checkpoint while journaling needs a --checkpoint file to rebase the journal on")
+    state = read_checkpoint(path, GCPState)
+    with _forks.route():
+        if _journal is None:
+            install_state(state, _backends())
+        else:
+            # The journal only replays on top of --checkpoint, so that file has to hold the restored state
+            with _journal.lock:
+                install_state(state, _backends())
+                _journal_checkpoint(state, _checkpoint_path)
+    stores = [value for value in vars(state).values() if isinstance(value, LazyStore)]
+    return {"stores": len(stores), "resources": sum(len(store) for store in stores)}
+
+
+def _journal_checkpoint(state, path: str) -> Dict[str, Any]:
+    """Checkpoint ``state`` with the journal position it covers; drop the journal up to there if it is --checkpoint."""
+    from emulator_core.checkpoint import write_checkpoint
+    summary = write_checkpoint(state, path, meta={"journal": _journal.position})
+    summary["journal"] = _journal.position
+    if _checkpoint_path and os.path.abspath(path) == os.path.abspath(_checkpoint_path):
+        summary["compacted_segments"] = _journal.compact(_journal.position)
+    return summary
+
+
+def _replay_request(record) -> None:
+    """Apply a journaled request again (see open_journal)."""
+    http_method, path_rest, query_params, body = record
+    match = _match_route(path_rest, http_method)
+    if match is None:
+        logger.warning(f"Replaying journaled {http_method} /{path_rest} failed: no route")
+        return
+    path_params, backend, parser_cls, _, method_name = match
+    try:
+        result = getattr(backend, method_name)(parser_cls.parse_request(method_name, path_params, query_params, body))
+    except Exception as e:
+        logger.warning(f"Replaying journaled {http_method} /{path_rest} failed: {e}")
+        return
+    if _is_operation(result):
+        backend.state.operations[result["name"]] = result
+
+
+def open_journal(directory: str, sync_interval: float, after: int = 0) -> None:
+    """
+    Journal mutating requests to ``directory`` from now on, first replaying
+    the records written after position ``after`` (that of the restored
+    checkpoint, 0 for the empty state). See emulator_core/journal.py.
+    """
+    global _journal
+    from emulator_core.journal import Journal
+    journal = Journal(directory, sync_interval)
+    if journal.truncated:
+        logger.warning(f"Journal {directory}: dropped a torn record ({journal.truncated} bytes) at the end")
+    start = time.perf_counter()
+    replayed = journal.replay(after, _replay_request)
+    logger.info(f"Replayed {replayed} journal records from {directory} in {time.perf_counter() - start:.3f}s")
+    atexit.register(journal.close)
+    _journal = journal
+
+
+def _checkpoint_request(action) -> Response:
+    path = request.values.get("path") or _checkpoint_path
+    if not path:
+        err_body = json.dumps({"error": "No checkpoint path given and no --checkpoint default set"})
+        return Response(err_body, status=400, mimetype="application/json")
+    start = time.perf_counter()
+    try:
+        summary = action(path)
+    except (OSError, ValueError) as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype="application/json")
+    summary.update(path=path, seconds=round(time.perf_counter() - start, 6))
+    logger.info(f"{action.__name__}({path}): {summary}")
+    return Response(json.dumps(summary), status=200, mimetype="application/json")
+
+
+@app.route("/_admin/checkpoint", methods=["POST"])
+def admin_checkpoint():
+    """Write the state to ``path`` (default: --checkpoint)."""
+    return _checkpoint_request(save_checkpoint)
+
+
+@app.route("/_admin/restore", methods=["POST"])
+def admin_restore():
+    """Replace the state with the checkpoint at ``path`` (default: --checkpoint)."""
+    return _checkpoint_request(restore_checkpoint)
+
+
+# ============================================================================
+# Forks (emulator extension)
+# ============================================================================
+
+@app.route("/_admin/forks", methods=["POST"])
+def admin_create_fork():
+    """Fork the state. Requests with an X-Vera-Fork: <forkId> header then run in the fork."""
+    start = time.perf_counter()
+    fork = _forks.create(request.values.get("name", ""))
+    summary = fork.to_dict()
+    summary["seconds"] = round(time.perf_counter() - start, 6)
+    logger.info(f"Created fork {fork.fork_id} ({fork.name}) in {summary['seconds']}s")
+    return Response(json.dumps(summary), status=200, mimetype="application/json")
+
+
+@app.route("/_admin/forks", methods=["GET"])
+def admin_list_forks():
+    """The live forks."""
+    body = json.dumps({"forks": [fork.to_dict() for fork in _forks.list()]})
+    return Response(body, status=200, mimetype="application/json")
+
+
+@app.route("/_admin/forks/<fork_id>", methods=["DELETE"])
+def admin_drop_fork(fork_id: str):
+    """Drop a fork and everything created in it."""
+    try:
+        fork = _forks.drop(fork_id)
+    except KeyError:
+        err_body = json.dumps({"error": f"Unknown fork: {fork_id}"})
+        return Response(err_body, status=404, mimetype="application/json")
+    logger.info(f"Dropped fork {fork_id} ({fork.name})")
+    return Response(json.dumps(fork.to_dict()), status=200, mimetype="application/json")
+
+
+# ============================================================================
+# Request log (emulator extension)
+# ============================================================================
+
+@app.route("/_admin/requests", methods=["GET"])
+def admin_requests():
+    """The last requests (--request-buffer), newest first; ``limit`` caps how many, ``route`` keeps one route's."""
+    try:
+        limit = int(request.values["limit"]) if "limit" in request.values else None
+    except ValueError:
+        return Response(json.dumps({"error": "limit must be an integer"}), status=400, mimetype="application/json")
+    body = json.dumps({"requests": _requests.recent(limit, request.values.get("route"))})
+    return Response(body, status=200, mimetype="application/json")
+
+
+# ============================================================================
+# Profiling (emulator extension)
+# ============================================================================
+
+_PROFILING_TOOLS = ("cprofile", "sampler", "tracemalloc")
+
+
+def _int_value(name: str, default: int) -> int:
+    value = request.values.get(name)
+    return default if value in (None, "") else int(value)
+
+
+def _profile_request(tool: str, action) -> Response:
+    """Run an /_admin/profile action for ``tool``; ValueError (misuse, bad numbers) becomes a 400."""
+    if tool not in _PROFILING_TOOLS:
+        err_body = json.dumps({"error": f"Unknown profiling tool: {tool}"})
+        return Response(err_body, status=404, mimetype="application/json")
+    try:
+        result = action()
+    except ValueError as e:
+        return Response(json.dumps({"error": str(e)}), status=400, mimetype="application/json")
+    if isinstance(result, Response):
+        return result
+    return Response(json.dumps(_profiler.status()), status=200, mimetype="application/json")
+
+
+@app.route("/_admin/profile", methods=["GET"])
+def admin_profile_status():
+    """Whether each profiling tool runs, and what it has collected."""
+    return Response(json.dumps(_profiler.status()), status=200, mimetype="application/json")
+
+
+@app.route("/_admin/profile/<tool>", methods=["POST"])
+def admin_profile_start(tool: str):
+    """
+    Start a profiling tool, dropping its earlier results. cprofile profiles
+    requests to ``route`` (e.g. Instance.aggregatedList; default: all),
+    sampler samples every thread each ``interval`` seconds, tracemalloc
+    keeps ``frames`` frames per allocation.
+    """
+    def start():
+        logger.info(f"Starting profiler {tool}")
+        if tool == "cprofile":
+            return _profiler.start_cprofile(request.values.get("route", ""))
+        if tool == "sampler":
+            return _profiler.start_sampler(float(request.values.get("interval") or 0.005))
+        return _profiler.start_tracemalloc(_int_value("frames", 16))
+
+    return _profile_request(tool, start)
+
+
+@app.route("/_admin/profile/<tool>", methods=["DELETE"])
+def admin_profile_stop(tool: str):
+    """Stop a profiling tool; its results stay downloadable."""
+    def stop():
+        logger.info(f"Stopping profiler {tool}")
+        getattr(_profiler, f"stop_{tool}")()
+
+    return _profile_request(tool, stop)
+
+
+@app.route("/_admin/profile/<tool>", methods=["GET"])
+def admin_profile_download(tool: str):
+    """
+    The results of a profiling tool. cprofile: a pstats file, or with
+    format=text the top ``limit`` functions by ``sort``; sampler: collapsed
+    stacks for flamegraphs; tracemalloc: the top ``limit`` allocation sites,
+    or with format=snapshot a tracemalloc.Snapshot dump.
+    """
+    def download():
+        fmt = request.values.get("format", "")
+        if tool == "cprofile" and fmt == "text":
+            text = _profiler.pstats_text(_int_value("limit", 50), request.values.get("sort", "cumulative"))
+            return Response(text, status=200, mimetype="text/plain")
+        if tool == "cprofile":
+            return Response(_profiler.pstats_data(), status=200, mimetype="application/octet-stream",
+                            headers={"Content-Disposition": "attachment; filename=emulator.pstats"})
+        if tool == "sampler":
+            return Response(_profiler.collapsed(), status=200, mimetype="text/plain",
+                            headers={"Content-Disposition": "attachment; filename=emulator.collapsed"})
+        if fmt == "snapshot":
+            return Response(_profiler.tracemalloc_data(), status=200, mimetype="application/octet-stream",
+                            headers={"Content-Disposition": "attachment; filename=emulator.tracemalloc"})
+        return Response(_profiler.tracemalloc_text(_int_value("limit", 50)), status=200, mimetype="text/plain")
+
+    return _profile_request(tool, download)
+
+
+# ============================================================================
+# Metrics (emulator extension)
+# ============================================================================
+
+@app.route("/_admin/metrics", methods=["GET"])
+def admin_metrics():
+    """Request and store metrics in the Prometheus text format (main state's stores)."""
+    from emulator_core.state import GCPState
+    with _forks.route():
+        body = _metrics.render(GCPState.get())
+    return Response(body, status=200, mimetype="text/plain; version=0.0.4")
+
+
 # ============================================================================
 # Entry point
 # ============================================================================
@@ -499,12 +866,108 @@ def main():
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=9100)
     parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--unix-socket", metavar="PATH",
+                        help="Also listen on this Unix socket (co-located clients skip TCP loopback)")
+    parser.add_argument("--no-tcp", action="store_true",
+                        help="Only listen on --unix-socket, not on --host/--port")
+    parser.add_argument("--server", action="store_true",
+                        help="Serve with waitress (thread pool, keep-alive, limits, graceful shutdown) instead "
+                             "of Flask's development server; needs the 'server' extra")
+    parser.add_argument("--threads", metavar="N", type=int, default=8,
+                        help="Worker threads of --server (one process: the state is shared in memory)")
+    parser.add_argument("--connection-limit", metavar="N", type=int, default=100,
+                        help="Open connections --server accepts at most")
+    parser.add_argument("--max-request-size", metavar="BYTES", type=int, default=16 * 1024 * 1024,
+                        help="Largest request body --server accepts (larger ones get a 413)")
+    parser.add_argument("--idle-timeout", metavar="SECONDS", type=float, default=120,
+                        help="How long --server keeps an idle keep-alive connection open")
+    parser.add_argument("--shutdown-timeout", metavar="SECONDS", type=float, default=10,
+                        help="How long --server lets requests in progress finish on SIGTERM/SIGINT")
+    parser.add_argument("--restore", metavar="PATH",
+                        help="Restore the state from this checkpoint file at startup")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="Default file for POST /_admin/checkpoint and /_admin/restore")
+    parser.add_argument("--journal", metavar="DIR",
+                        help="Journal mutating requests to this directory and replay it at startup "
+                             "(on top of --restore, or of --checkpoint if that file exists)")
+    parser.add_argument("--journal-sync", metavar="SECONDS", type=float, default=0.05,
+                        help="How often journaled requests are fsynced (0: before each response)")
+    parser.add_argument("--tenants", metavar="N", type=int, default=0,
+                        help="Give each project and auth token its own state, keeping at most N (least "
+                             "recently used are dropped; 0: one shared state)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Level of the emulator's own and the HTTP server's log lines")
+    parser.add_argument("--log-payloads", action="store_true",
+                        help="Also log (truncated) params and response bodies, at DEBUG")
+    parser.add_argument("--log-sample", metavar="ROUTE=N", action="append", default=[],
+                        help="Log one in every N successful requests to ROUTE, e.g. Instance.list "
+                             "(*=N: every other route; 0: none). Failed requests are always logged")
+    parser.add_argument("--payload-chars", metavar="N", type=int, default=2048,
+                        help="Characters of each payload kept in log lines and GET /_admin/requests")
+    parser.add_argument("--request-buffer", metavar="N", type=int, default=256,
+                        help="How many of the last requests GET /_admin/requests keeps")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Append per-phase trace spans of every request to this file")
+    parser.add_argument("--trace-format", choices=["jsonl", "otlp"], default="jsonl",
+                        help="One span per line (jsonl) or one OTLP/JSON export request per batch (otlp)")
+    parser.add_argument("--trace-buffer", metavar="N", type=int, default=10000,
+                        help="Requests whose spans may wait to be written; more are dropped")
     args = parser.parse_args()
+    if args.no_tcp and not args.unix_socket:
+        parser.error("--no-tcp needs --unix-socket")
+
+    global _checkpoint_path, _requests, _tracer
+    _checkpoint_path = args.checkpoint
+
+    logging.getLogger().setLevel(args.log_level)
+    if args.log_payloads:
+        logger.setLevel(logging.DEBUG)
 
     load_resources(args.code_dir)
-    logger.info(f"GCP Compute Emulator listening on {args.host}:{args.port}")
-    logger.info(f"Set CLOUDSDK_API_ENDPOINT_OVERRIDES_COMPUTE=http://{args.host}:{args.port}/")
-    app.run(host=args.host, port=args.port, debug=args.debug)
+    from emulator_core.requestlog import RequestLog
+    _requests = RequestLog(logger, "route", capacity=args.request_buffer,
+                           payloads=args.log_payloads, max_chars=args.payload_chars)
+    try:
+        _requests.set_sampling(args.log_sample)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.trace:
+        from emulator_core.tracing import Tracer
+        try:
+            _tracer = Tracer(args.trace, "route", args.trace_format, service="vera-google-compute",
+                             max_pending=args.trace_buffer)
+        except OSError as e:
+            parser.error(f"Cannot open trace file: {e}")
+        atexit.register(_tracer.close)
+    _forks.max_tenants = args.tenants
+    base = args.restore
+    if base is None and args.journal and _checkpoint_path and os.path.exists(_checkpoint_path):
+        base = _checkpoint_path
+    position = 0
+    if base:
+        from emulator_core.checkpoint import checkpoint_meta
+        start = time.perf_counter()
+        summary = restore_checkpoint(base)
+        position = checkpoint_meta(base).get("journal", 0)
+        logger.info(f"Restored {summary['resources']} resources from {base} "
+                    f"in {time.perf_counter() - start:.3f}s")
+    if args.journal:
+        open_journal(args.journal, args.journal_sync, position)
+    if not args.no_tcp:
+        logger.info(f"GCP Compute Emulator listening on {args.host}:{args.port}")
+        logger.info(f"Set CLOUDSDK_API_ENDPOINT_OVERRIDES_COMPUTE=http://{args.host}:{args.port}/")
+    from emulator_core.server import run_development, serve
+    if args.server:
+        try:
+            serve(app, args.host, args.port, unix_socket=args.unix_socket, tcp=not args.no_tcp,
+                  threads=args.threads, connection_limit=args.connection_limit,
+                  max_request_size=args.max_request_size, idle_timeout=args.idle_timeout,
+                  shutdown_timeout=args.shutdown_timeout)
+        except (RuntimeError, OSError) as e:
+            parser.error(str(e))
+    else:
+        run_development(app, args.host, args.port, debug=args.debug, unix_socket=args.unix_socket,
+                        tcp=not args.no_tcp)
 
 
 if __name__ == "__main__":
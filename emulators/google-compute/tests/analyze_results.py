@@ -26,7 +26,8 @@ def analyze_results(results_file):
     total = len(commands)
     
     for cmd_data in commands.values():
-        if cmd_data.get('restart_success') and cmd_data.get('result'):
+        # eval_emulator.py does not restart the emulator between commands
+        if cmd_data.get('restart_success', True) and cmd_data.get('result'):
             if cmd_data['result']['success']:
                 successful += 1
     
@@ -6,9 +6,13 @@ Runs each command against a running emulator instance.
 
 import json
 import os
+import shlex
 import subprocess
 import sys
+import threading
 import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
@@ -90,6 +94,162 @@ def check_emulator_health(endpoint_url, timeout=10, retry=3):
     return False
 
 
+def _command_parts(cmd):
+    """(words, flag values) of a gcpcli command: ['instances', 'create', 'vm'], {'zone': ['us-central1-a']}."""
+    try:
+        tokens = shlex.split(cmd)[1:]
+    except ValueError:
+        tokens = cmd.split()[1:]
+    words = [token for token in tokens if not token.startswith('--')]
+    flags = {}
+    for token in tokens:
+        if token.startswith('--'):
+            name, _, value = token[2:].partition('=')
+            flags[name] = value.split(',') if value else []
+    return words, flags
+
+
+def infer_chains(commands):
+    """
+    Group commands that depend on each other, from the script order.
+
+    Two commands are linked when they act on the same resource type
+    (instances create, instances describe, instances list) or mention the
+    same created resource: the name a create command gives (or a
+    --*-names flag, like disks snapshot --snapshot-names), wherever it shows
+    up later (networks subnets create --network=vera-net). Each chain keeps
+    script order and runs as a unit; different chains can run in parallel.
+
+    Returns:
+        list: Chains (lists of command indices), ordered by their first command
+    """
+    parsed = [_command_parts(cmd) for cmd in commands]
+    created = set()
+    for words, flags in parsed:
+        if 'create' in words and words[-1] != 'create':
+            created.add(words[-1])
+        for name, values in flags.items():
+            if name.endswith('-names'):
+                created.update(values)
+
+    parent = list(range(len(commands)))
+
+    def find(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    first_use = {}
+    for idx, (words, flags) in enumerate(parsed):
+        mentioned = set(words) | {value for values in flags.values() for value in values}
+        keys = mentioned & created
+        if words:
+            group = words[:2] if words[:2] == ['networks', 'subnets'] else words[:1]
+            keys.add('kind:' + ' '.join(group))
+        for key in keys:
+            if key in first_use:
+                parent[find(idx)] = find(first_use[key])
+            else:
+                first_use[key] = idx
+
+    chains = {}
+    for idx in range(len(commands)):
+        chains.setdefault(find(idx), []).append(idx)
+    return sorted(chains.values(), key=lambda chain: chain[0])
+
+
+class ProjectNamespace:
+    """
+    An isolated state namespace for one chain: a project of its own
+    (--project on each command), which the emulator started with
+    --tenants keeps apart from every other project.
+    """
+
+    def __init__(self, endpoint_url, number):
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self.project = f"vera-eval-{number}"
+
+    def command(self, cmd):
+        """``cmd`` run in this namespace."""
+        return f"{cmd} --project={self.project}"
+
+    def forks(self):
+        """The emulator forks holding this namespace's state."""
+        with urllib.request.urlopen(f"{self.endpoint_url}/_admin/forks", timeout=30) as response:
+            forks = json.load(response)['forks']
+        return [fork for fork in forks
+                if fork.get('tenant') and fork['tenant'].split('/')[0] == self.project]
+
+    def close(self):
+        """Drop the tenant state and everything created in it."""
+        try:
+            for fork in self.forks():
+                request = urllib.request.Request(f"{self.endpoint_url}/_admin/forks/{fork['forkId']}",
+                                                 method='DELETE')
+                urllib.request.urlopen(request, timeout=30).close()
+        except OSError:
+            pass
+
+
+def check_tenants(endpoint_url):
+    """Whether the emulator keeps projects apart (--tenants), probed with a throwaway project."""
+    probe = ProjectNamespace(endpoint_url, 'probe')
+    try:
+        urllib.request.urlopen(f"{probe.endpoint_url}/compute/v1/projects/{probe.project}/global/networks",
+                               timeout=30).close()
+        tenanted = bool(probe.forks())
+    except OSError:
+        return False
+    probe.close()
+    return tenanted
+
+
+def run_parallel(commands, indices, results, checkpoint_file, endpoint_url, jobs):
+    """
+    Run ``indices`` of ``commands`` on ``jobs`` workers, chain by chain (see
+    infer_chains), each chain in a project of its own, saving results into
+    ``results`` in the sequential checkpoint format as they arrive.
+    """
+    if not check_tenants(endpoint_url):
+        print("✗ Parallel runs need an emulator that keeps projects apart.")
+        print("  Start it with: uv run main.py --tenants 64")
+        sys.exit(1)
+    wanted = set(indices)
+    chains = [[idx for idx in chain if idx in wanted] for chain in infer_chains(commands)]
+    chains = [chain for chain in chains if chain]
+    print(f"Running {len(indices)} commands as {len(chains)} independent chains on {jobs} workers\n")
+    lock = threading.Lock()
+    done = [0]
+
+    def run_chain(number, chain):
+        namespace = ProjectNamespace(endpoint_url, number)
+        try:
+            for idx in chain:
+                cmd = commands[idx]
+                cmd_result = run_command(namespace.command(cmd), timeout=30)
+                with lock:
+                    done[0] += 1
+                    mark = '✓' if cmd_result['success'] else '✗'
+                    print(f"[{done[0]}/{len(indices)}] {mark} {idx}: {cmd[:100]}{'...' if len(cmd) > 100 else ''}",
+                          flush=True)
+                    results['commands'][idx] = {
+                        'command': cmd,
+                        'index': idx,
+                        'result': cmd_result,
+                        'timestamp': datetime.now().isoformat(),
+                        'chain': number
+                    }
+                    save_checkpoint(results, checkpoint_file)
+        finally:
+            namespace.close()
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_chain, number, chain) for number, chain in enumerate(chains)]
+        for future in as_completed(futures):
+            future.result()
+
+
 def save_checkpoint(results, checkpoint_file):
     """Save results to checkpoint file."""
     with open(checkpoint_file, 'w', encoding='utf-8') as f:
@@ -97,7 +257,7 @@ def save_checkpoint(results, checkpoint_file):
 
 
 def run_evaluation(script_file, checkpoint_file='eval_results_emulator.json',
-                   start_from=0, endpoint_url='http://localhost:9100'):
+                   start_from=0, endpoint_url='http://localhost:9100', jobs=1):
     """
     Run evaluation of commands from bash script.
     
@@ -106,6 +266,7 @@ def run_evaluation(script_file, checkpoint_file='eval_results_emulator.json',
         checkpoint_file: Path to save results JSON
         start_from: Command index to start from (for resuming)
         endpoint_url: Endpoint URL for the emulator (used for health check)
+        jobs: Parallel workers; above 1, each chain of dependent commands runs in its own project
     """
     # Parse commands
     print(f"Parsing commands from: {script_file}")
@@ -139,45 +300,51 @@ def run_evaluation(script_file, checkpoint_file='eval_results_emulator.json',
         with open(checkpoint_file, 'r', encoding='utf-8') as f:
             results = json.load(f)
     
-    # Main evaluation loop
-    for idx in range(start_from, len(commands)):
-        cmd = commands[idx]
-
-        print(f"\n{'='*80}")
-        print(f"Command {idx + 1}/{len(commands)}")
-        print(f"{'='*80}")
-        print(f"Command: {cmd[:100]}{'...' if len(cmd) > 100 else ''}")
-
-        # Run the command
-        print(f"  → Running command...", flush=True)
-        cmd_result = run_command(cmd, timeout=30)
+    if jobs > 1:
+        # Resuming skips the commands the checkpoint already has
+        indices = [idx for idx in range(start_from, len(commands))
+                   if idx not in results['commands'] and str(idx) not in results['commands']]
+        run_parallel(commands, indices, results, checkpoint_file, endpoint_url, jobs)
+    else:
+        # Main evaluation loop
+        for idx in range(start_from, len(commands)):
+            cmd = commands[idx]
+
+            print(f"\n{'='*80}")
+            print(f"Command {idx + 1}/{len(commands)}")
+            print(f"{'='*80}")
+            print(f"Command: {cmd[:100]}{'...' if len(cmd) > 100 else ''}")
+
+            # Run the command
+            print(f"  → Running command...", flush=True)
+            cmd_result = run_command(cmd, timeout=30)
         
-        is_success = cmd_result['success']
-
-        # Print result summary
-        if is_success:
-            print(f"  ✓ Success (exit code: {cmd_result['exit_code']})")
-            if cmd_result.get('note'):
-                print(f"    Note: {cmd_result['note']}")
-        else:
-            print(f"  ✗ Failed (exit code: {cmd_result['exit_code']})")
-            if cmd_result['error']:
-                print(f"    Error: {cmd_result['error']}")
-            if cmd_result['stderr']:
-                stderr_preview = cmd_result['stderr'][:200]
-                print(f"    Stderr: {stderr_preview}{'...' if len(cmd_result['stderr']) > 200 else ''}")
+            is_success = cmd_result['success']
+
+            # Print result summary
+            if is_success:
+                print(f"  ✓ Success (exit code: {cmd_result['exit_code']})")
+                if cmd_result.get('note'):
+                    print(f"    Note: {cmd_result['note']}")
+            else:
+                print(f"  ✗ Failed (exit code: {cmd_result['exit_code']})")
+                if cmd_result['error']:
+                    print(f"    Error: {cmd_result['error']}")
+                if cmd_result['stderr']:
+                    stderr_preview = cmd_result['stderr'][:200]
+                    print(f"    Stderr: {stderr_preview}{'...' if len(cmd_result['stderr']) > 200 else ''}")
         
-        # Save result
-        results['commands'][idx] = {
-            'command': cmd,
-            'index': idx,
-            'result': cmd_result,
-            'timestamp': datetime.now().isoformat()
-        }
+            # Save result
+            results['commands'][idx] = {
+                'command': cmd,
+                'index': idx,
+                'result': cmd_result,
+                'timestamp': datetime.now().isoformat()
+            }
         
-        # Save checkpoint
-        print(f"  → Saving checkpoint...", flush=True)
-        save_checkpoint(results, checkpoint_file)
+            # Save checkpoint
+            print(f"  → Saving checkpoint...", flush=True)
+            save_checkpoint(results, checkpoint_file)
     
     # Final summary
     print(f"\n\n{'='*80}")
@@ -228,6 +395,10 @@ Examples:
 
   # Use custom checkpoint file
   python eval_emulator.py test.sh --checkpoint my_results.json
+
+  # Run on 8 parallel workers, each chain of dependent commands in its own
+  # project (start the emulator with --tenants 64)
+  python eval_emulator.py test.sh --jobs 8
         """
     )
     
@@ -258,6 +429,14 @@ Examples:
         help='Emulator endpoint URL (default: http://localhost:9100)'
     )
     
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=1,
+        help='Parallel workers; 0 for one per CPU (default: 1, sequential on the shared state)'
+    )
+    
     args = parser.parse_args()
 
     # Check if script file exists
@@ -269,7 +448,7 @@ Examples:
     # Run evaluation
     try:
         run_evaluation(script_path, args.checkpoint, args.start_from,
-                      args.endpoint)
+                      args.endpoint, args.jobs or os.cpu_count())
     except KeyboardInterrupt:
         print("\n\nInterrupted by user. Progress has been saved.")
         sys.exit(0)
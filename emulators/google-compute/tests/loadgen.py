@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator: replays the CLI corpus against a running emulator.
+
+Translates the `gcloud compute` commands of cli/gcp_commands.json into the
+REST requests gcloud sends for them (flat JSON bodies, as the gateway
+accepts them) and replays them round-robin from --concurrency workers over
+a pool of keep-alive connections (asyncio, no dependencies beyond the
+standard library), optionally capped at --rate requests per second.
+
+Reports throughput, latency percentiles overall and per command, and
+errors broken down by HTTP status and error reason (NOT_FOUND, ...). The
+corpus creates, describes and deletes fixed names, so concurrent replays
+race each other and 404/409 errors are expected; --read-only replays only
+the list/describe commands, which leave the state as is.
+
+Usage:
+    python loadgen.py --endpoint http://localhost:9100 --concurrency 32 --duration 30
+    python loadgen.py --read-only --rate 500 --requests 20000 --output load.json
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import re
+import shlex
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+CORPUS = Path(__file__).resolve().parent / "cli" / "gcp_commands.json"
+PROJECT = "vera-project"
+DEFAULT_ZONE = "us-central1-a"
+DEFAULT_REGION = "us-central1"
+READ_ONLY_VERBS = ("list", "describe")
+
+# gcloud group -> (REST collection, scope): "zonal", "regional" or "global";
+# "regional/global" is regional unless --global; None for zones and regions
+COLLECTIONS = {
+    "zones": ("zones", None),
+    "regions": ("regions", None),
+    "machine-types": ("machineTypes", "zonal"),
+    "networks": ("networks", "global"),
+    "networks subnets": ("subnetworks", "regional"),
+    "firewall-rules": ("firewalls", "global"),
+    "instances": ("instances", "zonal"),
+    "disks": ("disks", "zonal"),
+    "snapshots": ("snapshots", "global"),
+    "addresses": ("addresses", "regional/global"),
+    "health-checks": ("healthChecks", "global"),
+    "backend-services": ("backendServices", "regional/global"),
+    "url-maps": ("urlMaps", "global"),
+    "target-http-proxies": ("targetHttpProxies", "global"),
+    "forwarding-rules": ("forwardingRules", "regional/global"),
+    "instance-templates": ("instanceTemplates", "global"),
+    "routes": ("routes", "global"),
+    "operations": ("operations", "regional/global"),
+}
+
+# Resource type wrapping the body of an update (PATCH)
+RESOURCE_TYPES = {"backend-services": "BackendService", "url-maps": "UrlMap", "networks": "Network",
+                  "firewall-rules": "Firewall", "health-checks": "HealthCheck"}
+
+
+class Request(NamedTuple):
+    name: str
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+# ---------------------------------------------------------------------------
+# Corpus -> REST requests
+# ---------------------------------------------------------------------------
+
+def _camel(flag: str) -> str:
+    first, *rest = flag.split("-")
+    return first + "".join(part[:1].upper() + part[1:] for part in rest)
+
+
+def _url(path: str) -> str:
+    return f"projects/{PROJECT}/{path}"
+
+
+def _size_gb(size: str) -> str:
+    return re.sub(r"(?i)gb$", "", size)
+
+
+def _boot_disk(flags: Dict[str, str]) -> List[Dict[str, Any]]:
+    image = f"projects/{flags.get('image-project', 'debian-cloud')}/global/images/family/{flags.get('image-family', 'debian-11')}"
+    return [{"boot": True, "autoDelete": True, "initializeParams": {"sourceImage": image}}]
+
+
+def _create_body(group: str, name: str, flags: Dict[str, str], location: str, kind: Optional[str]) -> Dict[str, Any]:
+    """The flat resource gcloud sends to create ``name`` in ``group``."""
+    body: Dict[str, Any] = {"name": name}
+    network = _url(f"global/networks/{flags.get('network', 'default')}")
+    if group == "networks":
+        body["autoCreateSubnetworks"] = flags.get("subnet-mode", "auto") == "auto"
+    elif group == "networks subnets":
+        body.update(network=network, ipCidrRange=flags.get("range"), region=_url(location))
+    elif group == "firewall-rules":
+        allowed = []
+        for rule in flags.get("allow", "").split(","):
+            protocol, _, ports = rule.partition(":")
+            allowed.append({"IPProtocol": protocol, **({"ports": [ports]} if ports else {})})
+        body.update(network=network, allowed=allowed)
+        if "source-ranges" in flags:
+            body["sourceRanges"] = flags["source-ranges"].split(",")
+    elif group == "instances":
+        body.update(machineType=f"{location}/machineTypes/{flags.get('machine-type', 'n1-standard-1')}",
+                    disks=_boot_disk(flags), networkInterfaces=[{"network": network}])
+    elif group == "disks":
+        body.update(sizeGb=_size_gb(flags.get("size", "10GB")),
+                    type=_url(f"{location}/diskTypes/{flags.get('type', 'pd-standard')}"))
+    elif group == "health-checks":
+        protocol = (kind or "http").upper()
+        body.update(type=protocol, **{f"{protocol.lower()}HealthCheck": {"port": int(flags.get("port", 80))}})
+    elif group == "backend-services":
+        body.update(protocol=flags.get("protocol", "HTTP"),
+                    healthChecks=[_url(f"global/healthChecks/{check}")
+                                  for check in flags.get("health-checks", "").split(",") if check])
+    elif group == "url-maps":
+        body["defaultService"] = _url(f"global/backendServices/{flags.get('default-service')}")
+    elif group == "target-http-proxies":
+        body["urlMap"] = _url(f"global/urlMaps/{flags.get('url-map')}")
+    elif group == "forwarding-rules":
+        if "target-http-proxy" in flags:
+            body["target"] = _url(f"global/targetHttpProxies/{flags['target-http-proxy']}")
+        if "ports" in flags:
+            body["portRange"] = flags["ports"]
+    elif group == "instance-templates":
+        body["properties"] = {"machineType": flags.get("machine-type", "n1-standard-1"),
+                              "disks": _boot_disk(flags), "networkInterfaces": [{"network": network}]}
+    elif group == "routes":
+        body.update(network=network, destRange=flags.get("destination-range"))
+        if "next-hop-gateway" in flags:
+            body["nextHopGateway"] = _url(f"global/gateways/{flags['next-hop-gateway']}")
+    return body
+
+
+def to_request(command: str) -> Optional[Tuple[str, str, str, Optional[Dict[str, Any]]]]:
+    """(name, method, path, JSON body) of a ``gcpcli`` command, or None if it cannot be replayed."""
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        return None
+    if len(tokens) < 3 or tokens[0] != "gcpcli":
+        return None
+    words = [token for token in tokens[1:] if not token.startswith("--")]
+    flags = {}
+    for token in tokens[1:]:
+        if token.startswith("--"):
+            key, _, value = token[2:].partition("=")
+            flags[key] = value
+    group = " ".join(words[:2]) if " ".join(words[:2]) in COLLECTIONS else words[0]
+    if group not in COLLECTIONS:
+        return None
+    words = words[len(group.split()):]
+    if not words:
+        return None
+    verb, positional = words[0], words[1:]
+    command = f"{group} {verb}"
+    kind = positional.pop(0) if group == "health-checks" and verb == "create" and len(positional) > 1 else None
+    name = positional[0] if positional else None
+    collection, scope = COLLECTIONS[group]
+
+    zone = flags.get("zone") or (flags.get("zones") or "").split(",")[0]
+    if scope is None:
+        location = ""
+    elif scope == "zonal" or (zone and group == "operations"):
+        location = f"zones/{zone or DEFAULT_ZONE}" if zone or verb != "list" else ""
+    elif "global" in flags or scope == "global":
+        location = "global"
+    else:
+        region = flags.get("region")
+        location = f"regions/{region or DEFAULT_REGION}" if region or verb != "list" else ""
+    if location:
+        base = f"/compute/v1/projects/{PROJECT}/{location}/{collection}"
+    elif scope is None:
+        base = f"/compute/v1/projects/{PROJECT}/{collection}"
+    else:
+        base = f"/compute/v1/projects/{PROJECT}/aggregated/{collection}"
+
+    # Bodies other than insert's go to the parsers as is, wrapped in their request type
+    if verb == "list":
+        return command, "GET", base, None
+    if name is None:
+        return None
+    if verb == "describe":
+        return command, "GET", f"{base}/{name}", None
+    if verb == "delete":
+        return command, "DELETE", f"{base}/{name}", None
+    if verb == "create":
+        return command, "POST", base, _create_body(group, name, flags, location, kind)
+    if verb == "update" and group in RESOURCE_TYPES:
+        fields = {_camel(key): value for key, value in flags.items()
+                  if key not in ("global", "region", "zone", "quiet", "format")}
+        return command, "PATCH", f"{base}/{name}", {RESOURCE_TYPES[group]: fields}
+    if group == "instances" and verb in ("start", "stop"):
+        return command, "POST", f"{base}/{name}/{verb}", None
+    if group == "instances" and verb == "set-machine-type":
+        return command, "POST", f"{base}/{name}/setMachineType", {"InstancesSetMachineTypeRequest": {"machineType": f"{location}/machineTypes/{flags.get('machine-type')}"}}
+    if group == "instances" and verb == "add-tags":
+        return command, "POST", f"{base}/{name}/setTags", {"Tags": {"items": flags.get("tags", "").split(",")}}
+    if group == "disks" and verb == "snapshot":
+        return command, "POST", f"{base}/{name}/createSnapshot", {"name": flags.get("snapshot-names", name).split(",")[0]}
+    if group == "disks" and verb == "resize":
+        return command, "POST", f"{base}/{name}/resize", {"DisksResizeRequest": {"sizeGb": _size_gb(flags.get("size", ""))}}
+    return None
+
+
+def load_corpus(read_only: bool, pattern: Optional[str]) -> List[Request]:
+    """The replayable requests of the corpus, in corpus order."""
+    with open(CORPUS) as handle:
+        corpus = json.load(handle)
+    requests = []
+    for entries in corpus.values():
+        for entry in entries:
+            translated = to_request(entry["cmd"])
+            if translated is None:
+                continue
+            name, method, path, body = translated
+            if read_only and name.rsplit(" ", 1)[1] not in READ_ONLY_VERBS:
+                continue
+            if pattern and not re.search(pattern, name):
+                continue
+            headers = {"Accept": "application/json"}
+            data = b""
+            if body is not None:
+                headers["Content-Type"] = "application/json"
+                data = json.dumps(body).encode()
+            requests.append(Request(name, method, path, headers, data))
+    return requests
+
+
+def error_code(status: int, body: bytes) -> Optional[str]:
+    """The error reason of a response (NOT_FOUND, ...; None on success), else its status."""
+    if status < 400:
+        return None
+    try:
+        error = json.loads(body)["error"]
+    except (ValueError, KeyError, TypeError):
+        return f"HTTP{status}"
+    reasons = [item.get("reason") for item in error.get("errors") or () if isinstance(item, dict)]
+    return next(filter(None, reasons), None) or error.get("status") or f"HTTP{status}"
+
+
+# ---------------------------------------------------------------------------
+# Keep-alive HTTP/1.1 client
+# ---------------------------------------------------------------------------
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reopened after the server closes it."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, request: Request) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        head = [f"{request.method} {request.path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                f"Content-Length: {len(request.body)}", "Connection: keep-alive"]
+        head.extend(f"{name}: {value}" for name, value in request.headers.items())
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + request.body)
+        try:
+            return await self._response()
+        except BaseException:
+            self.close()
+            raise
+
+    async def _response(self) -> Tuple[int, bytes]:
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed by the server")
+        version, status = status_line.split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if not size:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close" or version == b"HTTP/1.0":
+            self.close()
+        return int(status), body
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class Pool:
+    """Up to ``size`` keep-alive connections, handed out one request at a time."""
+
+    def __init__(self, endpoint: str, size: int) -> None:
+        parts = urlsplit(endpoint)
+        self._idle: "asyncio.Queue[Connection]" = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(Connection(parts.hostname or "localhost", parts.port or 80))
+
+    async def request(self, request: Request) -> Tuple[int, bytes]:
+        connection = await self._idle.get()
+        try:
+            return await connection.request(request)
+        finally:
+            self._idle.put_nowait(connection)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+# ---------------------------------------------------------------------------
+# Replay and report
+# ---------------------------------------------------------------------------
+
+class Stats:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, "collections.Counter[Tuple[str, str]]"] = collections.defaultdict(collections.Counter)
+
+    def record(self, name: str, seconds: float, status: str, code: Optional[str]) -> None:
+        self.latencies[name].append(seconds)
+        if code is not None:
+            self.errors[name][(status, code)] += 1
+
+
+async def replay(requests: List[Request], endpoint: str, concurrency: int, connections: int, rate: float,
+                 duration: float, total: int, timeout: float) -> Tuple[Stats, float]:
+    """Replay ``requests`` round-robin until ``duration`` seconds or ``total`` requests; returns stats and seconds."""
+    pool = Pool(endpoint, connections)
+    stats = Stats()
+    sent = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration else float("inf")
+
+    async def worker() -> None:
+        nonlocal sent
+        while True:
+            index = sent
+            if (total and index >= total) or time.perf_counter() >= deadline:
+                return
+            sent += 1
+            if rate:
+                delay = start + index / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            request = requests[index % len(requests)]
+            began = time.perf_counter()
+            try:
+                status, body = await asyncio.wait_for(pool.request(request), timeout)
+                stats.record(request.name, time.perf_counter() - began, str(status), error_code(status, body))
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                stats.record(request.name, time.perf_counter() - began, "transport", type(e).__name__)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    pool.close()
+    return stats, time.perf_counter() - start
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e3, 3)
+
+    return {"p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1e3, 3)}
+
+
+def report(stats: Stats, seconds: float, args: argparse.Namespace) -> Dict[str, Any]:
+    everything = [latency for latencies in stats.latencies.values() for latency in latencies]
+    errors: "collections.Counter[Tuple[str, str]]" = collections.Counter()
+    for counter in stats.errors.values():
+        errors.update(counter)
+    return {
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "connections": args.connections or args.concurrency,
+        "rate": args.rate,
+        "seconds": round(seconds, 3),
+        "requests": len(everything),
+        "throughput": round(len(everything) / seconds, 1) if seconds else None,
+        "errors": sum(errors.values()),
+        "latency": _percentiles(everything) if everything else {},
+        "errorsByCode": [{"status": status, "code": code, "count": count}
+                         for (status, code), count in errors.most_common()],
+        "commands": {name: {"requests": len(latencies), "errors": sum(stats.errors[name].values()),
+                           **_percentiles(latencies)}
+                    for name, latencies in sorted(stats.latencies.items())},
+    }
+
+
+def print_report(summary: Dict[str, Any], top: int) -> None:
+    latency = summary["latency"]
+    print(f"requests:   {summary['requests']} in {summary['seconds']:.1f} s "
+          f"({summary['throughput']} req/s, concurrency {summary['concurrency']})")
+    if latency:
+        print(f"latency:    p50 {latency['p50_ms']} ms, p90 {latency['p90_ms']} ms, "
+              f"p99 {latency['p99_ms']} ms, max {latency['max_ms']} ms")
+    print(f"errors:     {summary['errors']}")
+    for row in summary["errorsByCode"][:top]:
+        print(f"  {row['count']:>8}  {row['status']:<9} {row['code']}")
+    print()
+    print(f"{'command':<48} {'requests':>8} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    slowest = sorted(summary["commands"].items(), key=lambda item: -item[1]["p99_ms"])
+    for name, row in slowest[:top]:
+        print(f"{name:<48} {row['requests']:>8} {row['errors']:>7} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", default="http://localhost:9100", help="emulator URL")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--connections", type=int, default=0, help="keep-alive connections (default: concurrency)")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second over all workers (0: unlimited)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run (0: until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="requests to send (0: until --duration)")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a request counts as failed")
+    parser.add_argument("--read-only", action="store_true", help="only replay list and describe commands")
+    parser.add_argument("--commands", metavar="REGEX", help="only replay commands ('instances create') matching this")
+    parser.add_argument("--top", type=int, default=20, help="error codes and slowest commands to print")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("give --duration or --requests")
+
+    requests = load_corpus(args.read_only, args.commands)
+    if not requests:
+        parser.error("no corpus commands left to replay")
+    print(f"replaying {len(requests)} corpus requests against {args.endpoint}")
+    stats, seconds = asyncio.run(replay(requests, args.endpoint, args.concurrency,
+                                        args.connections or args.concurrency, args.rate,
+                                        args.duration, args.requests, args.timeout))
+    summary = report(stats, seconds, args)
+    print_report(summary, args.top)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(summary, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())